@@ -1,5 +1,6 @@
 from pathlib import Path
 import os
+import tempfile
 from dotenv import load_dotenv
 from datetime import timedelta
 
@@ -36,7 +37,7 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',  # Agregar WhiteNoise aquí
+    'projects.middleware.AsyncWhiteNoiseMiddleware',  # WhiteNoise compatible con ASGI
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -77,6 +78,8 @@ DATABASES = {
         'OPTIONS': {
             'init_command': "SET sql_mode='STRICT_TRANS_TABLES'",
             'charset': 'utf8mb4',
+            # LOAD DATA LOCAL INFILE (carga nativa); el servidor también debe habilitarlo
+            'local_infile': int(os.getenv('MYSQL_LOCAL_INFILE', 'false').lower() == 'true'),
         },
     }
 }
@@ -137,6 +140,145 @@ AWS_S3_FILE_OVERWRITE = False
 AWS_S3_ML_MODEL_PREFIX = os.environ.get('AWS_S3_ML_MODEL_PREFIX', 'ml_model/')
 AWS_S3_BUCKET_NAME = AWS_STORAGE_BUCKET_NAME
 
+# =============================================================================
+# CONFIGURACIÓN DE INFERENCIA
+# =============================================================================
+
+# Segundos que un modelo cargado se sirve desde memoria antes de revalidar
+# su versión (mtime local o ETag de S3) contra el storage
+MODEL_REGISTRY_TTL_SECONDS = float(os.environ.get('MODEL_REGISTRY_TTL_SECONDS', '30'))
+
+# Evaluar los bosques aleatorios con el motor compilado en NumPy (sklearn queda
+# como respaldo). Por encima de COMPILED_FOREST_MAX_ROWS filas se usa sklearn,
+# cuyo recorrido en Cython es más rápido para lotes grandes.
+USE_COMPILED_FOREST = os.environ.get('USE_COMPILED_FOREST', 'true').lower() == 'true'
+COMPILED_FOREST_MAX_ROWS = int(os.environ.get('COMPILED_FOREST_MAX_ROWS', '512'))
+
+# Formato de los artefactos de modelo: 'compact' (arreglos planos con tipos
+# estrechos, mapeables en memoria y compartidos entre workers) o 'pickle'.
+# La compresión (0-9) solo se aplica a la copia en S3; al servir se guarda
+# descomprimida en MODEL_CACHE_DIR para poder mapearla.
+MODEL_ARTIFACT_FORMAT = os.environ.get('MODEL_ARTIFACT_FORMAT', 'compact')
+MODEL_ARTIFACT_COMPRESS = int(os.environ.get('MODEL_ARTIFACT_COMPRESS', '3'))
+MODEL_CACHE_DIR = os.environ.get('MODEL_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'bohlin_model_cache'))
+
+# Combinaciones de características cuya probabilidad se memoriza (0 la desactiva)
+PREDICTION_CACHE_SIZE = int(os.environ.get('PREDICTION_CACHE_SIZE', '100000'))
+
+# Filas por bloque en batch_predict con stream=true
+BATCH_PREDICT_CHUNK_ROWS = int(os.environ.get('BATCH_PREDICT_CHUNK_ROWS', '50000'))
+
+# Procesos para evaluar lotes grandes en paralelo (0 o 1 lo desactiva) y
+# tamaño mínimo de lote a partir del cual se reparte entre procesos
+PREDICTION_WORKERS = int(os.environ.get('PREDICTION_WORKERS', '0'))
+PARALLEL_SCORING_MIN_ROWS = int(os.environ.get('PARALLEL_SCORING_MIN_ROWS', '200000'))
+
+# Precargar y calentar el modelo al iniciar cada worker. /api/ready/ solo
+# responde 200 cuando el modelo está residente en memoria.
+MODEL_PRELOAD = os.environ.get('MODEL_PRELOAD', 'false').lower() == 'true'
+MODEL_PRELOAD_FILENAME = os.environ.get('MODEL_PRELOAD_FILENAME', 'modelo_accidentes.pkl')
+
+# Micro-lotes de /api/predict-async/: máximo de registros por llamada al modelo
+# y espera máxima (ms) para acumularlos
+MICRO_BATCH_MAX_SIZE = int(os.environ.get('MICRO_BATCH_MAX_SIZE', '256'))
+MICRO_BATCH_MAX_WAIT_MS = float(os.environ.get('MICRO_BATCH_MAX_WAIT_MS', '2'))
+
+# =============================================================================
+# CONFIGURACIÓN DE ENTRENAMIENTO
+# =============================================================================
+
+# Motor de modelo: 'random_forest' (admite reentrenamiento incremental y el
+# bosque compilado) o 'hist_gradient_boosting' (tamaño fijo, categorías nativas).
+# El comando compare_model_engines guarda la comparación en ENGINE_COMPARISON_FILENAME
+MODEL_ENGINE = os.environ.get('MODEL_ENGINE', 'random_forest')
+ENGINE_COMPARISON_FILENAME = os.environ.get('ENGINE_COMPARISON_FILENAME', 'comparacion_motores.json')
+
+# Datos sintéticos y benchmarks: CSV real sobre el que se ajusta el generador,
+# escalas (filas) por defecto del comando run_benchmarks, informe en el storage
+# y modelo que entrena la suite (nunca el de producción)
+SYNTHETIC_SOURCE_CSV = os.environ.get(
+    'SYNTHETIC_SOURCE_CSV', os.path.join(BASE_DIR.parent, 'Requisitos', 'df_modelo_normalizado_v2.csv')
+)
+BENCHMARK_SCALES = os.environ.get('BENCHMARK_SCALES', '10000,100000')
+BENCHMARK_REPORT_FILENAME = os.environ.get('BENCHMARK_REPORT_FILENAME', 'benchmark_entrenamiento.json')
+BENCHMARK_MODEL_FILENAME = os.environ.get('BENCHMARK_MODEL_FILENAME', 'benchmark_modelo.pkl')
+
+# Segundos entre consultas a la cola de entrenamiento del comando run_training_worker
+TRAINING_WORKER_POLL_SECONDS = float(os.environ.get('TRAINING_WORKER_POLL_SECONDS', '5'))
+
+# Latido de lo que ejecuta el worker (entrenamientos y cargas por partes):
+# segundos entre latidos y segundos sin latido tras los que se da por
+# abandonado (worker caído por OOM o despliegue) y se marca como fallido
+JOB_HEARTBEAT_SECONDS = float(os.environ.get('JOB_HEARTBEAT_SECONDS', '30'))
+JOB_STALE_SECONDS = float(os.environ.get('JOB_STALE_SECONDS', '600'))
+
+# Núcleos para SMOTE, el ajuste del bosque y la evaluación (convención de
+# joblib: -1 = todos los disponibles, -2 = todos menos uno)
+TRAINING_N_JOBS = int(os.environ.get('TRAINING_N_JOBS', '-1'))
+
+# Filas por consulta al cargar la tabla de siniestros para entrenar
+TRAINING_LOAD_CHUNK_ROWS = int(os.environ.get('TRAINING_LOAD_CHUNK_ROWS', '100000'))
+
+# Reentrenamiento tras /api/upload-and-train/: 'incremental' agrega árboles
+# entrenados con los registros nuevos, 'full' reentrena sobre toda la tabla
+UPLOAD_RETRAIN_MODE = os.environ.get('UPLOAD_RETRAIN_MODE', 'incremental')
+
+# Filas por bloque al parsear el CSV subido (se insertan a medida que se leen)
+UPLOAD_CHUNK_ROWS = int(os.environ.get('UPLOAD_CHUNK_ROWS', '50000'))
+
+# Carga masiva: filas por INSERT (cada lote en su transacción; un lote que
+# falla se divide hasta aislar las filas inválidas) y máximo de filas con
+# error detalladas en la respuesta
+UPLOAD_BULK_BATCH_SIZE = int(os.environ.get('UPLOAD_BULK_BATCH_SIZE', '2000'))
+UPLOAD_MAX_ERROR_DETAILS = int(os.environ.get('UPLOAD_MAX_ERROR_DETAILS', '50'))
+
+# Carga nativa: 'orm' (bulk_create por bloques) o 'native' (archivo de staging
+# y LOAD DATA en MySQL) por defecto en upload-and-train, y carpeta del staging
+UPLOAD_LOAD_MODE = os.environ.get('UPLOAD_LOAD_MODE', 'orm')
+NATIVE_LOAD_STAGING_DIR = os.environ.get('NATIVE_LOAD_STAGING_DIR', tempfile.gettempdir())
+
+# Carga por partes (/api/uploads/): carpeta local de partes y resultados (con
+# USE_S3_STORAGE van al bucket bajo AWS_S3_UPLOAD_PREFIX), tamaño máximo por
+# parte, máximo de partes y horas sin actividad antes de purgar una sesión
+UPLOAD_PARTS_DIR = os.environ.get('UPLOAD_PARTS_DIR', os.path.join(BASE_DIR, 'upload_parts'))
+UPLOAD_PART_MAX_BYTES = int(os.environ.get('UPLOAD_PART_MAX_BYTES', str(64 * 1024 * 1024)))
+UPLOAD_MAX_PARTS = int(os.environ.get('UPLOAD_MAX_PARTS', '10000'))
+UPLOAD_SESSION_TTL_HOURS = float(os.environ.get('UPLOAD_SESSION_TTL_HOURS', '48'))
+AWS_S3_UPLOAD_PREFIX = os.environ.get('AWS_S3_UPLOAD_PREFIX', 'uploads/')
+
+# Importación offline (manage.py import_siniestros): procesos por defecto
+# (0 = núcleos disponibles) y tamaño mínimo del tramo en que se divide un CSV
+# sin comprimir para repartirlo entre procesos
+IMPORT_WORKERS = int(os.environ.get('IMPORT_WORKERS', '0'))
+IMPORT_SPLIT_BYTES = int(os.environ.get('IMPORT_SPLIT_BYTES', str(128 * 1024 * 1024)))
+
+# Reentrenamiento incremental: árboles nuevos por reentrenamiento, tamaño máximo
+# del bosque (se retiran los más antiguos; 0 = sin límite) y filas antiguas de
+# repaso por cada fila nueva
+INCREMENTAL_NEW_TREES = int(os.environ.get('INCREMENTAL_NEW_TREES', '20'))
+INCREMENTAL_MAX_TREES = int(os.environ.get('INCREMENTAL_MAX_TREES', '200'))
+INCREMENTAL_REPLAY_RATIO = float(os.environ.get('INCREMENTAL_REPLAY_RATIO', '1.0'))
+INCREMENTAL_REPLAY_MAX_ROWS = int(os.environ.get('INCREMENTAL_REPLAY_MAX_ROWS', '200000'))
+
+# Horas entre entrenamientos completos programados por run_training_worker (0 = nunca)
+FULL_RETRAIN_INTERVAL_HOURS = float(os.environ.get('FULL_RETRAIN_INTERVAL_HOURS', '24'))
+
+# Búsqueda de hiperparámetros (successive halving): folds, factor de reducción
+# por ronda, filas máximas usadas y archivo con los mejores parámetros, que
+# train_model usa en lugar de los valores por defecto
+TUNING_CV_FOLDS = int(os.environ.get('TUNING_CV_FOLDS', '3'))
+TUNING_HALVING_FACTOR = int(os.environ.get('TUNING_HALVING_FACTOR', '3'))
+TUNING_MAX_ROWS = int(os.environ.get('TUNING_MAX_ROWS', '200000'))
+BEST_HYPERPARAMS_FILENAME = os.environ.get('BEST_HYPERPARAMS_FILENAME', 'mejores_hiperparametros.json')
+
+# Snapshots en disco de la matriz de entrenamiento (columnas .npy abiertas con
+# mmap), versionados por filas, id máximo, último FECHA_INGRESO y última
+# FECHA_MODIFICACION; solo se leen de la base de datos las filas nuevas. TRAINING_SNAPSHOT_KEEP = snapshots
+# (combinaciones de filtros) que se conservan
+TRAINING_SNAPSHOTS_ENABLED = os.environ.get('TRAINING_SNAPSHOTS_ENABLED', 'true').lower() == 'true'
+TRAINING_SNAPSHOT_DIR = os.environ.get('TRAINING_SNAPSHOT_DIR', os.path.join(BASE_DIR, 'training_snapshots'))
+TRAINING_SNAPSHOT_KEEP = int(os.environ.get('TRAINING_SNAPSHOT_KEEP', '4'))
+
 # =============================================================================
 # CONFIGURACIÓN DE ARCHIVOS MEDIA (UPLOADS DE USUARIOS)
 # =============================================================================
@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class ProjectsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'projects'
+
+    def ready(self):
+        # Precarga opcional del modelo para que ningún worker atienda en frío
+        from .warmup import should_preload, warm_up
+        if should_preload():
+            warm_up()
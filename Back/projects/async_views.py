@@ -0,0 +1,151 @@
+"""
+Predicción asíncrona con micro-lotes (/api/predict-async/).
+
+La vista corre en el event loop (ASGI) sin pasar por DRF: autentica el JWT
+sin consultar la base de datos, valida cada registro contra el esquema del
+modelo y encola solo filas ya convertidas en el ``MicroBatcher``, de modo
+que una petición mal formada no afecta a las demás del mismo micro-lote.
+"""
+
+import asyncio
+import json
+import numpy as np
+import pandas as pd
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.request import Request
+from rest_framework_simplejwt.authentication import JWTStatelessUserAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, AuthenticationFailed
+from .models import Siniestro
+from .micro_batching import get_micro_batcher
+from .model_registry import get_model_registry
+from .prediction_results import build_prediction_columns, rows_from_columns, summarize_predictions
+
+
+def _authenticate(request):
+    """Valida el token JWT de la petición (las vistas async no pasan por DRF).
+
+    Se usa la variante sin estado, que no consulta la base de datos, para no
+    serializar las peticiones concurrentes en el hilo del ORM.
+    """
+    try:
+        return JWTStatelessUserAuthentication().authenticate(Request(request))
+    except (InvalidToken, AuthenticationFailed):
+        return None
+
+
+@csrf_exempt
+async def predict_async(request):
+    """
+    Realiza predicciones agrupando las peticiones concurrentes en micro-lotes.
+
+    Acepta el mismo cuerpo JSON que /api/predict/ ('data', 'threshold',
+    'model_filename'); cada registro se encola y se evalúa junto con los que
+    lleguen de otras peticiones dentro de la ventana configurada.
+    """
+    if request.method != 'POST':
+        return JsonResponse({
+            'success': False,
+            'message': 'Método no permitido'
+        }, status=405)
+
+    if _authenticate(request) is None:
+        return JsonResponse({
+            'success': False,
+            'message': 'Las credenciales de autenticación no se proveyeron o son inválidas'
+        }, status=401)
+
+    try:
+        body = json.loads(request.body or b'{}')
+    except ValueError:
+        return JsonResponse({
+            'success': False,
+            'message': 'El cuerpo de la petición debe ser JSON válido'
+        }, status=400)
+
+    if not isinstance(body, dict):
+        return JsonResponse({
+            'success': False,
+            'message': 'El cuerpo de la petición debe ser un objeto JSON'
+        }, status=400)
+
+    data = body.get('data')
+    model_filename = body.get('model_filename', 'modelo_accidentes.pkl')
+    try:
+        threshold = float(body.get('threshold', 0.5))
+    except (TypeError, ValueError):
+        return JsonResponse({
+            'success': False,
+            'message': 'threshold debe ser un número'
+        }, status=400)
+
+    if not data:
+        return JsonResponse({
+            'success': False,
+            'message': 'No se proporcionaron datos para predecir',
+            'required_fields': Siniestro.TRAINING_FIELDS
+        }, status=400)
+
+    if isinstance(data, dict):
+        data = [data]
+    if not isinstance(data, list) or not all(isinstance(record, dict) for record in data):
+        return JsonResponse({
+            'success': False,
+            'message': 'data debe ser un objeto o una lista de objetos',
+            'required_fields': Siniestro.TRAINING_FIELDS
+        }, status=400)
+
+    missing_fields = sorted({
+        field for record in data for field in Siniestro.TRAINING_FIELDS if field not in record
+    })
+    if missing_fields:
+        return JsonResponse({
+            'success': False,
+            'message': 'Faltan campos requeridos en los datos',
+            'missing_fields': missing_fields,
+            'required_fields': Siniestro.TRAINING_FIELDS
+        }, status=400)
+
+    try:
+        # Cada petición se valida por separado; al micro-lote solo llegan filas convertidas
+        loop = asyncio.get_running_loop()
+        schema = await loop.run_in_executor(None, get_model_registry().get_schema, model_filename)
+        validation = schema.validate(pd.DataFrame.from_records(data, columns=Siniestro.TRAINING_FIELDS))
+        if not validation.is_valid:
+            return JsonResponse({
+                'success': False,
+                'message': 'Se encontraron valores nulos, no enteros o fuera de rango en campos requeridos',
+                'validation': validation.report(),
+                'required_fields': Siniestro.TRAINING_FIELDS
+            }, status=400)
+
+        df = pd.DataFrame(validation.values, columns=validation.fields)
+        batcher = get_micro_batcher()
+        probabilities = await asyncio.gather(*[
+            batcher.predict(model_filename, row) for row in validation.values.astype(np.float64).tolist()
+        ])
+    except FileNotFoundError:
+        return JsonResponse({
+            'success': False,
+            'message': 'Modelo no encontrado. Primero entrene el modelo usando /api/train-model/'
+        }, status=404)
+    except Exception as e:
+        return JsonResponse({
+            'success': False,
+            'message': 'Error al realizar predicciones',
+            'error': str(e)
+        }, status=500)
+
+    columns, predictions = build_prediction_columns(df, probabilities, threshold)
+    full_summary = summarize_predictions(probabilities, predictions)
+
+    return JsonResponse({
+        'success': True,
+        'predictions': rows_from_columns(columns),
+        'summary': {
+            key: full_summary[key]
+            for key in ('total_predictions', 'accidents_predicted', 'high_risk', 'medium_risk', 'low_risk')
+        },
+        'threshold_used': threshold,
+        'micro_batching': dict(batcher.stats)
+    })
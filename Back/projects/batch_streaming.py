@@ -0,0 +1,125 @@
+"""
+Predicción por lotes en streaming para archivos CSV de gran tamaño.
+
+El archivo se lee por bloques de filas directamente desde el stream del
+upload, cada bloque se evalúa y se escribe en la respuesta en cuanto está
+listo, de modo que la memoria usada no depende del tamaño del archivo.
+El resumen del lote se acumula bloque a bloque y se emite al final como
+una línea de comentario (``# summary: {...}``), legible con
+``pd.read_csv(..., comment='#')``.
+"""
+
+import json
+import numpy as np
+import pandas as pd
+from .models import Siniestro
+from .prediction_cache import get_prediction_cache
+from .prediction_results import BatchSummary, risk_levels
+from .input_schema import FeatureSchema
+
+
+def open_csv_chunks(file_obj, chunk_size):
+    """
+    Abre el CSV subido para leerlo por bloques y valida el primer bloque.
+
+    Args:
+        file_obj: Archivo subido (UploadedFile)
+        chunk_size (int): Filas por bloque
+
+    Returns:
+        tuple: (primer bloque, iterador con los bloques restantes)
+
+    Raises:
+        ValueError: Si el archivo está vacío o faltan columnas requeridas
+    """
+    # Los streams descomprimidos (cargas por partes) no admiten seek y ya están al inicio
+    if file_obj.seekable():
+        file_obj.seek(0)
+    reader = pd.read_csv(file_obj, chunksize=chunk_size, encoding='utf-8')
+    try:
+        first_chunk = next(reader)
+    except StopIteration:
+        raise ValueError('El archivo CSV está vacío')
+
+    first_chunk.columns = first_chunk.columns.str.strip()
+    if first_chunk.empty:
+        raise ValueError('El archivo CSV está vacío')
+
+    missing_fields = [field for field in Siniestro.TRAINING_FIELDS if field not in first_chunk.columns]
+    if missing_fields:
+        raise ValueError(f'Faltan columnas requeridas en el archivo CSV: {missing_fields}')
+
+    return first_chunk, reader
+
+
+def stream_predictions_csv(first_chunk, reader, predictor, threshold, summary=None, schema=None):
+    """
+    Genera el CSV de resultados bloque a bloque.
+
+    Las filas con valores nulos o que no cumplen el esquema del modelo se
+    conservan con las columnas de predicción vacías y se cuentan como
+    ``invalid_rows``.
+
+    Args:
+        first_chunk (pd.DataFrame): Primer bloque ya validado
+        reader: Iterador con los bloques restantes
+        predictor (ModelPredictor): Predictor del modelo
+        threshold (float): Umbral de probabilidad para clasificación
+        summary (BatchSummary, optional): Acumulador del resumen
+        schema (FeatureSchema, optional): Esquema de entrada del modelo
+
+    Yields:
+        str: Fragmentos del CSV de salida
+    """
+    if summary is None:
+        summary = BatchSummary()
+    if schema is None:
+        schema = FeatureSchema()
+    columns = list(first_chunk.columns)
+    cache = get_prediction_cache()
+
+    def chunks():
+        yield first_chunk
+        for chunk in reader:
+            chunk.columns = chunk.columns.str.strip()
+            yield chunk
+
+    header = True
+    for chunk in chunks():
+        validation = schema.validate(chunk)
+        valid = validation.valid_rows
+        n_rows = len(chunk)
+
+        probabilities = np.full(n_rows, np.nan)
+        if valid.any():
+            probabilities[valid] = cache.predict_proba(predictor, validation.values[valid])
+        valid_probabilities = probabilities[valid]
+        valid_predictions = (valid_probabilities >= threshold).astype(int)
+        summary.update(valid_probabilities, valid_predictions)
+        summary.invalid_rows += int(n_rows - np.count_nonzero(valid))
+
+        output = chunk[columns]
+        if valid.all():
+            output = output.assign(
+                PREDICTION=valid_predictions,
+                PROBABILITY=probabilities,
+                RISK_LEVEL=risk_levels(probabilities),
+                ACCIDENT_LIKELY=valid_predictions.astype(bool)
+            )
+        else:
+            predictions = pd.array(np.zeros(n_rows, dtype=int), dtype='Int64')
+            predictions[~valid] = pd.NA
+            predictions[valid] = valid_predictions
+            levels = np.where(valid, risk_levels(probabilities), '')
+            output = output.assign(
+                PREDICTION=predictions,
+                PROBABILITY=probabilities,
+                RISK_LEVEL=levels,
+                ACCIDENT_LIKELY=predictions.astype('boolean')
+            )
+
+        yield output.to_csv(index=False, header=header)
+        header = False
+
+    report = dict(summary.to_dict(), invalid_rows=summary.invalid_rows)
+    yield f"# summary: {json.dumps(report, ensure_ascii=False)}\n"
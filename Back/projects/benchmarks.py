@@ -0,0 +1,355 @@
+"""
+Suite de benchmarks del entrenamiento y de los endpoints de ingesta y predicción.
+
+Para cada escala (filas en la tabla) se insertan siniestros sintéticos
+(``synthetic_data``) marcados con FECHA_INGRESO = BENCHMARK_INGRESO_DATE y
+se entrena solo sobre ellos, midiendo cada etapa de AccidentPredictorAPI con
+su perfil (tiempo de pared y RSS máximo). Las escalas son acumulativas: al
+pasar de 100k a 1M filas solo se insertan las 900k que faltan.
+
+Después se miden los endpoints en el mismo proceso con el cliente de DRF:
+``/api/predict/`` y ``/api/batch-predict/`` contra el modelo entrenado en la
+mayor escala y ``/api/upload-and-train/`` (sin reentrenamiento) con CSV
+sintéticos de distintos tamaños.
+
+El informe es un JSON con la versión del código, las librerías y la base de
+datos; ``compare_reports`` lo contrasta con el de otra versión. Las filas
+insertadas se borran al terminar, pero la suite escribe en la base de datos
+configurada: debe correrse sobre una base de desarrollo (SQLite o MySQL local).
+"""
+
+import io
+import os
+import platform
+import subprocess
+import time
+from datetime import date, datetime
+import numpy as np
+import pandas as pd
+import sklearn
+import django
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import connection
+from .models import Siniestro
+from .columnar_loader import get_integer_fields, load_dataframe
+from .model_trainer import AccidentPredictorAPI
+from .synthetic_data import SyntheticSiniestroGenerator
+
+# FECHA_INGRESO de las filas sintéticas: las separa de los datos reales
+BENCHMARK_INGRESO_DATE = date(1900, 1, 1)
+
+REPORT_FORMAT_VERSION = 1
+
+
+def get_benchmark_scales():
+    scales = getattr(settings, 'BENCHMARK_SCALES', '10000,100000')
+    if isinstance(scales, str):
+        scales = [int(scale) for scale in scales.split(',') if scale.strip()]
+    return sorted(int(scale) for scale in scales)
+
+
+def benchmark_queryset():
+    return Siniestro.objects.filter(FECHA_INGRESO=BENCHMARK_INGRESO_DATE)
+
+
+def clear_benchmark_rows():
+    """Borra las filas sintéticas de corridas anteriores; retorna cuántas había."""
+    deleted, _ = benchmark_queryset().delete()
+    return deleted
+
+
+def _code_version():
+    """Commit actual del repositorio, si está disponible."""
+    try:
+        output = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, timeout=5
+        )
+        return output.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def _environment():
+    return {
+        'code_version': _code_version(),
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'scikit_learn': sklearn.__version__,
+        'database': connection.vendor,
+        'cpu_count': os.cpu_count(),
+        'platform': platform.platform()
+    }
+
+
+def _latency_summary(seconds, rows):
+    seconds = np.asarray(seconds)
+    median = float(np.median(seconds))
+    return {
+        'rows': int(rows),
+        'repeats': int(len(seconds)),
+        'ms_p50': round(median * 1000, 3),
+        'ms_p95': round(float(np.percentile(seconds, 95)) * 1000, 3),
+        'rows_per_second': round(rows / median, 1) if median > 0 else None
+    }
+
+
+def benchmark_training(engine=None, random_state=42):
+    """
+    Entrena sobre las filas sintéticas midiendo cada etapa.
+
+    La carga se mide tres veces: lectura directa de la base de datos, carga
+    que actualiza el snapshot en disco y carga desde el snapshot (la que
+    queda en el perfil, como en un reentrenamiento sin cambios en la tabla).
+
+    Args:
+        engine (str, optional): Motor de modelo
+        random_state (int): Semilla de la partición y de SMOTE
+
+    Returns:
+        tuple: (resultado de la escala, predictor entrenado)
+    """
+    queryset = benchmark_queryset()
+    predictor = AccidentPredictorAPI(engine=engine)
+
+    start = time.perf_counter()
+    load_dataframe(queryset, get_integer_fields(Siniestro, predictor.excluded_columns))
+    database_seconds = time.perf_counter() - start
+
+    predictor.load_data_from_model(Siniestro, {'FECHA_INGRESO': BENCHMARK_INGRESO_DATE})
+    refresh = predictor.profiler.stages.pop('load_data')
+    refresh_source = predictor.data.attrs.get('snapshot')
+    predictor.load_data_from_model(Siniestro, {'FECHA_INGRESO': BENCHMARK_INGRESO_DATE})
+
+    predictor.prepare_data(random_state=random_state)
+    predictor.apply_smote(random_state=random_state)
+    # Hiperparámetros por defecto del motor: los informes deben ser comparables
+    predictor.train_model(hyperparams=predictor.engine.default_hyperparams)
+    predictor.evaluate_model()
+    predictor.save_model(get_benchmark_model_filename())
+
+    profile = predictor.profiler.to_dict()
+    result = {
+        'rows': len(predictor.data),
+        'training_samples': len(predictor.X_train),
+        'smote_samples': len(predictor.X_train_smote),
+        'engine': predictor.engine.name,
+        'load': {
+            'database_seconds': round(database_seconds, 3),
+            'snapshot_refresh': dict(refresh, source=refresh_source),
+            'snapshot_source': predictor.data.attrs.get('snapshot')
+        },
+        'stages': profile['stages'],
+        'total_wall_seconds': profile['total_wall_seconds'],
+        'peak_rss_mb': profile['peak_rss_mb'],
+        'cpu_budget': profile['cpu_budget'],
+        'roc_auc': predictor.metrics.get('roc_auc'),
+        'f1_score': predictor.metrics.get('f1_score')
+    }
+    return result, predictor
+
+
+def get_benchmark_model_filename():
+    return getattr(settings, 'BENCHMARK_MODEL_FILENAME', 'benchmark_modelo.pkl')
+
+
+def _api_client():
+    # Import tardío: el cliente de pruebas de DRF solo se necesita aquí
+    from rest_framework.test import APIClient
+    client = APIClient(SERVER_NAME='localhost')
+    client.force_authenticate(user=User(username='benchmark'))
+    return client
+
+
+def _csv_upload(frame, name):
+    buffer = io.BytesIO(frame.to_csv(index=False).encode('utf-8'))
+    buffer.name = name
+    return buffer
+
+
+def benchmark_endpoints(generator, payload_rows=(100, 1000), repeats=5, random_state=7):
+    """
+    Mide los endpoints de predicción e ingesta con cargas sintéticas.
+
+    Args:
+        generator (SyntheticSiniestroGenerator): Generador ajustado
+        payload_rows (list): Tamaños de carga (filas por petición)
+        repeats (int): Peticiones por tamaño para predicción
+        random_state (int): Semilla de las cargas
+
+    Returns:
+        dict: Latencia por endpoint y tamaño
+
+    Raises:
+        RuntimeError: Si algún endpoint responde con error
+    """
+    client = _api_client()
+    model_filename = get_benchmark_model_filename()
+    results = {'predict': {}, 'batch_predict': {}, 'upload': {}}
+
+    for rows in payload_rows:
+        frame = next(generator.generate(rows, random_state=random_state, chunk_size=rows, null_dates=True))
+        features = frame[Siniestro.TRAINING_FIELDS]
+
+        records = features.to_dict('records')
+        timings = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            response = client.post('/api/predict/', {'data': records, 'model_filename': model_filename},
+                                   format='json')
+            timings.append(time.perf_counter() - start)
+            _check_response(response, 'predict')
+        results['predict'][str(rows)] = _latency_summary(timings, rows)
+
+        timings = []
+        for _ in range(repeats):
+            upload = _csv_upload(features, 'benchmark.csv')
+            start = time.perf_counter()
+            response = client.post('/api/batch-predict/', {'file': upload, 'model_filename': model_filename},
+                                   format='multipart')
+            timings.append(time.perf_counter() - start)
+            _check_response(response, 'batch-predict')
+        results['batch_predict'][str(rows)] = _latency_summary(timings, rows)
+
+        # La carga inserta filas con la fecha de hoy: se borran por rango de llave
+        last_pk = Siniestro.objects.order_by('-pk').values_list('pk', flat=True).first() or 0
+        upload = _csv_upload(frame, 'benchmark.csv')
+        start = time.perf_counter()
+        response = client.post('/api/upload-and-train/', {'file': upload, 'auto_retrain': 'false'},
+                               format='multipart')
+        elapsed = time.perf_counter() - start
+        try:
+            _check_response(response, 'upload-and-train')
+        finally:
+            Siniestro.objects.filter(pk__gt=last_pk).exclude(FECHA_INGRESO=BENCHMARK_INGRESO_DATE).delete()
+        results['upload'][str(rows)] = _latency_summary([elapsed], rows)
+
+    return results
+
+
+def _check_response(response, endpoint):
+    if response.status_code >= 400:
+        raise RuntimeError(f"{endpoint} respondió {response.status_code}: {str(response.content[:300])}")
+
+
+def run_benchmark_suite(scales=None, engine=None, payload_rows=(100, 1000), predict_repeats=5,
+                        include_endpoints=True, keep_data=False, random_state=42, progress_callback=None):
+    """
+    Corre la suite completa y arma el informe.
+
+    Args:
+        scales (list, optional): Filas sintéticas por escala (por defecto BENCHMARK_SCALES)
+        engine (str, optional): Motor de modelo
+        payload_rows (list): Filas por petición en los endpoints
+        predict_repeats (int): Peticiones por tamaño en los endpoints de predicción
+        include_endpoints (bool): Medir también los endpoints
+        keep_data (bool): Conservar las filas sintéticas al terminar
+        random_state (int): Semilla
+        progress_callback (callable, optional): Recibe un mensaje por paso
+
+    Returns:
+        dict: Informe del benchmark
+    """
+    def report(message):
+        print(message)
+        if progress_callback:
+            progress_callback(message)
+
+    scales = sorted(int(scale) for scale in scales) if scales else get_benchmark_scales()
+    generator = SyntheticSiniestroGenerator.from_csv()
+    sample = next(generator.generate(min(100000, scales[-1]), random_state=random_state))
+
+    removed = clear_benchmark_rows()
+    if removed:
+        report(f"Filas de benchmark anteriores eliminadas: {removed}")
+
+    results = []
+    inserted = 0
+    try:
+        for i, scale in enumerate(scales):
+            rows = scale - inserted
+            report(f"Escala {scale}: insertando {rows} filas sintéticas")
+            start = time.perf_counter()
+            created = generator.insert(rows, BENCHMARK_INGRESO_DATE, random_state=random_state + i)
+            insert_seconds = time.perf_counter() - start
+            inserted = scale
+
+            report(f"Escala {scale}: entrenando")
+            scale_result, _ = benchmark_training(engine=engine, random_state=random_state)
+            scale_result['scale'] = scale
+            scale_result['ingestion'] = {
+                'method': 'bulk_create',
+                'rows': rows,
+                # Filas sintéticas idénticas a una existente se omiten por su huella
+                'duplicates_skipped': rows - created,
+                'seconds': round(insert_seconds, 3),
+                'rows_per_second': round(rows / insert_seconds, 1) if insert_seconds > 0 else None
+            }
+            results.append(scale_result)
+
+        endpoints = None
+        if include_endpoints:
+            report("Midiendo endpoints")
+            endpoints = benchmark_endpoints(generator, payload_rows, predict_repeats)
+    finally:
+        if not keep_data:
+            clear_benchmark_rows()
+
+    return {
+        'format': REPORT_FORMAT_VERSION,
+        'generated_at': datetime.now().isoformat(),
+        'environment': _environment(),
+        'engine': results[-1]['engine'] if results else engine,
+        'generator': dict(generator.describe(), fidelity=generator.fidelity(sample)),
+        'scales': results,
+        'endpoints': endpoints
+    }
+
+
+def _flatten_metrics(report):
+    """Métricas comparables del informe: {nombre: valor} (tiempos en s o ms)."""
+    metrics = {}
+    for scale in report.get('scales', []):
+        prefix = f"scale_{scale['scale']}"
+        metrics[f'{prefix}.ingestion_rows_per_second'] = scale['ingestion']['rows_per_second']
+        metrics[f'{prefix}.load_database_seconds'] = scale['load']['database_seconds']
+        metrics[f'{prefix}.total_wall_seconds'] = scale['total_wall_seconds']
+        metrics[f'{prefix}.peak_rss_mb'] = scale['peak_rss_mb']
+        for stage, values in scale['stages'].items():
+            metrics[f'{prefix}.{stage}_seconds'] = values['wall_seconds']
+    for endpoint, sizes in (report.get('endpoints') or {}).items():
+        for rows, values in sizes.items():
+            metrics[f'{endpoint}_{rows}.ms_p50'] = values['ms_p50']
+    return metrics
+
+
+def compare_reports(baseline, current):
+    """
+    Compara dos informes del benchmark métrica por métrica.
+
+    Args:
+        baseline (dict): Informe de referencia (otra versión)
+        current (dict): Informe actual
+
+    Returns:
+        dict: {métrica: {baseline, current, ratio}} para las métricas presentes
+        en ambos; ratio = actual / referencia (en filas/s, mayor es mejor;
+        en tiempos y memoria, menor es mejor)
+    """
+    before, after = _flatten_metrics(baseline), _flatten_metrics(current)
+    comparison = {}
+    for name in before:
+        if name in after and before[name] and after[name] is not None:
+            comparison[name] = {
+                'baseline': before[name],
+                'current': after[name],
+                'ratio': round(after[name] / before[name], 3)
+            }
+    return {
+        'baseline_version': baseline.get('environment', {}).get('code_version'),
+        'current_version': current.get('environment', {}).get('code_version'),
+        'metrics': comparison
+    }
@@ -0,0 +1,257 @@
+"""
+Formatos binarios y columnares para las entradas y salidas de predicción.
+
+Formatos soportados:
+
+* Matriz cruda (``application/x-siniestro-matrix``): cabecera little-endian
+  seguida de los datos fila por fila, sin padding::
+
+      magic     4s   b'SINM'
+      version   u1   1
+      dtype     u1   1=int8, 2=int16, 3=float32
+      n_cols    u2
+      n_rows    u4
+      names_len u4   longitud de los nombres de columna
+      names     ...  nombres en UTF-8 separados por comas
+
+  Los datos se leen con ``np.frombuffer`` sobre el cuerpo de la petición, sin
+  copiarlos; si las columnas ya vienen en el orden de TRAINING_FIELDS esa
+  misma vista es la que recibe el modelo.
+
+* Apache Arrow IPC (``application/vnd.apache.arrow.stream`` y
+  ``application/vnd.apache.arrow.file``) y Parquet
+  (``application/vnd.apache.parquet``). Requieren ``pyarrow``, que es
+  opcional; cada columna se expone a NumPy sin copia y se apilan una sola
+  vez en la matriz del modelo con el dtype entero más estrecho.
+"""
+
+import struct
+import numpy as np
+from rest_framework.exceptions import ParseError, UnsupportedMediaType
+from rest_framework.parsers import BaseParser
+from .models import Siniestro
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:  # pyarrow es opcional
+    pa = None
+
+MATRIX_MEDIA_TYPE = 'application/x-siniestro-matrix'
+ARROW_STREAM_MEDIA_TYPE = 'application/vnd.apache.arrow.stream'
+ARROW_FILE_MEDIA_TYPE = 'application/vnd.apache.arrow.file'
+PARQUET_MEDIA_TYPE = 'application/vnd.apache.parquet'
+
+MATRIX_MAGIC = b'SINM'
+MATRIX_VERSION = 1
+MATRIX_HEADER = struct.Struct('<4sBBHII')
+MATRIX_DTYPES = {1: np.dtype('<i1'), 2: np.dtype('<i2'), 3: np.dtype('<f4')}
+MATRIX_DTYPE_CODES = {dtype: code for code, dtype in MATRIX_DTYPES.items()}
+
+
+class FeatureMatrix:
+    """Matriz de características decodificada desde un cuerpo binario."""
+
+    def __init__(self, values, media_type):
+        """
+        Args:
+            values (np.ndarray): Matriz (n_filas, n_campos) en el orden de TRAINING_FIELDS
+            media_type (str): Formato en que llegó la petición
+        """
+        self.values = values
+        self.media_type = media_type
+
+    def __len__(self):
+        return len(self.values)
+
+    def get(self, key, default=None):
+        # Permite usar request.data.get(...) igual que con JSON o formularios
+        return default
+
+
+def _order_columns(names):
+    """Retorna los índices de columna en el orden de TRAINING_FIELDS."""
+    missing = [field for field in Siniestro.TRAINING_FIELDS if field not in names]
+    if missing:
+        raise ParseError(f'Faltan columnas requeridas: {missing}')
+    return [names.index(field) for field in Siniestro.TRAINING_FIELDS]
+
+
+def decode_matrix(data):
+    """
+    Decodifica una matriz cruda sin copiar los datos.
+
+    Args:
+        data (bytes): Cuerpo de la petición
+
+    Returns:
+        np.ndarray: Matriz en el orden de TRAINING_FIELDS
+    """
+    if len(data) < MATRIX_HEADER.size:
+        raise ParseError('Cabecera de matriz incompleta')
+    magic, version, dtype_code, n_cols, n_rows, names_len = MATRIX_HEADER.unpack_from(data)
+    if magic != MATRIX_MAGIC or version != MATRIX_VERSION:
+        raise ParseError('Cabecera de matriz no reconocida')
+    if dtype_code not in MATRIX_DTYPES:
+        raise ParseError(f'Tipo de dato no soportado: {dtype_code}')
+
+    names_end = MATRIX_HEADER.size + names_len
+    try:
+        names = data[MATRIX_HEADER.size:names_end].decode('utf-8').split(',')
+    except UnicodeDecodeError:
+        raise ParseError('Los nombres de columna de la matriz no son UTF-8 válido')
+    if len(names) != n_cols:
+        raise ParseError('La cabecera declara un número de columnas distinto a sus nombres')
+
+    dtype = MATRIX_DTYPES[dtype_code]
+    expected = names_end + n_rows * n_cols * dtype.itemsize
+    if len(data) != expected:
+        raise ParseError(f'Tamaño de cuerpo inválido: se esperaban {expected} bytes y se recibieron {len(data)}')
+
+    values = np.frombuffer(data, dtype=dtype, count=n_rows * n_cols, offset=names_end).reshape(n_rows, n_cols)
+    order = _order_columns(names)
+    if order == list(range(n_cols)):
+        return values
+    return values[:, order]
+
+
+def encode_matrix(values, names):
+    """
+    Codifica una matriz en el formato crudo.
+
+    Args:
+        values (np.ndarray): Matriz int8, int16 o float32
+        names (list): Nombres de las columnas
+
+    Returns:
+        bytes: Cuerpo codificado
+    """
+    values = np.ascontiguousarray(values)
+    dtype = values.dtype.newbyteorder('<')
+    if dtype not in MATRIX_DTYPE_CODES:
+        raise ValueError(f'Tipo de dato no soportado para matriz: {values.dtype}')
+    names_bytes = ','.join(names).encode('utf-8')
+    header = MATRIX_HEADER.pack(
+        MATRIX_MAGIC, MATRIX_VERSION, MATRIX_DTYPE_CODES[dtype],
+        values.shape[1], values.shape[0], len(names_bytes)
+    )
+    return header + names_bytes + values.astype(dtype, copy=False).tobytes()
+
+
+def _require_pyarrow():
+    if pa is None:
+        raise UnsupportedMediaType(
+            'application/vnd.apache.*',
+            detail='Los formatos Arrow y Parquet requieren instalar pyarrow'
+        )
+
+
+def table_to_matrix(table):
+    """
+    Convierte una tabla Arrow en la matriz del modelo.
+
+    Args:
+        table (pyarrow.Table): Tabla con los campos de entrenamiento
+
+    Returns:
+        np.ndarray: Matriz en el orden de TRAINING_FIELDS
+    """
+    _order_columns(table.column_names)
+    columns = []
+    for field in Siniestro.TRAINING_FIELDS:
+        column = table.column(field)
+        if column.null_count:
+            raise ParseError(f'La columna {field} contiene valores nulos')
+        columns.append(column.combine_chunks().to_numpy(zero_copy_only=False))
+    dtype = np.result_type(*columns) if columns else np.int16
+    if dtype.kind in 'iu' and all(c.size == 0 or (c.min() >= -128 and c.max() <= 127) for c in columns):
+        dtype = np.int8
+    return np.column_stack(columns).astype(dtype, copy=False)
+
+
+def decode_table(data, media_type):
+    """Lee un cuerpo Arrow IPC o Parquet como tabla."""
+    _require_pyarrow()
+    try:
+        buffer = pa.py_buffer(data)
+        if media_type == PARQUET_MEDIA_TYPE:
+            return pyarrow.parquet.read_table(pa.BufferReader(buffer))
+        if media_type == ARROW_FILE_MEDIA_TYPE:
+            return pyarrow.ipc.open_file(buffer).read_all()
+        return pyarrow.ipc.open_stream(buffer).read_all()
+    except pa.ArrowException as e:
+        raise ParseError(f'No se pudo leer el cuerpo {media_type}: {e}')
+
+
+def encode_results(media_type, probabilities, predictions, risk_levels):
+    """
+    Codifica los resultados de predicción en el formato de la petición.
+
+    La matriz cruda solo admite un dtype, así que se devuelve en float32 con
+    las columnas PROBABILITY y PREDICTION; Arrow y Parquet incluyen además
+    RISK_LEVEL.
+
+    Args:
+        media_type (str): Formato de salida
+        probabilities (np.ndarray): Probabilidades de accidente
+        predictions (np.ndarray): Predicciones (0/1)
+        risk_levels (np.ndarray): Niveles de riesgo
+
+    Returns:
+        bytes: Cuerpo de la respuesta
+    """
+    if media_type == MATRIX_MEDIA_TYPE:
+        values = np.column_stack([probabilities, predictions]).astype(np.float32)
+        return encode_matrix(values, ['PROBABILITY', 'PREDICTION'])
+
+    _require_pyarrow()
+    table = pa.table({
+        'PREDICTION': pa.array(np.asarray(predictions, dtype=np.int8)),
+        'PROBABILITY': pa.array(np.asarray(probabilities, dtype=np.float64)),
+        'RISK_LEVEL': pa.array(np.asarray(risk_levels, dtype=str))
+    })
+    sink = pa.BufferOutputStream()
+    if media_type == PARQUET_MEDIA_TYPE:
+        pyarrow.parquet.write_table(table, sink)
+    elif media_type == ARROW_FILE_MEDIA_TYPE:
+        with pyarrow.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    else:
+        with pyarrow.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+class FeatureMatrixParser(BaseParser):
+    """Parser DRF para matrices crudas de códigos enteros."""
+
+    media_type = MATRIX_MEDIA_TYPE
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        return FeatureMatrix(decode_matrix(stream.read()), MATRIX_MEDIA_TYPE)
+
+
+class ArrowStreamParser(BaseParser):
+    """Parser DRF para Apache Arrow IPC (formato stream)."""
+
+    media_type = ARROW_STREAM_MEDIA_TYPE
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        table = decode_table(stream.read(), self.media_type)
+        return FeatureMatrix(table_to_matrix(table), self.media_type)
+
+
+class ArrowFileParser(ArrowStreamParser):
+    """Parser DRF para Apache Arrow IPC (formato file)."""
+
+    media_type = ARROW_FILE_MEDIA_TYPE
+
+
+class ParquetParser(ArrowStreamParser):
+    """Parser DRF para cuerpos Parquet."""
+
+    media_type = PARQUET_MEDIA_TYPE
+
+
+BINARY_PARSERS = [FeatureMatrixParser, ArrowStreamParser, ArrowFileParser, ParquetParser]
@@ -0,0 +1,385 @@
+"""
+Importación offline de CSV de siniestros repartida entre procesos.
+
+La usa el comando ``import_siniestros`` para cargas iniciales y backfills de
+varios GB fuera del servidor web. Cada archivo es una tarea; los CSV sin
+comprimir mayores que IMPORT_SPLIT_BYTES se dividen además en tramos de bytes
+alineados a fin de línea (cada tramo se lee con el encabezado del archivo
+antepuesto). Los archivos comprimidos no se pueden dividir y van enteros.
+
+Cada tarea usa las mismas funciones que /api/upload-and-train/
+(``ingest_csv_upload`` o ``load_csv_native``), así que las reglas de
+validación y la omisión de duplicados por huella son las mismas. Con
+validación, antes de insertar se revisan todas las tareas
+(``check_csv_upload``) y si alguna no pasa no se inserta nada; después cada
+tarea se inserta en su propia transacción.
+
+Las filas con saltos de línea dentro de un campo entre comillas no son
+válidas en este formato (todos los campos son numéricos o fechas), por lo
+que dividir por líneas es seguro.
+"""
+
+import io
+import multiprocessing
+import os
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from django.conf import settings
+from django.db import DatabaseError, connection, connections
+from .csv_ingestion import (
+    GZIP_MAGIC, ZSTD_MAGIC, CsvUploadError, check_csv_upload, ingest_csv_upload, is_supported_upload
+)
+from .native_load import load_csv_native
+
+IMPORT_LOAD_MODES = ('orm', 'native')
+
+# Bytes por lectura al recorrer un tramo
+READ_BUFFER_BYTES = 1024 * 1024
+
+# Filas procesadas por todas las tareas (compartido entre procesos)
+_worker_counter = None
+
+
+def get_import_workers(workers=None):
+    """Procesos a usar: el valor pedido, IMPORT_WORKERS o los núcleos disponibles."""
+    if workers is None:
+        workers = getattr(settings, 'IMPORT_WORKERS', 0)
+    workers = int(workers)
+    return workers if workers > 0 else (os.cpu_count() or 1)
+
+
+def collect_import_files(paths):
+    """
+    Lista los archivos a importar.
+
+    Args:
+        paths (list): Archivos o carpetas; de las carpetas se toman (sin
+            recorrer subcarpetas) los archivos .csv, .csv.gz y .csv.zst
+
+    Returns:
+        list: Rutas de los archivos, en orden y sin repetir
+
+    Raises:
+        CsvUploadError: Si una ruta no existe o no hay archivos que importar
+    """
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(
+                os.path.join(path, name) for name in sorted(os.listdir(path))
+                if is_supported_upload(name) and os.path.isfile(os.path.join(path, name))
+            )
+        elif os.path.isfile(path):
+            files.append(path)
+        else:
+            raise CsvUploadError(f'No existe el archivo o carpeta: {path}')
+
+    unique = list(dict.fromkeys(os.path.abspath(path) for path in files))
+    if not unique:
+        raise CsvUploadError('No se encontraron archivos CSV para importar')
+    return unique
+
+
+def _is_compressed(path):
+    with open(path, 'rb') as f:
+        magic = f.read(4)
+    return magic.startswith(GZIP_MAGIC) or magic.startswith(ZSTD_MAGIC)
+
+
+def _line_start_after(f, position):
+    """Primer inicio de línea en ``position`` o después."""
+    f.seek(position - 1)
+    f.readline()
+    return f.tell()
+
+
+def plan_import_tasks(files, split_bytes=None):
+    """
+    Reparte los archivos en tareas.
+
+    Args:
+        files (list): Rutas de los archivos
+        split_bytes (int, optional): Tamaño mínimo de un tramo (por defecto
+            IMPORT_SPLIT_BYTES; 0 no divide los archivos)
+
+    Returns:
+        list: Tareas (dict con path, start, end y label); ``end`` None indica
+        el archivo completo
+    """
+    if split_bytes is None:
+        split_bytes = getattr(settings, 'IMPORT_SPLIT_BYTES', 128 * 1024 * 1024)
+    tasks = []
+    for path in files:
+        size = os.path.getsize(path)
+        name = os.path.basename(path)
+        pieces = size // split_bytes if split_bytes > 0 else 0
+        if pieces < 2 or _is_compressed(path):
+            tasks.append({'path': path, 'start': 0, 'end': None, 'label': name})
+            continue
+
+        with open(path, 'rb') as f:
+            header_end = len(f.readline())
+            boundaries = [0]
+            for k in range(1, pieces):
+                boundary = _line_start_after(f, k * size // pieces)
+                if header_end < boundary < size and boundary > boundaries[-1]:
+                    boundaries.append(boundary)
+        boundaries.append(size)
+        for start, end in zip(boundaries, boundaries[1:]):
+            tasks.append({'path': path, 'start': start, 'end': end, 'label': f'{name} [{start}-{end}]'})
+    return tasks
+
+
+class RangeReader:
+    """Lee un tramo [start, end) de un CSV con su encabezado antepuesto (read y seek(0))."""
+
+    def __init__(self, path, start, end):
+        self.path = path
+        self.start = start
+        self.end = end
+        self._file = open(path, 'rb')
+        self._header = self._file.readline() if start > 0 else b''
+        self.seek(0)
+
+    def seek(self, offset, whence=0):
+        if offset != 0 or whence != 0:
+            raise io.UnsupportedOperation('RangeReader solo admite seek(0)')
+        self._pending = self._header
+        self._file.seek(self.start)
+        return 0
+
+    def seekable(self):
+        return False
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            size = READ_BUFFER_BYTES
+        data = self._pending[:size]
+        self._pending = self._pending[len(data):]
+        remaining = min(size - len(data), self.end - self._file.tell())
+        if remaining > 0:
+            data += self._file.read(remaining)
+        return data
+
+    def close(self):
+        self._file.close()
+
+
+def _open_task(task):
+    if task['end'] is None:
+        return open(task['path'], 'rb')
+    return RangeReader(task['path'], task['start'], task['end'])
+
+
+def _init_worker(counter):
+    """Inicializa un proceso de importación con el contador compartido de filas."""
+    global _worker_counter
+    from django.apps import apps
+    if not apps.ready:
+        import django
+        django.setup()
+    _worker_counter = counter
+
+
+def _progress_callback():
+    """Suma al contador compartido las filas nuevas de cada bloque."""
+    last = [0]
+
+    def callback(rows):
+        if _worker_counter is not None:
+            with _worker_counter.get_lock():
+                _worker_counter.value += rows - last[0]
+        last[0] = rows
+    return callback
+
+
+def run_import_task(task, phase, options):
+    """
+    Revisa ('check') o inserta ('insert') una tarea en el proceso actual.
+
+    Args:
+        task (dict): Tarea de plan_import_tasks
+        phase (str): 'check' o 'insert'
+        options (dict): default_date, ingreso_date, validate, load_mode,
+            chunk_size y batch_size
+
+    Returns:
+        dict: label, success, result (totales de la carga) o message y details,
+        y range_start: byte donde empieza el tramo (None si es el archivo
+        completo); en un tramo, las filas de los errores son relativas a él
+    """
+    outcome = {'label': task['label'], 'success': False,
+               'range_start': task['start'] if task['end'] is not None else None}
+    try:
+        file_obj = _open_task(task)
+    except OSError as e:
+        outcome.update(message=f'No se pudo leer el archivo: {e}', details={})
+        return outcome
+
+    try:
+        if phase == 'check':
+            outcome['result'] = check_csv_upload(
+                file_obj, options['default_date'],
+                validate=options['validate'],
+                chunk_size=options['chunk_size'],
+                progress_callback=_progress_callback()
+            )
+        elif options['load_mode'] == 'native':
+            outcome['result'] = load_csv_native(
+                file_obj, options['default_date'], options['ingreso_date'],
+                validate=options['validate'],
+                chunk_size=options['chunk_size'],
+                batch_size=options['batch_size'],
+                progress_callback=_progress_callback()
+            )
+        else:
+            outcome['result'] = ingest_csv_upload(
+                file_obj, options['default_date'], options['ingreso_date'],
+                validate=options['validate'],
+                chunk_size=options['chunk_size'],
+                batch_size=options['batch_size'],
+                progress_callback=_progress_callback()
+            )
+        outcome['success'] = True
+    except CsvUploadError as e:
+        outcome.update(message=str(e), details=e.details)
+    except (OSError, DatabaseError) as e:
+        outcome.update(message=f'Error en la carga: {e}', details={})
+    except Exception as e:
+        # Un error inesperado falla solo esta tarea; las demás siguen y se reportan
+        print(traceback.format_exc())
+        outcome.update(message=f'Error inesperado: {e}', details={'type': type(e).__name__})
+    finally:
+        file_obj.close()
+    return outcome
+
+
+def _run_phase(tasks, phase, options, workers, on_progress, progress_interval):
+    """Ejecuta una fase sobre todas las tareas; en paralelo si hay más de un proceso."""
+    global _worker_counter
+    counter = multiprocessing.Value('q', 0)
+    start_time = time.perf_counter()
+    outcomes = []
+
+    def report():
+        if on_progress:
+            seconds = time.perf_counter() - start_time
+            on_progress(phase, counter.value, seconds, len(outcomes), len(tasks))
+
+    if workers < 2:
+        _worker_counter = counter
+        try:
+            for task in tasks:
+                outcomes.append(run_import_task(task, phase, options))
+                report()
+        finally:
+            _worker_counter = None
+        return outcomes, time.perf_counter() - start_time
+
+    # Los procesos hijos abren sus propias conexiones
+    connections.close_all()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(counter,)) as pool:
+        futures = {pool.submit(run_import_task, task, phase, options): index for index, task in enumerate(tasks)}
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, timeout=progress_interval, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    outcome = future.result()
+                except Exception as e:
+                    # El proceso murió (p. ej. sin memoria): la tarea se reporta como fallida
+                    task = tasks[futures[future]]
+                    outcome = {'label': task['label'], 'success': False,
+                               'range_start': task['start'] if task['end'] is not None else None,
+                               'message': f'El proceso de la tarea terminó con error: {e}',
+                               'details': {'type': type(e).__name__}}
+                outcomes.append((futures[future], outcome))
+            report()
+    # Resultados en el orden de las tareas
+    return [outcome for _, outcome in sorted(outcomes, key=lambda item: item[0])], \
+        time.perf_counter() - start_time
+
+
+def _summarize(outcomes, keys):
+    totals = dict.fromkeys(keys, 0)
+    for outcome in outcomes:
+        for key in keys:
+            totals[key] += (outcome.get('result') or {}).get(key, 0)
+    return totals
+
+
+def import_siniestros(paths, default_date, ingreso_date, validate=True, dry_run=False, load_mode='orm',
+                      workers=None, chunk_size=None, batch_size=None, split_bytes=None, on_progress=None,
+                      progress_interval=5.0):
+    """
+    Importa uno o varios CSV de siniestros repartiendo el trabajo entre procesos.
+
+    Args:
+        paths (list): Archivos o carpetas a importar
+        default_date (date): Fecha para FECHA_SINIESTRO vacía
+        ingreso_date (date): FECHA_INGRESO de las filas importadas
+        validate (bool): Revisar todo antes de insertar y rechazar la
+            importación completa si algún archivo trae nulos o valores no numéricos
+        dry_run (bool): Solo revisar, sin insertar
+        load_mode (str): 'orm' (bulk_create por bloques) o 'native' (staging y LOAD DATA)
+        workers (int, optional): Procesos (por defecto IMPORT_WORKERS o los núcleos)
+        chunk_size (int, optional): Filas por bloque (por defecto UPLOAD_CHUNK_ROWS)
+        batch_size (int, optional): Filas por INSERT (por defecto UPLOAD_BULK_BATCH_SIZE)
+        split_bytes (int, optional): Tamaño mínimo de tramo (por defecto IMPORT_SPLIT_BYTES)
+        on_progress (callable, optional): Recibe (fase, filas, segundos,
+            tareas terminadas, tareas totales)
+        progress_interval (float): Segundos entre avisos de progreso
+
+    Returns:
+        dict: files, tasks, workers, check y insert (tareas y totales de cada
+        fase; insert es None con dry_run o si la revisión falló) y success
+
+    Raises:
+        CsvUploadError: Si no hay archivos o load_mode no es válido
+    """
+    if load_mode not in IMPORT_LOAD_MODES:
+        raise CsvUploadError(f'load_mode no válido: {load_mode}. Opciones: {list(IMPORT_LOAD_MODES)}')
+    files = collect_import_files(paths)
+    tasks = plan_import_tasks(files, split_bytes)
+    workers = min(get_import_workers(workers), len(tasks))
+    options = {
+        'default_date': default_date,
+        'ingreso_date': ingreso_date,
+        'validate': validate,
+        'load_mode': load_mode,
+        'chunk_size': chunk_size,
+        'batch_size': batch_size
+    }
+    report = {'files': files, 'tasks': len(tasks), 'workers': workers, 'check': None, 'insert': None,
+              'success': False}
+    print(f"Importando {len(files)} archivos en {len(tasks)} tareas con {workers} procesos")
+
+    if validate or dry_run:
+        outcomes, seconds = _run_phase(tasks, 'check', options, workers, on_progress, progress_interval)
+        totals = _summarize(outcomes, ('total_rows', 'valid_rows', 'records_errors', 'dates_fixed'))
+        report['check'] = dict(
+            totals, tasks=outcomes, seconds=round(seconds, 3),
+            rows_per_second=round(totals['total_rows'] / seconds, 1) if seconds > 0 else None
+        )
+        if not all(outcome['success'] for outcome in outcomes):
+            return report
+        if dry_run:
+            report['success'] = True
+            return report
+
+    # SQLite admite un solo escritor: los INSERT en paralelo fallarían con "database is locked"
+    insert_workers = 1 if connection.vendor == 'sqlite' else workers
+    if insert_workers != workers:
+        print(f"{connection.vendor} admite un solo escritor: la inserción usa 1 proceso")
+    report['insert_workers'] = insert_workers
+
+    outcomes, seconds = _run_phase(tasks, 'insert', options, insert_workers, on_progress, progress_interval)
+    totals = _summarize(outcomes, ('total_rows', 'records_created', 'records_duplicates', 'records_errors',
+                                   'dates_fixed'))
+    report['insert'] = dict(
+        totals, tasks=outcomes, seconds=round(seconds, 3),
+        rows_per_second=round(totals['total_rows'] / seconds, 1) if seconds > 0 else None
+    )
+    report['success'] = all(outcome['success'] for outcome in outcomes)
+    return report
@@ -0,0 +1,252 @@
+"""
+Inserción masiva de siniestros.
+
+Los valores se convierten por columna con NumPy (en lugar de ``int(row[...])``
+fila por fila) y las filas se insertan con ``bulk_create`` en lotes de
+UPLOAD_BULK_BATCH_SIZE, cada lote en su propia transacción. Si un lote
+falla, se divide en mitades recursivamente hasta aislar las filas
+inválidas: solo esas se descartan y el resto del archivo se inserta.
+
+Cada fila lleva su huella (``Siniestro.FINGERPRINT``, con índice único): las
+filas que ya están en la tabla o se repiten en el archivo se omiten y se
+cuentan como duplicadas, de modo que volver a subir un CSV no duplica datos.
+"""
+
+import time
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.db import DatabaseError, IntegrityError, transaction
+from .models import Siniestro
+
+DATE_FIELD = 'FECHA_SINIESTRO'
+INGRESO_FIELD = 'FECHA_INGRESO'
+FINGERPRINT_FIELD = 'FINGERPRINT'
+
+# Campos enteros que se insertan (entrada del modelo y objetivo)
+INTEGER_FIELDS = Siniestro.TRAINING_FIELDS + [Siniestro.TARGET_FIELD]
+
+# Valores de texto que se consideran fecha vacía
+EMPTY_DATE_VALUES = ['', 'NaN', 'nan', 'null', 'NULL', 'None']
+
+
+def get_bulk_batch_size():
+    return max(1, int(getattr(settings, 'UPLOAD_BULK_BATCH_SIZE', 2000)))
+
+
+def _row_detail(df, position, error):
+    return {
+        'row': int(position) + 1,
+        'error': error,
+        'data': {key: str(value) for key, value in df.iloc[position].to_dict().items()}
+    }
+
+
+def siniestro_rows_from_dataframe(df, default_date, ingreso_date=None, max_error_details=None):
+    """
+    Convierte un DataFrame de carga en filas listas para insertar.
+
+    Los enteros se truncan como hacía ``int()``; las filas con valores nulos,
+    no numéricos o fuera del rango de INT se descartan y se reportan.
+    FECHA_SINIESTRO vacía o no interpretable se reemplaza por ``default_date``;
+    la huella se calcula con la fecha original (FINGERPRINT_NULL_DATE si venía
+    vacía), así volver a cargar el archivo con otra fecha por defecto, u otro
+    día, no vuelve a insertar esas filas.
+
+    Args:
+        df (pd.DataFrame): Datos con INTEGER_FIELDS y FECHA_SINIESTRO
+        default_date (date): Fecha para FECHA_SINIESTRO vacía
+        ingreso_date (date, optional): FECHA_INGRESO (por defecto hoy)
+        max_error_details (int, optional): Máximo de filas inválidas a detallar
+
+    Returns:
+        dict: fields (orden de los valores), rows (lista de tuplas), row_numbers
+        (posición de cada fila en el archivo), errors (filas descartadas),
+        error_details y dates_fixed
+    """
+    if max_error_details is None:
+        max_error_details = getattr(settings, 'UPLOAD_MAX_ERROR_DETAILS', 50)
+    ingreso_date = ingreso_date or pd.Timestamp.today().date()
+
+    valid = np.ones(len(df), dtype=bool)
+    columns = {}
+    ok_by_field = {}
+    for field in INTEGER_FIELDS:
+        values = pd.to_numeric(df[field], errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+        ok = np.isfinite(values) & (np.abs(values) < 2 ** 31)
+        ok_by_field[field] = ok
+        valid &= ok
+        columns[field] = np.trunc(np.where(ok, values, 0)).astype(np.int64)
+
+    dates = df[DATE_FIELD] if DATE_FIELD in df.columns else pd.Series(None, index=df.index, dtype=object)
+    dates = pd.to_datetime(dates.replace(EMPTY_DATE_VALUES, None), errors='coerce')
+    missing_dates = dates.isna().to_numpy()
+    date_values = np.where(missing_dates, default_date, dates.dt.date.to_numpy(dtype=object))
+
+    invalid_positions = np.flatnonzero(~valid)
+    error_details = []
+    for position in invalid_positions[:max_error_details]:
+        bad = [field for field in INTEGER_FIELDS if not ok_by_field[field][position]]
+        error_details.append(_row_detail(df, position, f"Valores nulos, no numéricos o fuera de rango en: {bad}"))
+
+    positions = np.flatnonzero(valid)
+    fields = INTEGER_FIELDS + [DATE_FIELD, INGRESO_FIELD, FINGERPRINT_FIELD]
+    fingerprint_dates = np.where(missing_dates, Siniestro.FINGERPRINT_NULL_DATE, date_values)
+    compute_fingerprint = Siniestro.compute_fingerprint
+    rows = [
+        values + (row_date, ingreso_date, compute_fingerprint(values + (fingerprint_date,)))
+        for values, row_date, fingerprint_date in zip(
+            zip(*(columns[field][positions].tolist() for field in INTEGER_FIELDS)),
+            date_values[positions].tolist(),
+            fingerprint_dates[positions].tolist()
+        )
+    ]
+    return {
+        'fields': fields,
+        'rows': rows,
+        'row_numbers': positions,
+        'errors': int(len(invalid_positions)),
+        'error_details': error_details,
+        'dates_fixed': int(missing_dates[positions].sum())
+    }
+
+
+def _skip_duplicates(fingerprints, seen):
+    """Posiciones del lote cuya huella no está en la tabla ni apareció antes en el lote."""
+    existing = set(
+        Siniestro.objects.filter(**{f'{FINGERPRINT_FIELD}__in': fingerprints})
+        .values_list(FINGERPRINT_FIELD, flat=True)
+    )
+    keep = []
+    for position, fingerprint in enumerate(fingerprints):
+        if fingerprint not in existing and fingerprint not in seen:
+            seen.add(fingerprint)
+            keep.append(position)
+    return keep
+
+
+def bulk_insert_siniestros(fields, rows, row_numbers=None, batch_size=None, max_error_details=None,
+                           describe_row=None, progress_callback=None):
+    """
+    Inserta filas con bulk_create por lotes, aislando las filas que fallan.
+
+    Si ``fields`` incluye FINGERPRINT, antes de cada lote se consultan las
+    huellas que ya existen y esas filas (y las repetidas dentro del lote) se
+    omiten. Si otra carga concurrente inserta la misma fila entre la consulta
+    y el INSERT, el índice único rechaza el lote, la bisección aísla la fila
+    y se cuenta como duplicada (no se usa ``ignore_conflicts``: contaría como
+    creadas filas descartadas y en MySQL convertiría los errores de datos en
+    advertencias).
+
+    Args:
+        fields (list): Campos de Siniestro en el orden de cada tupla
+        rows (list): Tuplas de valores
+        row_numbers (array, optional): Posición de cada fila en el archivo (para los errores)
+        batch_size (int, optional): Filas por lote (por defecto UPLOAD_BULK_BATCH_SIZE)
+        max_error_details (int, optional): Máximo de errores a detallar
+        describe_row (callable, optional): Recibe (posición, error) y retorna el detalle
+        progress_callback (callable, optional): Recibe las filas procesadas hasta el momento
+
+    Returns:
+        dict: records_created, records_duplicates, records_errors, error_details,
+        batches, bisected_batches, seconds y rows_per_second
+    """
+    batch_size = batch_size or get_bulk_batch_size()
+    if max_error_details is None:
+        max_error_details = getattr(settings, 'UPLOAD_MAX_ERROR_DETAILS', 50)
+    if row_numbers is None:
+        row_numbers = np.arange(len(rows))
+    fingerprint_index = fields.index(FINGERPRINT_FIELD) if FINGERPRINT_FIELD in fields else None
+    result = {'records_created': 0, 'records_duplicates': 0, 'records_errors': 0, 'error_details': [],
+              'batches': 0, 'bisected_batches': 0}
+
+    def is_duplicate(values, error):
+        if fingerprint_index is None or not isinstance(error, IntegrityError):
+            return False
+        return FINGERPRINT_FIELD in str(error) or Siniestro.objects.filter(
+            **{FINGERPRINT_FIELD: values[fingerprint_index]}
+        ).exists()
+
+    def insert(batch, numbers):
+        objects = [Siniestro(**dict(zip(fields, values))) for values in batch]
+        try:
+            with transaction.atomic():
+                Siniestro.objects.bulk_create(objects, batch_size=batch_size)
+            result['records_created'] += len(batch)
+            return True
+        except (DatabaseError, ValueError, TypeError) as e:
+            if len(batch) == 1 and is_duplicate(batch[0], e):
+                result['records_duplicates'] += 1
+                return False
+            if len(batch) == 1:
+                result['records_errors'] += 1
+                if len(result['error_details']) < max_error_details:
+                    position = int(numbers[0])
+                    detail = describe_row(position, str(e)) if describe_row else \
+                        {'row': position + 1, 'error': str(e)}
+                    result['error_details'].append(detail)
+                return False
+            # Bisección: cada mitad en su propia transacción
+            middle = len(batch) // 2
+            insert(batch[:middle], numbers[:middle])
+            insert(batch[middle:], numbers[middle:])
+            return False
+
+    start_time = time.perf_counter()
+    seen = set()
+    for start in range(0, len(rows), batch_size):
+        end = min(start + batch_size, len(rows))
+        batch = rows[start:end]
+        numbers = row_numbers[start:end]
+        if fingerprint_index is not None:
+            keep = _skip_duplicates([values[fingerprint_index] for values in batch], seen)
+            result['records_duplicates'] += len(batch) - len(keep)
+            batch = [batch[position] for position in keep]
+            numbers = [numbers[position] for position in keep]
+        result['batches'] += 1
+        if batch and not insert(batch, numbers):
+            result['bisected_batches'] += 1
+        if progress_callback:
+            progress_callback(end)
+    seconds = time.perf_counter() - start_time
+
+    result['seconds'] = round(seconds, 3)
+    result['rows_per_second'] = round(len(rows) / seconds, 1) if seconds > 0 else None
+    return result
+
+
+def ingest_dataframe(df, default_date, ingreso_date=None, batch_size=None, progress_callback=None):
+    """
+    Convierte e inserta un DataFrame de carga.
+
+    Args:
+        df (pd.DataFrame): Datos con INTEGER_FIELDS y FECHA_SINIESTRO
+        default_date (date): Fecha para FECHA_SINIESTRO vacía
+        ingreso_date (date, optional): FECHA_INGRESO (por defecto hoy)
+        batch_size (int, optional): Filas por lote
+        progress_callback (callable, optional): Recibe las filas procesadas
+
+    Returns:
+        dict: Resultado de bulk_insert_siniestros con las filas descartadas en la
+        conversión sumadas a los errores, dates_fixed, total_rows y el
+        rendimiento medido de punta a punta (conversión incluida)
+    """
+    start_time = time.perf_counter()
+    prepared = siniestro_rows_from_dataframe(df, default_date, ingreso_date)
+    max_error_details = getattr(settings, 'UPLOAD_MAX_ERROR_DETAILS', 50)
+    result = bulk_insert_siniestros(
+        prepared['fields'], prepared['rows'], prepared['row_numbers'], batch_size,
+        max_error_details=max(0, max_error_details - len(prepared['error_details'])),
+        describe_row=lambda position, error: _row_detail(df, position, error),
+        progress_callback=progress_callback
+    )
+    seconds = time.perf_counter() - start_time
+
+    result['records_errors'] += prepared['errors']
+    result['error_details'] = prepared['error_details'] + result['error_details']
+    result['dates_fixed'] = prepared['dates_fixed']
+    result['total_rows'] = len(df)
+    result['insert_seconds'] = result['seconds']
+    result['seconds'] = round(seconds, 3)
+    result['rows_per_second'] = round(len(df) / seconds, 1) if seconds > 0 else None
+    return result
@@ -0,0 +1,773 @@
+"""
+Carga reanudable por partes de archivos CSV grandes.
+
+En lugar de enviar el archivo completo en un único multipart (que retiene un
+worker durante toda la transferencia y vuelve a empezar ante cualquier corte),
+el cliente:
+
+1. Inicia una sesión (``POST /api/uploads/``) indicando el propósito:
+   ``ingest`` (como /api/upload-and-train/) o ``predict`` (como /api/batch-predict/).
+2. Sube las partes en cualquier orden (``PUT /api/uploads/<id>/parts/<n>/``,
+   cuerpo binario). Cada parte se valida al llegar y se guarda en disco local o
+   en el bucket S3; una parte fallida se vuelve a subir sola, y
+   ``GET /api/uploads/<id>/`` indica cuáles ya se recibieron.
+3. Completa la sesión (``POST /api/uploads/<id>/complete/``): queda en cola y el
+   comando ``run_training_worker`` la procesa leyendo las partes en orden como
+   un único stream, sin reensamblar el archivo.
+
+Así cada petición HTTP dura lo que tarda en transferirse una parte.
+"""
+
+import codecs
+import csv
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+import traceback
+import zlib
+from datetime import date, datetime, timedelta
+from botocore.exceptions import ClientError
+from django.conf import settings
+from django.utils import timezone
+from .batch_streaming import open_csv_chunks, stream_predictions_csv
+from .csv_ingestion import (
+    GZIP_MAGIC, SAMPLE_BYTES, ZSTD_MAGIC, CsvUploadError, check_required_columns, ingest_csv_upload,
+    is_supported_upload, open_upload_stream, parse_csv_header, zstandard
+)
+from .model_registry import get_model_registry
+from .models import Siniestro, UploadPart, UploadSession
+from .native_load import load_csv_native
+from .parallel_scoring import get_parallel_predictor
+from .prediction_results import BatchSummary
+from .s3_utils import S3ModelStorage
+from .training_jobs import RETRAIN_MODES, Heartbeat, enqueue_training_job
+
+# Bytes leídos por vez del cuerpo de la petición y de las partes
+COPY_BUFFER_BYTES = 1024 * 1024
+
+# Bytes comprimidos de la primera parte que se descomprimen para leer el encabezado
+COMPRESSED_SAMPLE_BYTES = 4 * 1024 * 1024
+
+# Nombre del CSV de predicciones en el storage de la sesión
+RESULT_NAME = 'result.csv'
+
+DEFAULT_UPLOAD_PARAMS = {
+    UploadSession.PURPOSE_INGEST: {
+        'validate_data': True,
+        'default_date': None,
+        'load_mode': None,
+        'auto_retrain': True,
+        'retrain_mode': None
+    },
+    UploadSession.PURPOSE_PREDICT: {
+        'model_filename': 'modelo_accidentes.pkl',
+        'threshold': 0.5,
+        'chunk_size': None
+    }
+}
+
+
+class ChunkedUploadError(ValueError):
+    """Error de una operación de carga por partes; ``status_code`` y ``details`` van en la respuesta."""
+
+    def __init__(self, message, status_code=400, **details):
+        super().__init__(message)
+        self.status_code = status_code
+        self.details = details
+
+
+class LocalPartStorage:
+    """Partes y resultados en UPLOAD_PARTS_DIR/<id>/."""
+
+    name = 'local'
+
+    def __init__(self):
+        self.base_dir = getattr(settings, 'UPLOAD_PARTS_DIR', os.path.join(tempfile.gettempdir(), 'bohlin_uploads'))
+        os.makedirs(self.base_dir, exist_ok=True)
+
+    def _path(self, upload_id, name):
+        return os.path.join(self.base_dir, str(upload_id), name)
+
+    def save(self, upload_id, name, source_path):
+        path = self._path(upload_id, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(source_path, path)
+        return path
+
+    def open(self, upload_id, name):
+        return open(self._path(upload_id, name), 'rb')
+
+    def exists(self, upload_id, name):
+        return os.path.exists(self._path(upload_id, name))
+
+    def delete(self, upload_id, names=None):
+        if names is None:
+            shutil.rmtree(os.path.join(self.base_dir, str(upload_id)), ignore_errors=True)
+            return
+        for name in names:
+            if self.exists(upload_id, name):
+                os.remove(self._path(upload_id, name))
+
+
+class S3PartStorage:
+    """Partes y resultados en el bucket configurado, bajo AWS_S3_UPLOAD_PREFIX<id>/."""
+
+    name = 's3'
+
+    def __init__(self):
+        s3 = S3ModelStorage()
+        self.s3_client = s3.s3_client
+        self.bucket_name = s3.bucket_name
+        self.prefix = getattr(settings, 'AWS_S3_UPLOAD_PREFIX', 'uploads/')
+
+    def _key(self, upload_id, name):
+        return f"{self.prefix}{upload_id}/{name}"
+
+    def save(self, upload_id, name, source_path):
+        key = self._key(upload_id, name)
+        self.s3_client.upload_file(source_path, self.bucket_name, key)
+        os.remove(source_path)
+        return f"s3://{self.bucket_name}/{key}"
+
+    def open(self, upload_id, name):
+        return self.s3_client.get_object(Bucket=self.bucket_name, Key=self._key(upload_id, name))['Body']
+
+    def exists(self, upload_id, name):
+        try:
+            self.s3_client.head_object(Bucket=self.bucket_name, Key=self._key(upload_id, name))
+            return True
+        except ClientError:
+            return False
+
+    def delete(self, upload_id, names=None):
+        if names is None:
+            paginator = self.s3_client.get_paginator('list_objects_v2')
+            keys = [
+                item['Key']
+                for page in paginator.paginate(Bucket=self.bucket_name, Prefix=self._key(upload_id, ''))
+                for item in page.get('Contents', [])
+            ]
+        else:
+            keys = [self._key(upload_id, name) for name in names]
+        for start in range(0, len(keys), 1000):
+            self.s3_client.delete_objects(
+                Bucket=self.bucket_name,
+                Delete={'Objects': [{'Key': key} for key in keys[start:start + 1000]]}
+            )
+
+
+def get_part_storage(name=None):
+    """
+    Retorna el storage de partes: el de la sesión, o según USE_S3_STORAGE.
+
+    Args:
+        name (str, optional): 'local' o 's3'
+
+    Returns:
+        LocalPartStorage o S3PartStorage
+    """
+    if name is None:
+        name = 's3' if getattr(settings, 'USE_S3_STORAGE', False) else 'local'
+    return S3PartStorage() if name == 's3' else LocalPartStorage()
+
+
+def part_name(number):
+    return f"part-{number:06d}"
+
+
+class PartsReader:
+    """Lee las partes de una sesión en orden como un único archivo (read y seek(0))."""
+
+    def __init__(self, storage, upload_id, numbers):
+        self.storage = storage
+        self.upload_id = upload_id
+        self.numbers = list(numbers)
+        self._reset()
+
+    def _reset(self):
+        self._index = 0
+        self._current = None
+
+    def seek(self, offset, whence=0):
+        if offset != 0 or whence != 0:
+            raise io.UnsupportedOperation('PartsReader solo admite seek(0)')
+        self.close()
+        self._reset()
+        return 0
+
+    def seekable(self):
+        return False
+
+    def read(self, size=-1):
+        chunks = []
+        remaining = size
+        while self._index < len(self.numbers) and (size is None or size < 0 or remaining > 0):
+            if self._current is None:
+                self._current = self.storage.open(self.upload_id, part_name(self.numbers[self._index]))
+            data = self._current.read(COPY_BUFFER_BYTES if size is None or size < 0 else remaining)
+            if not data:
+                self._current.close()
+                self._current = None
+                self._index += 1
+                continue
+            chunks.append(data)
+            if size is not None and size >= 0:
+                remaining -= len(data)
+        return b''.join(chunks)
+
+    def close(self):
+        if self._current is not None:
+            self._current.close()
+            self._current = None
+
+
+def _decompressed_sample(data):
+    """Primeros SAMPLE_BYTES del contenido de la primera parte; (muestra, compresión)."""
+    if data.startswith(GZIP_MAGIC):
+        # wbits=31: formato gzip; la parte es solo el comienzo del archivo
+        decompressor = zlib.decompressobj(wbits=31)
+        return decompressor.decompress(data[:COMPRESSED_SAMPLE_BYTES], SAMPLE_BYTES), 'gzip'
+    if data.startswith(ZSTD_MAGIC):
+        if zstandard is None:
+            raise ChunkedUploadError('El archivo está comprimido con zstd; instale el paquete zstandard para cargarlo')
+        decompressor = zstandard.ZstdDecompressor().decompressobj()
+        return decompressor.decompress(data[:COMPRESSED_SAMPLE_BYTES])[:SAMPLE_BYTES], 'zstd'
+    return data[:SAMPLE_BYTES], None
+
+
+def _required_fields(purpose):
+    if purpose == UploadSession.PURPOSE_PREDICT:
+        return Siniestro.TRAINING_FIELDS
+    return Siniestro.TRAINING_FIELDS + [Siniestro.TARGET_FIELD, 'FECHA_SINIESTRO']
+
+
+def inspect_first_part(path, purpose):
+    """
+    Valida el encabezado del archivo con la primera parte.
+
+    Args:
+        path (str): Archivo con el contenido de la parte 1
+        purpose (str): 'ingest' o 'predict' (define las columnas requeridas)
+
+    Returns:
+        dict: compression, encoding y columns (cantidad y nombres)
+
+    Raises:
+        ChunkedUploadError: Si la parte está vacía o faltan columnas requeridas
+    """
+    with open(path, 'rb') as part:
+        data = part.read(COMPRESSED_SAMPLE_BYTES)
+    try:
+        sample, compression = _decompressed_sample(data)
+    except zlib.error as e:
+        raise ChunkedUploadError(f'La primera parte no es un gzip válido: {e}')
+    if not sample.strip():
+        raise ChunkedUploadError('La primera parte no contiene el encabezado del CSV')
+    try:
+        encoding, raw_names = parse_csv_header(sample)
+        check_required_columns(raw_names, _required_fields(purpose))
+    except CsvUploadError as e:
+        raise ChunkedUploadError(str(e), **e.details)
+    except ValueError as e:
+        raise ChunkedUploadError(f'No se pudo leer el encabezado del CSV: {e}')
+    return {'compression': compression, 'encoding': encoding, 'columns': list(raw_names)}
+
+
+def check_part_rows(path, number, file_info):
+    """
+    Verifica que las líneas completas de una parte sin comprimir tengan tantos
+    campos como el encabezado (detecta partes de otro archivo o corruptas).
+
+    La primera y la última línea de la parte pueden estar cortadas por el límite
+    de la parte y no se revisan. Las partes comprimidas no se pueden leer por
+    separado, y las que llegan antes que la primera no tienen encabezado con
+    qué compararse: para ellas se verifican solo el tamaño y el checksum.
+
+    Args:
+        path (str): Archivo con el contenido de la parte
+        number (int): Número de parte
+        file_info (dict): Datos de la primera parte (inspect_first_part)
+
+    Raises:
+        ChunkedUploadError: Si alguna línea completa no tiene la cantidad de campos esperada
+    """
+    if not file_info or file_info.get('compression'):
+        return
+    n_columns = len(file_info['columns'])
+    decoder = codecs.getincrementaldecoder(file_info['encoding'])(errors='replace')
+    pending = ''
+    line_number = 0
+    with open(path, 'rb') as part:
+        while True:
+            data = part.read(COPY_BUFFER_BYTES)
+            text = pending + decoder.decode(data, final=not data)
+            lines = text.split('\n')
+            pending = lines.pop()
+            for line in lines:
+                line_number += 1
+                # Línea 1: encabezado (parte 1) o cortada por el inicio de la parte
+                if line_number == 1 or not line.strip():
+                    continue
+                fields = next(csv.reader([line]))
+                if len(fields) != n_columns:
+                    raise ChunkedUploadError(
+                        f'La parte {number} tiene una línea con {len(fields)} campos; se esperaban {n_columns}',
+                        line_in_part=line_number,
+                        line=line[:200]
+                    )
+            if not data:
+                break
+
+
+def create_upload(purpose, filename, params=None, expected_size=None, expected_parts=None, user=None):
+    """
+    Inicia una carga por partes.
+
+    Args:
+        purpose (str): 'ingest' o 'predict'
+        filename (str): Nombre del archivo (.csv, .csv.gz o .csv.zst)
+        params (dict, optional): Parámetros del procesamiento (DEFAULT_UPLOAD_PARAMS)
+        expected_size (int, optional): Tamaño total declarado; se verifica al completar
+        expected_parts (int, optional): Cantidad de partes declarada
+        user (User, optional): Usuario que inicia la carga
+
+    Returns:
+        UploadSession
+
+    Raises:
+        ChunkedUploadError: Si el propósito, el nombre o los parámetros no son válidos
+    """
+    if purpose not in DEFAULT_UPLOAD_PARAMS:
+        raise ChunkedUploadError(f'Propósito no válido: {purpose}. Opciones: {list(DEFAULT_UPLOAD_PARAMS)}')
+    if not filename or not is_supported_upload(filename):
+        raise ChunkedUploadError(f'El archivo debe ser un CSV (.csv, .csv.gz o .csv.zst). Archivo recibido: {filename}')
+    max_parts = getattr(settings, 'UPLOAD_MAX_PARTS', 10000)
+    if expected_parts is not None and not 1 <= expected_parts <= max_parts:
+        raise ChunkedUploadError(f'total_parts debe estar entre 1 y {max_parts}')
+
+    upload_params = dict(DEFAULT_UPLOAD_PARAMS[purpose])
+    upload_params.update({key: value for key, value in (params or {}).items()
+                          if key in upload_params and value is not None})
+    if purpose == UploadSession.PURPOSE_INGEST:
+        if upload_params['load_mode'] not in (None, 'orm', 'native'):
+            raise ChunkedUploadError(f"load_mode no válido: {upload_params['load_mode']}. Opciones: ['orm', 'native']")
+        if upload_params['default_date']:
+            try:
+                datetime.strptime(upload_params['default_date'], '%Y-%m-%d')
+            except (TypeError, ValueError):
+                raise ChunkedUploadError(f"default_date no válida: {upload_params['default_date']}")
+        # Se valida ahora: al procesar, las filas ya estarían insertadas cuando falle el encolado
+        if upload_params['retrain_mode'] not in (None,) + RETRAIN_MODES:
+            raise ChunkedUploadError(
+                f"retrain_mode no válido: {upload_params['retrain_mode']}. Opciones: {list(RETRAIN_MODES)}"
+            )
+    else:
+        try:
+            upload_params['threshold'] = float(upload_params['threshold'])
+        except (TypeError, ValueError):
+            raise ChunkedUploadError(f"threshold no válido: {upload_params['threshold']}")
+        if upload_params['chunk_size'] is not None and int(upload_params['chunk_size']) < 1:
+            raise ChunkedUploadError('chunk_size debe ser un entero positivo')
+
+    if user is not None and not user.is_authenticated:
+        user = None
+    session = UploadSession.objects.create(
+        purpose=purpose,
+        filename=filename,
+        storage=get_part_storage().name,
+        params=upload_params,
+        expected_size=expected_size,
+        expected_parts=expected_parts,
+        created_by=user
+    )
+    print(f"Carga por partes {session.id} iniciada ({purpose}, {filename})")
+    return session
+
+
+def receive_part(session, number, stream, content_length=None, sha256=None):
+    """
+    Recibe, valida y guarda una parte. Volver a subir una parte la reemplaza.
+
+    El cuerpo se copia por bloques a un archivo temporal (no se carga completo en
+    memoria) mientras se calcula su SHA-256.
+
+    Args:
+        session (UploadSession): Sesión en estado 'uploading'
+        number (int): Número de parte (desde 1)
+        stream: Cuerpo de la petición (objeto con ``read``)
+        content_length (int, optional): Content-Length declarado; detecta transferencias cortadas
+        sha256 (str, optional): Checksum declarado por el cliente (hexadecimal)
+
+    Returns:
+        UploadPart
+
+    Raises:
+        ChunkedUploadError: Si la sesión no acepta partes o la parte no es válida
+    """
+    if session.status != UploadSession.STATUS_UPLOADING:
+        raise ChunkedUploadError(f'La carga está en estado {session.status} y no acepta partes', status_code=409)
+    max_parts = session.expected_parts or getattr(settings, 'UPLOAD_MAX_PARTS', 10000)
+    if not 1 <= number <= max_parts:
+        raise ChunkedUploadError(f'Número de parte fuera de rango (1-{max_parts})')
+    max_bytes = getattr(settings, 'UPLOAD_PART_MAX_BYTES', 64 * 1024 * 1024)
+    if content_length is not None and content_length > max_bytes:
+        raise ChunkedUploadError(f'La parte supera el máximo de {max_bytes} bytes', status_code=413)
+
+    storage = get_part_storage(session.storage)
+    spool_dir = getattr(settings, 'UPLOAD_PARTS_DIR', tempfile.gettempdir())
+    os.makedirs(spool_dir, exist_ok=True)
+    descriptor, tmp_path = tempfile.mkstemp(prefix=f'{session.id}-', suffix='.part', dir=spool_dir)
+    try:
+        digest = hashlib.sha256()
+        size = 0
+        with os.fdopen(descriptor, 'wb') as tmp:
+            while True:
+                data = stream.read(COPY_BUFFER_BYTES)
+                if not data:
+                    break
+                size += len(data)
+                if size > max_bytes:
+                    raise ChunkedUploadError(f'La parte supera el máximo de {max_bytes} bytes', status_code=413)
+                digest.update(data)
+                tmp.write(data)
+
+        if size == 0:
+            raise ChunkedUploadError('La parte está vacía')
+        if content_length is not None and size != content_length:
+            raise ChunkedUploadError(f'La parte llegó incompleta: {size} de {content_length} bytes')
+        checksum = digest.hexdigest()
+        if sha256 and sha256.lower() != checksum:
+            raise ChunkedUploadError('El checksum SHA-256 de la parte no coincide', expected=sha256, received=checksum)
+
+        file_info = session.file_info
+        if number == 1:
+            file_info = inspect_first_part(tmp_path, session.purpose)
+        check_part_rows(tmp_path, number, file_info)
+
+        storage.save(session.id, part_name(number), tmp_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    part, _ = UploadPart.objects.update_or_create(
+        session=session, number=number, defaults={'size': size, 'sha256': checksum}
+    )
+    if number == 1:
+        UploadSession.objects.filter(id=session.id).update(file_info=file_info, updated_at=timezone.now())
+        session.file_info = file_info
+    else:
+        UploadSession.objects.filter(id=session.id).update(updated_at=timezone.now())
+    return part
+
+
+def complete_upload(session):
+    """
+    Cierra la recepción de partes y encola el procesamiento.
+
+    Args:
+        session (UploadSession): Sesión en estado 'uploading'
+
+    Returns:
+        UploadSession: Sesión en estado 'queued'
+
+    Raises:
+        ChunkedUploadError: Si faltan partes o el tamaño no coincide con el declarado
+    """
+    if session.status != UploadSession.STATUS_UPLOADING:
+        raise ChunkedUploadError(f'La carga está en estado {session.status}', status_code=409)
+    parts = list(session.parts.values_list('number', 'size'))
+    numbers = [number for number, _ in parts]
+    total_parts = session.expected_parts or (numbers[-1] if numbers else 0)
+    missing = sorted(set(range(1, total_parts + 1)) - set(numbers))
+    if not numbers or missing:
+        raise ChunkedUploadError(
+            'Faltan partes por subir',
+            missing_parts=missing[:100] if numbers else [1],
+            received_parts=len(numbers)
+        )
+    total_size = sum(size for _, size in parts)
+    if session.expected_size is not None and total_size != session.expected_size:
+        raise ChunkedUploadError(
+            f'El tamaño recibido ({total_size} bytes) no coincide con el declarado ({session.expected_size} bytes)'
+        )
+
+    # Solo una petición logra cerrar la sesión
+    closed = UploadSession.objects.filter(id=session.id, status=UploadSession.STATUS_UPLOADING).update(
+        status=UploadSession.STATUS_QUEUED, updated_at=timezone.now()
+    )
+    session.refresh_from_db()
+    if not closed:
+        raise ChunkedUploadError(f'La carga está en estado {session.status}', status_code=409)
+    print(f"Carga por partes {session.id} completa: {len(numbers)} partes, {total_size} bytes")
+    return session
+
+
+def abort_upload(session):
+    """Cancela la carga y borra sus partes (no se puede cancelar mientras se procesa)."""
+    if session.status == UploadSession.STATUS_PROCESSING:
+        raise ChunkedUploadError('La carga se está procesando y no se puede cancelar', status_code=409)
+    get_part_storage(session.storage).delete(session.id)
+    session.parts.all().delete()
+    UploadSession.objects.filter(id=session.id).update(status=UploadSession.STATUS_ABORTED, updated_at=timezone.now())
+    session.refresh_from_db()
+    return session
+
+
+def _process_ingest(session, reader):
+    params = session.params
+    default_date = date.fromisoformat(params['default_date']) if params['default_date'] else date.today()
+    load_mode = params['load_mode'] or getattr(settings, 'UPLOAD_LOAD_MODE', 'orm')
+    if load_mode == 'native':
+        ingestion = load_csv_native(reader, default_date, ingreso_date=date.today(), validate=params['validate_data'])
+    else:
+        ingestion = ingest_csv_upload(reader, default_date, ingreso_date=date.today(), validate=params['validate_data'])
+
+    result = {
+        'success': ingestion['records_created'] > 0 or ingestion['records_errors'] == 0,
+        'records_created': ingestion['records_created'],
+        'records_duplicates': ingestion['records_duplicates'],
+        'records_errors': ingestion['records_errors'],
+        'dates_fixed': ingestion['dates_fixed'],
+        'error_details': ingestion['error_details'][:10],
+        'total_records_in_db': Siniestro.objects.count(),
+        'encoding': ingestion['encoding'],
+        'compression': ingestion['compression'],
+        'load_method': ingestion.get('method', 'bulk_create'),
+        'throughput': {
+            'seconds': ingestion['seconds'],
+            'rows_per_second': ingestion['rows_per_second'],
+            'chunks': ingestion['chunks']
+        },
+        'model_retrain': None
+    }
+    if params['auto_retrain'] and ingestion['records_created'] > 0:
+        retrain_mode = params['retrain_mode'] or getattr(settings, 'UPLOAD_RETRAIN_MODE', 'incremental')
+        # Las filas ya están insertadas: un error al encolar se reporta sin marcar la carga como fallida
+        try:
+            job = enqueue_training_job({'mode': retrain_mode}, source='upload', user=session.created_by)
+            result['model_retrain'] = {
+                'success': True,
+                'mode': retrain_mode,
+                'job_id': job.id,
+                'status_url': f'/api/train-jobs/{job.id}/'
+            }
+        except Exception as e:
+            print(f"Error al encolar el reentrenamiento: {str(e)}")
+            result['model_retrain'] = {
+                'success': False,
+                'mode': retrain_mode,
+                'message': f'Error al encolar el reentrenamiento del modelo: {str(e)}'
+            }
+    return result
+
+
+def _process_predict(session, reader, storage):
+    params = session.params
+    chunk_size = int(params['chunk_size'] or getattr(settings, 'BATCH_PREDICT_CHUNK_ROWS', 50000))
+    registry = get_model_registry()
+    if not registry.model_exists(params['model_filename']):
+        raise ChunkedUploadError(f"Modelo no encontrado: {params['model_filename']}")
+    predictor = get_parallel_predictor(registry.get_predictor(params['model_filename']), params['model_filename'])
+
+    stream, _ = open_upload_stream(reader)
+    try:
+        first_chunk, chunks = open_csv_chunks(stream, chunk_size)
+    except ValueError as e:
+        raise ChunkedUploadError(str(e))
+
+    summary = BatchSummary()
+    spool_dir = getattr(settings, 'UPLOAD_PARTS_DIR', tempfile.gettempdir())
+    descriptor, tmp_path = tempfile.mkstemp(prefix=f'{session.id}-', suffix='.csv', dir=spool_dir)
+    try:
+        with os.fdopen(descriptor, 'w', encoding='utf-8', newline='') as output:
+            for text in stream_predictions_csv(first_chunk, chunks, predictor, float(params['threshold']),
+                                               summary=summary, schema=registry.get_schema(params['model_filename'])):
+                output.write(text)
+        storage.save(session.id, RESULT_NAME, tmp_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    return {
+        'success': True,
+        'summary': summary.to_dict(),
+        'invalid_rows': summary.invalid_rows,
+        'threshold_used': float(params['threshold']),
+        'result_url': f'/api/uploads/{session.id}/result/'
+    }
+
+
+def process_upload(session):
+    """
+    Ingiere o evalúa una carga completa y guarda el resultado en la sesión.
+
+    Args:
+        session (UploadSession): Sesión ya tomada (estado 'processing')
+
+    Returns:
+        UploadSession: Sesión actualizada ('completed' o 'failed')
+    """
+    storage = get_part_storage(session.storage)
+    numbers = list(session.parts.values_list('number', flat=True))
+    reader = PartsReader(storage, session.id, numbers)
+    print(f"Procesando carga por partes {session.id} ({session.purpose}, {len(numbers)} partes)")
+
+    error = ''
+    # El latido (updated_at) distingue una carga en proceso de una abandonada por un worker caído
+    with Heartbeat(UploadSession.objects.filter(id=session.id), 'updated_at'):
+        try:
+            if session.purpose == UploadSession.PURPOSE_PREDICT:
+                result = _process_predict(session, reader, storage)
+            else:
+                result = _process_ingest(session, reader)
+        except (CsvUploadError, ChunkedUploadError) as e:
+            result = dict({'success': False, 'message': str(e)}, **e.details)
+            error = str(e)
+        except Exception as e:
+            result = {'success': False, 'message': 'Error al procesar la carga', 'error': str(e)}
+            error = traceback.format_exc()
+        finally:
+            reader.close()
+
+    succeeded = result['success']
+    if succeeded:
+        # El archivo ya se procesó: se conservan solo el resultado y los metadatos
+        storage.delete(session.id, [part_name(number) for number in numbers])
+    now = timezone.now()
+    UploadSession.objects.filter(id=session.id).update(
+        status=UploadSession.STATUS_COMPLETED if succeeded else UploadSession.STATUS_FAILED,
+        result=result,
+        error=error,
+        finished_at=now,
+        updated_at=now
+    )
+    session.refresh_from_db()
+    print(f"Carga por partes {session.id} terminada: {session.status}")
+    return session
+
+
+def claim_upload(session_id, worker_name):
+    """Pasa una sesión de 'queued' a 'processing'; True si este worker la tomó."""
+    now = timezone.now()
+    return bool(UploadSession.objects.filter(id=session_id, status=UploadSession.STATUS_QUEUED).update(
+        status=UploadSession.STATUS_PROCESSING,
+        worker=worker_name,
+        started_at=now,
+        updated_at=now
+    ))
+
+
+def recover_stale_uploads(stale_seconds=None):
+    """
+    Marca como fallidas las cargas en proceso cuyo worker dejó de dar latidos.
+
+    Igual que con los trabajos de entrenamiento (``recover_stale_jobs``), una
+    carga abandonada por un worker caído quedaría en 'processing' para
+    siempre y la purga nunca borraría sus partes. Al quedar fallida, sus
+    partes se borran con la purga tras UPLOAD_SESSION_TTL_HOURS. Con
+    validación, la ingesta corre en una transacción, así que un worker caído
+    no deja filas a medias.
+
+    Args:
+        stale_seconds (float, optional): Segundos sin latido (por defecto JOB_STALE_SECONDS)
+
+    Returns:
+        int: Cantidad de cargas recuperadas
+    """
+    if stale_seconds is None:
+        stale_seconds = getattr(settings, 'JOB_STALE_SECONDS', 600)
+    now = timezone.now()
+    stale = UploadSession.objects.filter(
+        status=UploadSession.STATUS_PROCESSING, updated_at__lt=now - timedelta(seconds=stale_seconds)
+    )
+    recovered = 0
+    for session in stale:
+        message = f'El worker {session.worker} dejó de responder mientras procesaba la carga'
+        # Condicional sobre el latido leído: si el worker revivió, no se toca
+        recovered += UploadSession.objects.filter(
+            id=session.id, status=UploadSession.STATUS_PROCESSING, updated_at=session.updated_at
+        ).update(
+            status=UploadSession.STATUS_FAILED,
+            result={'success': False, 'message': 'Carga abandonada por el worker', 'error': message},
+            error=message,
+            finished_at=now,
+            updated_at=now
+        )
+        print(f"Carga por partes {session.id} abandonada: {message}")
+    return recovered
+
+
+def process_pending_uploads(worker_name, max_uploads=None):
+    """
+    Procesa las cargas completas en cola, en orden de llegada.
+
+    Args:
+        worker_name (str): Identificador del worker
+        max_uploads (int, optional): Máximo de cargas a procesar
+
+    Returns:
+        int: Cantidad de cargas procesadas
+    """
+    processed = 0
+    while max_uploads is None or processed < max_uploads:
+        queued = UploadSession.objects.filter(status=UploadSession.STATUS_QUEUED).order_by('updated_at')
+        session_id = next((session_id for session_id in queued.values_list('id', flat=True)[:10]
+                           if claim_upload(session_id, worker_name)), None)
+        if session_id is None:
+            break
+        process_upload(UploadSession.objects.get(id=session_id))
+        processed += 1
+    return processed
+
+
+def purge_expired_uploads(ttl_hours=None):
+    """
+    Borra las sesiones sin actividad en las últimas ttl_hours (y sus partes y resultados).
+
+    Args:
+        ttl_hours (float, optional): Horas (por defecto UPLOAD_SESSION_TTL_HOURS; 0 lo desactiva)
+
+    Returns:
+        int: Cantidad de sesiones borradas
+    """
+    if ttl_hours is None:
+        ttl_hours = getattr(settings, 'UPLOAD_SESSION_TTL_HOURS', 48)
+    if not ttl_hours:
+        return 0
+    expired = UploadSession.objects.filter(updated_at__lt=timezone.now() - timedelta(hours=ttl_hours)).exclude(
+        status__in=[UploadSession.STATUS_QUEUED, UploadSession.STATUS_PROCESSING]
+    )
+    purged = 0
+    for session in expired:
+        get_part_storage(session.storage).delete(session.id)
+        session.delete()
+        purged += 1
+    return purged
+
+
+def serialize_upload(session):
+    """Representación JSON de una carga por partes para la API."""
+    parts = list(session.parts.values_list('number', 'size'))
+    return {
+        'upload_id': str(session.id),
+        'purpose': session.purpose,
+        'filename': session.filename,
+        'status': session.status,
+        'storage': session.storage,
+        'params': session.params,
+        'expected_size': session.expected_size,
+        'expected_parts': session.expected_parts,
+        'received_parts': [number for number, _ in parts],
+        'received_bytes': sum(size for _, size in parts),
+        'max_part_bytes': getattr(settings, 'UPLOAD_PART_MAX_BYTES', 64 * 1024 * 1024),
+        'file_info': session.file_info or None,
+        'worker': session.worker or None,
+        'created_at': session.created_at.isoformat(),
+        'updated_at': session.updated_at.isoformat(),
+        'started_at': session.started_at.isoformat() if session.started_at else None,
+        'finished_at': session.finished_at.isoformat() if session.finished_at else None,
+        'result': session.result,
+        'error': session.error or None
+    }
@@ -0,0 +1,128 @@
+"""
+Carga columnar de la tabla de siniestros para entrenamiento.
+
+En lugar de instanciar cada fila como objeto del modelo y pasar por
+``model_to_dict``, la tabla se recorre por bloques con ``values_list``
+(paginación por llave primaria, así cada bloque es una consulta acotada
+y el cliente nunca recibe el resultado completo) y los valores se copian
+directamente en arreglos NumPy preasignados, uno por columna, con el tipo
+entero más estrecho según el mínimo y máximo de cada campo.
+"""
+
+import time
+from itertools import chain
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.db.models import Count, Max, Min
+from .input_schema import narrowest_int_dtype
+
+INTEGER_FIELD_TYPES = {
+    'IntegerField', 'SmallIntegerField', 'BigIntegerField',
+    'PositiveIntegerField', 'PositiveSmallIntegerField', 'PositiveBigIntegerField',
+    'BooleanField'
+}
+
+
+def get_integer_fields(model_class, excluded_columns=()):
+    """
+    Retorna los campos enteros del modelo que se usan como columnas.
+
+    Args:
+        model_class: Clase del modelo Django
+        excluded_columns (list): Campos a omitir (fechas, id, ...)
+
+    Returns:
+        list: Nombres de los campos
+
+    Raises:
+        ValueError: Si queda algún campo no entero sin excluir
+    """
+    fields = [field for field in model_class._meta.concrete_fields if field.name not in excluded_columns]
+    non_integer = [field.name for field in fields if field.get_internal_type() not in INTEGER_FIELD_TYPES]
+    if non_integer:
+        raise ValueError(f"La carga columnar solo admite campos enteros; excluya: {non_integer}")
+    return [field.name for field in fields]
+
+
+def load_columns(queryset, fields, chunk_size=None, max_pk=None):
+    """
+    Lee los campos indicados en arreglos NumPy columnares.
+
+    Args:
+        queryset: QuerySet de Django con los filtros a aplicar
+        fields (list): Campos enteros a cargar
+        chunk_size (int, optional): Filas por consulta
+        max_pk (int, optional): Llave máxima a leer (por defecto la actual)
+
+    Returns:
+        dict: {campo: np.ndarray} con el dtype entero más estrecho
+    """
+    if chunk_size is None:
+        chunk_size = getattr(settings, 'TRAINING_LOAD_CHUNK_ROWS', 100000)
+    chunk_size = max(1, int(chunk_size))
+
+    # Se fija la llave máxima al inicio: las filas insertadas durante la carga
+    # no cambian el tamaño de los arreglos
+    if max_pk is None:
+        max_pk = queryset.aggregate(max_pk=Max('pk'))['max_pk']
+    if max_pk is None:
+        return {field: np.empty(0, dtype=np.int8) for field in fields}
+    queryset = queryset.filter(pk__lte=max_pk)
+
+    stats = queryset.aggregate(
+        total=Count('pk'),
+        **{f'{field}__min': Min(field) for field in fields},
+        **{f'{field}__max': Max(field) for field in fields}
+    )
+    total = stats['total']
+    columns = {}
+    for field in fields:
+        low, high = stats[f'{field}__min'], stats[f'{field}__max']
+        dtype = narrowest_int_dtype(low, high) if low is not None else np.dtype(np.float64)
+        columns[field] = np.empty(total, dtype=dtype)
+
+    ordered = queryset.order_by('pk').values_list('pk', *fields)
+    position = 0
+    last_pk = None
+    while position < total:
+        page = ordered if last_pk is None else ordered.filter(pk__gt=last_pk)
+        rows = list(page[:chunk_size])
+        if not rows:
+            break
+        block = np.fromiter(
+            chain.from_iterable(rows), dtype=np.int64, count=len(rows) * (len(fields) + 1)
+        ).reshape(len(rows), len(fields) + 1)
+        n_rows = min(len(block), total - position)
+        for i, field in enumerate(fields, start=1):
+            columns[field][position:position + n_rows] = block[:n_rows, i]
+        position += n_rows
+        last_pk = rows[-1][0]
+
+    if position < total:
+        # Se eliminaron filas durante la carga
+        columns = {field: values[:position] for field, values in columns.items()}
+    return columns
+
+
+def load_dataframe(queryset, fields, chunk_size=None):
+    """
+    Carga un DataFrame columnar con los campos indicados.
+
+    Args:
+        queryset: QuerySet de Django con los filtros a aplicar
+        fields (list): Campos enteros a cargar
+        chunk_size (int, optional): Filas por consulta
+
+    Returns:
+        pd.DataFrame: Con la llave máxima leída en ``df.attrs['max_pk']``
+    """
+    start = time.perf_counter()
+    max_pk = queryset.aggregate(max_pk=Max('pk'))['max_pk']
+    columns = load_columns(queryset, fields, chunk_size, max_pk=max_pk)
+    df = pd.DataFrame(columns, copy=False)
+    df.attrs['max_pk'] = max_pk
+    elapsed = time.perf_counter() - start
+    memory_mb = df.memory_usage(index=False).sum() / (1024 * 1024)
+    print(f"Carga columnar: {len(df)} filas en {elapsed:.2f}s ({memory_mb:.1f} MB)")
+    return df
@@ -0,0 +1,276 @@
+"""
+Motor de inferencia compilado para los bosques aleatorios del proyecto.
+
+Convierte un RandomForestClassifier entrenado en arreglos planos de NumPy
+(característica, umbral, hijo izquierdo, hijo derecho y probabilidades de
+hoja por nodo, concatenando todos los árboles) y los evalúa de forma
+vectorizada: todas las filas y todos los árboles avanzan un nivel por paso.
+Así se evita la validación de DataFrames y el despacho árbol por árbol de
+sklearn, que dominan el costo al predecir uno o pocos registros.
+"""
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from sklearn.ensemble import RandomForestClassifier
+
+
+class CompiledForest:
+    """Bosque de decisión representado como arreglos planos de nodos."""
+
+    # Filas evaluadas por bloque para acotar la matriz (filas x árboles)
+    BLOCK_SIZE = 8192
+
+    def __init__(self, feature, threshold, left, right, value, roots,
+                 max_depth, n_features, classes, feature_names=None):
+        """Inicializa el bosque compilado a partir de sus arreglos de nodos.
+
+        Args:
+            feature (np.ndarray): Índice de característica por nodo.
+            threshold (np.ndarray): Umbral de división por nodo.
+            left (np.ndarray): Índice global del hijo izquierdo por nodo.
+            right (np.ndarray): Índice global del hijo derecho por nodo.
+            value (np.ndarray): Probabilidades por clase en cada nodo (o solo la
+                de la clase positiva, 1-D, en modelos binarios).
+            roots (np.ndarray): Índice global de la raíz de cada árbol.
+            max_depth (int): Profundidad máxima entre todos los árboles.
+            n_features (int): Número de características esperadas.
+            classes (np.ndarray): Etiquetas de clase del modelo original.
+            feature_names (list, optional): Nombres de las características.
+        """
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        self.roots = roots
+        self.max_depth = int(max_depth)
+        self.n_features = int(n_features)
+        self.classes_ = classes
+        self.feature_names = list(feature_names) if feature_names is not None else None
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    @property
+    def n_nodes(self):
+        return len(self.feature)
+
+    @classmethod
+    def from_sklearn(cls, model):
+        """Compila un RandomForestClassifier entrenado.
+
+        Args:
+            model (RandomForestClassifier): Modelo entrenado de sklearn.
+
+        Returns:
+            CompiledForest: Bosque compilado.
+
+        Raises:
+            ValueError: Si el modelo no es un bosque de clasificación soportado.
+        """
+        if not isinstance(model, RandomForestClassifier) or not hasattr(model, 'estimators_'):
+            raise ValueError(f"Modelo no soportado para compilación: {type(model).__name__}")
+        if getattr(model, 'n_outputs_', 1) != 1:
+            raise ValueError("Solo se soportan modelos de una salida")
+
+        features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+        offset = 0
+        max_depth = 0
+        for estimator in model.estimators_:
+            tree = estimator.tree_
+            n = tree.node_count
+            is_leaf = tree.children_left == -1
+            local_ids = np.arange(n)
+
+            # Las hojas apuntan a sí mismas para que recorrer niveles extra sea inocuo
+            left = np.where(is_leaf, local_ids, tree.children_left) + offset
+            right = np.where(is_leaf, local_ids, tree.children_right) + offset
+            feature = np.where(is_leaf, 0, tree.feature)
+            threshold = np.where(is_leaf, np.inf, tree.threshold)
+
+            # Normalizar igual que DecisionTreeClassifier.predict_proba
+            value = tree.value[:, 0, :].astype(np.float64)
+            normalizer = value.sum(axis=1, keepdims=True)
+            normalizer[normalizer == 0.0] = 1.0
+            value = value / normalizer
+
+            features.append(feature)
+            thresholds.append(threshold)
+            lefts.append(left)
+            rights.append(right)
+            values.append(value)
+            roots.append(offset)
+            offset += n
+            max_depth = max(max_depth, tree.max_depth)
+
+        index_dtype = np.int32 if offset < np.iinfo(np.int32).max else np.int64
+        return cls(
+            feature=np.concatenate(features).astype(np.intp),
+            threshold=np.concatenate(thresholds).astype(np.float64),
+            left=np.concatenate(lefts).astype(index_dtype),
+            right=np.concatenate(rights).astype(index_dtype),
+            value=np.concatenate(values),
+            roots=np.asarray(roots, dtype=index_dtype),
+            max_depth=max_depth,
+            n_features=model.n_features_in_,
+            classes=model.classes_,
+            feature_names=getattr(model, 'feature_names_in_', None)
+        )
+
+    def _as_matrix(self, X):
+        """Convierte la entrada a una matriz float32 con el orden de columnas del modelo."""
+        if isinstance(X, pd.DataFrame):
+            if self.feature_names is not None:
+                X = X[self.feature_names]
+            X = X.to_numpy()
+        # sklearn compara en float32 contra umbrales float64; se replica para igualdad exacta
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if X.shape[1] != self.n_features:
+            raise ValueError(
+                f"Se esperaban {self.n_features} características y se recibieron {X.shape[1]}"
+            )
+        return X
+
+    def _predict_block(self, X):
+        n_rows, n_cols = X.shape
+        flat = np.ascontiguousarray(X).ravel()
+        # Desplazamiento de cada fila dentro de la matriz aplanada
+        row_offsets = (np.arange(n_rows, dtype=np.intp) * n_cols)[:, None]
+        nodes = np.broadcast_to(self.roots.astype(np.intp), (n_rows, self.n_trees))
+        for _ in range(self.max_depth):
+            x_values = np.take(flat, row_offsets + np.take(self.feature, nodes))
+            go_left = x_values <= np.take(self.threshold, nodes)
+            nodes = np.where(go_left, np.take(self.left, nodes), np.take(self.right, nodes))
+        probabilities = np.take(self.value, nodes, axis=0).mean(axis=1)
+        if self.value.ndim == 1:
+            # Artefacto compacto de un modelo binario: solo la probabilidad positiva
+            return np.column_stack([1.0 - probabilities, probabilities])
+        return probabilities
+
+    def predict_proba(self, X):
+        """Calcula las probabilidades por clase para cada fila.
+
+        Args:
+            X (pd.DataFrame | np.ndarray): Datos de entrada.
+
+        Returns:
+            np.ndarray: Matriz (n_filas, n_clases) de probabilidades.
+        """
+        X = self._as_matrix(X)
+        if X.shape[0] <= self.BLOCK_SIZE:
+            return self._predict_block(X)
+        return np.concatenate([
+            self._predict_block(X[start:start + self.BLOCK_SIZE])
+            for start in range(0, X.shape[0], self.BLOCK_SIZE)
+        ])
+
+    def _probe_matrix(self, n_samples=512, random_state=0):
+        """Genera filas de prueba que cruzan los umbrales usados por el bosque."""
+        rng = np.random.RandomState(random_state)
+        X = np.zeros((n_samples, self.n_features), dtype=np.float32)
+        internal = np.isfinite(self.threshold)
+        for col in range(self.n_features):
+            col_thresholds = self.threshold[internal & (self.feature == col)]
+            if len(col_thresholds) == 0:
+                continue
+            low = np.floor(col_thresholds.min()) - 1
+            high = np.ceil(col_thresholds.max()) + 1
+            X[:, col] = rng.randint(int(low), int(high) + 1, size=n_samples)
+        return X
+
+    def verify(self, model, X=None):
+        """Comprueba que el bosque compilado reproduce exactamente a sklearn.
+
+        Args:
+            model (RandomForestClassifier): Modelo original.
+            X (array-like, optional): Datos de referencia; si no se indican se
+                generan filas que recorren los umbrales de todos los árboles.
+
+        Returns:
+            float: Máxima diferencia absoluta observada.
+
+        Raises:
+            ValueError: Si las probabilidades difieren más allá del redondeo.
+        """
+        if X is None:
+            X = self._probe_matrix()
+        X = self._as_matrix(X)
+        reference_input = X
+        if self.feature_names is not None:
+            reference_input = pd.DataFrame(X, columns=self.feature_names)
+        expected = model.predict_proba(reference_input)
+        actual = self.predict_proba(X)
+        max_diff = float(np.max(np.abs(expected - actual))) if len(X) else 0.0
+        # El único margen admitido es el del orden de suma entre árboles
+        if max_diff > 1e-9:
+            raise ValueError(f"El bosque compilado difiere de sklearn (máx. diferencia {max_diff})")
+        return max_diff
+
+
+class ModelPredictor:
+    """Envoltorio de inferencia: usa el bosque compilado y recurre a sklearn si falla.
+
+    El bosque compilado elimina el costo fijo por llamada de sklearn, pero para
+    lotes grandes el recorrido en Cython de sklearn es más rápido; por encima de
+    ``compiled_max_rows`` filas se delega en el modelo original.
+    """
+
+    def __init__(self, model, compiled=None, compiled_max_rows=None):
+        self.model = model
+        self.compiled = compiled
+        # Identifica archivo y versión del modelo (lo asigna el registro)
+        self.cache_key = None
+        if compiled_max_rows is None:
+            compiled_max_rows = getattr(settings, 'COMPILED_FOREST_MAX_ROWS', 512)
+        self.compiled_max_rows = int(compiled_max_rows)
+
+    @property
+    def engine(self):
+        return 'compiled' if self.compiled is not None else 'sklearn'
+
+    def predict_proba(self, X):
+        """Calcula las probabilidades por clase con el motor disponible.
+
+        Args:
+            X (pd.DataFrame | np.ndarray): Datos de entrada.
+
+        Returns:
+            np.ndarray: Matriz (n_filas, n_clases) de probabilidades.
+        """
+        if self.compiled is not None and len(X) <= self.compiled_max_rows:
+            try:
+                return self.compiled.predict_proba(X)
+            except Exception as e:
+                print(f"Error en el bosque compilado, usando sklearn: {e}")
+        if not isinstance(X, pd.DataFrame) and hasattr(self.model, 'feature_names_in_'):
+            X = pd.DataFrame(X, columns=self.model.feature_names_in_)
+        return self.model.predict_proba(X)
+
+
+def build_predictor(model, verify=True):
+    """
+    Construye el predictor para un modelo, compilándolo cuando es posible.
+
+    Args:
+        model: Modelo entrenado de sklearn.
+        verify (bool): Si es True, valida la equivalencia exacta con sklearn.
+
+    Returns:
+        ModelPredictor
+    """
+    if not isinstance(model, RandomForestClassifier):
+        # Otros motores (p. ej. HistGradientBoostingClassifier) predicen con sklearn
+        return ModelPredictor(model)
+    try:
+        compiled = CompiledForest.from_sklearn(model)
+        if verify:
+            compiled.verify(model)
+        print(f"Bosque compilado: {compiled.n_trees} árboles, {compiled.n_nodes} nodos")
+        return ModelPredictor(model, compiled)
+    except Exception as e:
+        print(f"No se pudo compilar el modelo, se usará sklearn: {e}")
+        return ModelPredictor(model)
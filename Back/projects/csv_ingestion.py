@@ -0,0 +1,362 @@
+"""
+Ingesta en streaming de archivos CSV de siniestros.
+
+El CSV se parsea directamente desde el stream del upload, por bloques de
+UPLOAD_CHUNK_ROWS filas, y cada bloque se inserta (``bulk_ingestion``) en
+cuanto se parsea: la memoria depende del tamaño del bloque y no del archivo.
+
+- La compresión se detecta por los bytes iniciales (gzip o zstd) y se
+  descomprime en streaming. zstd requiere el paquete opcional ``zstandard``.
+- La codificación se decide con una muestra inicial (BOM, UTF-8 o latin-1)
+  sin decodificar el archivo completo.
+- Los 19 campos enteros se parsean con dtype ``Int32`` (el rango de
+  IntegerField, con nulos) cuando se validan los datos.
+
+Con validación, la carga completa corre en una transacción: si un bloque
+trae nulos o valores no numéricos, se revierte todo lo insertado, igual
+que cuando el archivo se validaba entero antes de insertar. Sin validación,
+cada lote se confirma por separado y las filas inválidas se aíslan.
+"""
+
+import codecs
+import gzip
+import io
+import time
+import pandas as pd
+from django.conf import settings
+from django.db import transaction
+from .bulk_ingestion import (
+    DATE_FIELD, INTEGER_FIELDS, get_bulk_batch_size, ingest_dataframe, siniestro_rows_from_dataframe
+)
+
+try:
+    import zstandard
+except ImportError:  # zstandard es opcional
+    zstandard = None
+
+GZIP_MAGIC = b'\x1f\x8b'
+ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'
+
+# Extensiones aceptadas en /api/upload-and-train/
+UPLOAD_EXTENSIONS = ('.csv', '.csv.gz', '.csv.zst', '.gz', '.zst')
+
+# Bytes (ya descomprimidos) con que se decide la codificación y se lee el encabezado
+SAMPLE_BYTES = 64 * 1024
+
+REQUIRED_FIELDS = INTEGER_FIELDS + [DATE_FIELD]
+
+
+class CsvUploadError(ValueError):
+    """Error de formato o validación del CSV subido; ``details`` va en la respuesta."""
+
+    def __init__(self, message, **details):
+        super().__init__(message)
+        self.details = details
+
+
+def get_upload_chunk_rows():
+    return max(1, int(getattr(settings, 'UPLOAD_CHUNK_ROWS', 50000)))
+
+
+def is_supported_upload(filename):
+    return filename.lower().endswith(UPLOAD_EXTENSIONS)
+
+
+class _RawStream(io.RawIOBase):
+    """Adapta un objeto con ``read()`` a RawIOBase para envolverlo en un BufferedReader."""
+
+    def __init__(self, stream):
+        self._stream = stream
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        data = self._stream.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+
+def open_upload_stream(file_obj):
+    """
+    Abre el upload como stream binario descomprimido.
+
+    Args:
+        file_obj: Archivo subido (UploadedFile)
+
+    Returns:
+        tuple: (stream binario con búfer, compresión: 'gzip', 'zstd' o None)
+
+    Raises:
+        CsvUploadError: Si el archivo es zstd y zstandard no está instalado
+    """
+    file_obj.seek(0)
+    magic = file_obj.read(4)
+    file_obj.seek(0)
+    if magic.startswith(GZIP_MAGIC):
+        return io.BufferedReader(gzip.GzipFile(fileobj=file_obj, mode='rb')), 'gzip'
+    if magic.startswith(ZSTD_MAGIC):
+        if zstandard is None:
+            raise CsvUploadError('El archivo está comprimido con zstd; instale el paquete zstandard para cargarlo')
+        reader = zstandard.ZstdDecompressor().stream_reader(file_obj, read_across_frames=True)
+        return io.BufferedReader(_RawStream(reader)), 'zstd'
+    return io.BufferedReader(_RawStream(file_obj)), None
+
+
+def detect_encoding(sample):
+    """
+    Decide la codificación a partir de los primeros bytes.
+
+    Args:
+        sample (bytes): Muestra inicial del archivo
+
+    Returns:
+        str: 'utf-8-sig', 'utf-16', 'utf-8' o 'latin-1'
+    """
+    if sample.startswith(codecs.BOM_UTF8):
+        return 'utf-8-sig'
+    if sample.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return 'utf-16'
+    try:
+        # final=False: la muestra puede cortar un carácter multibyte al final
+        codecs.getincrementaldecoder('utf-8')().decode(sample, final=False)
+        return 'utf-8'
+    except UnicodeDecodeError:
+        return 'latin-1'
+
+
+def parse_csv_header(sample):
+    """
+    Decide la codificación y lee el encabezado a partir de la muestra inicial.
+
+    Args:
+        sample (bytes): Primeros bytes del CSV (ya descomprimidos)
+
+    Returns:
+        tuple: (codificación, dict nombre sin espacios -> nombre tal como viene)
+    """
+    encoding = detect_encoding(sample)
+    header_text = sample.decode(encoding, errors='replace').lstrip('\ufeff')
+    header = [str(column) for column in pd.read_csv(io.StringIO(header_text.splitlines()[0]), nrows=0).columns]
+    return encoding, {column.strip(): column for column in header}
+
+
+def check_required_columns(raw_names, required_fields=None):
+    """
+    Verifica que el encabezado tenga las columnas requeridas.
+
+    Args:
+        raw_names (dict): Columnas del encabezado (parse_csv_header)
+        required_fields (list, optional): Columnas requeridas (por defecto REQUIRED_FIELDS)
+
+    Raises:
+        CsvUploadError: Si falta alguna
+    """
+    required_fields = required_fields or REQUIRED_FIELDS
+    missing_fields = [field for field in required_fields if field not in raw_names]
+    if missing_fields:
+        raise CsvUploadError(
+            'Faltan columnas requeridas en el archivo CSV',
+            missing_fields=missing_fields,
+            required_fields=required_fields,
+            found_columns=list(raw_names)
+        )
+
+
+def open_csv_reader(file_obj, chunk_size=None, validate=True):
+    """
+    Prepara el lector por bloques del CSV subido.
+
+    Args:
+        file_obj: Archivo subido (UploadedFile)
+        chunk_size (int, optional): Filas por bloque (por defecto UPLOAD_CHUNK_ROWS)
+        validate (bool): Parsear los enteros con dtype Int32 (un valor no numérico
+            es un error); si no, se infieren y la conversión fila a fila descarta
+            los inválidos
+
+    Returns:
+        tuple: (lector de pandas por bloques, info con encoding, compression y columnas)
+
+    Raises:
+        CsvUploadError: Si el archivo está vacío o faltan columnas requeridas
+    """
+    chunk_size = chunk_size or get_upload_chunk_rows()
+    stream, compression = open_upload_stream(file_obj)
+    sample = stream.peek(SAMPLE_BYTES)[:SAMPLE_BYTES]
+    if not sample.strip():
+        raise CsvUploadError('El archivo CSV está vacío')
+
+    # Encabezado tal como viene (con espacios) para mapear dtypes y columnas
+    encoding, raw_names = parse_csv_header(sample)
+    check_required_columns(raw_names)
+
+    dtype = {raw_names[DATE_FIELD]: 'string'}
+    if validate:
+        dtype.update({raw_names[field]: 'Int32' for field in INTEGER_FIELDS})
+    text = io.TextIOWrapper(stream, encoding=encoding, errors='replace', newline='')
+    reader = pd.read_csv(
+        text,
+        chunksize=chunk_size,
+        usecols=[raw_names[field] for field in REQUIRED_FIELDS],
+        dtype=dtype
+    )
+    return reader, {'encoding': encoding, 'compression': compression, 'columns': list(raw_names)}
+
+
+def _check_chunk(chunk, offset):
+    """Validación por bloque: sin nulos en los campos enteros."""
+    null_counts = chunk[INTEGER_FIELDS].isnull().sum()
+    if null_counts.sum() > 0:
+        raise CsvUploadError(
+            'Se encontraron valores nulos en campos críticos',
+            null_fields={field: int(count) for field, count in null_counts[null_counts > 0].items()},
+            rows=f'{offset + 1}-{offset + len(chunk)}',
+            note='FECHA_SINIESTRO puede estar vacía y se manejará automáticamente'
+        )
+
+
+def iter_csv_chunks(reader, validate=True):
+    """
+    Recorre los bloques del lector con las columnas normalizadas.
+
+    Args:
+        reader: Lector de pandas por bloques (open_csv_reader)
+        validate (bool): Rechazar bloques con nulos en los campos enteros
+
+    Yields:
+        tuple: (filas anteriores al bloque, DataFrame del bloque)
+
+    Raises:
+        CsvUploadError: Si un bloque no se puede parsear o no pasa la validación
+    """
+    offset = 0
+    while True:
+        try:
+            chunk = next(reader)
+        except StopIteration:
+            return
+        except (ValueError, TypeError) as e:
+            raise CsvUploadError(
+                f'Valores no numéricos o fuera de rango en campos enteros cerca de la fila {offset + 1}: {e}'
+            )
+        chunk.columns = chunk.columns.str.strip()
+        if validate:
+            _check_chunk(chunk, offset)
+        yield offset, chunk
+        offset += len(chunk)
+
+
+def _ingest_chunks(reader, default_date, ingreso_date, validate, batch_size, progress_callback):
+    max_error_details = getattr(settings, 'UPLOAD_MAX_ERROR_DETAILS', 50)
+    totals = {'records_created': 0, 'records_duplicates': 0, 'records_errors': 0, 'error_details': [],
+              'dates_fixed': 0, 'total_rows': 0, 'batches': 0, 'bisected_batches': 0,
+              'insert_seconds': 0.0, 'chunks': 0, 'max_chunk_rows': 0}
+    for offset, chunk in iter_csv_chunks(reader, validate):
+        result = ingest_dataframe(chunk, default_date, ingreso_date=ingreso_date, batch_size=batch_size)
+        for detail in result['error_details']:
+            detail['row'] += offset
+        totals['error_details'].extend(result['error_details'][:max(0, max_error_details - len(totals['error_details']))])
+        for key in ('records_created', 'records_duplicates', 'records_errors', 'dates_fixed', 'total_rows',
+                    'batches', 'bisected_batches', 'insert_seconds'):
+            totals[key] += result[key]
+        totals['chunks'] += 1
+        totals['max_chunk_rows'] = max(totals['max_chunk_rows'], len(chunk))
+        if progress_callback:
+            progress_callback(offset + len(chunk))
+    return totals
+
+
+def ingest_csv_upload(file_obj, default_date, ingreso_date=None, validate=True, chunk_size=None,
+                      batch_size=None, progress_callback=None):
+    """
+    Parsea e inserta un CSV subido por bloques.
+
+    Args:
+        file_obj: Archivo subido (CSV, CSV.gz o CSV.zst)
+        default_date (date): Fecha para FECHA_SINIESTRO vacía
+        ingreso_date (date, optional): FECHA_INGRESO (por defecto hoy)
+        validate (bool): Rechazar el archivo completo si trae nulos o valores no numéricos
+        chunk_size (int, optional): Filas por bloque (por defecto UPLOAD_CHUNK_ROWS)
+        batch_size (int, optional): Filas por INSERT (por defecto UPLOAD_BULK_BATCH_SIZE)
+        progress_callback (callable, optional): Recibe las filas procesadas
+
+    Returns:
+        dict: Totales de la inserción (registros, duplicados omitidos, errores,
+        fechas corregidas, bloques, lotes), encoding, compression y rendimiento
+        (rows_per_second)
+
+    Raises:
+        CsvUploadError: Si el archivo no se puede leer o no pasa la validación
+    """
+    start_time = time.perf_counter()
+    chunk_size = chunk_size or get_upload_chunk_rows()
+    reader, info = open_csv_reader(file_obj, chunk_size, validate)
+    if validate:
+        with transaction.atomic():
+            totals = _ingest_chunks(reader, default_date, ingreso_date, validate, batch_size, progress_callback)
+    else:
+        totals = _ingest_chunks(reader, default_date, ingreso_date, validate, batch_size, progress_callback)
+    if totals['total_rows'] == 0:
+        raise CsvUploadError('El archivo CSV está vacío')
+    seconds = time.perf_counter() - start_time
+
+    totals.update(
+        encoding=info['encoding'],
+        compression=info['compression'],
+        chunk_size=chunk_size,
+        batch_size=batch_size or get_bulk_batch_size(),
+        insert_seconds=round(totals['insert_seconds'], 3),
+        seconds=round(seconds, 3),
+        rows_per_second=round(totals['total_rows'] / seconds, 1) if seconds > 0 else None
+    )
+    return totals
+
+
+def check_csv_upload(file_obj, default_date, validate=True, chunk_size=None, progress_callback=None):
+    """
+    Aplica al CSV las mismas validaciones que ingest_csv_upload sin insertar nada.
+
+    Args:
+        file_obj: Archivo CSV (CSV, CSV.gz o CSV.zst)
+        default_date (date): Fecha para FECHA_SINIESTRO vacía
+        validate (bool): Rechazar el archivo si trae nulos o valores no numéricos
+        chunk_size (int, optional): Filas por bloque (por defecto UPLOAD_CHUNK_ROWS)
+        progress_callback (callable, optional): Recibe las filas procesadas
+
+    Returns:
+        dict: total_rows, valid_rows, records_errors, error_details, dates_fixed,
+        chunks, encoding, compression y rendimiento (rows_per_second)
+
+    Raises:
+        CsvUploadError: Si el archivo no se puede leer o no pasa la validación
+    """
+    start_time = time.perf_counter()
+    max_error_details = getattr(settings, 'UPLOAD_MAX_ERROR_DETAILS', 50)
+    reader, info = open_csv_reader(file_obj, chunk_size, validate)
+    totals = {'total_rows': 0, 'valid_rows': 0, 'records_errors': 0, 'error_details': [],
+              'dates_fixed': 0, 'chunks': 0}
+    for offset, chunk in iter_csv_chunks(reader, validate):
+        prepared = siniestro_rows_from_dataframe(
+            chunk, default_date, max_error_details=max(0, max_error_details - len(totals['error_details']))
+        )
+        for detail in prepared['error_details']:
+            detail['row'] += offset
+        totals['error_details'].extend(prepared['error_details'])
+        totals['total_rows'] += len(chunk)
+        totals['valid_rows'] += len(prepared['rows'])
+        totals['records_errors'] += prepared['errors']
+        totals['dates_fixed'] += prepared['dates_fixed']
+        totals['chunks'] += 1
+        if progress_callback:
+            progress_callback(offset + len(chunk))
+    if totals['total_rows'] == 0:
+        raise CsvUploadError('El archivo CSV está vacío')
+    seconds = time.perf_counter() - start_time
+
+    totals.update(
+        encoding=info['encoding'],
+        compression=info['compression'],
+        seconds=round(seconds, 3),
+        rows_per_second=round(totals['total_rows'] / seconds, 1) if seconds > 0 else None
+    )
+    return totals
@@ -0,0 +1,226 @@
+"""
+Búsqueda de hiperparámetros del bosque aleatorio con successive halving.
+
+Todos los candidatos se evalúan primero con una submuestra pequeña de cada
+fold de entrenamiento; en cada ronda solo sigue la fracción 1/factor con
+mejor ROC AUC y la submuestra crece factor veces, hasta usar el fold
+completo (si queda un solo candidato antes, una ronda final lo evalúa con
+el fold completo). Los pares (candidato, fold) de cada ronda se ajustan en
+procesos paralelos (joblib comparte los arreglos grandes por memmap).
+
+SMOTE se aplica una sola vez por fold y tamaño de submuestra y el
+resultado se reutiliza para todos los candidatos de la ronda. Los mejores
+parámetros se guardan en el storage y ``train_model`` los usa por defecto.
+"""
+
+import math
+import time
+from datetime import datetime
+import numpy as np
+from django.conf import settings
+from imblearn.over_sampling import SMOTE
+from joblib import Parallel, delayed
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import roc_auc_score
+from sklearn.model_selection import ParameterGrid, StratifiedKFold, train_test_split
+from sklearn.neighbors import NearestNeighbors
+from .training_profile import get_training_cpu_budget
+
+DEFAULT_PARAM_GRID = {
+    'n_estimators': [50, 100, 200],
+    'max_depth': [8, 10, 14, None],
+    'min_samples_split': [2, 15],
+    'min_samples_leaf': [1, 5],
+    'max_features': ['sqrt', 'log2']
+}
+
+# Parámetros fijos de todos los candidatos
+BASE_PARAMS = {
+    'bootstrap': True,
+    'class_weight': 'balanced',
+    'random_state': 42
+}
+
+# Tamaño mínimo de la submuestra de la primera ronda
+MIN_RESOURCES = 500
+
+
+def get_best_params_filename():
+    return getattr(settings, 'BEST_HYPERPARAMS_FILENAME', 'mejores_hiperparametros.json')
+
+
+def load_best_hyperparameters(storage, engine='random_forest'):
+    """
+    Retorna los mejores hiperparámetros guardados por la última búsqueda.
+
+    Args:
+        storage: Storage handler (local o S3)
+        engine (str): Motor de modelo que los va a usar
+
+    Returns:
+        dict: Hiperparámetros, o {} si nunca se hizo una búsqueda para ese motor
+    """
+    filename = get_best_params_filename()
+    if not storage.metrics_exist(filename):
+        return {}
+    search = storage.load_metrics(filename)
+    if search.get('engine', 'random_forest') != engine:
+        return {}
+    return search.get('best_params', {})
+
+
+class ResampledFoldCache:
+    """Datos de cada fold ya submuestreados y balanceados con SMOTE.
+
+    La llave es (tamaño de submuestra, fold): todos los candidatos de una
+    ronda comparten el mismo conjunto remuestreado.
+    """
+
+    def __init__(self, X, y, folds, n_jobs=1, random_state=42):
+        self.X = X
+        self.y = y
+        self.folds = folds
+        self.n_jobs = n_jobs
+        self.random_state = random_state
+        self._data = {}
+        self.smote_seconds = 0.0
+
+    def get(self, resources, fold):
+        key = (resources, fold)
+        if key not in self._data:
+            train_idx, val_idx = self.folds[fold]
+            if resources < len(train_idx):
+                train_idx, _ = train_test_split(
+                    train_idx, train_size=resources, stratify=self.y[train_idx],
+                    random_state=self.random_state
+                )
+            start = time.perf_counter()
+            smote = SMOTE(
+                random_state=self.random_state,
+                k_neighbors=NearestNeighbors(n_neighbors=6, n_jobs=self.n_jobs)
+            )
+            X_res, y_res = smote.fit_resample(self.X[train_idx], self.y[train_idx])
+            self.smote_seconds += time.perf_counter() - start
+            self._data[key] = (X_res, y_res, self.X[val_idx], self.y[val_idx])
+        return self._data[key]
+
+    def drop_level(self, resources):
+        """Libera los datos de una ronda ya terminada."""
+        for key in [key for key in self._data if key[0] == resources]:
+            del self._data[key]
+
+
+def _fit_and_score(params, X_train, y_train, X_val, y_val):
+    """Ajusta un candidato en un fold y retorna su ROC AUC (en un proceso del pool)."""
+    model = RandomForestClassifier(**BASE_PARAMS, **params, n_jobs=1)
+    model.fit(X_train, y_train)
+    return roc_auc_score(y_val, model.predict_proba(X_val)[:, 1])
+
+
+def successive_halving_search(X, y, param_grid=None, cv=None, factor=None, min_resources=None,
+                              n_jobs=None, random_state=42, progress_callback=None):
+    """
+    Busca los mejores hiperparámetros con successive halving.
+
+    Args:
+        X (np.ndarray): Características
+        y (np.ndarray): Variable objetivo
+        param_grid (dict, optional): Grilla de hiperparámetros
+        cv (int, optional): Cantidad de folds estratificados
+        factor (int, optional): Factor de reducción de candidatos y crecimiento de la submuestra
+        min_resources (int, optional): Tamaño de la submuestra en la primera ronda
+        n_jobs (int, optional): Procesos para ajustar candidatos en paralelo
+        random_state (int): Semilla para reproducibilidad
+        progress_callback (callable, optional): Recibe (etapa, progreso) al comenzar cada ronda
+
+    Returns:
+        dict: Mejores parámetros, puntaje (siempre con los folds completos,
+        best_score_resources filas) y el detalle de cada ronda
+    """
+    param_grid = param_grid or DEFAULT_PARAM_GRID
+    cv = int(cv or getattr(settings, 'TUNING_CV_FOLDS', 3))
+    factor = int(factor or getattr(settings, 'TUNING_HALVING_FACTOR', 3))
+    if factor < 2:
+        raise ValueError("El factor de successive halving debe ser al menos 2")
+    n_jobs = get_training_cpu_budget(n_jobs)
+    start = time.perf_counter()
+
+    X = np.asarray(X)
+    y = np.asarray(y)
+    folds = list(StratifiedKFold(n_splits=cv, shuffle=True, random_state=random_state).split(X, y))
+    n_train = min(len(train_idx) for train_idx, _ in folds)
+
+    candidates = list(ParameterGrid(param_grid))
+    n_rounds = max(1, math.ceil(math.log(len(candidates), factor))) if len(candidates) > 1 else 1
+    if min_resources is None:
+        min_resources = max(MIN_RESOURCES, n_train // factor ** (n_rounds - 1))
+    cache = ResampledFoldCache(X, y, folds, n_jobs=n_jobs, random_state=random_state)
+
+    rounds = []
+
+    def run_round(round_candidates, resources, label, progress):
+        """Evalúa los candidatos con la submuestra indicada; retorna sus índices de mejor a peor."""
+        if progress_callback is not None:
+            progress_callback(label, progress)
+        round_start = time.perf_counter()
+
+        fold_data = [cache.get(resources, fold) for fold in range(cv)]
+        fold_scores = Parallel(n_jobs=n_jobs)(
+            delayed(_fit_and_score)(params, *fold_data[fold])
+            for params in round_candidates for fold in range(cv)
+        )
+        fold_scores = np.asarray(fold_scores).reshape(len(round_candidates), cv)
+        mean_scores = fold_scores.mean(axis=1)
+        cache.drop_level(resources)
+
+        order = np.argsort(-mean_scores, kind='stable')
+        rounds.append({
+            'round': len(rounds) + 1,
+            'resources': resources,
+            'n_candidates': len(round_candidates),
+            'wall_seconds': round(time.perf_counter() - round_start, 3),
+            'top_candidates': [
+                {'params': round_candidates[i], 'mean_roc_auc': float(mean_scores[i]), 'std_roc_auc': float(fold_scores[i].std())}
+                for i in order[:5].tolist()
+            ]
+        })
+        print(f"Ronda {len(rounds)}: {len(round_candidates)} candidatos con {resources} filas, "
+              f"mejor ROC AUC {mean_scores[order[0]]:.4f}")
+        return order.tolist()
+
+    for round_index in range(n_rounds):
+        resources = min(n_train, int(min_resources * factor ** round_index))
+        order = run_round(candidates, resources, f'round_{round_index + 1}', round_index / n_rounds)
+
+        # Con el fold completo otra ronda repetiría los mismos ajustes
+        keep = 1 if resources >= n_train else max(1, math.ceil(len(candidates) / factor))
+        candidates = [candidates[i] for i in order[:keep]]
+        if len(candidates) == 1:
+            break
+
+    # La búsqueda puede terminar en una ronda submuestreada (queda un solo
+    # candidato antes de tiempo): el puntaje reportado es siempre con los folds completos
+    if rounds[-1]['resources'] < n_train:
+        order = run_round(candidates, n_train, 'final_round', len(rounds) / (len(rounds) + 1))
+        candidates = [candidates[i] for i in order]
+
+    best_params = candidates[0]
+    best_round = rounds[-1]['top_candidates'][0]
+    return {
+        'engine': 'random_forest',
+        'best_params': best_params,
+        'best_score': best_round['mean_roc_auc'],
+        'best_score_std': best_round['std_roc_auc'],
+        'best_score_resources': rounds[-1]['resources'],
+        'scoring': 'roc_auc',
+        'cv': cv,
+        'factor': factor,
+        'n_candidates': len(list(ParameterGrid(param_grid))),
+        'param_grid': param_grid,
+        'rows': int(len(X)),
+        'n_jobs': n_jobs,
+        'smote_seconds': round(cache.smote_seconds, 3),
+        'elapsed_seconds': round(time.perf_counter() - start, 3),
+        'tuned_at': datetime.now().isoformat(),
+        'rounds': rounds
+    }
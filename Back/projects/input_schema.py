@@ -0,0 +1,297 @@
+"""
+Esquema compilado de las entradas de predicción.
+
+El esquema se deriva de los datos de entrenamiento en ``evaluate_model``
+(rango y conjunto de códigos observados por campo) y se guarda junto al
+modelo como ``<modelo>_schema.json``. Al predecir, todo el lote se valida
+como una matriz en una sola pasada: conversión numérica, nulos, enteros,
+rango y códigos permitidos (con una tabla de búsqueda concatenada para
+todas las columnas), y la matriz resultante se convierte al tipo entero
+más estrecho antes de llegar al modelo.
+"""
+
+import os
+import numpy as np
+import pandas as pd
+from .models import Siniestro
+
+SCHEMA_VERSION = 1
+
+# Por encima de esta cantidad de códigos distintos solo se valida el rango
+MAX_ALLOWED_VALUES = 256
+
+# Filas con error que se detallan en el reporte
+MAX_REPORTED_ROWS = 50
+
+INTEGER_DTYPES = [np.int8, np.int16, np.int32, np.int64]
+
+
+def schema_filename_for(model_filename):
+    """
+    Retorna el nombre del archivo de esquema asociado a un modelo.
+
+    Args:
+        model_filename (str): Nombre del archivo del modelo
+
+    Returns:
+        str: p. ej. 'modelo_accidentes_schema.json'
+    """
+    return f"{os.path.splitext(model_filename)[0]}_schema.json"
+
+
+def narrowest_int_dtype(min_value, max_value):
+    """Retorna el dtype entero más estrecho que contiene el rango."""
+    for dtype in INTEGER_DTYPES:
+        info = np.iinfo(dtype)
+        if info.min <= min_value and max_value <= info.max:
+            return np.dtype(dtype)
+    return np.dtype(np.float64)
+
+
+class SchemaValidation:
+    """Resultado de validar un lote contra el esquema."""
+
+    def __init__(self, fields, values, errors, source):
+        """
+        Args:
+            fields (list): Campos en el orden de las columnas
+            values (np.ndarray): Matriz convertida (las filas inválidas quedan en 0)
+            errors (np.ndarray): Máscara booleana (n_filas, n_campos) de valores inválidos
+            source (pd.DataFrame | np.ndarray): Datos originales, para el reporte
+        """
+        self.fields = fields
+        self.values = values
+        self.errors = errors
+        self.valid_rows = ~errors.any(axis=1)
+        self._source = source
+
+    @property
+    def is_valid(self):
+        return bool(self.valid_rows.all())
+
+    @property
+    def invalid_count(self):
+        return int(len(self.valid_rows) - np.count_nonzero(self.valid_rows))
+
+    def report(self, max_rows=MAX_REPORTED_ROWS):
+        """
+        Describe las filas y columnas con valores inválidos.
+
+        Args:
+            max_rows (int): Máximo de filas detalladas
+
+        Returns:
+            dict: Conteo por columna y detalle de las primeras filas inválidas
+        """
+        column_counts = self.errors.sum(axis=0)
+        rows = []
+        for row in np.flatnonzero(~self.valid_rows)[:max_rows].tolist():
+            columns = np.flatnonzero(self.errors[row]).tolist()
+            rows.append({
+                'row': row,
+                'values': {self.fields[col]: _original_value(self._source, row, col) for col in columns}
+            })
+        return {
+            'invalid_rows': self.invalid_count,
+            'invalid_by_column': {
+                field: int(count) for field, count in zip(self.fields, column_counts.tolist()) if count
+            },
+            'rows': rows
+        }
+
+
+def _original_value(source, row, col):
+    value = source.iat[row, col] if isinstance(source, pd.DataFrame) else source[row, col]
+    # pd.isna también reconoce np.float32 (matrices binarias); NaN no es JSON válido
+    if pd.isna(value):
+        return None
+    if isinstance(value, (float, np.floating)) and not np.isfinite(value):
+        return str(float(value))
+    return value.item() if hasattr(value, 'item') else value
+
+
+class FeatureSchema:
+    """Tipos, rangos y códigos permitidos de cada campo de entrenamiento."""
+
+    def __init__(self, fields=None, mins=None, maxs=None, allowed=None):
+        """
+        Args:
+            fields (list, optional): Campos validados (por defecto TRAINING_FIELDS)
+            mins (list, optional): Mínimo por campo (None = sin límite)
+            maxs (list, optional): Máximo por campo (None = sin límite)
+            allowed (list, optional): Códigos permitidos por campo (None = todo el rango)
+        """
+        self.fields = list(fields or Siniestro.TRAINING_FIELDS)
+        n_fields = len(self.fields)
+        self.mins = list(mins) if mins is not None else [None] * n_fields
+        self.maxs = list(maxs) if maxs is not None else [None] * n_fields
+        self.allowed = list(allowed) if allowed is not None else [None] * n_fields
+        self._compile()
+
+    def _compile(self):
+        """Prepara los vectores de límites y la tabla de códigos permitidos."""
+        self._min = np.array([-np.inf if v is None else v for v in self.mins], dtype=np.float64)
+        self._max = np.array([np.inf if v is None else v for v in self.maxs], dtype=np.float64)
+
+        # Una sola tabla booleana con un tramo [min, max] por campo; los campos
+        # sin conjunto permitido quedan fuera (máscara _has_allowed)
+        self._has_allowed = np.array([codes is not None for codes in self.allowed], dtype=bool)
+        offsets = np.zeros(len(self.fields), dtype=np.int64)
+        tables = []
+        position = 0
+        for i, codes in enumerate(self.allowed):
+            if codes is None:
+                continue
+            low, high = int(self.mins[i]), int(self.maxs[i])
+            table = np.zeros(high - low + 1, dtype=bool)
+            table[np.asarray(codes, dtype=np.int64) - low] = True
+            offsets[i] = position - low
+            position += len(table)
+            tables.append(table)
+        self._offsets = offsets
+        self._lookup = np.concatenate(tables) if tables else np.zeros(1, dtype=bool)
+
+        if all(v is not None for v in self.mins + self.maxs):
+            self.dtype = narrowest_int_dtype(min(self.mins), max(self.maxs))
+        else:
+            self.dtype = None
+
+    @classmethod
+    def from_training_data(cls, X, max_allowed_values=MAX_ALLOWED_VALUES):
+        """
+        Deriva el esquema de los datos de entrenamiento.
+
+        Args:
+            X (pd.DataFrame): Características de entrenamiento
+            max_allowed_values (int): Cardinalidad máxima para guardar el conjunto de códigos
+
+        Returns:
+            FeatureSchema
+        """
+        fields = [field for field in Siniestro.TRAINING_FIELDS if field in X.columns]
+        values = X[fields].to_numpy(dtype=np.int64)
+        mins = values.min(axis=0).tolist()
+        maxs = values.max(axis=0).tolist()
+        allowed = []
+        for i in range(len(fields)):
+            codes = np.unique(values[:, i])
+            contiguous = len(codes) == maxs[i] - mins[i] + 1
+            allowed.append(None if contiguous or len(codes) > max_allowed_values else codes.tolist())
+        return cls(fields, mins, maxs, allowed)
+
+    @classmethod
+    def from_dict(cls, data):
+        columns = data['fields']
+        return cls(
+            [column['name'] for column in columns],
+            [column.get('min') for column in columns],
+            [column.get('max') for column in columns],
+            [column.get('allowed') for column in columns]
+        )
+
+    def to_dict(self):
+        return {
+            'version': SCHEMA_VERSION,
+            'dtype': self.dtype.name if self.dtype is not None else None,
+            'fields': [
+                {'name': field, 'dtype': 'int', 'min': low, 'max': high, 'allowed': codes}
+                for field, low, high, codes in zip(self.fields, self.mins, self.maxs, self.allowed)
+            ]
+        }
+
+    def union(self, other, max_allowed_values=MAX_ALLOWED_VALUES):
+        """
+        Combina dos esquemas aceptando lo que acepte cualquiera de ellos.
+
+        Se usa en el reentrenamiento incremental, donde los datos nuevos solo
+        cubren parte de los códigos con que se entrenó el modelo.
+
+        Args:
+            other (FeatureSchema): Esquema a combinar
+            max_allowed_values (int): Cardinalidad máxima del conjunto de códigos
+
+        Returns:
+            FeatureSchema
+        """
+        mins, maxs, allowed = [], [], []
+        for i, field in enumerate(self.fields):
+            j = other.fields.index(field) if field in other.fields else None
+            bounds = [self.mins[i], self.maxs[i]] + ([other.mins[j], other.maxs[j]] if j is not None else [])
+            if any(value is None for value in bounds):
+                mins.append(None)
+                maxs.append(None)
+                allowed.append(None)
+                continue
+            low, high = min(bounds), max(bounds)
+            codes = set(self.allowed[i] if self.allowed[i] is not None else range(self.mins[i], self.maxs[i] + 1))
+            if j is not None:
+                codes |= set(other.allowed[j] if other.allowed[j] is not None else range(other.mins[j], other.maxs[j] + 1))
+            contiguous = len(codes) == high - low + 1
+            mins.append(low)
+            maxs.append(high)
+            allowed.append(None if contiguous or len(codes) > max_allowed_values else sorted(codes))
+        return FeatureSchema(self.fields, mins, maxs, allowed)
+
+    def validate(self, X):
+        """
+        Valida un lote completo y lo convierte al tipo entero más estrecho.
+
+        Args:
+            X (pd.DataFrame | np.ndarray): DataFrame con los campos del esquema o
+                matriz en su mismo orden
+
+        Returns:
+            SchemaValidation
+        """
+        if isinstance(X, pd.DataFrame):
+            source = X[self.fields]
+            if all(dtype.kind in 'iufb' for dtype in source.dtypes):
+                floats = source.to_numpy(dtype=np.float64, na_value=np.nan)
+            else:
+                floats = source.apply(pd.to_numeric, errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+        else:
+            source = np.asarray(X)
+            if source.ndim == 1:
+                source = source.reshape(1, -1)
+            if source.dtype.kind in 'iub':
+                floats = None
+            else:
+                floats = source.astype(np.float64)
+
+        if floats is None:
+            # Matrices enteras (formatos binarios): no hay nulos ni decimales
+            values = source.astype(np.int64, copy=False)
+            errors = (values < self._min) | (values > self._max)
+        else:
+            finite = np.isfinite(floats)
+            errors = ~finite | (floats != np.floor(floats)) | (floats < self._min) | (floats > self._max)
+            values = np.where(errors, 0, floats).astype(np.int64)
+
+        if self._has_allowed.any():
+            in_range = ~errors & self._has_allowed
+            index = np.where(in_range, values + self._offsets, 0)
+            errors |= in_range & ~self._lookup[index]
+
+        values = np.where(errors, 0, values)
+        dtype = self.dtype
+        if dtype is None:
+            dtype = narrowest_int_dtype(int(values.min(initial=0)), int(values.max(initial=0)))
+        return SchemaValidation(self.fields, values.astype(dtype), errors, source)
+
+
+def load_schema(storage, model_filename):
+    """
+    Carga el esquema guardado junto a un modelo.
+
+    Args:
+        storage: Storage handler (local o S3)
+        model_filename (str): Nombre del archivo del modelo
+
+    Returns:
+        FeatureSchema: Esquema del modelo, o uno que solo valida enteros si
+        el modelo se entrenó antes de guardar esquemas
+    """
+    schema_filename = schema_filename_for(model_filename)
+    if storage.metrics_exist(schema_filename):
+        return FeatureSchema.from_dict(storage.load_metrics(schema_filename))
+    return FeatureSchema()
@@ -0,0 +1,97 @@
+from datetime import date
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError
+from projects.csv_ingestion import CsvUploadError
+from projects.native_load import LOAD_METHODS, load_csv_native
+
+
+class Command(BaseCommand):
+    help = ('Carga un CSV grande de siniestros validándolo a un archivo de staging y cargándolo '
+            'con LOAD DATA LOCAL INFILE en MySQL (bulk_create por lotes en SQLite)')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'csv_path',
+            type=str,
+            help='Archivo CSV a cargar (admite .csv.gz y .csv.zst)'
+        )
+        parser.add_argument(
+            '--method',
+            choices=LOAD_METHODS,
+            default='auto',
+            help='auto: LOAD DATA en MySQL y bulk_create en otros motores (default: auto)'
+        )
+        parser.add_argument(
+            '--no-validate',
+            action='store_true',
+            help='Descartar las filas inválidas en lugar de rechazar el archivo completo'
+        )
+        parser.add_argument(
+            '--default-date',
+            type=str,
+            default=None,
+            help='Fecha para FECHA_SINIESTRO vacía, YYYY-MM-DD (default: hoy)'
+        )
+        parser.add_argument(
+            '--ingreso-date',
+            type=str,
+            default=None,
+            help='FECHA_INGRESO de las filas cargadas, YYYY-MM-DD (default: hoy)'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=None,
+            help='Filas por bloque al parsear el CSV (default: UPLOAD_CHUNK_ROWS)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=None,
+            help='Filas por INSERT con bulk_create (default: UPLOAD_BULK_BATCH_SIZE)'
+        )
+        parser.add_argument(
+            '--keep-staging',
+            action='store_true',
+            help='Conservar el archivo de staging generado'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            default_date = date.fromisoformat(options['default_date']) if options['default_date'] else date.today()
+            ingreso_date = date.fromisoformat(options['ingreso_date']) if options['ingreso_date'] else date.today()
+        except ValueError as e:
+            raise CommandError(f'Fecha no válida: {e}')
+
+        try:
+            with open(options['csv_path'], 'rb') as file_obj:
+                result = load_csv_native(
+                    file_obj, default_date, ingreso_date,
+                    validate=not options['no_validate'],
+                    method=options['method'],
+                    chunk_size=options['chunk_size'],
+                    batch_size=options['batch_size'],
+                    keep_staging=options['keep_staging'],
+                    progress_callback=lambda rows: self.stdout.write(f"Validadas {rows} filas...")
+                )
+        except OSError as e:
+            raise CommandError(f"No se pudo leer {options['csv_path']}: {e}")
+        except CsvUploadError as e:
+            details = ''.join(f'\n  {key}: {value}' for key, value in e.details.items())
+            raise CommandError(f'{e}{details}')
+        except (ValueError, DatabaseError) as e:
+            raise CommandError(f'Error en la carga: {e}')
+
+        if result['fallback_reason']:
+            self.stdout.write(self.style.WARNING(f"LOAD DATA no disponible: {result['fallback_reason']}"))
+        for detail in result['error_details'][:10]:
+            self.stdout.write(self.style.WARNING(f"Fila {detail['row']}: {detail['error']}"))
+        if result['staging_file']:
+            self.stdout.write(f"Archivo de staging: {result['staging_file']}")
+        self.stdout.write(self.style.SUCCESS(
+            f"{result['records_created']} filas cargadas con {result['method']} "
+            f"({result['records_duplicates']} duplicadas omitidas, {result['records_errors']} con errores, "
+            f"{result['dates_fixed']} fechas corregidas) en "
+            f"{result['seconds']}s: staging {result['staging_seconds']}s, carga {result['load_seconds']}s, "
+            f"inserción {result['insert_seconds']}s ({result['rows_per_second']} filas/s)"
+        ))
@@ -0,0 +1,69 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from projects.models import Siniestro
+from projects.model_engines import ENGINES
+from projects.model_trainer import compare_engines_from_db
+
+
+class Command(BaseCommand):
+    help = ('Entrena cada motor de modelo con los mismos datos y compara tiempo de ajuste, '
+            'tamaño del artefacto, latencia y ROC AUC')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--engines',
+            nargs='+',
+            choices=list(ENGINES),
+            default=None,
+            help='Motores a comparar (default: todos)'
+        )
+        parser.add_argument(
+            '--batch-rows',
+            type=int,
+            default=10000,
+            help='Filas del lote usado para medir la latencia por lote (default: 10000)'
+        )
+        parser.add_argument(
+            '--single-row-repeats',
+            type=int,
+            default=200,
+            help='Predicciones de una fila para medir la latencia por fila (default: 200)'
+        )
+        parser.add_argument(
+            '--output',
+            type=str,
+            default=getattr(settings, 'ENGINE_COMPARISON_FILENAME', 'comparacion_motores.json'),
+            help='Archivo del informe en el storage (default: ENGINE_COMPARISON_FILENAME)'
+        )
+        parser.add_argument(
+            '--no-save',
+            action='store_true',
+            help='Solo muestra el informe, sin guardarlo'
+        )
+
+    def handle(self, *args, **options):
+        result = compare_engines_from_db(
+            model_class=Siniestro,
+            engines=options['engines'],
+            report_filename=None if options['no_save'] else options['output'],
+            single_row_repeats=options['single_row_repeats'],
+            batch_rows=options['batch_rows']
+        )
+        if not result['success']:
+            raise CommandError(f"{result['message']}: {result['error']}")
+
+        report = result['report']
+        self.stdout.write(
+            f"{'motor':<24}{'ajuste s':>10}{'MB':>10}{'1 fila ms':>11}{'lote ms':>10}{'ROC AUC':>9}"
+        )
+        for name, row in report['engines'].items():
+            latency = row['latency']
+            self.stdout.write(
+                f"{name:<24}{row['fit_seconds']:>10.2f}{row['artifact_mb']:>10.2f}"
+                f"{latency['single_row_ms_p50']:>11.3f}{latency['batch_ms']:>10.1f}{row['roc_auc']:>9.4f}"
+            )
+        self.stdout.write(self.style.SUCCESS(
+            ', '.join(f"{criterion}: {name}" for criterion, name in report['best'].items())
+        ))
+        if 'report_path' in result:
+            self.stdout.write(f"Informe guardado en: {result['report_path']}")
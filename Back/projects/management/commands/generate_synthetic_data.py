@@ -0,0 +1,87 @@
+from datetime import date
+from django.core.management.base import BaseCommand, CommandError
+from projects.synthetic_data import SyntheticSiniestroGenerator
+
+
+class Command(BaseCommand):
+    help = ('Genera siniestros sintéticos con las distribuciones del CSV de referencia, '
+            'como CSV (formato de carga) o insertados en la base de datos')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rows',
+            type=int,
+            required=True,
+            help='Cantidad de filas a generar'
+        )
+        parser.add_argument(
+            '--output',
+            type=str,
+            default=None,
+            help='Archivo CSV de salida (admite .csv.gz, .csv.zst, ...)'
+        )
+        parser.add_argument(
+            '--insert',
+            action='store_true',
+            help='Insertar las filas en la tabla de siniestros'
+        )
+        parser.add_argument(
+            '--ingreso-date',
+            type=str,
+            default=None,
+            help='FECHA_INGRESO de las filas insertadas, YYYY-MM-DD (default: hoy)'
+        )
+        parser.add_argument(
+            '--source',
+            type=str,
+            default=None,
+            help='CSV real sobre el que se ajusta el generador (default: SYNTHETIC_SOURCE_CSV)'
+        )
+        parser.add_argument(
+            '--smoothing',
+            type=float,
+            default=1.0,
+            help='Pseudo-conteos de suavizado de las tablas condicionales (default: 1.0)'
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=None,
+            help='Semilla para reproducir el dataset'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=100000,
+            help='Filas generadas por bloque (default: 100000)'
+        )
+
+    def handle(self, *args, **options):
+        if not options['output'] and not options['insert']:
+            raise CommandError('Indique --output, --insert o ambos')
+        try:
+            ingreso_date = date.fromisoformat(options['ingreso_date']) if options['ingreso_date'] else date.today()
+        except ValueError:
+            raise CommandError(f"Fecha de ingreso no válida: {options['ingreso_date']}")
+
+        try:
+            generator = SyntheticSiniestroGenerator.from_csv(options['source'], smoothing=options['smoothing'])
+        except (OSError, ValueError) as e:
+            raise CommandError(f'No se pudo ajustar el generador: {e}')
+        self.stdout.write(
+            f"Generador ajustado sobre {generator.source_rows} filas; dependencias: "
+            + ', '.join(f"{edge['parent']}->{edge['child']}" for edge in generator.edges)
+        )
+
+        if options['output']:
+            written = generator.write_csv(options['output'], options['rows'], options['seed'], options['chunk_size'])
+            self.stdout.write(self.style.SUCCESS(f"{written} filas escritas en {options['output']}"))
+
+        if options['insert']:
+            inserted = generator.insert(
+                options['rows'], ingreso_date, options['seed'], options['chunk_size'],
+                progress_callback=lambda rows: self.stdout.write(f"Insertadas {rows} filas...")
+            )
+            self.stdout.write(self.style.SUCCESS(
+                f"{inserted} filas insertadas con FECHA_INGRESO={ingreso_date.isoformat()}"
+            ))
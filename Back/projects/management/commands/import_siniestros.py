@@ -0,0 +1,171 @@
+from datetime import date
+from django.core.management.base import BaseCommand, CommandError
+from projects.bulk_import import IMPORT_LOAD_MODES, import_siniestros
+from projects.csv_ingestion import CsvUploadError
+from projects.models import TrainingJob
+from projects.training_jobs import RETRAIN_MODES, default_worker_name, enqueue_training_job, run_job_now
+
+
+class Command(BaseCommand):
+    help = ('Importa uno o varios CSV de siniestros (o carpetas con CSV) repartiendo el trabajo entre '
+            'procesos, con las mismas validaciones que /api/upload-and-train/')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'paths',
+            nargs='+',
+            type=str,
+            help='Archivos CSV (admite .csv.gz y .csv.zst) o carpetas que los contienen'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=None,
+            help='Procesos en paralelo (default: IMPORT_WORKERS o los núcleos disponibles)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=None,
+            help='Filas por INSERT con bulk_create (default: UPLOAD_BULK_BATCH_SIZE)'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=None,
+            help='Filas por bloque al parsear el CSV (default: UPLOAD_CHUNK_ROWS)'
+        )
+        parser.add_argument(
+            '--split-bytes',
+            type=int,
+            default=None,
+            help='Tamaño mínimo de tramo al dividir un CSV sin comprimir; 0 no divide (default: IMPORT_SPLIT_BYTES)'
+        )
+        parser.add_argument(
+            '--load-mode',
+            choices=IMPORT_LOAD_MODES,
+            default='orm',
+            help='orm: bulk_create por bloques; native: staging y LOAD DATA en MySQL (default: orm)'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Solo validar los archivos y reportar, sin insertar'
+        )
+        parser.add_argument(
+            '--no-validate',
+            action='store_true',
+            help='Descartar las filas inválidas en lugar de rechazar la importación completa'
+        )
+        parser.add_argument(
+            '--default-date',
+            type=str,
+            default=None,
+            help='Fecha para FECHA_SINIESTRO vacía, YYYY-MM-DD (default: hoy)'
+        )
+        parser.add_argument(
+            '--ingreso-date',
+            type=str,
+            default=None,
+            help='FECHA_INGRESO de las filas importadas, YYYY-MM-DD (default: hoy)'
+        )
+        parser.add_argument(
+            '--retrain',
+            action='store_true',
+            help='Reentrenar el modelo al terminar si se insertaron filas'
+        )
+        parser.add_argument(
+            '--retrain-mode',
+            choices=RETRAIN_MODES,
+            default='full',
+            help='Modo del reentrenamiento (default: full)'
+        )
+        parser.add_argument(
+            '--progress-interval',
+            type=float,
+            default=5.0,
+            help='Segundos entre avisos de progreso (default: 5)'
+        )
+
+    def _progress(self, phase, rows, seconds, done, total):
+        rate = rows / seconds if seconds > 0 else 0
+        label = 'Validadas' if phase == 'check' else 'Procesadas'
+        self.stdout.write(f"{label} {rows} filas ({rate:.0f} filas/s), {done}/{total} tareas terminadas")
+
+    def _write_failures(self, outcomes):
+        for outcome in outcomes:
+            # En un tramo de un archivo dividido las filas se cuentan desde el inicio del tramo
+            where = '' if outcome['range_start'] is None else \
+                f" (filas relativas al tramo que empieza en el byte {outcome['range_start']})"
+            if not outcome['success']:
+                details = ''.join(f'\n    {key}: {value}' for key, value in outcome['details'].items())
+                self.stdout.write(self.style.ERROR(f"  {outcome['label']}: {outcome['message']}{where}{details}"))
+            else:
+                for detail in outcome['result']['error_details'][:5]:
+                    self.stdout.write(self.style.WARNING(
+                        f"  {outcome['label']} fila {detail['row']}{where}: {detail['error']}"
+                    ))
+
+    def handle(self, *args, **options):
+        try:
+            default_date = date.fromisoformat(options['default_date']) if options['default_date'] else date.today()
+            ingreso_date = date.fromisoformat(options['ingreso_date']) if options['ingreso_date'] else date.today()
+        except ValueError as e:
+            raise CommandError(f'Fecha no válida: {e}')
+
+        try:
+            report = import_siniestros(
+                options['paths'], default_date, ingreso_date,
+                validate=not options['no_validate'],
+                dry_run=options['dry_run'],
+                load_mode=options['load_mode'],
+                workers=options['workers'],
+                chunk_size=options['chunk_size'],
+                batch_size=options['batch_size'],
+                split_bytes=options['split_bytes'],
+                on_progress=self._progress,
+                progress_interval=options['progress_interval']
+            )
+        except CsvUploadError as e:
+            raise CommandError(str(e))
+
+        check = report['check']
+        if check:
+            self._write_failures(check['tasks'])
+            self.stdout.write(
+                f"Validación: {check['total_rows']} filas, {check['valid_rows']} válidas, "
+                f"{check['records_errors']} con errores, {check['dates_fixed']} fechas corregidas en "
+                f"{check['seconds']}s ({check['rows_per_second']} filas/s)"
+            )
+            if report['insert'] is None and not report['success']:
+                raise CommandError('La validación falló; no se insertó ninguna fila')
+        if options['dry_run']:
+            self.stdout.write(self.style.SUCCESS(
+                f"Dry run: {len(report['files'])} archivos válidos en {report['tasks']} tareas; no se insertó nada"
+            ))
+            return
+
+        insert = report['insert']
+        self._write_failures(insert['tasks'])
+        summary = (
+            f"{insert['records_created']} filas insertadas ({insert['records_duplicates']} duplicadas omitidas, "
+            f"{insert['records_errors']} con errores, {insert['dates_fixed']} fechas corregidas) desde "
+            f"{len(report['files'])} archivos en {insert['seconds']}s con {report['insert_workers']} procesos "
+            f"({insert['rows_per_second']} filas/s)"
+        )
+        if not report['success']:
+            raise CommandError(f'{summary}. Algunas tareas fallaron; las demás quedaron insertadas')
+        self.stdout.write(self.style.SUCCESS(summary))
+
+        if options['retrain']:
+            if insert['records_created'] == 0:
+                self.stdout.write('No se insertaron filas nuevas; se omite el reentrenamiento')
+                return
+            job = enqueue_training_job({'mode': options['retrain_mode']}, source='import')
+            self.stdout.write(f"Reentrenando ({options['retrain_mode']}), trabajo {job.id}...")
+            job = run_job_now(job, default_worker_name())
+            if job.status != TrainingJob.STATUS_SUCCEEDED:
+                raise CommandError(f'El reentrenamiento terminó con estado {job.status}: {job.error}')
+            self.stdout.write(self.style.SUCCESS(
+                f"Reentrenamiento completado: {(job.result or {}).get('message', '')}"
+            ))
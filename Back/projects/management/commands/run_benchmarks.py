@@ -0,0 +1,130 @@
+import json
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from projects.benchmarks import compare_reports, run_benchmark_suite
+from projects.model_engines import ENGINES
+from projects.s3_utils import get_storage_handler
+
+
+class Command(BaseCommand):
+    help = ('Mide cada etapa del entrenamiento y los endpoints de ingesta y predicción con datos '
+            'sintéticos a varias escalas y guarda un informe JSON comparable entre versiones')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--scales',
+            type=int,
+            nargs='+',
+            default=None,
+            help='Filas sintéticas por escala, p. ej. 100000 1000000 (default: BENCHMARK_SCALES)'
+        )
+        parser.add_argument(
+            '--engine',
+            choices=list(ENGINES),
+            default=None,
+            help='Motor de modelo (default: MODEL_ENGINE)'
+        )
+        parser.add_argument(
+            '--payload-rows',
+            type=int,
+            nargs='+',
+            default=[100, 1000],
+            help='Filas por petición al medir los endpoints (default: 100 1000)'
+        )
+        parser.add_argument(
+            '--repeats',
+            type=int,
+            default=5,
+            help='Peticiones por tamaño en los endpoints de predicción (default: 5)'
+        )
+        parser.add_argument(
+            '--skip-endpoints',
+            action='store_true',
+            help='Medir solo el entrenamiento'
+        )
+        parser.add_argument(
+            '--keep-data',
+            action='store_true',
+            help='No borrar las filas sintéticas al terminar'
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=42,
+            help='Semilla de los datos sintéticos (default: 42)'
+        )
+        parser.add_argument(
+            '--output',
+            type=str,
+            default=getattr(settings, 'BENCHMARK_REPORT_FILENAME', 'benchmark_entrenamiento.json'),
+            help='Archivo del informe en el storage (default: BENCHMARK_REPORT_FILENAME)'
+        )
+        parser.add_argument(
+            '--output-file',
+            type=str,
+            default=None,
+            help='Copia local del informe, para compararlo con otras versiones'
+        )
+        parser.add_argument(
+            '--baseline',
+            type=str,
+            default=None,
+            help='Informe JSON local de otra versión con el que comparar'
+        )
+        parser.add_argument(
+            '--no-save',
+            action='store_true',
+            help='No guardar el informe en el storage'
+        )
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options['baseline']:
+            try:
+                with open(options['baseline']) as f:
+                    baseline = json.load(f)
+            except (OSError, ValueError) as e:
+                raise CommandError(f'No se pudo leer el informe de referencia: {e}')
+
+        try:
+            report = run_benchmark_suite(
+                scales=options['scales'],
+                engine=options['engine'],
+                payload_rows=options['payload_rows'],
+                predict_repeats=options['repeats'],
+                include_endpoints=not options['skip_endpoints'],
+                keep_data=options['keep_data'],
+                random_state=options['seed']
+            )
+        except Exception as e:
+            raise CommandError(f'Error durante el benchmark: {e}')
+
+        self.stdout.write(
+            f"{'filas':>10}{'ingesta f/s':>13}{'lectura BD s':>14}{'SMOTE s':>10}{'ajuste s':>10}"
+            f"{'total s':>10}{'RSS MB':>9}{'ROC AUC':>9}"
+        )
+        for scale in report['scales']:
+            stages = scale['stages']
+            self.stdout.write(
+                f"{scale['scale']:>10}{scale['ingestion']['rows_per_second'] or 0:>13.0f}"
+                f"{scale['load']['database_seconds']:>14.2f}{stages['smote']['wall_seconds']:>10.2f}"
+                f"{stages['train']['wall_seconds']:>10.2f}{scale['total_wall_seconds']:>10.2f}"
+                f"{scale['peak_rss_mb']:>9.0f}{scale['roc_auc']:>9.4f}"
+            )
+        for endpoint, sizes in (report['endpoints'] or {}).items():
+            for rows, values in sizes.items():
+                self.stdout.write(f"{endpoint} ({rows} filas): p50 {values['ms_p50']:.1f} ms, "
+                                  f"{values['rows_per_second'] or 0:.0f} filas/s")
+
+        if baseline is not None:
+            report['comparison'] = compare_reports(baseline, report)
+            for name, values in report['comparison']['metrics'].items():
+                self.stdout.write(f"{name}: {values['baseline']} -> {values['current']} (x{values['ratio']})")
+
+        if options['output_file']:
+            with open(options['output_file'], 'w') as f:
+                json.dump(report, f, indent=2, default=str)
+            self.stdout.write(f"Informe escrito en: {options['output_file']}")
+        if not options['no_save']:
+            path = get_storage_handler().save_metrics(report, options['output'])
+            self.stdout.write(self.style.SUCCESS(f"Informe guardado en: {path}"))
@@ -0,0 +1,68 @@
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from projects.chunked_uploads import process_pending_uploads, purge_expired_uploads, recover_stale_uploads
+from projects.training_jobs import default_worker_name, recover_stale_jobs, run_pending_jobs, schedule_full_retrain
+
+
+class Command(BaseCommand):
+    help = ('Ejecuta los trabajos de entrenamiento encolados (POST /api/train-model/) y procesa '
+            'las cargas por partes completas (POST /api/uploads/<id>/complete/)')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Ejecuta los trabajos pendientes y termina en lugar de seguir esperando'
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=getattr(settings, 'TRAINING_WORKER_POLL_SECONDS', 5),
+            help='Segundos entre consultas a la cola cuando está vacía (default: TRAINING_WORKER_POLL_SECONDS)'
+        )
+        parser.add_argument(
+            '--full-retrain-hours',
+            type=float,
+            default=getattr(settings, 'FULL_RETRAIN_INTERVAL_HOURS', 24),
+            help='Encola un entrenamiento completo si el último tiene más de estas horas; 0 lo desactiva '
+                 '(default: FULL_RETRAIN_INTERVAL_HOURS)'
+        )
+        parser.add_argument(
+            '--worker-name',
+            type=str,
+            default=None,
+            help='Identificador del worker (default: host:pid)'
+        )
+
+    def handle(self, *args, **options):
+        worker_name = options['worker_name'] or default_worker_name()
+        self.stdout.write(f'Worker de entrenamiento "{worker_name}" iniciado')
+
+        try:
+            while True:
+                # Antes de tomar trabajos: los que dejó en ejecución un worker caído
+                recovered = recover_stale_jobs()
+                if recovered:
+                    self.stdout.write(self.style.WARNING(f'{recovered} trabajo(s) abandonados marcados como fallidos'))
+                recovered = recover_stale_uploads()
+                if recovered:
+                    self.stdout.write(self.style.WARNING(f'{recovered} carga(s) abandonadas marcadas como fallidas'))
+                scheduled = schedule_full_retrain(options['full_retrain_hours'])
+                if scheduled:
+                    self.stdout.write(f'Entrenamiento completo programado (trabajo {scheduled.id})')
+                executed = run_pending_jobs(worker_name)
+                if executed:
+                    self.stdout.write(self.style.SUCCESS(f'{executed} trabajo(s) de entrenamiento ejecutados'))
+                # Las cargas ingeridas pueden encolar reentrenamientos: se ejecutan en la siguiente vuelta
+                processed = process_pending_uploads(worker_name)
+                if processed:
+                    self.stdout.write(self.style.SUCCESS(f'{processed} carga(s) por partes procesadas'))
+                purged = purge_expired_uploads()
+                if purged:
+                    self.stdout.write(f'{purged} carga(s) por partes vencidas eliminadas')
+                if options['once']:
+                    break
+                time.sleep(options['poll_interval'])
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.WARNING('Worker de entrenamiento detenido'))
@@ -0,0 +1,67 @@
+import json
+from django.core.management.base import BaseCommand, CommandError
+from projects.models import Siniestro
+from projects.model_trainer import tune_hyperparameters_from_db
+
+
+class Command(BaseCommand):
+    help = 'Busca los hiperparámetros del bosque con successive halving y guarda los mejores para train_model'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--cv',
+            type=int,
+            default=None,
+            help='Cantidad de folds estratificados (default: TUNING_CV_FOLDS)'
+        )
+        parser.add_argument(
+            '--factor',
+            type=int,
+            default=None,
+            help='Factor de reducción de candidatos por ronda (default: TUNING_HALVING_FACTOR)'
+        )
+        parser.add_argument(
+            '--max-rows',
+            type=int,
+            default=None,
+            help='Máximo de filas de entrenamiento usadas en la búsqueda (default: TUNING_MAX_ROWS)'
+        )
+        parser.add_argument(
+            '--target-col',
+            type=str,
+            default='ACCIDENTE',
+            help='Columna objetivo (default: ACCIDENTE)'
+        )
+        parser.add_argument(
+            '--no-save',
+            action='store_true',
+            help='Solo muestra el resultado, sin cambiar los hiperparámetros de train_model'
+        )
+
+    def handle(self, *args, **options):
+        result = tune_hyperparameters_from_db(
+            model_class=Siniestro,
+            target_col=options['target_col'],
+            cv=options['cv'],
+            factor=options['factor'],
+            max_rows=options['max_rows'],
+            save=not options['no_save']
+        )
+        if not result['success']:
+            raise CommandError(f"{result['message']}: {result['error']}")
+
+        search = result['search']
+        for round_info in search['rounds']:
+            best = round_info['top_candidates'][0]
+            self.stdout.write(
+                f"Ronda {round_info['round']}: {round_info['n_candidates']} candidatos, "
+                f"{round_info['resources']} filas, {round_info['wall_seconds']}s, "
+                f"mejor ROC AUC {best['mean_roc_auc']:.4f}"
+            )
+        self.stdout.write(f"Mejores hiperparámetros: {json.dumps(result['best_params'])}")
+        self.stdout.write(self.style.SUCCESS(
+            f"ROC AUC {result['best_score']:.4f} en {search['elapsed_seconds']}s "
+            f"(SMOTE: {search['smote_seconds']}s)"
+        ))
+        if 'params_path' in result:
+            self.stdout.write(f"Guardados en: {result['params_path']}")
@@ -0,0 +1,118 @@
+"""
+Agrupación de predicciones individuales en micro-lotes (stack ASGI).
+
+Las peticiones de un solo registro se encolan y todo lo que llega dentro de
+una ventana corta (MICRO_BATCH_MAX_WAIT_MS o MICRO_BATCH_MAX_SIZE registros)
+se evalúa en una única llamada al modelo; cada petición recibe luego su
+propia probabilidad. Miles de predicciones pequeñas por segundo se
+convierten así en unas pocas llamadas vectorizadas.
+"""
+
+import asyncio
+import weakref
+from collections import defaultdict
+import numpy as np
+from django.conf import settings
+from .model_registry import get_model_registry
+from .prediction_cache import get_prediction_cache
+
+
+def _score_rows(model_filename, rows):
+    """Evalúa un micro-lote completo (se ejecuta fuera del event loop)."""
+    predictor = get_model_registry().get_predictor(model_filename)
+    return get_prediction_cache().predict_proba(predictor, rows)
+
+
+class MicroBatcher:
+    """Cola de predicciones pendientes asociada a un event loop."""
+
+    def __init__(self, max_batch_size=None, max_wait_ms=None):
+        if max_batch_size is None:
+            max_batch_size = getattr(settings, 'MICRO_BATCH_MAX_SIZE', 256)
+        if max_wait_ms is None:
+            max_wait_ms = getattr(settings, 'MICRO_BATCH_MAX_WAIT_MS', 2)
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = float(max_wait_ms) / 1000.0
+        self._queue = asyncio.Queue()
+        self._worker = None
+        self.stats = {'records': 0, 'batches': 0, 'largest_batch': 0}
+
+    async def predict(self, model_filename, row):
+        """Encola un registro y espera su probabilidad.
+
+        Args:
+            model_filename (str): Nombre del archivo del modelo.
+            row (list): Valores de TRAINING_FIELDS en orden, ya validados con el
+                esquema del modelo (una fila inválida haría fallar todo el micro-lote).
+
+        Returns:
+            float: Probabilidad de accidente.
+        """
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((model_filename, row, future))
+        # El worker termina cuando la cola queda vacía; se relanza al llegar trabajo
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.get_running_loop().create_task(self._run())
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while not self._queue.empty():
+            batch = [self._queue.get_nowait()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                if not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                    continue
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            await self._score(batch)
+
+    async def _score(self, batch):
+        loop = asyncio.get_running_loop()
+        self.stats['records'] += len(batch)
+        self.stats['batches'] += 1
+        self.stats['largest_batch'] = max(self.stats['largest_batch'], len(batch))
+
+        groups = defaultdict(list)
+        for model_filename, row, future in batch:
+            groups[model_filename].append((row, future))
+
+        for model_filename, items in groups.items():
+            try:
+                rows = np.asarray([row for row, _ in items], dtype=np.float64)
+                probabilities = await loop.run_in_executor(None, _score_rows, model_filename, rows)
+            except Exception as e:
+                for _, future in items:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            for (_, future), probability in zip(items, probabilities.tolist()):
+                if not future.done():
+                    future.set_result(probability)
+
+
+_batchers = weakref.WeakKeyDictionary()
+
+
+def get_micro_batcher():
+    """
+    Retorna el micro-batcher del event loop actual.
+
+    Bajo ASGI hay un único loop por proceso y todas las peticiones comparten
+    la cola; bajo WSGI cada petición asíncrona corre en su propio loop.
+
+    Returns:
+        MicroBatcher
+    """
+    loop = asyncio.get_running_loop()
+    batcher = _batchers.get(loop)
+    if batcher is None:
+        batcher = MicroBatcher()
+        _batchers[loop] = batcher
+    return batcher
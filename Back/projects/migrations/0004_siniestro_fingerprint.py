@@ -0,0 +1,61 @@
+# Generated by Django 5.2 on 2026-10-17 21:10
+
+import hashlib
+
+from django.db import migrations, models
+
+
+def backfill_fingerprints(apps, schema_editor):
+    """
+    Calcula la huella de las filas existentes. Si la tabla ya tenía filas
+    repetidas, solo la primera recibe la huella; las demás quedan en NULL
+    (el índice único admite varios NULL) para no borrar datos en la migración.
+    """
+    Siniestro = apps.get_model('projects', 'Siniestro')
+    fingerprint_fields = [
+        'HORA_SINIESTRO', 'CLASE_SINIESTRO', 'CANTIDAD_DE_VEHICULOS_DANADOS',
+        'DISTRITO', 'ZONA', 'TIPO_DE_VIA', 'RED_VIAL', 'EXISTE_CICLOVIA',
+        'CONDICION_CLIMATICA', 'ZONIFICACION', 'CARACTERISTICAS_DE_VIA',
+        'PERFIL_LONGITUDINAL_VIA', 'SUPERFICIE_DE_CALZADA', 'SENALIZACION',
+        'DIA_DE_LA_SEMANA', 'MES', 'PERIODO_DEL_DIA', 'FERIADO', 'ACCIDENTE', 'FECHA_SINIESTRO'
+    ]
+    seen = set()
+    pending = []
+    duplicates = 0
+    for values in Siniestro.objects.order_by('pk').values_list('pk', *fingerprint_fields).iterator(chunk_size=5000):
+        # Mismo cálculo que Siniestro.compute_fingerprint
+        canonical = '|'.join(str(value) for value in values[1:])
+        fingerprint = hashlib.blake2b(canonical.encode('ascii'), digest_size=16).hexdigest()
+        if fingerprint in seen:
+            duplicates += 1
+            continue
+        seen.add(fingerprint)
+        pending.append(Siniestro(pk=values[0], FINGERPRINT=fingerprint))
+        if len(pending) >= 5000:
+            Siniestro.objects.bulk_update(pending, ['FINGERPRINT'])
+            pending = []
+    if pending:
+        Siniestro.objects.bulk_update(pending, ['FINGERPRINT'])
+    if duplicates:
+        print(f"\n  {duplicates} filas repetidas quedaron sin huella (FINGERPRINT NULL)")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0003_trainingjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='siniestro',
+            name='FINGERPRINT',
+            field=models.CharField(blank=True, editable=False, max_length=32, null=True),
+        ),
+        migrations.RunPython(backfill_fingerprints, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='siniestro',
+            name='FINGERPRINT',
+            field=models.CharField(blank=True, editable=False, max_length=32, null=True, unique=True),
+        ),
+    ]
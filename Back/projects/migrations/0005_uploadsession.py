@@ -0,0 +1,57 @@
+# Generated by Django 5.2 on 2026-10-17 21:24
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0004_siniestro_fingerprint'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UploadSession',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('purpose', models.CharField(choices=[('ingest', 'Carga de datos'), ('predict', 'Predicción por lotes')], max_length=16)),
+                ('filename', models.CharField(max_length=255)),
+                ('status', models.CharField(choices=[('uploading', 'Recibiendo partes'), ('queued', 'En cola'), ('processing', 'Procesando'), ('completed', 'Completada'), ('failed', 'Fallida'), ('aborted', 'Cancelada')], db_index=True, default='uploading', max_length=16)),
+                ('storage', models.CharField(default='local', max_length=8)),
+                ('params', models.JSONField(default=dict)),
+                ('expected_size', models.BigIntegerField(blank=True, null=True)),
+                ('expected_parts', models.IntegerField(blank=True, null=True)),
+                ('file_info', models.JSONField(default=dict)),
+                ('result', models.JSONField(blank=True, null=True)),
+                ('error', models.TextField(blank=True, default='')),
+                ('worker', models.CharField(blank=True, default='', max_length=128)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='UploadPart',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('number', models.PositiveIntegerField()),
+                ('size', models.BigIntegerField()),
+                ('sha256', models.CharField(max_length=64)),
+                ('received_at', models.DateTimeField(auto_now=True)),
+                ('session', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='parts', to='projects.uploadsession')),
+            ],
+            options={
+                'ordering': ['number'],
+                'constraints': [models.UniqueConstraint(fields=('session', 'number'), name='unique_upload_part_number')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-17 21:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0006_trainingjob_heartbeat_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='siniestro',
+            name='FECHA_MODIFICACION',
+            field=models.DateTimeField(auto_now=True, db_index=True, null=True),
+        ),
+    ]
@@ -0,0 +1,364 @@
+"""
+Formato compacto y mapeable en memoria de los artefactos de modelo.
+
+Un pickle de RandomForestClassifier guarda 64 bytes por nodo más las
+probabilidades por clase, y cada worker que lo carga deserializa su propia
+copia. En el formato compacto el bosque se guarda como los arreglos planos
+del bosque compilado con tipos estrechos:
+
+- característica en int8/int16
+- umbral en float32 cuando la conversión es exacta
+- hijos en int32
+- una sola probabilidad por nodo en modelos binarios
+
+Además se guardan impureza y pesos en float32 (para la importancia de
+características) y el "esqueleto" del bosque sin árboles ni
+``oob_decision_function_``.
+
+El archivo es un joblib sin comprimir. Abierto con ``mmap_mode='r'``, los
+arreglos quedan en la caché de páginas del sistema y los workers de un
+mismo host comparten esas páginas. La inferencia usa directamente el bosque
+compilado sobre esos arreglos. El RandomForestClassifier de sklearn solo se
+reconstruye cuando se necesita (reentrenamiento incremental, evaluación).
+La compresión es opcional y solo se usa para transferir (S3).
+"""
+
+import copy
+import io
+import os
+import threading
+import joblib
+import numpy as np
+from django.conf import settings
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.tree._tree import NODE_DTYPE, Tree, TREE_LEAF, TREE_UNDEFINED
+from .compiled_forest import CompiledForest
+
+ARTIFACT_MAGIC = 'bohlin-compact-forest'
+ARTIFACT_VERSION = 1
+
+ARTIFACT_FORMATS = ('compact', 'pickle')
+
+# Atributos ajustados comunes a todos los árboles del bosque
+TREE_FITTED_ATTRIBUTES = ('n_features_in_', 'n_outputs_', 'classes_', 'n_classes_', 'max_features_')
+
+
+def get_artifact_format():
+    artifact_format = getattr(settings, 'MODEL_ARTIFACT_FORMAT', 'compact')
+    if artifact_format not in ARTIFACT_FORMATS:
+        raise ValueError(f"Formato de artefacto no válido: {artifact_format}. Opciones: {list(ARTIFACT_FORMATS)}")
+    return artifact_format
+
+
+def _narrow_int(values):
+    """Convierte un arreglo entero al tipo con signo más estrecho que lo contiene."""
+    low, high = (int(values.min()), int(values.max())) if len(values) else (0, 0)
+    for dtype in (np.int8, np.int16, np.int32, np.int64):
+        info = np.iinfo(dtype)
+        if info.min <= low and high <= info.max:
+            return values.astype(dtype)
+    return values
+
+
+def _narrow_float(values):
+    """float32 si la conversión no cambia ningún valor; si no, se conserva float64."""
+    narrow = values.astype(np.float32)
+    if np.array_equal(narrow.astype(np.float64), values):
+        return narrow
+    return values
+
+
+def pack_forest(model):
+    """
+    Convierte un RandomForestClassifier al contenido del artefacto compacto.
+
+    Args:
+        model (RandomForestClassifier): Modelo entrenado
+
+    Returns:
+        dict: Arreglos y esqueleto del bosque
+
+    Raises:
+        ValueError: Si el modelo no es un bosque soportado o la versión compacta
+            no reproduce exactamente sus probabilidades
+    """
+    compiled = CompiledForest.from_sklearn(model)
+    trees = [estimator.tree_ for estimator in model.estimators_]
+
+    value = compiled.value
+    if value.shape[1] == 2:
+        # Modelos binarios: basta la probabilidad de la clase positiva
+        value = np.ascontiguousarray(value[:, 1])
+
+    arrays = {
+        'feature': _narrow_int(compiled.feature),
+        'threshold': _narrow_float(compiled.threshold),
+        'left': compiled.left.astype(np.int32),
+        'right': compiled.right.astype(np.int32),
+        'value': value,
+        'roots': compiled.roots.astype(np.int32),
+        'impurity': np.concatenate([tree.impurity for tree in trees]).astype(np.float32),
+        'n_node_samples': np.concatenate([tree.n_node_samples for tree in trees]).astype(np.int32),
+        'weighted_n_node_samples': np.concatenate([tree.weighted_n_node_samples for tree in trees]).astype(np.float32),
+        'missing_go_to_left': np.concatenate([
+            tree.__getstate__()['nodes']['missing_go_to_left'] for tree in trees
+        ]).astype(np.uint8),
+        'tree_max_depth': np.array([tree.max_depth for tree in trees], dtype=np.int32),
+        'tree_random_state': np.array([estimator.random_state for estimator in model.estimators_], dtype=np.int64)
+    }
+
+    # Esqueleto: el bosque sin árboles ni predicciones OOB de entrenamiento
+    skeleton = copy.copy(model)
+    skeleton.estimators_ = []
+    if hasattr(skeleton, 'oob_decision_function_'):
+        del skeleton.oob_decision_function_
+
+    payload = {
+        'magic': ARTIFACT_MAGIC,
+        'version': ARTIFACT_VERSION,
+        'skeleton': skeleton,
+        'tree_attributes': {
+            name: getattr(model.estimators_[0], name) for name in TREE_FITTED_ATTRIBUTES
+        } if model.estimators_ else {},
+        'arrays': arrays
+    }
+    compiled_from_payload(payload).verify(model)
+    return payload
+
+
+def is_compact_payload(obj):
+    return isinstance(obj, dict) and obj.get('magic') == ARTIFACT_MAGIC
+
+
+def compiled_from_payload(payload):
+    """Bosque compilado que opera directamente sobre los arreglos del artefacto."""
+    arrays = payload['arrays']
+    skeleton = payload['skeleton']
+    return CompiledForest(
+        feature=arrays['feature'],
+        threshold=arrays['threshold'],
+        left=arrays['left'],
+        right=arrays['right'],
+        value=arrays['value'],
+        roots=arrays['roots'],
+        max_depth=int(arrays['tree_max_depth'].max()) if len(arrays['tree_max_depth']) else 0,
+        n_features=skeleton.n_features_in_,
+        classes=skeleton.classes_,
+        feature_names=getattr(skeleton, 'feature_names_in_', None)
+    )
+
+
+def unpack_forest(payload):
+    """
+    Reconstruye el RandomForestClassifier de sklearn desde el artefacto compacto.
+
+    Args:
+        payload (dict): Contenido del artefacto
+
+    Returns:
+        RandomForestClassifier
+    """
+    arrays = payload['arrays']
+    model = copy.copy(payload['skeleton'])
+    n_classes = len(model.classes_)
+    n_nodes_total = len(arrays['feature'])
+    bounds = np.append(arrays['roots'].astype(np.int64), n_nodes_total)
+
+    estimators = []
+    for i in range(len(arrays['roots'])):
+        start, end = int(bounds[i]), int(bounds[i + 1])
+        local = np.arange(end - start)
+        left = np.asarray(arrays['left'][start:end], dtype=np.int64) - start
+        right = np.asarray(arrays['right'][start:end], dtype=np.int64) - start
+        # En el bosque compilado las hojas apuntan a sí mismas
+        is_leaf = left == local
+
+        nodes = np.zeros(end - start, dtype=NODE_DTYPE)
+        nodes['left_child'] = np.where(is_leaf, TREE_LEAF, left)
+        nodes['right_child'] = np.where(is_leaf, TREE_LEAF, right)
+        nodes['feature'] = np.where(is_leaf, TREE_UNDEFINED, arrays['feature'][start:end])
+        nodes['threshold'] = np.where(is_leaf, float(TREE_UNDEFINED), arrays['threshold'][start:end])
+        nodes['impurity'] = arrays['impurity'][start:end]
+        nodes['n_node_samples'] = arrays['n_node_samples'][start:end]
+        nodes['weighted_n_node_samples'] = arrays['weighted_n_node_samples'][start:end]
+        nodes['missing_go_to_left'] = arrays['missing_go_to_left'][start:end]
+
+        value = np.asarray(arrays['value'][start:end], dtype=np.float64)
+        if value.ndim == 1:
+            value = np.column_stack([1.0 - value, value])
+        values = np.ascontiguousarray(value.reshape(end - start, 1, n_classes))
+
+        tree = Tree(model.n_features_in_, np.array([n_classes], dtype=np.intp), 1)
+        tree.__setstate__({
+            'max_depth': int(arrays['tree_max_depth'][i]),
+            'node_count': end - start,
+            'nodes': nodes,
+            'values': values
+        })
+
+        estimator = copy.deepcopy(model.estimator_)
+        estimator.set_params(random_state=int(arrays['tree_random_state'][i]))
+        for name, value in payload['tree_attributes'].items():
+            setattr(estimator, name, copy.copy(value))
+        estimator.tree_ = tree
+        estimators.append(estimator)
+
+    model.estimators_ = estimators
+    return model
+
+
+class CompactModelArtifact:
+    """Modelo servido desde el artefacto compacto (arreglos posiblemente mapeados).
+
+    Expone la interfaz de predicción de sklearn sobre el bosque compilado; el
+    RandomForestClassifier completo se reconstruye solo al pedir ``.model``.
+    """
+
+    def __init__(self, payload):
+        self.payload = payload
+        self.compiled = compiled_from_payload(payload)
+        skeleton = payload['skeleton']
+        self.classes_ = skeleton.classes_
+        self.n_features_in_ = skeleton.n_features_in_
+        if hasattr(skeleton, 'feature_names_in_'):
+            self.feature_names_in_ = skeleton.feature_names_in_
+        self._model = None
+        self._lock = threading.Lock()
+
+    @property
+    def model(self):
+        """RandomForestClassifier reconstruido (en memoria privada del proceso)."""
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    self._model = unpack_forest(self.payload)
+        return self._model
+
+    def predict_proba(self, X):
+        # Todo tamaño de lote se evalúa sobre los arreglos compartidos
+        return self.compiled.predict_proba(X)
+
+    @property
+    def is_mapped(self):
+        return any(isinstance(array, np.memmap) for array in self.payload['arrays'].values())
+
+
+def dump_artifact(model, target, artifact_format=None, compress=0):
+    """
+    Serializa un modelo en el formato configurado.
+
+    Los modelos que no son bosques aleatorios se guardan siempre como pickle.
+
+    Args:
+        model: Modelo entrenado
+        target (str | file): Ruta o archivo binario
+        artifact_format (str, optional): 'compact' o 'pickle' (por defecto MODEL_ARTIFACT_FORMAT)
+        compress (int): Nivel de compresión de joblib (0 = sin comprimir, mapeable)
+
+    Returns:
+        str: Formato usado
+    """
+    artifact_format = artifact_format or get_artifact_format()
+    if artifact_format == 'compact' and isinstance(model, RandomForestClassifier):
+        try:
+            joblib.dump(pack_forest(model), target, compress=compress)
+            return 'compact'
+        except ValueError as e:
+            print(f"No se pudo generar el artefacto compacto, se guarda como pickle: {e}")
+            if hasattr(target, 'seek'):
+                target.seek(0)
+                target.truncate()
+    joblib.dump(model, target, compress=compress)
+    return 'pickle'
+
+
+def load_artifact(source, mmap=False):
+    """
+    Carga un artefacto en cualquiera de los dos formatos.
+
+    Args:
+        source (str | file): Ruta o archivo binario
+        mmap (bool): Si es True y source es una ruta sin comprimir, los
+            arreglos se mapean en memoria en lugar de copiarse
+
+    Returns:
+        CompactModelArtifact | modelo de sklearn
+    """
+    mmap_mode = 'r' if mmap and isinstance(source, (str, os.PathLike)) else None
+    obj = joblib.load(source, mmap_mode=mmap_mode)
+    if is_compact_payload(obj):
+        return CompactModelArtifact(obj)
+    return obj
+
+
+def as_sklearn_model(obj):
+    """Retorna el modelo de sklearn de un artefacto cargado."""
+    return obj.model if isinstance(obj, CompactModelArtifact) else obj
+
+
+def artifact_format_of(obj):
+    return 'compact' if isinstance(obj, CompactModelArtifact) else 'pickle'
+
+
+def estimator_name(obj):
+    """Clase del estimador de un modelo cargado, sin reconstruirlo."""
+    if isinstance(obj, CompactModelArtifact):
+        return type(obj.payload['skeleton']).__name__
+    return type(obj).__name__
+
+
+def artifact_size_bytes(model, artifact_format=None):
+    """Tamaño del modelo serializado igual que lo guarda el storage."""
+    buffer = io.BytesIO()
+    dump_artifact(model, buffer, artifact_format)
+    return buffer.tell()
+
+
+def _arrays_of(obj):
+    """Arreglos NumPy que ocupan memoria en un modelo cargado."""
+    if isinstance(obj, CompactModelArtifact):
+        arrays = list(obj.payload['arrays'].values())
+        if obj._model is not None:
+            arrays.extend(_arrays_of(obj._model))
+        return arrays
+    if isinstance(obj, CompiledForest):
+        return [obj.feature, obj.threshold, obj.left, obj.right, obj.value, obj.roots]
+    if isinstance(obj, RandomForestClassifier):
+        arrays = [getattr(obj, 'oob_decision_function_', np.empty(0))]
+        for estimator in obj.estimators_:
+            # Tree guarda los nodos en memoria propia: tamaño equivalente a NODE_DTYPE
+            arrays.append(np.empty((estimator.tree_.node_count, NODE_DTYPE.itemsize), dtype=np.uint8))
+            arrays.append(estimator.tree_.value)
+        return arrays
+    if hasattr(obj, '_predictors'):
+        # HistGradientBoostingClassifier
+        return [predictor.nodes for iteration in obj._predictors for predictor in iteration]
+    return []
+
+
+def memory_footprint(model, compiled=None):
+    """
+    Estima la memoria que ocupa un modelo cargado en el proceso.
+
+    Args:
+        model: Modelo o CompactModelArtifact
+        compiled (CompiledForest, optional): Bosque compilado del predictor
+
+    Returns:
+        dict: private_bytes (memoria propia del proceso) y mapped_bytes
+        (páginas del archivo compartidas entre procesos)
+    """
+    arrays = _arrays_of(model)
+    if compiled is not None and not isinstance(model, CompactModelArtifact):
+        arrays.extend(_arrays_of(compiled))
+    private, mapped = 0, 0
+    seen = set()
+    for array in arrays:
+        if id(array) in seen:
+            continue
+        seen.add(id(array))
+        if isinstance(array, np.memmap):
+            mapped += array.nbytes
+        else:
+            private += array.nbytes
+    return {'private_bytes': int(private), 'mapped_bytes': int(mapped)}
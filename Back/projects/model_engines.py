@@ -0,0 +1,229 @@
+"""
+Motores de modelo intercambiables para el entrenamiento.
+
+``AccidentPredictorAPI`` delega en un motor la construcción del estimador,
+sus hiperparámetros por defecto, la importancia de características y la
+preparación para servir. El motor se elige con MODEL_ENGINE (o por
+entrenamiento):
+
+- ``random_forest``: RandomForestClassifier. Admite reentrenamiento
+  incremental y el bosque compilado de inferencia.
+- ``hist_gradient_boosting``: HistGradientBoostingClassifier con soporte
+  categórico nativo para los campos codificados (Siniestro.CATEGORICAL_FIELDS).
+  El modelo ocupa un tamaño fijo (max_iter árboles de max_leaf_nodes hojas)
+  y predice sobre datos ya discretizados en bins.
+
+Al final del módulo está la medición de latencia del informe comparativo.
+"""
+
+import time
+import numpy as np
+from django.conf import settings
+from sklearn.ensemble import HistGradientBoostingClassifier, RandomForestClassifier
+from sklearn.inspection import permutation_importance
+from .models import Siniestro
+
+# Filas del conjunto de prueba usadas para la importancia por permutación
+PERMUTATION_MAX_ROWS = 5000
+
+
+class ModelEngine:
+    """Interfaz de un motor de modelo."""
+
+    name = None
+    estimator_class = None
+    default_hyperparams = {}
+    supports_incremental = False
+
+    def build(self, hyperparams, n_jobs, X):
+        """
+        Crea el estimador sin entrenar.
+
+        Args:
+            hyperparams (dict): Hiperparámetros del estimador
+            n_jobs (int): Presupuesto de CPU del entrenamiento
+            X (pd.DataFrame): Datos con que se va a entrenar
+
+        Returns:
+            Estimador de sklearn
+        """
+        raise NotImplementedError
+
+    def feature_importances(self, model, X, y):
+        """Importancia de cada característica, en el orden de X.columns."""
+        return model.feature_importances_
+
+    def prepare_for_serving(self, model):
+        """Ajusta el modelo antes de guardarlo para inferencia."""
+
+    def describe(self, model):
+        """Tamaño estructural del modelo para las métricas."""
+        return {}
+
+
+class RandomForestEngine(ModelEngine):
+    name = 'random_forest'
+    estimator_class = RandomForestClassifier
+    default_hyperparams = {
+        'n_estimators': 100,
+        'max_depth': 10,
+        'min_samples_split': 15,
+        'min_samples_leaf': 5,
+        'max_features': 'sqrt',
+        'bootstrap': True,
+        'oob_score': True,
+        'random_state': 42,
+        'class_weight': 'balanced'
+    }
+    supports_incremental = True
+
+    def build(self, hyperparams, n_jobs, X):
+        hyperparams = dict(hyperparams)
+        hyperparams.setdefault('n_jobs', n_jobs)
+        return RandomForestClassifier(**hyperparams)
+
+    def prepare_for_serving(self, model):
+        # Al servir, el paralelismo lo maneja parallel_scoring; el modelo se guarda
+        # sin n_jobs para no lanzar hilos dentro de cada worker web
+        model.set_params(n_jobs=None)
+
+    def describe(self, model):
+        return {
+            'n_trees': len(model.estimators_),
+            'n_nodes': int(sum(tree.tree_.node_count for tree in model.estimators_))
+        }
+
+
+class HistGradientBoostingEngine(ModelEngine):
+    name = 'hist_gradient_boosting'
+    estimator_class = HistGradientBoostingClassifier
+    default_hyperparams = {
+        'max_iter': 200,
+        'learning_rate': 0.1,
+        'max_leaf_nodes': 31,
+        'min_samples_leaf': 20,
+        'l2_regularization': 0.0,
+        'early_stopping': True,
+        'validation_fraction': 0.1,
+        'n_iter_no_change': 10,
+        'class_weight': 'balanced',
+        'random_state': 42
+    }
+
+    def build(self, hyperparams, n_jobs, X):
+        # Los hilos de OpenMP quedan acotados por threadpool_limits en cada etapa
+        hyperparams = dict(hyperparams)
+        hyperparams.setdefault('categorical_features', self.categorical_mask(X, hyperparams.get('max_bins', 255)))
+        return HistGradientBoostingClassifier(**hyperparams)
+
+    @staticmethod
+    def categorical_mask(X, max_bins=255):
+        """
+        Marca como categóricos los campos codificados cuyos códigos caben en los bins.
+
+        Args:
+            X (pd.DataFrame): Datos de entrenamiento
+            max_bins (int): Bins del estimador (los códigos deben estar en [0, max_bins))
+
+        Returns:
+            list: Un booleano por columna
+        """
+        mask = []
+        for column in X.columns:
+            values = X[column]
+            mask.append(
+                column in Siniestro.CATEGORICAL_FIELDS
+                and int(values.min()) >= 0 and int(values.max()) < max_bins
+            )
+        return mask
+
+    def feature_importances(self, model, X, y):
+        # El estimador no expone importancias propias: se usa la caída del ROC AUC
+        # al permutar cada columna sobre una muestra del conjunto de prueba
+        if len(X) > PERMUTATION_MAX_ROWS:
+            sample = np.random.RandomState(42).choice(len(X), PERMUTATION_MAX_ROWS, replace=False)
+            X, y = X.iloc[sample], y.iloc[sample]
+        result = permutation_importance(model, X, y, scoring='roc_auc', n_repeats=3, random_state=42)
+        return np.clip(result.importances_mean, 0, None)
+
+    def describe(self, model):
+        n_nodes = sum(predictor.nodes.shape[0] for iteration in model._predictors for predictor in iteration)
+        return {
+            'n_iter': int(model.n_iter_),
+            'n_nodes': int(n_nodes),
+            'categorical_features': [
+                column for column, is_categorical in zip(model.feature_names_in_, model.is_categorical_)
+                if is_categorical
+            ] if model.is_categorical_ is not None and hasattr(model, 'feature_names_in_') else []
+        }
+
+
+ENGINES = {engine.name: engine for engine in (RandomForestEngine(), HistGradientBoostingEngine())}
+
+
+def get_engine(name=None):
+    """
+    Retorna el motor de modelo por nombre.
+
+    Args:
+        name (str, optional): Nombre del motor (por defecto MODEL_ENGINE)
+
+    Returns:
+        ModelEngine
+
+    Raises:
+        ValueError: Si el motor no existe
+    """
+    name = name or getattr(settings, 'MODEL_ENGINE', 'random_forest')
+    if name not in ENGINES:
+        raise ValueError(f"Motor de modelo no válido: {name}. Opciones: {list(ENGINES)}")
+    return ENGINES[name]
+
+
+def engine_for_model(model):
+    """Retorna el motor que corresponde a un modelo ya entrenado."""
+    for engine in ENGINES.values():
+        if isinstance(model, engine.estimator_class):
+            return engine
+    raise ValueError(f"No hay un motor para el modelo {type(model).__name__}")
+
+
+def measure_latency(predictor, X, single_row_repeats=200, batch_rows=10000, batch_repeats=3):
+    """
+    Mide la latencia de inferencia con el predictor que se usa al servir.
+
+    Args:
+        predictor (ModelPredictor): Predictor del modelo
+        X (np.ndarray): Filas de referencia (ya validadas)
+        single_row_repeats (int): Predicciones de una fila a medir
+        batch_rows (int): Filas del lote
+        batch_repeats (int): Repeticiones del lote
+
+    Returns:
+        dict: Mediana y p95 por fila (ms) y tiempo y filas/s del lote
+    """
+    X = np.asarray(X)
+    predictor.predict_proba(X[:1])  # Primera llamada fuera de la medición
+
+    single = []
+    for i in range(single_row_repeats):
+        row = X[i % len(X):i % len(X) + 1]
+        start = time.perf_counter()
+        predictor.predict_proba(row)
+        single.append(time.perf_counter() - start)
+
+    batch = X[np.arange(batch_rows) % len(X)]
+    batch_times = []
+    for _ in range(batch_repeats):
+        start = time.perf_counter()
+        predictor.predict_proba(batch)
+        batch_times.append(time.perf_counter() - start)
+    batch_seconds = float(np.median(batch_times))
+
+    return {
+        'single_row_ms_p50': round(float(np.median(single)) * 1000, 3),
+        'single_row_ms_p95': round(float(np.percentile(single, 95)) * 1000, 3),
+        'batch_rows': int(batch_rows),
+        'batch_ms': round(batch_seconds * 1000, 3),
+        'batch_rows_per_second': round(batch_rows / batch_seconds, 1) if batch_seconds > 0 else None
+    }
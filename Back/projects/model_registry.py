@@ -0,0 +1,241 @@
+"""
+Registro en memoria de los modelos cargados por proceso.
+
+Evita que cada petición de predicción descargue y deserialice el modelo:
+los modelos quedan residentes indexados por nombre de archivo y versión
+(mtime local o ETag de S3) y se revalidan contra el storage como mucho
+una vez cada MODEL_REGISTRY_TTL_SECONDS.
+"""
+
+import threading
+import time
+from django.conf import settings
+from .s3_utils import get_storage_handler
+from .compiled_forest import ModelPredictor, build_predictor
+from .input_schema import load_schema
+from .model_artifacts import CompactModelArtifact, artifact_format_of, estimator_name, memory_footprint
+
+
+class ModelRegistry:
+    """Caché de modelos cargados, compartida por todas las vistas del proceso."""
+
+    def __init__(self, ttl_seconds=None):
+        """Inicializa el registro vacío.
+
+        Args:
+            ttl_seconds (float, optional): Segundos durante los que un modelo
+                se sirve sin volver a consultar su versión en el storage.
+        """
+        if ttl_seconds is None:
+            ttl_seconds = getattr(settings, 'MODEL_REGISTRY_TTL_SECONDS', 30)
+        self.ttl_seconds = float(ttl_seconds)
+        self._entries = {}
+        self._lock = threading.RLock()
+        self._storage = None
+        self.stats = {'hits': 0, 'revalidations': 0, 'loads': 0, 'invalidations': 0}
+
+    def _get_storage(self):
+        """Retorna el storage handler del proceso, creándolo una sola vez."""
+        if self._storage is None:
+            self._storage = get_storage_handler()
+        return self._storage
+
+    def get_model(self, filename='modelo_accidentes.pkl'):
+        """Retorna el modelo cargado, recargándolo solo si cambió su versión.
+
+        Args:
+            filename (str): Nombre del archivo del modelo.
+
+        Returns:
+            Modelo cargado.
+
+        Raises:
+            FileNotFoundError: Si el modelo no existe en el storage.
+        """
+        return self._get_entry(filename)['model']
+
+    def get_predictor(self, filename='modelo_accidentes.pkl'):
+        """Retorna el predictor del modelo (bosque compilado con respaldo en sklearn).
+
+        Args:
+            filename (str): Nombre del archivo del modelo.
+
+        Returns:
+            ModelPredictor
+
+        Raises:
+            FileNotFoundError: Si el modelo no existe en el storage.
+        """
+        return self._get_entry(filename)['predictor']
+
+    def get_schema(self, filename='modelo_accidentes.pkl'):
+        """Retorna el esquema de entrada guardado junto al modelo.
+
+        Args:
+            filename (str): Nombre del archivo del modelo.
+
+        Returns:
+            FeatureSchema
+
+        Raises:
+            FileNotFoundError: Si el modelo no existe en el storage.
+        """
+        return self._get_entry(filename)['schema']
+
+    def _get_entry(self, filename):
+        entry = self._entries.get(filename)
+        if entry is not None and time.monotonic() - entry['checked_at'] < self.ttl_seconds:
+            self.stats['hits'] += 1
+            return entry
+
+        with self._lock:
+            # Otro hilo pudo haber revalidado mientras esperábamos el lock
+            entry = self._entries.get(filename)
+            now = time.monotonic()
+            if entry is not None and now - entry['checked_at'] < self.ttl_seconds:
+                self.stats['hits'] += 1
+                return entry
+
+            storage = self._get_storage()
+            version = storage.get_model_version(filename)
+            if version is None:
+                self._entries.pop(filename, None)
+                raise FileNotFoundError(f"Modelo no encontrado: {filename}")
+
+            if entry is not None and entry['version'] == version:
+                entry['checked_at'] = now
+                self.stats['revalidations'] += 1
+                return entry
+
+            model = storage.load_serving_model(filename)
+            if isinstance(model, CompactModelArtifact):
+                # El artefacto compacto ya es un bosque compilado (verificado al guardarlo)
+                predictor = ModelPredictor(model, model.compiled)
+            elif getattr(settings, 'USE_COMPILED_FOREST', True):
+                predictor = build_predictor(model)
+            else:
+                predictor = ModelPredictor(model)
+            predictor.cache_key = (filename, version)
+            entry = {
+                'model': model,
+                'predictor': predictor,
+                'schema': load_schema(storage, filename),
+                'version': version,
+                'checked_at': time.monotonic(),
+                'loaded_at': time.time()
+            }
+            self._entries[filename] = entry
+            self.stats['loads'] += 1
+            print(f"Modelo '{filename}' cargado en el registro (versión {version})")
+            return entry
+
+    def model_exists(self, filename='modelo_accidentes.pkl'):
+        """Indica si el modelo está disponible, cargándolo si es necesario.
+
+        Args:
+            filename (str): Nombre del archivo del modelo.
+
+        Returns:
+            bool: True si existe, False si no
+        """
+        try:
+            self.get_model(filename)
+            return True
+        except FileNotFoundError:
+            return False
+
+    def is_loaded(self, filename='modelo_accidentes.pkl'):
+        """Indica si el modelo ya está residente, sin consultar el storage.
+
+        Args:
+            filename (str): Nombre del archivo del modelo.
+
+        Returns:
+            bool: True si está cargado en memoria
+        """
+        return filename in self._entries
+
+    def invalidate(self, filename=None):
+        """Descarta un modelo del registro (o todos si no se indica archivo).
+
+        Args:
+            filename (str, optional): Nombre del archivo del modelo.
+        """
+        with self._lock:
+            if filename is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(filename, None)
+            self.stats['invalidations'] += 1
+
+    def get_info(self):
+        """Retorna el estado del registro para diagnóstico.
+
+        Returns:
+            dict: Modelos residentes y contadores de uso.
+        """
+        return {
+            'ttl_seconds': self.ttl_seconds,
+            'models': {
+                filename: {
+                    'version': entry['version'],
+                    'loaded_at': entry['loaded_at'],
+                    'estimator': estimator_name(entry['model']),
+                    'engine': entry['predictor'].engine,
+                    'artifact_format': artifact_format_of(entry['model']),
+                    'memory': memory_footprint(entry['model'], entry['predictor'].compiled)
+                }
+                for filename, entry in list(self._entries.items())
+            },
+            'stats': dict(self.stats)
+        }
+
+    def get_model_info(self, filename='modelo_accidentes.pkl'):
+        """Tamaño en disco del artefacto y memoria que ocupa en este proceso.
+
+        Args:
+            filename (str): Nombre del archivo del modelo.
+
+        Returns:
+            dict: Información del storage más artifact_format, resident_bytes
+            (memoria propia del proceso) y mapped_bytes (páginas compartidas
+            entre workers); estos últimos son None si el modelo no está cargado.
+        """
+        info = dict(self._get_storage().get_model_info(filename))
+        entry = self._entries.get(filename)
+        if entry is None and info['exists']:
+            try:
+                entry = self._get_entry(filename)
+            except FileNotFoundError:
+                entry = None
+        if entry is None:
+            info.update(artifact_format=None, resident_bytes=None, mapped_bytes=None)
+            return info
+        memory = memory_footprint(entry['model'], entry['predictor'].compiled)
+        info.update(
+            artifact_format=artifact_format_of(entry['model']),
+            resident_bytes=memory['private_bytes'],
+            resident_mb=round(memory['private_bytes'] / (1024 * 1024), 2),
+            mapped_bytes=memory['mapped_bytes'],
+            mapped_mb=round(memory['mapped_bytes'] / (1024 * 1024), 2)
+        )
+        return info
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_model_registry():
+    """
+    Retorna el registro de modelos del proceso.
+
+    Returns:
+        ModelRegistry
+    """
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = ModelRegistry()
+    return _registry
@@ -13,20 +13,41 @@ import numpy as np
 import os
 import joblib
 import json
+import time
 from datetime import datetime
 from sklearn.ensemble import RandomForestClassifier
-from sklearn.model_selection import train_test_split, cross_val_score, GridSearchCV, StratifiedKFold
+from sklearn.neighbors import NearestNeighbors
+from sklearn.model_selection import train_test_split
 from sklearn.metrics import (
     accuracy_score, precision_score, recall_score, f1_score, 
     roc_auc_score, confusion_matrix, classification_report, roc_curve
 )
 from imblearn.over_sampling import SMOTE
 from collections import Counter
+import random
+from django.conf import settings
+from django.db.models.functions import Mod
 from .s3_utils import get_storage_handler
+from .model_registry import get_model_registry
+from .prediction_cache import get_prediction_cache
+from .input_schema import FeatureSchema, schema_filename_for, load_schema
+from .columnar_loader import get_integer_fields, load_dataframe
+from .training_snapshots import load_training_dataframe
+from .training_profile import StageProfiler, profiled_stage
+from .hyperparameter_search import (
+    get_best_params_filename, load_best_hyperparameters, successive_halving_search
+)
+from .model_engines import ENGINES, get_engine, engine_for_model, measure_latency
+from .model_artifacts import artifact_size_bytes
+from .compiled_forest import build_predictor
 
 class AccidentPredictorAPI:
-    def __init__(self):
-        """Inicializa el predictor de accidentes para API Django."""
+    def __init__(self, engine=None):
+        """Inicializa el predictor de accidentes para API Django.
+        
+        Args:
+            engine (str, optional): Motor de modelo (por defecto MODEL_ENGINE).
+        """
         self.data = None
         self.X = None
         self.y = None
@@ -35,13 +56,27 @@ class AccidentPredictorAPI:
         self.y_train = None
         self.y_test = None
         self.rf_model = None
+        self.engine = get_engine(engine)
+        self.hyperparams = None
+        self.hyperparams_source = None
+        self.tuning_result = None
         self.feature_importance = None
+        self.input_schema = None
+        self.previous_schema = None
         self.metrics = {}
+        # Llave máxima de los datos cargados y modo del último entrenamiento
+        self.data_max_pk = None
+        self.training_mode = 'full'
+        self.incremental_info = None
         # Columnas excluidas del entrenamiento
-        self.excluded_columns = ['FECHA_SINIESTRO', 'FECHA_INGRESO', 'id']
+        self.excluded_columns = ['FECHA_SINIESTRO', 'FECHA_INGRESO', 'FINGERPRINT', 'FECHA_MODIFICACION', 'id']
         # Inicializar storage handler
         self.storage = get_storage_handler()
+        # Núcleos disponibles para SMOTE, el bosque y la evaluación, y perfil por etapa
+        self.profiler = StageProfiler()
+        self.n_jobs = self.profiler.cpu_budget
     
+    @profiled_stage('load_data')
     def load_data_from_model(self, model_class, filter_kwargs=None):
         """Carga datos desde un modelo de Django excluyendo columnas específicas.
         
@@ -49,26 +84,16 @@ class AccidentPredictorAPI:
             model_class: Clase del modelo Django.
             filter_kwargs (dict, optional): Filtros para la consulta.
         """
-        from django.forms.models import model_to_dict
-        import pandas as pd
-        
         # Obtener queryset
         if filter_kwargs:
             queryset = model_class.objects.filter(**filter_kwargs)
         else:
             queryset = model_class.objects.all()
         
-        # Convertir a lista de diccionarios
-        data_list = []
-        for obj in queryset:
-            obj_dict = model_to_dict(obj)
-            # Excluir columnas no deseadas
-            filtered_dict = {k: v for k, v in obj_dict.items() 
-                           if k not in self.excluded_columns}
-            data_list.append(filtered_dict)
-        
-        # Convertir a DataFrame
-        self.data = pd.DataFrame(data_list)
+        # Columnas NumPy de enteros estrechos, desde el snapshot en disco si los datos no cambiaron
+        fields = get_integer_fields(model_class, self.excluded_columns)
+        self.data = load_training_dataframe(queryset, fields)
+        self.data_max_pk = self.data.attrs.get('max_pk')
         
         if self.data.empty:
             raise ValueError("No se encontraron datos en la base de datos")
@@ -78,26 +103,17 @@ class AccidentPredictorAPI:
         
         return self
     
+    @profiled_stage('load_data')
     def load_data_from_db(self, queryset):
         """Carga datos desde un QuerySet de Django excluyendo columnas específicas.
         
         Args:
             queryset: QuerySet de Django.
         """
-        from django.forms.models import model_to_dict
-        import pandas as pd
-        
-        # Convertir queryset a lista de diccionarios
-        data_list = []
-        for obj in queryset:
-            obj_dict = model_to_dict(obj)
-            # Excluir columnas no deseadas
-            filtered_dict = {k: v for k, v in obj_dict.items() 
-                           if k not in self.excluded_columns}
-            data_list.append(filtered_dict)
-        
-        # Convertir a DataFrame
-        self.data = pd.DataFrame(data_list)
+        # Columnas NumPy de enteros estrechos, desde el snapshot en disco si los datos no cambiaron
+        fields = get_integer_fields(queryset.model, self.excluded_columns)
+        self.data = load_training_dataframe(queryset, fields)
+        self.data_max_pk = self.data.attrs.get('max_pk')
         
         if self.data.empty:
             raise ValueError("No se encontraron datos en el QuerySet")
@@ -107,6 +123,7 @@ class AccidentPredictorAPI:
         
         return self
     
+    @profiled_stage('prepare_data')
     def prepare_data(self, target_col='ACCIDENTE', test_size=0.2, random_state=42):
         """Prepara los datos para el entrenamiento dividiendo en conjuntos de entrenamiento y prueba.
         
@@ -137,16 +154,43 @@ class AccidentPredictorAPI:
         print(f"\nCaracterísticas seleccionadas: {self.X.columns.tolist()}")
         print(f"Distribución de la variable objetivo:\n{self.y.value_counts()}")
         
-        # Dividir en conjuntos de entrenamiento y prueba
-        self.X_train, self.X_test, self.y_train, self.y_test = train_test_split(
-            self.X, self.y, test_size=test_size, random_state=random_state, stratify=self.y
-        )
+        if self.incremental_info is not None:
+            self._split_incremental(test_size, random_state)
+        else:
+            # Dividir en conjuntos de entrenamiento y prueba
+            self.X_train, self.X_test, self.y_train, self.y_test = train_test_split(
+                self.X, self.y, test_size=test_size, random_state=random_state, stratify=self.y
+            )
         
         print(f"\nConjunto de entrenamiento: {len(self.X_train)} muestras")
         print(f"Conjunto de prueba: {len(self.X_test)} muestras")
         
         return self
     
+    def _split_incremental(self, test_size, random_state):
+        """Divide los datos incrementales evaluando solo con registros nuevos.
+        
+        Las filas de repaso son registros con que ya se entrenaron los árboles
+        conservados: en el conjunto de prueba inflarían las métricas, así que
+        van todas a entrenamiento y la prueba sale solo de los registros nuevos
+        (que load_incremental_data deja al comienzo de self.data).
+        """
+        n_new = self.incremental_info['new_rows']
+        new_y = self.y.iloc[:n_new]
+        counts = new_y.value_counts()
+        if len(counts) < 2 or counts.min() < 2:
+            raise ValueError(
+                "Los registros nuevos no tienen al menos 2 casos de cada clase para evaluar el modelo; "
+                "use un reentrenamiento completo"
+            )
+        X_new_train, self.X_test, y_new_train, self.y_test = train_test_split(
+            self.X.iloc[:n_new], new_y, test_size=test_size, random_state=random_state, stratify=new_y
+        )
+        self.X_train = pd.concat([X_new_train, self.X.iloc[n_new:]])
+        self.y_train = pd.concat([y_new_train, self.y.iloc[n_new:]])
+        self.incremental_info['test_rows'] = len(self.X_test)
+    
+    @profiled_stage('smote')
     def apply_smote(self, random_state=42):
         """Aplica SMOTE para equilibrar las clases en el conjunto de entrenamiento.
         
@@ -160,7 +204,11 @@ class AccidentPredictorAPI:
             raise ValueError("Primero debe preparar los datos con prepare_data()")
         
         # Aplicar SMOTE al conjunto de entrenamiento
-        smote = SMOTE(random_state=random_state)
+        # La búsqueda de vecinos es la parte costosa de SMOTE; usa el presupuesto de CPU
+        smote = SMOTE(
+            random_state=random_state,
+            k_neighbors=NearestNeighbors(n_neighbors=6, n_jobs=self.n_jobs)
+        )
         self.X_train_smote, self.y_train_smote = smote.fit_resample(self.X_train, self.y_train)
         
         # Verificar distribución después de SMOTE
@@ -169,31 +217,29 @@ class AccidentPredictorAPI:
         
         return self
     
+    @profiled_stage('train')
     def train_model(self, use_smote=True, hyperparams=None):
-        """Entrena un modelo de Random Forest con los datos preparados.
+        """Entrena un modelo con el motor configurado y los datos preparados.
         
         Args:
             use_smote (bool): Si es True, usa los datos balanceados con SMOTE.
-            hyperparams (dict, optional): Hiperparámetros para el modelo.
+            hyperparams (dict, optional): Hiperparámetros para el modelo. Por
+                defecto se usan los del motor, reemplazados por los de la última
+                búsqueda guardada para ese motor, si existe.
             
         Returns:
             self: Para encadenamiento de métodos.
         """
         if hyperparams is None:
-            hyperparams = {
-                'n_estimators': 100,
-                'max_depth': 10,
-                'min_samples_split': 15,
-                'min_samples_leaf': 5,
-                'max_features': 'sqrt',
-                'bootstrap': True,
-                'oob_score': True,
-                'random_state': 42,
-                'class_weight': 'balanced'
-            }
+            tuned = load_best_hyperparameters(self.storage, self.engine.name)
+            hyperparams = dict(self.engine.default_hyperparams, **tuned)
+            self.hyperparams_source = 'tuned' if tuned else 'default'
+        else:
+            self.hyperparams_source = 'explicit'
+        self.hyperparams = {key: value for key, value in hyperparams.items() if key != 'n_jobs'}
         
         # Crear modelo
-        self.rf_model = RandomForestClassifier(**hyperparams)
+        self.rf_model = self.engine.build(hyperparams, self.n_jobs, self.X_train)
         
         # Entrenar modelo
         if use_smote:
@@ -205,8 +251,152 @@ class AccidentPredictorAPI:
             self.rf_model.fit(self.X_train, self.y_train)
             print("\nModelo entrenado con datos originales")
         
+        # Ventana de datos que cubre cada grupo de árboles
+        self.training_mode = 'full'
+        self.rf_model.data_max_pk_ = self.data_max_pk
+        if self.engine.supports_incremental:
+            self.rf_model.tree_windows_ = [self._tree_window('full', len(self.rf_model.estimators_))]
+        
         return self
     
+    def _tree_window(self, mode, n_trees):
+        """Describe los datos con que se entrenó un grupo de árboles."""
+        info = self.incremental_info or {}
+        return {
+            'mode': mode,
+            'n_trees': n_trees,
+            'pk_min': info.get('pk_min'),
+            'pk_max': self.data_max_pk,
+            'rows': len(self.data),
+            'replay_rows': info.get('replay_rows', 0),
+            'trained_at': datetime.now().isoformat()
+        }
+    
+    @profiled_stage('load_data')
+    def load_incremental_data(self, model_class, replay_ratio=None, max_replay_rows=None, filter_kwargs=None):
+        """Carga los registros nuevos desde el último entrenamiento y una muestra de los anteriores.
+        
+        La muestra de repaso se toma de forma sistemática por llave primaria
+        (pk % paso == desplazamiento aleatorio), lo que la base de datos
+        resuelve sin ordenar la tabla. Los registros nuevos quedan primero en
+        self.data; prepare_data reserva la prueba solo de ellos.
+        
+        Args:
+            model_class: Clase del modelo Django.
+            replay_ratio (float, optional): Filas de repaso por cada fila nueva.
+            max_replay_rows (int, optional): Máximo de filas de repaso.
+            filter_kwargs (dict, optional): Filtros para la consulta.
+            
+        Returns:
+            self: Para encadenamiento de métodos.
+        """
+        if replay_ratio is None:
+            replay_ratio = getattr(settings, 'INCREMENTAL_REPLAY_RATIO', 1.0)
+        if max_replay_rows is None:
+            max_replay_rows = getattr(settings, 'INCREMENTAL_REPLAY_MAX_ROWS', 200000)
+        
+        since = getattr(self.rf_model, 'data_max_pk_', None)
+        if since is None:
+            raise ValueError("El modelo actual no registra la ventana de datos con que se entrenó")
+        
+        fields = get_integer_fields(model_class, self.excluded_columns)
+        queryset = model_class.objects.filter(**(filter_kwargs or {}))
+        new_data = load_dataframe(queryset.filter(pk__gt=since), fields)
+        if new_data.empty:
+            raise ValueError("No hay registros nuevos desde el último entrenamiento")
+        
+        old_queryset = queryset.filter(pk__lte=since)
+        old_count = old_queryset.count()
+        replay_rows = min(int(len(new_data) * replay_ratio), int(max_replay_rows), old_count)
+        frames = [new_data]
+        if replay_rows > 0:
+            step = max(1, old_count // replay_rows)
+            replay_queryset = old_queryset.annotate(replay_slot=Mod('pk', step)).filter(
+                replay_slot=random.randrange(step)
+            )
+            frames.append(load_dataframe(replay_queryset, fields))
+        
+        self.data = pd.concat(frames, ignore_index=True)
+        self.data_max_pk = new_data.attrs['max_pk']
+        self.incremental_info = {
+            'pk_min': since + 1,
+            'new_rows': len(new_data),
+            'replay_rows': len(self.data) - len(new_data)
+        }
+        
+        print(f"Datos incrementales: {len(new_data)} registros nuevos, "
+              f"{self.incremental_info['replay_rows']} de repaso")
+        
+        return self
+    
+    @profiled_stage('train')
+    def train_incremental(self, new_trees=None, max_trees=None, use_smote=True):
+        """Agrega árboles al modelo actual con warm_start, entrenados solo con los datos cargados.
+        
+        Args:
+            new_trees (int, optional): Árboles a agregar.
+            max_trees (int, optional): Tamaño máximo del bosque; se retiran los
+                árboles más antiguos (0 = sin límite).
+            use_smote (bool): Si es True, usa los datos balanceados con SMOTE.
+            
+        Returns:
+            self: Para encadenamiento de métodos.
+        """
+        if new_trees is None:
+            new_trees = getattr(settings, 'INCREMENTAL_NEW_TREES', 20)
+        if max_trees is None:
+            max_trees = getattr(settings, 'INCREMENTAL_MAX_TREES', 200)
+        if not isinstance(self.rf_model, RandomForestClassifier):
+            raise ValueError("El entrenamiento incremental requiere un RandomForestClassifier")
+        
+        if use_smote:
+            if not hasattr(self, 'X_train_smote') or not hasattr(self, 'y_train_smote'):
+                self.apply_smote()
+            X_fit, y_fit = self.X_train_smote, self.y_train_smote
+        else:
+            X_fit, y_fit = self.X_train, self.y_train
+        
+        if set(np.unique(y_fit)) != set(self.rf_model.classes_):
+            raise ValueError("Los datos incrementales no contienen todas las clases del modelo")
+        
+        n_before = len(self.rf_model.estimators_)
+        windows = list(getattr(self.rf_model, 'tree_windows_', None) or [
+            {'mode': 'full', 'n_trees': n_before, 'pk_min': None, 'pk_max': None}
+        ])
+        
+        # Los árboles existentes se conservan; solo se ajustan los nuevos
+        self.rf_model.set_params(warm_start=True, n_estimators=n_before + int(new_trees), oob_score=False,
+                                 n_jobs=self.n_jobs)
+        self.rf_model.fit(X_fit, y_fit)
+        self.rf_model.set_params(warm_start=False)
+        windows.append(self._tree_window('incremental', int(new_trees)))
+        
+        # Retirar los árboles más antiguos para acotar el tamaño del bosque
+        retired = 0
+        if max_trees and len(self.rf_model.estimators_) > max_trees:
+            retired = len(self.rf_model.estimators_) - int(max_trees)
+            self.rf_model.estimators_ = self.rf_model.estimators_[retired:]
+            self.rf_model.n_estimators = len(self.rf_model.estimators_)
+            remaining = retired
+            while remaining and windows:
+                if windows[0]['n_trees'] <= remaining:
+                    remaining -= windows.pop(0)['n_trees']
+                else:
+                    windows[0] = dict(windows[0], n_trees=windows[0]['n_trees'] - remaining)
+                    remaining = 0
+        
+        self.rf_model.tree_windows_ = windows
+        self.rf_model.data_max_pk_ = self.data_max_pk
+        self.training_mode = 'incremental'
+        self.incremental_info.update(trees_added=int(new_trees), trees_retired=retired,
+                                     total_trees=len(self.rf_model.estimators_))
+        
+        print(f"\nModelo incremental: {new_trees} árboles nuevos, {retired} retirados, "
+              f"{len(self.rf_model.estimators_)} en total")
+        
+        return self
+    
+    @profiled_stage('evaluate')
     def evaluate_model(self, threshold=0.5):
         """Evalúa el rendimiento del modelo en el conjunto de prueba.
         
@@ -247,6 +437,7 @@ class AccidentPredictorAPI:
                 'training_samples': len(self.X_train),
                 'test_samples': len(self.X_test),
                 'features_count': len(self.X.columns),
+                'load_source': self.data.attrs.get('snapshot'),
                 'target_distribution': self.y.value_counts().to_dict()
             }
         }
@@ -258,9 +449,23 @@ class AccidentPredictorAPI:
         # Guardar importancia de características
         self.feature_importance = pd.DataFrame({
             'Feature': self.X.columns,
-            'Importance': self.rf_model.feature_importances_
+            'Importance': self.engine.feature_importances(self.rf_model, self.X_test, self.y_test)
         }).sort_values('Importance', ascending=False)
         
+        # Esquema de entrada (rangos y códigos observados) para validar predicciones
+        self.input_schema = FeatureSchema.from_training_data(self.X)
+        if self.previous_schema is not None:
+            self.input_schema = self.input_schema.union(self.previous_schema)
+        
+        # Motor, modo de entrenamiento y ventana de datos de cada grupo de árboles
+        self.metrics['model_engine'] = dict(self.engine.describe(self.rf_model), name=self.engine.name)
+        self.metrics['training_mode'] = self.training_mode
+        self.metrics['tree_windows'] = describe_tree_windows(self.rf_model)
+        if self.training_mode == 'incremental':
+            self.metrics['incremental'] = self.incremental_info
+        elif self.hyperparams is not None:
+            self.metrics['hyperparameters'] = {'source': self.hyperparams_source, 'params': self.hyperparams}
+        
         # Agregar top 10 características importantes a las métricas
         self.metrics['top_features'] = [
             {
@@ -272,11 +477,51 @@ class AccidentPredictorAPI:
         
         print("\n---- Evaluación del Modelo ----")
         for key, value in self.metrics.items():
-            if key not in ['timestamp', 'training_date', 'confusion_matrix', 'dataset_info', 'top_features']:
+            if key not in ['timestamp', 'training_date', 'confusion_matrix', 'dataset_info', 'top_features',
+                           'tree_windows', 'incremental', 'training_profile', 'hyperparameters',
+                           'model_engine']:
                 print(f"{key}: {value}")
         
         return self
     
+    @profiled_stage('tune')
+    def tune_hyperparameters(self, cv=None, factor=None, max_rows=None, param_grid=None,
+                             random_state=42, progress_callback=None):
+        """Busca los mejores hiperparámetros con successive halving.
+        
+        Solo usa el conjunto de entrenamiento (el de prueba queda fuera de la
+        búsqueda) y, si supera max_rows, una submuestra estratificada.
+        
+        Args:
+            cv (int, optional): Cantidad de folds.
+            factor (int, optional): Factor de reducción por ronda.
+            max_rows (int, optional): Máximo de filas usadas en la búsqueda.
+            param_grid (dict, optional): Grilla de hiperparámetros.
+            random_state (int): Semilla para reproducibilidad.
+            progress_callback (callable, optional): Recibe (etapa, progreso) en cada ronda.
+            
+        Returns:
+            dict: Resultado de la búsqueda.
+        """
+        if self.X_train is None or self.y_train is None:
+            raise ValueError("Primero debe preparar los datos con prepare_data()")
+        
+        if max_rows is None:
+            max_rows = getattr(settings, 'TUNING_MAX_ROWS', 200000)
+        X, y = self.X_train, self.y_train
+        if max_rows and len(X) > max_rows:
+            X, _, y, _ = train_test_split(X, y, train_size=int(max_rows), random_state=random_state, stratify=y)
+            print(f"Búsqueda sobre una submuestra de {len(X)} filas")
+        
+        self.tuning_result = successive_halving_search(
+            X.to_numpy(), y.to_numpy(), param_grid=param_grid, cv=cv, factor=factor,
+            n_jobs=self.n_jobs, random_state=random_state, progress_callback=progress_callback
+        )
+        self.tuning_result['features'] = self.X_train.columns.tolist()
+        print(f"Mejores hiperparámetros: {self.tuning_result['best_params']} "
+              f"(ROC AUC {self.tuning_result['best_score']:.4f})")
+        return self.tuning_result
+    
     def save_metrics_json(self, metrics_filename):
         """Guarda las métricas del modelo usando el storage configurado.
         
@@ -289,11 +534,15 @@ class AccidentPredictorAPI:
         if not self.metrics:
             raise ValueError("Primero debe evaluar el modelo")
         
+        # Tiempo y memoria máxima por etapa con el presupuesto de CPU usado
+        self.metrics['training_profile'] = self.profiler.to_dict()
+        
         # Guardar métricas usando el storage handler
         saved_path = self.storage.save_metrics(self.metrics, metrics_filename)
         print(f"\nMétricas guardadas en: {saved_path}")
         return saved_path
     
+    @profiled_stage('save_model')
     def save_model(self, model_filename):
         """Guarda el modelo entrenado usando el storage configurado.
         
@@ -306,10 +555,21 @@ class AccidentPredictorAPI:
         if self.rf_model is None:
             raise ValueError("Primero debe entrenar el modelo")
         
+        # El esquema se guarda antes que el modelo para que ningún proceso
+        # cargue la versión nueva del modelo con el esquema anterior
+        if self.input_schema is not None:
+            self.storage.save_metrics(self.input_schema.to_dict(), schema_filename_for(model_filename))
+        
+        self.engine.prepare_for_serving(self.rf_model)
+        
         # Guardar el modelo usando el storage handler
         saved_path = self.storage.save_model(self.rf_model, model_filename)
         print(f"\nModelo guardado en: {saved_path}")
         
+        # Descartar la versión anterior residente en este proceso
+        get_model_registry().invalidate(model_filename)
+        get_prediction_cache().clear()
+        
         return saved_path
     
     def predict_new_data(self, new_data, threshold=0.5):
@@ -348,7 +608,8 @@ class AccidentPredictorAPI:
         return self.metrics
     
     def train_and_evaluate(self, queryset_or_model, target_col='ACCIDENTE', 
-                          model_filename=None, metrics_filename=None, filter_kwargs=None):
+                          model_filename=None, metrics_filename=None, filter_kwargs=None,
+                          progress_callback=None):
         """Método completo para entrenar y evaluar el modelo desde la API.
         
         Args:
@@ -357,22 +618,34 @@ class AccidentPredictorAPI:
             model_filename (str, optional): Nombre del archivo del modelo.
             metrics_filename (str, optional): Nombre del archivo de métricas.
             filter_kwargs (dict, optional): Filtros para la consulta.
+            progress_callback (callable, optional): Se llama con (etapa, progreso)
+                al comenzar cada etapa; progreso va de 0 a 1.
             
         Returns:
             dict: Diccionario con las rutas de los archivos guardados y métricas.
         """
+        def report(stage, progress):
+            if progress_callback is not None:
+                progress_callback(stage, progress)
+        
         try:
             # Cargar datos
+            report('load_data', 0.0)
             if hasattr(queryset_or_model, 'objects'):  # Es una clase de modelo
                 self.load_data_from_model(queryset_or_model, filter_kwargs)
             else:  # Es un QuerySet
                 self.load_data_from_db(queryset_or_model)
             
             # Preparar, entrenar y evaluar
-            self.prepare_data(target_col=target_col) \
-                .apply_smote() \
-                .train_model() \
-                .evaluate_model()
+            report('prepare_data', 0.15)
+            self.prepare_data(target_col=target_col)
+            report('smote', 0.2)
+            self.apply_smote()
+            report('train', 0.3)
+            self.train_model()
+            report('evaluate', 0.85)
+            self.evaluate_model()
+            report('save', 0.95)
             
             result = {
                 'success': True,
@@ -399,11 +672,28 @@ class AccidentPredictorAPI:
                 'message': 'Error durante el entrenamiento del modelo'
             }
 
+def describe_tree_windows(model):
+    """
+    Retorna las ventanas de datos del modelo con el rango de árboles de cada una.
+    
+    Args:
+        model: Modelo entrenado.
+        
+    Returns:
+        list: Ventanas en el orden de los árboles del bosque.
+    """
+    windows = []
+    first_tree = 0
+    for window in getattr(model, 'tree_windows_', None) or []:
+        windows.append(dict(window, first_tree=first_tree, last_tree=first_tree + window['n_trees'] - 1))
+        first_tree += window['n_trees']
+    return windows
+
 # Función de utilidad actualizada
 def train_accident_model_from_db(model_class, target_col='ACCIDENTE', 
                                 filter_kwargs=None, model_filename='modelo_accidentes.pkl',
                                 metrics_filename='metricas_modelo.json',
-                                excluded_columns=None):
+                                excluded_columns=None, progress_callback=None, engine=None):
     """Función de utilidad para entrenar el modelo desde una vista de Django.
     
     Args:
@@ -413,11 +703,13 @@ def train_accident_model_from_db(model_class, target_col='ACCIDENTE',
         model_filename (str): Nombre del archivo del modelo.
         metrics_filename (str): Nombre del archivo de métricas.
         excluded_columns (list, optional): Columnas a excluir del entrenamiento.
+        progress_callback (callable, optional): Recibe (etapa, progreso) al comenzar cada etapa.
+        engine (str, optional): Motor de modelo (por defecto MODEL_ENGINE).
         
     Returns:
         dict: Resultado del entrenamiento con rutas y métricas.
     """
-    predictor = AccidentPredictorAPI()
+    predictor = AccidentPredictorAPI(engine=engine)
     
     # Configurar columnas excluidas si se proporcionan
     if excluded_columns:
@@ -428,5 +720,250 @@ def train_accident_model_from_db(model_class, target_col='ACCIDENTE',
         target_col=target_col,
         model_filename=model_filename,
         metrics_filename=metrics_filename,
-        filter_kwargs=filter_kwargs
-    )
\ No newline at end of file
+        filter_kwargs=filter_kwargs,
+        progress_callback=progress_callback
+    )
+
+
+def incremental_retrain_from_db(model_class, model_filename='modelo_accidentes.pkl',
+                                metrics_filename='metricas_modelo.json', new_trees=None,
+                                max_trees=None, replay_ratio=None, progress_callback=None,
+                                target_col='ACCIDENTE', filter_kwargs=None, engine=None):
+    """Reentrena el modelo actual de forma incremental con los registros nuevos.
+    
+    Carga el modelo guardado, agrega árboles (warm_start) entrenados con los
+    registros insertados desde su último entrenamiento más una muestra de
+    repaso de los anteriores, y retira los árboles más antiguos si el bosque
+    supera max_trees. Las métricas se calculan con una parte reservada de los
+    registros nuevos, nunca con las filas de repaso. Si el modelo no existe,
+    no registra su ventana de datos o se pide un motor distinto al suyo, se
+    hace un entrenamiento completo (con el mismo target_col, filter_kwargs y
+    engine).
+    
+    Args:
+        model_class: Clase del modelo Django con los datos.
+        model_filename (str): Nombre del archivo del modelo.
+        metrics_filename (str): Nombre del archivo de métricas.
+        new_trees (int, optional): Árboles a agregar.
+        max_trees (int, optional): Tamaño máximo del bosque.
+        replay_ratio (float, optional): Filas de repaso por cada fila nueva.
+        progress_callback (callable, optional): Recibe (etapa, progreso) al comenzar cada etapa.
+        target_col (str): Nombre de la columna objetivo.
+        filter_kwargs (dict, optional): Filtros que delimitan los registros nuevos y el repaso.
+        engine (str, optional): Motor esperado (por defecto el del modelo actual).
+        
+    Returns:
+        dict: Resultado del entrenamiento con rutas y métricas.
+    """
+    def report(stage, progress):
+        if progress_callback is not None:
+            progress_callback(stage, progress)
+    
+    predictor = AccidentPredictorAPI()
+    requested_engine = get_engine(engine) if engine is not None else None
+    
+    report('load_model', 0.0)
+    try:
+        predictor.rf_model = predictor.storage.load_model(model_filename)
+        fallback_reason = None
+        predictor.engine = engine_for_model(predictor.rf_model)
+        if not predictor.engine.supports_incremental:
+            fallback_reason = f'El motor {predictor.engine.name} no admite reentrenamiento incremental'
+        elif requested_engine is not None and requested_engine.name != predictor.engine.name:
+            fallback_reason = (f'El modelo actual usa el motor {predictor.engine.name} '
+                               f'y se pidió {requested_engine.name}')
+        elif getattr(predictor.rf_model, 'data_max_pk_', None) is None:
+            fallback_reason = 'El modelo actual no registra la ventana de datos con que se entrenó'
+    except FileNotFoundError:
+        fallback_reason = 'No existe un modelo previo'
+    
+    if fallback_reason:
+        print(f"{fallback_reason}; se realiza un entrenamiento completo")
+        result = train_accident_model_from_db(
+            model_class=model_class,
+            target_col=target_col,
+            filter_kwargs=filter_kwargs,
+            model_filename=model_filename,
+            metrics_filename=metrics_filename,
+            progress_callback=progress_callback,
+            engine=(requested_engine or predictor.engine).name
+        )
+        result['fallback_reason'] = fallback_reason
+        return result
+    
+    try:
+        report('load_data', 0.1)
+        predictor.load_incremental_data(model_class, replay_ratio=replay_ratio, filter_kwargs=filter_kwargs)
+        report('prepare_data', 0.25)
+        predictor.prepare_data(target_col=target_col)
+        report('smote', 0.3)
+        predictor.apply_smote()
+        report('train', 0.4)
+        predictor.train_incremental(new_trees=new_trees, max_trees=max_trees)
+        report('evaluate', 0.85)
+        predictor.previous_schema = load_schema(predictor.storage, model_filename)
+        predictor.evaluate_model()
+        report('save', 0.95)
+        
+        return {
+            'success': True,
+            'metrics': predictor.metrics,
+            'message': 'Modelo reentrenado de forma incremental',
+            'model_path': predictor.save_model(model_filename),
+            'metrics_path': predictor.save_metrics_json(metrics_filename)
+        }
+        
+    except Exception as e:
+        return {
+            'success': False,
+            'error': str(e),
+            'message': 'Error durante el reentrenamiento incremental del modelo'
+        }
+
+
+def tune_hyperparameters_from_db(model_class, target_col='ACCIDENTE', filter_kwargs=None,
+                                 cv=None, factor=None, max_rows=None, save=True,
+                                 progress_callback=None):
+    """Busca hiperparámetros del bosque y guarda los mejores para train_model.
+    
+    Args:
+        model_class: Clase del modelo Django con los datos.
+        target_col (str): Nombre de la columna objetivo.
+        filter_kwargs (dict, optional): Filtros para la consulta.
+        cv (int, optional): Cantidad de folds.
+        factor (int, optional): Factor de reducción por ronda.
+        max_rows (int, optional): Máximo de filas usadas en la búsqueda.
+        save (bool): Si es True, los siguientes entrenamientos usan los mejores parámetros.
+        progress_callback (callable, optional): Recibe (etapa, progreso) al comenzar cada etapa.
+        
+    Returns:
+        dict: Resultado de la búsqueda.
+    """
+    def report(stage, progress):
+        if progress_callback is not None:
+            progress_callback(stage, progress)
+    
+    def report_round(stage, progress):
+        report(stage, 0.2 + 0.75 * progress)
+    
+    predictor = AccidentPredictorAPI()
+    try:
+        report('load_data', 0.0)
+        predictor.load_data_from_model(model_class, filter_kwargs)
+        report('prepare_data', 0.15)
+        predictor.prepare_data(target_col=target_col)
+        search = predictor.tune_hyperparameters(
+            cv=cv, factor=factor, max_rows=max_rows, progress_callback=report_round
+        )
+        search['training_profile'] = predictor.profiler.to_dict()
+        
+        result = {
+            'success': True,
+            'message': 'Búsqueda de hiperparámetros completada',
+            'best_params': search['best_params'],
+            'best_score': search['best_score'],
+            'search': search
+        }
+        if save:
+            report('save', 0.95)
+            result['params_path'] = predictor.storage.save_metrics(search, get_best_params_filename())
+        return result
+    
+    except Exception as e:
+        return {
+            'success': False,
+            'error': str(e),
+            'message': 'Error durante la búsqueda de hiperparámetros'
+        }
+
+
+def compare_engines_from_db(model_class, engines=None, target_col='ACCIDENTE', filter_kwargs=None,
+                            report_filename=None, single_row_repeats=200, batch_rows=10000):
+    """Entrena cada motor de modelo con la misma partición y compara costo y calidad.
+    
+    Para cada motor se mide el tiempo de ajuste, el tamaño del artefacto
+    serializado, la latencia de una fila y de un lote con el predictor que
+    se usa al servir, y el ROC AUC en el conjunto de prueba. Los datos se
+    cargan, dividen y balancean con SMOTE una sola vez para todos.
+    
+    Args:
+        model_class: Clase del modelo Django con los datos.
+        engines (list, optional): Motores a comparar (por defecto todos).
+        target_col (str): Nombre de la columna objetivo.
+        filter_kwargs (dict, optional): Filtros para la consulta.
+        report_filename (str, optional): Archivo donde guardar el informe.
+        single_row_repeats (int): Predicciones de una fila a medir.
+        batch_rows (int): Filas del lote medido.
+        
+    Returns:
+        dict: Resultado con el informe por motor.
+    """
+    try:
+        engines = [get_engine(name).name for name in (engines or list(ENGINES))]
+        predictor = AccidentPredictorAPI()
+        predictor.load_data_from_model(model_class, filter_kwargs)
+        predictor.prepare_data(target_col=target_col)
+        predictor.apply_smote()
+        
+        # Las filas de prueba se miden en el mismo formato que reciben al servir
+        reference = FeatureSchema.from_training_data(predictor.X).validate(predictor.X_test).values
+        
+        results = {}
+        for name in engines:
+            print(f"\n==== Motor: {name} ====")
+            predictor.engine = get_engine(name)
+            start = time.perf_counter()
+            predictor.train_model()
+            fit_seconds = time.perf_counter() - start
+            predictor.evaluate_model()
+            
+            model = predictor.rf_model
+            predictor.engine.prepare_for_serving(model)
+            serving = build_predictor(model)
+            artifact_bytes = artifact_size_bytes(model)
+            results[name] = {
+                'fit_seconds': round(fit_seconds, 3),
+                'roc_auc': predictor.metrics['roc_auc'],
+                'f1_score': predictor.metrics['f1_score'],
+                'artifact_bytes': artifact_bytes,
+                'artifact_mb': round(artifact_bytes / (1024 * 1024), 3),
+                'inference_engine': serving.engine,
+                'structure': predictor.metrics['model_engine'],
+                'hyperparameters': predictor.metrics.get('hyperparameters'),
+                'latency': measure_latency(serving, reference, single_row_repeats=single_row_repeats,
+                                           batch_rows=batch_rows)
+            }
+        
+        report = {
+            'generated_at': datetime.now().isoformat(),
+            'dataset_info': {
+                'total_samples': len(predictor.data),
+                'training_samples': len(predictor.X_train),
+                'test_samples': len(predictor.X_test)
+            },
+            'cpu_budget': predictor.n_jobs,
+            'engines': results,
+            'best': {
+                'roc_auc': max(results, key=lambda name: results[name]['roc_auc']),
+                'fit_seconds': min(results, key=lambda name: results[name]['fit_seconds']),
+                'artifact_size': min(results, key=lambda name: results[name]['artifact_bytes']),
+                'single_row_latency': min(results, key=lambda name: results[name]['latency']['single_row_ms_p50']),
+                'batch_latency': min(results, key=lambda name: results[name]['latency']['batch_ms'])
+            }
+        }
+        
+        result = {
+            'success': True,
+            'message': 'Comparación de motores completada',
+            'report': report
+        }
+        if report_filename:
+            result['report_path'] = predictor.storage.save_metrics(report, report_filename)
+        return result
+    
+    except Exception as e:
+        return {
+            'success': False,
+            'error': str(e),
+            'message': 'Error durante la comparación de motores'
+        }
@@ -1,3 +1,5 @@
+import hashlib
+import uuid
 from django.db import models
 
 class Siniestro(models.Model):
@@ -22,6 +24,12 @@ class Siniestro(models.Model):
     ACCIDENTE = models.IntegerField()
     FECHA_SINIESTRO = models.DateField()
     FECHA_INGRESO = models.DateField()
+    # Huella de los valores de la fila (FINGERPRINT_FIELDS); el índice único evita
+    # que una misma fila se cargue dos veces
+    FINGERPRINT = models.CharField(max_length=32, unique=True, null=True, blank=True, editable=False)
+    # Última escritura de la fila (save y bulk_create); forma parte de la versión de
+    # los datos de los snapshots de entrenamiento, que así detectan ediciones
+    FECHA_MODIFICACION = models.DateTimeField(auto_now=True, null=True, db_index=True)
 
     # Campos que se usan para entrenamiento y predicción
     TRAINING_FIELDS = [
@@ -32,11 +40,157 @@ class Siniestro(models.Model):
         'DIA_DE_LA_SEMANA', 'MES', 'PERIODO_DEL_DIA', 'FERIADO'
     ]
     
+    # Campos con códigos de categoría (sin orden); los motores con soporte
+    # categórico nativo los tratan como tales
+    CATEGORICAL_FIELDS = [
+        'CLASE_SINIESTRO', 'DISTRITO', 'ZONA', 'TIPO_DE_VIA', 'RED_VIAL',
+        'CONDICION_CLIMATICA', 'ZONIFICACION', 'CARACTERISTICAS_DE_VIA',
+        'PERFIL_LONGITUDINAL_VIA', 'SUPERFICIE_DE_CALZADA', 'SENALIZACION',
+        'DIA_DE_LA_SEMANA', 'PERIODO_DEL_DIA'
+    ]
+    
     # Campo objetivo para el entrenamiento
     TARGET_FIELD = 'ACCIDENTE'
     
+    # Campos que identifican una fila cargada (todas las columnas del CSV)
+    FINGERPRINT_FIELDS = TRAINING_FIELDS + [TARGET_FIELD, 'FECHA_SINIESTRO']
+    
+    # Valor de FECHA_SINIESTRO en la huella cuando el CSV la trae vacía: la fecha
+    # por defecto cambia entre cargas y no debe cambiar la identidad de la fila
+    FINGERPRINT_NULL_DATE = 'sin-fecha'
+    
     class Meta:
         db_table = 'projects_siniestro'
         
     def __str__(self):
         return f"Siniestro {self.id} - Accidente: {self.ACCIDENTE}"
+    
+    @staticmethod
+    def compute_fingerprint(values):
+        """
+        Calcula la huella de una fila.
+        
+        Args:
+            values (iterable): Valores de FINGERPRINT_FIELDS en ese orden (enteros y la
+                fecha, o FINGERPRINT_NULL_DATE si venía vacía)
+            
+        Returns:
+            str: Hash BLAKE2b de 128 bits en hexadecimal
+        """
+        canonical = '|'.join(str(value) for value in values)
+        return hashlib.blake2b(canonical.encode('ascii'), digest_size=16).hexdigest()
+    
+    def save(self, *args, **kwargs):
+        # bulk_create no pasa por aquí: la carga masiva asigna la huella al preparar las filas
+        self.FINGERPRINT = self.compute_fingerprint(
+            getattr(self, field) for field in self.FINGERPRINT_FIELDS
+        )
+        super().save(*args, **kwargs)
+
+
+class TrainingJob(models.Model):
+    """Trabajo de entrenamiento encolado; lo ejecuta el comando run_training_worker."""
+
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_SUCCEEDED = 'succeeded'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pendiente'),
+        (STATUS_RUNNING, 'En ejecución'),
+        (STATUS_SUCCEEDED, 'Completado'),
+        (STATUS_FAILED, 'Fallido'),
+    ]
+
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=STATUS_PENDING, db_index=True)
+    source = models.CharField(max_length=32, default='api')
+    params = models.JSONField(default=dict)
+    stage = models.CharField(max_length=32, blank=True, default='')
+    progress = models.FloatField(default=0.0)
+    stage_timings = models.JSONField(default=dict)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True, default='')
+    worker = models.CharField(max_length=128, blank=True, default='')
+    created_by = models.ForeignKey('auth.User', null=True, blank=True, on_delete=models.SET_NULL)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    # Último latido del worker que lo ejecuta; sin latidos recientes se da por abandonado
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"TrainingJob {self.id} - {self.status}"
+
+
+class UploadSession(models.Model):
+    """Carga por partes de un CSV grande; al completarse se ingiere o se evalúa en un worker."""
+
+    PURPOSE_INGEST = 'ingest'
+    PURPOSE_PREDICT = 'predict'
+    PURPOSE_CHOICES = [
+        (PURPOSE_INGEST, 'Carga de datos'),
+        (PURPOSE_PREDICT, 'Predicción por lotes'),
+    ]
+
+    STATUS_UPLOADING = 'uploading'
+    STATUS_QUEUED = 'queued'
+    STATUS_PROCESSING = 'processing'
+    STATUS_COMPLETED = 'completed'
+    STATUS_FAILED = 'failed'
+    STATUS_ABORTED = 'aborted'
+    STATUS_CHOICES = [
+        (STATUS_UPLOADING, 'Recibiendo partes'),
+        (STATUS_QUEUED, 'En cola'),
+        (STATUS_PROCESSING, 'Procesando'),
+        (STATUS_COMPLETED, 'Completada'),
+        (STATUS_FAILED, 'Fallida'),
+        (STATUS_ABORTED, 'Cancelada'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    purpose = models.CharField(max_length=16, choices=PURPOSE_CHOICES)
+    filename = models.CharField(max_length=255)
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=STATUS_UPLOADING, db_index=True)
+    storage = models.CharField(max_length=8, default='local')
+    params = models.JSONField(default=dict)
+    expected_size = models.BigIntegerField(null=True, blank=True)
+    expected_parts = models.IntegerField(null=True, blank=True)
+    # Compresión, codificación y columnas detectadas en la primera parte
+    file_info = models.JSONField(default=dict)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True, default='')
+    worker = models.CharField(max_length=128, blank=True, default='')
+    created_by = models.ForeignKey('auth.User', null=True, blank=True, on_delete=models.SET_NULL)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"UploadSession {self.id} - {self.purpose} - {self.status}"
+
+
+class UploadPart(models.Model):
+    """Parte recibida de una UploadSession; el contenido está en el storage de partes."""
+
+    session = models.ForeignKey(UploadSession, related_name='parts', on_delete=models.CASCADE)
+    number = models.PositiveIntegerField()
+    size = models.BigIntegerField()
+    sha256 = models.CharField(max_length=64)
+    # Se actualiza si la parte se vuelve a subir
+    received_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['number']
+        constraints = [
+            models.UniqueConstraint(fields=['session', 'number'], name='unique_upload_part_number'),
+        ]
+
+    def __str__(self):
+        return f"UploadPart {self.session_id} #{self.number}"
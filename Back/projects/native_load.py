@@ -0,0 +1,326 @@
+"""
+Carga masiva nativa de siniestros (MySQL ``LOAD DATA LOCAL INFILE``).
+
+Para importaciones históricas grandes, el CSV se valida y normaliza por
+bloques (las mismas reglas que ``bulk_ingestion``) y se escribe en un archivo
+de staging separado por tabulaciones. Luego:
+
+- MySQL: el archivo se carga con ``LOAD DATA LOCAL INFILE`` en una tabla
+  temporal y se pasa a ``projects_siniestro`` con un único
+  ``INSERT ... SELECT DISTINCT`` atómico con un anti-join por huella (las
+  filas cuya huella ya existe se omiten y se cuentan como duplicadas). No se
+  usa ``INSERT IGNORE``: convertiría también los errores de datos en
+  advertencias y esas filas se contarían como duplicadas; cualquier
+  advertencia cancela la carga. Requiere ``local_infile`` habilitado en el
+  servidor y en el cliente (MYSQL_LOCAL_INFILE=true).
+- Otros motores (SQLite en desarrollo y pruebas): el archivo de staging se
+  inserta con ``bulk_create`` por lotes dentro de una transacción.
+
+Como nada se escribe en la tabla hasta que el archivo completo pasó la
+validación, la carga es todo o nada en ambos casos.
+
+Para probar contra MySQL local:
+    docker run -e MYSQL_ALLOW_EMPTY_PASSWORD=1 -e MYSQL_DATABASE=accidents_db \\
+        -p 3306:3306 mysql:8 --local-infile=1
+    MYSQL_LOCAL_INFILE=true python manage.py bulk_load_siniestros datos.csv.gz
+"""
+
+import csv
+import os
+import tempfile
+import time
+from datetime import date
+from django.conf import settings
+from django.db import DatabaseError, DataError, connection, transaction
+from .bulk_ingestion import (
+    DATE_FIELD, FINGERPRINT_FIELD, INGRESO_FIELD, INTEGER_FIELDS, bulk_insert_siniestros, get_bulk_batch_size,
+    siniestro_rows_from_dataframe
+)
+from .csv_ingestion import CsvUploadError, get_upload_chunk_rows, iter_csv_chunks, open_csv_reader
+from .models import Siniestro
+
+LOAD_METHODS = ('auto', 'load_data', 'bulk_create')
+
+# Orden de las columnas en el archivo de staging
+STAGING_FIELDS = INTEGER_FIELDS + [DATE_FIELD, INGRESO_FIELD, FINGERPRINT_FIELD]
+
+STAGING_TABLE = 'projects_siniestro_staging'
+
+
+def resolve_load_method(method='auto'):
+    """
+    Decide cómo se carga el archivo de staging.
+
+    Args:
+        method (str): 'auto', 'load_data' o 'bulk_create'
+
+    Returns:
+        str: 'load_data' (MySQL) o 'bulk_create'
+
+    Raises:
+        ValueError: Si el método no existe o se pide load_data fuera de MySQL
+    """
+    method = method or 'auto'
+    if method not in LOAD_METHODS:
+        raise ValueError(f'Método de carga no válido: {method}. Opciones: {list(LOAD_METHODS)}')
+    if method == 'auto':
+        return 'load_data' if connection.vendor == 'mysql' else 'bulk_create'
+    if method == 'load_data' and connection.vendor != 'mysql':
+        raise ValueError(f'LOAD DATA requiere MySQL (motor actual: {connection.vendor})')
+    return method
+
+
+def write_staging_file(file_obj, path, default_date, ingreso_date=None, validate=True, chunk_size=None,
+                       progress_callback=None):
+    """
+    Valida y normaliza el CSV por bloques y lo escribe como archivo de staging.
+
+    Args:
+        file_obj: Archivo CSV (binario; admite gzip y zstd)
+        path (str): Ruta del archivo de staging (separado por tabulaciones, sin encabezado)
+        default_date (date): Fecha para FECHA_SINIESTRO vacía
+        ingreso_date (date, optional): FECHA_INGRESO (por defecto hoy)
+        validate (bool): Rechazar el archivo si trae nulos o valores no numéricos;
+            si no, las filas inválidas se descartan y se reportan
+        chunk_size (int, optional): Filas por bloque (por defecto UPLOAD_CHUNK_ROWS)
+        progress_callback (callable, optional): Recibe las filas procesadas
+
+    Returns:
+        dict: staged_rows, records_errors, error_details, dates_fixed, total_rows,
+        chunks, encoding y compression
+
+    Raises:
+        CsvUploadError: Si el archivo no se puede leer o no pasa la validación
+    """
+    ingreso_date = ingreso_date or date.today()
+    max_error_details = getattr(settings, 'UPLOAD_MAX_ERROR_DETAILS', 50)
+    reader, info = open_csv_reader(file_obj, chunk_size, validate)
+    totals = {'staged_rows': 0, 'records_errors': 0, 'error_details': [], 'dates_fixed': 0,
+              'total_rows': 0, 'chunks': 0}
+
+    with open(path, 'w', newline='', encoding='utf-8') as staging:
+        writer = csv.writer(staging, delimiter='\t', lineterminator='\n')
+        for offset, chunk in iter_csv_chunks(reader, validate):
+            prepared = siniestro_rows_from_dataframe(
+                chunk, default_date, ingreso_date,
+                max_error_details=max(0, max_error_details - len(totals['error_details']))
+            )
+            if validate and prepared['errors']:
+                detail = prepared['error_details'][0] if prepared['error_details'] else {}
+                raise CsvUploadError(
+                    'Se encontraron valores fuera de rango en campos enteros',
+                    row=detail.get('row', 0) + offset,
+                    error=detail.get('error')
+                )
+            writer.writerows(prepared['rows'])
+            for detail in prepared['error_details']:
+                detail['row'] += offset
+            totals['error_details'].extend(prepared['error_details'])
+            totals['staged_rows'] += len(prepared['rows'])
+            totals['records_errors'] += prepared['errors']
+            totals['dates_fixed'] += prepared['dates_fixed']
+            totals['total_rows'] += len(chunk)
+            totals['chunks'] += 1
+            if progress_callback:
+                progress_callback(offset + len(chunk))
+
+    totals.update(encoding=info['encoding'], compression=info['compression'])
+    return totals
+
+
+def _insert_from_staging(cursor, staging_table):
+    """
+    Inserta las filas de la tabla de staging cuya huella no está en la tabla de siniestros.
+
+    DISTINCT descarta las filas repetidas dentro del archivo (misma huella,
+    mismos valores) y el anti-join las que ya estaban cargadas.
+
+    Args:
+        cursor: Cursor de la conexión que creó la tabla de staging
+        staging_table (str): Nombre de la tabla de staging (ya citado)
+
+    Returns:
+        int: Filas insertadas
+    """
+    quote = connection.ops.quote_name
+    table = quote(Siniestro._meta.db_table)
+    fingerprint = quote(FINGERPRINT_FIELD)
+    columns = ', '.join(quote(field) for field in STAGING_FIELDS)
+    staged_columns = ', '.join(f'staged.{quote(field)}' for field in STAGING_FIELDS)
+    cursor.execute(
+        f'INSERT INTO {table} ({columns}) '
+        f'SELECT DISTINCT {staged_columns} FROM {staging_table} staged '
+        f'LEFT JOIN {table} existing ON existing.{fingerprint} = staged.{fingerprint} '
+        f'WHERE existing.{fingerprint} IS NULL'
+    )
+    return cursor.rowcount
+
+
+def _raise_on_warnings(cursor, step):
+    """Falla si la última sentencia dejó advertencias (MySQL convierte así algunos errores de datos)."""
+    cursor.execute('SHOW WARNINGS')
+    warnings = cursor.fetchall()
+    if warnings:
+        messages = '; '.join(str(warning[2]) for warning in warnings[:5])
+        raise DataError(f'{step} generó {len(warnings)} advertencias; no se insertó nada: {messages}')
+
+
+def _load_data_infile(path, staged_rows):
+    """LOAD DATA en una tabla temporal e INSERT ... SELECT atómico; retorna los tiempos."""
+    quote = connection.ops.quote_name
+    table = quote(Siniestro._meta.db_table)
+    staging_table = quote(STAGING_TABLE)
+    columns = ', '.join(quote(field) for field in STAGING_FIELDS)
+
+    with connection.cursor() as cursor:
+        cursor.execute(f'DROP TEMPORARY TABLE IF EXISTS {staging_table}')
+        cursor.execute(f'CREATE TEMPORARY TABLE {staging_table} SELECT {columns} FROM {table} WHERE 1 = 0')
+        try:
+            start_time = time.perf_counter()
+            cursor.execute(
+                f"LOAD DATA LOCAL INFILE %s INTO TABLE {staging_table} CHARACTER SET utf8mb4 "
+                f"FIELDS TERMINATED BY '\\t' LINES TERMINATED BY '\\n' ({columns})",
+                [path]
+            )
+            loaded = cursor.rowcount
+            load_seconds = time.perf_counter() - start_time
+            # Con LOCAL, MySQL convierte los errores en advertencias: si no cargó
+            # todas las filas, o alguna con valores truncados, no se toca la tabla de siniestros
+            if loaded != staged_rows:
+                raise DataError(f'LOAD DATA cargó {loaded} de {staged_rows} filas; no se insertó nada')
+            _raise_on_warnings(cursor, 'LOAD DATA')
+
+            start_time = time.perf_counter()
+            with transaction.atomic():
+                inserted = _insert_from_staging(cursor, staging_table)
+                _raise_on_warnings(cursor, 'El INSERT desde staging')
+            insert_seconds = time.perf_counter() - start_time
+        finally:
+            cursor.execute(f'DROP TEMPORARY TABLE IF EXISTS {staging_table}')
+    return {'records_created': inserted, 'records_duplicates': loaded - inserted, 'load_seconds': load_seconds, 'insert_seconds': insert_seconds,
+            'batches': 1, 'bisected_batches': 0, 'batch_size': None}
+
+
+def _read_staging_batches(path, rows_per_batch):
+    with open(path, newline='', encoding='utf-8') as staging:
+        batch = []
+        for values in csv.reader(staging, delimiter='\t'):
+            batch.append(
+                tuple(int(value) for value in values[:len(INTEGER_FIELDS)])
+                + tuple(date.fromisoformat(value) for value in values[len(INTEGER_FIELDS):-1])
+                + (values[-1],)
+            )
+            if len(batch) >= rows_per_batch:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+
+def _bulk_create_staging(path, batch_size=None):
+    """Inserta el archivo de staging con bulk_create en una transacción (fallback sin LOAD DATA)."""
+    batch_size = batch_size or get_bulk_batch_size()
+    result = {'records_created': 0, 'records_duplicates': 0, 'records_errors': 0, 'error_details': [],
+              'batches': 0, 'bisected_batches': 0, 'load_seconds': 0.0, 'batch_size': batch_size}
+    start_time = time.perf_counter()
+    with transaction.atomic():
+        # Se leen varios lotes por vez para no tener el archivo completo en memoria
+        offset = 0
+        for rows in _read_staging_batches(path, batch_size * 10):
+            inserted = bulk_insert_siniestros(STAGING_FIELDS, rows, batch_size=batch_size)
+            for key in ('records_created', 'records_duplicates', 'records_errors', 'batches', 'bisected_batches'):
+                result[key] += inserted[key]
+            for detail in inserted['error_details']:
+                detail['row'] += offset
+            result['error_details'].extend(inserted['error_details'])
+            offset += len(rows)
+    result['insert_seconds'] = time.perf_counter() - start_time
+    return result
+
+
+def load_csv_native(file_obj, default_date, ingreso_date=None, validate=True, method='auto', chunk_size=None,
+                    batch_size=None, keep_staging=False, progress_callback=None):
+    """
+    Carga un CSV completo a través de un archivo de staging.
+
+    Args:
+        file_obj: Archivo CSV (binario; admite gzip y zstd)
+        default_date (date): Fecha para FECHA_SINIESTRO vacía
+        ingreso_date (date, optional): FECHA_INGRESO (por defecto hoy)
+        validate (bool): Rechazar el archivo completo si trae nulos o valores inválidos
+        method (str): 'auto' (LOAD DATA en MySQL, bulk_create en otros motores),
+            'load_data' o 'bulk_create'
+        chunk_size (int, optional): Filas por bloque al parsear (por defecto UPLOAD_CHUNK_ROWS)
+        batch_size (int, optional): Filas por INSERT en el fallback (por defecto UPLOAD_BULK_BATCH_SIZE)
+        keep_staging (bool): Conservar el archivo de staging (se informa su ruta)
+        progress_callback (callable, optional): Recibe las filas procesadas
+
+    Returns:
+        dict: Totales (records_created, records_duplicates, records_errors, error_details, dates_fixed,
+        total_rows, chunks), method, encoding, compression y tiempos por etapa
+
+    Raises:
+        CsvUploadError: Si el archivo no se puede leer o no pasa la validación
+        ValueError: Si el método de carga no es válido para el motor actual
+        DatabaseError: Si LOAD DATA falla con method='load_data'
+    """
+    requested_method = method or 'auto'
+    method = resolve_load_method(requested_method)
+    chunk_size = chunk_size or get_upload_chunk_rows()
+    staging_dir = getattr(settings, 'NATIVE_LOAD_STAGING_DIR', None) or tempfile.gettempdir()
+    os.makedirs(staging_dir, exist_ok=True)
+    descriptor, path = tempfile.mkstemp(prefix='siniestros_', suffix='.tsv', dir=staging_dir)
+    os.close(descriptor)
+
+    start_time = time.perf_counter()
+    fallback_reason = None
+    try:
+        staged = write_staging_file(file_obj, path, default_date, ingreso_date, validate, chunk_size,
+                                    progress_callback)
+        staging_seconds = time.perf_counter() - start_time
+        if staged['total_rows'] == 0:
+            raise CsvUploadError('El archivo CSV está vacío')
+
+        loaded = None
+        if method == 'load_data':
+            try:
+                loaded = _load_data_infile(path, staged['staged_rows'])
+            except DatabaseError as e:
+                # Con 'auto' se recurre a bulk_create (p. ej. local_infile deshabilitado)
+                if requested_method != 'auto':
+                    raise
+                fallback_reason = str(e)
+                print(f"LOAD DATA no disponible ({e}); se usa bulk_create")
+                method = 'bulk_create'
+        if loaded is None:
+            loaded = _bulk_create_staging(path, batch_size)
+    finally:
+        if not keep_staging and os.path.exists(path):
+            os.remove(path)
+    seconds = time.perf_counter() - start_time
+
+    result = {
+        'records_created': loaded['records_created'],
+        'records_duplicates': loaded['records_duplicates'],
+        'records_errors': staged['records_errors'] + loaded.get('records_errors', 0),
+        'error_details': (staged['error_details'] + loaded.get('error_details', []))[
+            :getattr(settings, 'UPLOAD_MAX_ERROR_DETAILS', 50)],
+        'dates_fixed': staged['dates_fixed'],
+        'total_rows': staged['total_rows'],
+        'method': method,
+        'fallback_reason': fallback_reason,
+        'encoding': staged['encoding'],
+        'compression': staged['compression'],
+        'chunk_size': chunk_size,
+        'chunks': staged['chunks'],
+        'batch_size': loaded['batch_size'],
+        'batches': loaded['batches'],
+        'bisected_batches': loaded['bisected_batches'],
+        'staging_seconds': round(staging_seconds, 3),
+        'load_seconds': round(loaded['load_seconds'], 3),
+        'insert_seconds': round(loaded['insert_seconds'], 3),
+        'seconds': round(seconds, 3),
+        'rows_per_second': round(staged['total_rows'] / seconds, 1) if seconds > 0 else None,
+        'staging_file': path if keep_staging else None
+    }
+    return result
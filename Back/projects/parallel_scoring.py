@@ -0,0 +1,173 @@
+"""
+Evaluación en paralelo de lotes grandes con un pool de procesos.
+
+Cada proceso del pool carga el modelo una sola vez (desde su propio
+registro de modelos) al iniciar, de modo que las tareas solo transportan
+el bloque de filas a evaluar y no el modelo serializado. El pool se
+mantiene vivo entre peticiones y se recrea cuando cambia la versión del
+modelo; el pool anterior se cierra cuando terminan las peticiones que lo
+estaban usando.
+
+Cada tarea lleva la versión del modelo del proceso principal (cache_key).
+Un proceso con otra versión recarga el modelo; si aun así no coincide (el
+storage ya tiene una más nueva que el proceso principal), el bloque se
+evalúa en el proceso principal para que todo el lote use la misma versión.
+"""
+
+import threading
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from django.conf import settings
+
+# Predictor cargado en cada proceso del pool y el archivo de su modelo
+_worker_predictor = None
+_worker_model_filename = None
+
+
+def _init_worker(model_filename):
+    """Inicializa un proceso del pool cargando el modelo una sola vez."""
+    global _worker_predictor, _worker_model_filename
+    from django.apps import apps
+    if not apps.ready:
+        import django
+        django.setup()
+    from .model_registry import get_model_registry
+    _worker_model_filename = model_filename
+    _worker_predictor = get_model_registry().get_predictor(model_filename)
+
+
+def _score_shard(shard, cache_key):
+    """Evalúa un bloque de filas en un proceso del pool.
+
+    Args:
+        shard (np.ndarray): Filas a evaluar.
+        cache_key (tuple): Versión del modelo del proceso principal.
+
+    Returns:
+        tuple: (versión del modelo usada, probabilidades)
+    """
+    global _worker_predictor
+    if cache_key is not None and getattr(_worker_predictor, 'cache_key', None) != cache_key:
+        # El modelo cambió desde que se cargó en este proceso
+        from .model_registry import get_model_registry
+        registry = get_model_registry()
+        registry.invalidate(_worker_model_filename)
+        _worker_predictor = registry.get_predictor(_worker_model_filename)
+    return getattr(_worker_predictor, 'cache_key', None), _worker_predictor.predict_proba(shard)
+
+
+class ParallelPredictor:
+    """Predictor que reparte los lotes grandes entre varios procesos.
+
+    Por debajo de ``min_rows`` filas (o con menos de dos workers) evalúa en el
+    proceso actual con el predictor original.
+    """
+
+    def __init__(self, predictor, model_filename, workers=None, min_rows=None):
+        self.predictor = predictor
+        self.model_filename = model_filename
+        self.cache_key = getattr(predictor, 'cache_key', None)
+        if workers is None:
+            workers = getattr(settings, 'PREDICTION_WORKERS', 0)
+        if min_rows is None:
+            min_rows = getattr(settings, 'PARALLEL_SCORING_MIN_ROWS', 200000)
+        self.workers = int(workers)
+        self.min_rows = int(min_rows)
+
+    @property
+    def engine(self):
+        return getattr(self.predictor, 'engine', 'sklearn')
+
+    def predict_proba(self, X):
+        """Calcula las probabilidades por clase, en paralelo si el lote es grande.
+
+        Args:
+            X (pd.DataFrame | np.ndarray): Datos de entrada.
+
+        Returns:
+            np.ndarray: Matriz (n_filas, n_clases) de probabilidades.
+        """
+        if self.workers < 2 or len(X) < self.min_rows:
+            return self.predictor.predict_proba(X)
+
+        if isinstance(X, pd.DataFrame):
+            X = X.to_numpy(dtype=np.float32)
+        else:
+            X = np.asarray(X, dtype=np.float32)
+
+        shards = np.array_split(X, self.workers)
+        pool = _acquire_pool(self.model_filename, self.cache_key, self.workers)
+        try:
+            # map conserva el orden de los bloques al reensamblar
+            results = list(pool.map(_score_shard, shards, [self.cache_key] * len(shards)))
+        finally:
+            _release_pool(pool)
+
+        blocks = []
+        for shard, (worker_key, probabilities) in zip(shards, results):
+            if self.cache_key is not None and worker_key != self.cache_key:
+                probabilities = self.predictor.predict_proba(shard)
+            blocks.append(probabilities)
+        return np.concatenate(blocks)
+
+
+_pool = None
+_pool_key = None
+_pool_lock = threading.Lock()
+# Peticiones en curso por pool, y pools reemplazados que esperan a quedar libres
+_pool_users = {}
+_retired_pools = set()
+
+
+def _acquire_pool(model_filename, cache_key, workers):
+    """Retorna el pool de procesos para la versión actual del modelo y registra su uso.
+
+    Cada llamada debe terminar con _release_pool.
+    """
+    global _pool, _pool_key
+    key = (model_filename, cache_key, workers)
+    with _pool_lock:
+        if _pool is None or _pool_key != key:
+            if _pool is not None:
+                _retired_pools.add(_pool)
+                _shutdown_if_unused(_pool)
+            _pool = ProcessPoolExecutor(
+                max_workers=workers,
+                initializer=_init_worker,
+                initargs=(model_filename,)
+            )
+            _pool_key = key
+            _pool_users[_pool] = 0
+            print(f"Pool de predicción iniciado con {workers} procesos para '{model_filename}'")
+        _pool_users[_pool] += 1
+        return _pool
+
+
+def _release_pool(pool):
+    """Libera el uso de un pool; cierra los pools reemplazados que quedan sin uso."""
+    with _pool_lock:
+        _pool_users[pool] -= 1
+        _shutdown_if_unused(pool)
+
+
+def _shutdown_if_unused(pool):
+    # Se llama con _pool_lock tomado
+    if pool in _retired_pools and _pool_users[pool] == 0:
+        _retired_pools.discard(pool)
+        del _pool_users[pool]
+        pool.shutdown(wait=False)
+
+
+def get_parallel_predictor(predictor, model_filename='modelo_accidentes.pkl'):
+    """
+    Envuelve un predictor para evaluar lotes grandes en paralelo.
+
+    Args:
+        predictor (ModelPredictor): Predictor del modelo.
+        model_filename (str): Archivo del modelo que cargará cada proceso.
+
+    Returns:
+        ParallelPredictor
+    """
+    return ParallelPredictor(predictor, model_filename)
@@ -0,0 +1,207 @@
+"""
+Caché LRU de predicciones para el espacio de características categóricas.
+
+Los 18 campos de entrenamiento son códigos enteros pequeños, así que cada
+combinación se empaqueta en un único entero de 64 bits (un bloque de bits
+por campo) que sirve de llave. Las probabilidades quedan asociadas a la
+versión del modelo y se descartan cuando ésta cambia o se guarda un modelo
+nuevo.
+"""
+
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from .models import Siniestro
+
+# Bits reservados por campo: el rango observado más un margen de crecimiento.
+# La suma no debe superar 64 para que la llave quepa en un uint64.
+FIELD_BITS = {
+    'HORA_SINIESTRO': 5,                 # 0-23
+    'CLASE_SINIESTRO': 4,                # 0-9
+    'CANTIDAD_DE_VEHICULOS_DANADOS': 4,  # 1-4
+    'DISTRITO': 8,                       # 0-76
+    'ZONA': 2,
+    'TIPO_DE_VIA': 4,
+    'RED_VIAL': 3,
+    'EXISTE_CICLOVIA': 2,
+    'CONDICION_CLIMATICA': 3,
+    'ZONIFICACION': 3,
+    'CARACTERISTICAS_DE_VIA': 4,
+    'PERFIL_LONGITUDINAL_VIA': 2,
+    'SUPERFICIE_DE_CALZADA': 3,
+    'SENALIZACION': 2,
+    'DIA_DE_LA_SEMANA': 3,
+    'MES': 4,                            # 1-12
+    'PERIODO_DEL_DIA': 3,
+    'FERIADO': 2,
+}
+
+
+class FeatureKeyPacker:
+    """Empaqueta filas de códigos enteros en llaves uint64 de forma vectorizada."""
+
+    def __init__(self, fields=None, bits=None):
+        self.fields = list(fields or Siniestro.TRAINING_FIELDS)
+        bits = bits or FIELD_BITS
+        widths = np.array([bits[field] for field in self.fields], dtype=np.int64)
+        if widths.sum() > 64:
+            raise ValueError(f"La llave requiere {widths.sum()} bits; el máximo es 64")
+        self.shifts = np.concatenate([[0], np.cumsum(widths)[:-1]]).astype(np.uint64)
+        self.limits = np.left_shift(1, widths)
+
+    def pack(self, X):
+        """Calcula la llave de cada fila.
+
+        Args:
+            X (np.ndarray): Matriz (n_filas, n_campos) en el orden de ``fields``.
+
+        Returns:
+            tuple: (llaves uint64, máscara de filas empaquetables). Las filas con
+            valores no enteros, negativos o fuera de su bloque de bits no se
+            pueden empaquetar y deben evaluarse sin caché.
+        """
+        X = np.asarray(X)
+        if X.dtype.kind in 'iub':
+            values = X.astype(np.int64)
+            packable = np.ones(len(X), dtype=bool)
+        else:
+            try:
+                floats = X.astype(np.float64)
+            except (TypeError, ValueError):
+                return np.zeros(len(X), dtype=np.uint64), np.zeros(len(X), dtype=bool)
+            packable = np.all(np.isfinite(floats) & (floats == np.floor(floats)), axis=1)
+            values = np.where(np.isfinite(floats), floats, -1).astype(np.int64)
+        packable &= np.all((values >= 0) & (values < self.limits), axis=1)
+        values = np.where(packable[:, None], values, 0).astype(np.uint64)
+        keys = np.bitwise_or.reduce(values << self.shifts, axis=1)
+        return keys, packable
+
+
+class PredictionCache:
+    """LRU acotado de probabilidades de la clase positiva, por versión de modelo."""
+
+    def __init__(self, maxsize=None, packer=None):
+        if maxsize is None:
+            maxsize = getattr(settings, 'PREDICTION_CACHE_SIZE', 100000)
+        self.maxsize = int(maxsize)
+        self.packer = packer or FeatureKeyPacker()
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.model_key = None
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+
+    def clear(self):
+        """Vacía la caché (por ejemplo, al guardar un modelo nuevo)."""
+        with self._lock:
+            self._data.clear()
+            self.model_key = None
+
+    def _to_matrix(self, X):
+        if isinstance(X, pd.DataFrame):
+            return X[self.packer.fields].to_numpy()
+        return np.asarray(X)
+
+    def predict_proba(self, predictor, X):
+        """Retorna la probabilidad de la clase positiva usando la caché.
+
+        Las filas repetidas dentro del lote se evalúan una sola vez y todas las
+        filas pendientes se resuelven en una única llamada al predictor.
+
+        Args:
+            predictor (ModelPredictor): Predictor del modelo; su ``cache_key``
+                identifica el archivo y la versión del modelo.
+            X (pd.DataFrame | np.ndarray): Datos en el orden de TRAINING_FIELDS.
+
+        Returns:
+            np.ndarray: Probabilidades de la clase positiva.
+        """
+        model_key = getattr(predictor, 'cache_key', None)
+        if self.maxsize <= 0 or model_key is None or len(X) == 0:
+            return predictor.predict_proba(X)[:, 1]
+
+        keys, packable = self.packer.pack(self._to_matrix(X))
+        packable_rows = np.flatnonzero(packable)
+        unique_keys, first_rows, inverse = np.unique(
+            keys[packable_rows], return_index=True, return_inverse=True
+        )
+
+        unique_values = np.empty(len(unique_keys), dtype=np.float64)
+        missing = []
+        with self._lock:
+            if model_key != self.model_key:
+                self._data.clear()
+                self.model_key = model_key
+            for i, key in enumerate(unique_keys.tolist()):
+                value = self._data.get(key)
+                if value is None:
+                    missing.append(i)
+                else:
+                    self._data.move_to_end(key)
+                    unique_values[i] = value
+
+        missing = np.asarray(missing, dtype=np.intp)
+        unpackable_rows = np.flatnonzero(~packable)
+        rows_to_score = np.concatenate([packable_rows[first_rows[missing]], unpackable_rows])
+
+        probabilities = np.empty(len(X), dtype=np.float64)
+        if len(rows_to_score):
+            subset = X.iloc[rows_to_score] if isinstance(X, pd.DataFrame) else X[rows_to_score]
+            scored = predictor.predict_proba(subset)[:, 1]
+            unique_values[missing] = scored[:len(missing)]
+            probabilities[unpackable_rows] = scored[len(missing):]
+
+            with self._lock:
+                if model_key == self.model_key:
+                    for key, value in zip(unique_keys[missing].tolist(), scored[:len(missing)].tolist()):
+                        self._data[key] = value
+                    while len(self._data) > self.maxsize:
+                        self._data.popitem(last=False)
+
+        probabilities[packable_rows] = unique_values[inverse]
+
+        # Contadores por fila: acierto si su combinación ya estaba en caché
+        missing_rows = int(np.isin(inverse, missing).sum()) if len(missing) else 0
+        with self._lock:
+            self.misses += missing_rows
+            self.hits += len(packable_rows) - missing_rows
+            self.bypassed += len(unpackable_rows)
+        return probabilities
+
+    def get_stats(self):
+        """Retorna los contadores de uso de la caché.
+
+        Returns:
+            dict: Aciertos, fallos, filas sin caché y ocupación.
+        """
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'bypassed': self.bypassed,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+            'size': len(self._data),
+            'maxsize': self.maxsize
+        }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_prediction_cache():
+    """
+    Retorna la caché de predicciones del proceso.
+
+    Returns:
+        PredictionCache
+    """
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = PredictionCache()
+    return _cache
@@ -0,0 +1,162 @@
+"""
+Utilidades para construir los resultados de las predicciones.
+"""
+
+import numpy as np
+
+# Umbrales de probabilidad para los niveles de riesgo
+HIGH_RISK_THRESHOLD = 0.7
+MEDIUM_RISK_THRESHOLD = 0.3
+
+RISK_HIGH = 'Alto'
+RISK_MEDIUM = 'Medio'
+RISK_LOW = 'Bajo'
+
+
+def risk_levels(probabilities):
+    """
+    Calcula el nivel de riesgo de cada probabilidad.
+
+    Args:
+        probabilities (np.ndarray): Probabilidades de accidente
+
+    Returns:
+        np.ndarray: Niveles de riesgo ('Alto', 'Medio' o 'Bajo')
+    """
+    probabilities = np.asarray(probabilities)
+    return np.select(
+        [probabilities > HIGH_RISK_THRESHOLD, probabilities > MEDIUM_RISK_THRESHOLD],
+        [RISK_HIGH, RISK_MEDIUM],
+        default=RISK_LOW
+    )
+
+
+class BatchSummary:
+    """Acumula las estadísticas de un lote de predicciones bloque a bloque."""
+
+    def __init__(self):
+        self.total = 0
+        self.accidents = 0
+        self.high_risk = 0
+        self.medium_risk = 0
+        self.low_risk = 0
+        self.invalid_rows = 0
+        self.probability_sum = 0.0
+        self.min_probability = None
+        self.max_probability = None
+
+    def update(self, probabilities, predictions):
+        """
+        Incorpora un bloque de resultados.
+
+        Args:
+            probabilities (np.ndarray): Probabilidades del bloque
+            predictions (np.ndarray): Predicciones (0/1) del bloque
+        """
+        if len(probabilities) == 0:
+            return
+        self.total += len(probabilities)
+        self.accidents += int(np.count_nonzero(predictions))
+        high = int(np.count_nonzero(probabilities > HIGH_RISK_THRESHOLD))
+        medium_or_high = int(np.count_nonzero(probabilities > MEDIUM_RISK_THRESHOLD))
+        self.high_risk += high
+        self.medium_risk += medium_or_high - high
+        self.low_risk += len(probabilities) - medium_or_high
+        self.probability_sum += float(np.sum(probabilities))
+        chunk_min = float(np.min(probabilities))
+        chunk_max = float(np.max(probabilities))
+        self.min_probability = chunk_min if self.min_probability is None else min(self.min_probability, chunk_min)
+        self.max_probability = chunk_max if self.max_probability is None else max(self.max_probability, chunk_max)
+
+    def to_dict(self):
+        """
+        Retorna el resumen con las mismas llaves que la respuesta JSON de batch_predict.
+
+        Returns:
+            dict: Resumen del lote
+        """
+        return {
+            'total_predictions': self.total,
+            'accidents_predicted': self.accidents,
+            'no_accidents_predicted': self.total - self.accidents,
+            'high_risk': self.high_risk,
+            'medium_risk': self.medium_risk,
+            'low_risk': self.low_risk,
+            'average_probability': self.probability_sum / self.total if self.total else None,
+            'max_probability': self.max_probability,
+            'min_probability': self.min_probability
+        }
+
+
+def summarize_predictions(probabilities, predictions):
+    """
+    Calcula el resumen de un lote completo con conteos vectorizados.
+
+    Args:
+        probabilities (np.ndarray): Probabilidades de accidente
+        predictions (np.ndarray): Predicciones (0/1)
+
+    Returns:
+        dict: Resumen del lote
+    """
+    summary = BatchSummary()
+    summary.update(np.asarray(probabilities), np.asarray(predictions))
+    return summary.to_dict()
+
+
+def build_prediction_columns(input_df, probabilities, threshold, index_key='index'):
+    """
+    Construye los resultados en formato columnar (una lista por columna).
+
+    Args:
+        input_df (pd.DataFrame): Datos de entrada con los campos de entrenamiento
+        probabilities (np.ndarray): Probabilidades de accidente
+        threshold (float): Umbral de probabilidad para clasificación
+        index_key (str): Nombre de la columna con el índice de cada fila
+
+    Returns:
+        tuple: (columnas de resultados, predicciones como np.ndarray)
+    """
+    probabilities = np.asarray(probabilities, dtype=np.float64)
+    predictions = (probabilities >= threshold).astype(int)
+    columns = {
+        index_key: input_df.index.tolist(),
+        'input_data': {field: input_df[field].tolist() for field in input_df.columns},
+        'prediction': predictions.tolist(),
+        'probability': probabilities.tolist(),
+        'risk_level': risk_levels(probabilities).tolist(),
+        'accident_likely': predictions.astype(bool).tolist()
+    }
+    return columns, predictions
+
+
+def rows_from_columns(columns, index_key='index'):
+    """
+    Convierte los resultados columnares en la lista de objetos por fila.
+
+    Args:
+        columns (dict): Resultado de build_prediction_columns
+        index_key (str): Nombre de la columna con el índice de cada fila
+
+    Returns:
+        list: Un diccionario por fila
+    """
+    fields = list(columns['input_data'].keys())
+    return [
+        {
+            index_key: index,
+            'input_data': dict(zip(fields, values)),
+            'prediction': prediction,
+            'probability': probability,
+            'risk_level': level,
+            'accident_likely': likely
+        }
+        for index, values, prediction, probability, level, likely in zip(
+            columns[index_key],
+            zip(*columns['input_data'].values()),
+            columns['prediction'],
+            columns['probability'],
+            columns['risk_level'],
+            columns['accident_likely']
+        )
+    ]
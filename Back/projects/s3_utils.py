@@ -6,6 +6,8 @@ import os
 from botocore.exceptions import ClientError, NoCredentialsError
 from django.conf import settings
 import tempfile
+import hashlib
+from .model_artifacts import dump_artifact, load_artifact, as_sklearn_model
 
 """
 Utilidades para el manejo de archivos en S3 para modelos de ML.
@@ -57,9 +59,9 @@ class S3ModelStorage:
             str: Ruta S3 del modelo guardado
         """
         try:
-            # Serializar modelo en memoria
+            # Serializar modelo en memoria (comprimido solo para la transferencia)
             buffer = io.BytesIO()
-            joblib.dump(model, buffer)
+            artifact_format = dump_artifact(model, buffer, compress=getattr(settings, 'MODEL_ARTIFACT_COMPRESS', 3))
             buffer.seek(0)
             
             # Construir key S3
@@ -74,7 +76,7 @@ class S3ModelStorage:
             )
             
             s3_path = f"s3://{self.bucket_name}/{s3_key}"
-            print(f"Modelo guardado en S3: {s3_path}")
+            print(f"Modelo guardado en S3 ({artifact_format}): {s3_path}")
             
             return s3_path
             
@@ -100,8 +102,8 @@ class S3ModelStorage:
             self.s3_client.download_fileobj(self.bucket_name, s3_key, buffer)
             buffer.seek(0)
             
-            # Cargar modelo
-            model = joblib.load(buffer)
+            # Cargar modelo (el artefacto compacto se reconstruye como modelo de sklearn)
+            model = as_sklearn_model(load_artifact(buffer))
             
             print(f"Modelo cargado desde S3: s3://{self.bucket_name}/{s3_key}")
             return model
@@ -114,6 +116,51 @@ class S3ModelStorage:
         except Exception as e:
             raise Exception(f"Error al procesar modelo desde S3: {str(e)}")
     
+    def load_serving_model(self, filename='modelo_accidentes.pkl'):
+        """
+        Carga un modelo para servir predicciones.
+        
+        El artefacto se descarga una sola vez por versión (ETag) a
+        MODEL_CACHE_DIR, sin comprimir, y se abre con mmap: los workers del
+        mismo host comparten el archivo y sus páginas.
+        
+        Args:
+            filename (str): Nombre del archivo
+            
+        Returns:
+            CompactModelArtifact o modelo de sklearn
+        """
+        version = self.get_model_version(filename)
+        if version is None:
+            raise FileNotFoundError(f"Modelo no encontrado en S3: {filename}")
+        
+        cache_dir = getattr(settings, 'MODEL_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'bohlin_model_cache'))
+        os.makedirs(cache_dir, exist_ok=True)
+        s3_key = f"{self.prefix}{filename}"
+        digest = hashlib.sha1(f"{self.bucket_name}/{s3_key}/{version}".encode('utf-8')).hexdigest()[:16]
+        cache_path = os.path.join(cache_dir, f"{digest}_{filename}")
+        
+        if not os.path.exists(cache_path):
+            buffer = io.BytesIO()
+            self.s3_client.download_fileobj(self.bucket_name, s3_key, buffer)
+            buffer.seek(0)
+            
+            # Se reescribe sin comprimir para poder mapearlo
+            tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+            joblib.dump(joblib.load(buffer), tmp_path)
+            os.replace(tmp_path, cache_path)
+            
+            # Descartar versiones anteriores del mismo modelo
+            for name in os.listdir(cache_dir):
+                if name.endswith(f"_{filename}") and name != os.path.basename(cache_path):
+                    try:
+                        os.remove(os.path.join(cache_dir, name))
+                    except OSError:
+                        pass
+            print(f"Modelo descargado desde S3 a la caché local: {cache_path}")
+        
+        return load_artifact(cache_path, mmap=True)
+    
     def save_metrics(self, metrics_dict, filename='metricas_modelo.json'):
         """
         Guarda métricas en S3.
@@ -214,6 +261,23 @@ class S3ModelStorage:
         except ClientError:
             return False
     
+    def get_model_version(self, filename='modelo_accidentes.pkl'):
+        """
+        Obtiene la versión de un modelo en S3 sin descargarlo.
+        
+        Args:
+            filename (str): Nombre del archivo
+            
+        Returns:
+            str: ETag del objeto, o None si no existe
+        """
+        try:
+            s3_key = f"{self.prefix}{filename}"
+            response = self.s3_client.head_object(Bucket=self.bucket_name, Key=s3_key)
+            return response['ETag']
+        except ClientError:
+            return None
+    
     def get_model_info(self, filename='modelo_accidentes.pkl'):
         """
         Obtiene información de un modelo en S3.
@@ -267,14 +331,25 @@ class LocalModelStorage:
     
     def save_model(self, model, filename='modelo_accidentes.pkl'):
         model_path = os.path.join(self.output_dir, filename)
-        joblib.dump(model, model_path)
+        # Archivo nuevo + rename: los workers que tienen mapeada la versión
+        # anterior la siguen leyendo intacta
+        tmp_path = f"{model_path}.{os.getpid()}.tmp"
+        dump_artifact(model, tmp_path)
+        os.replace(tmp_path, model_path)
         return model_path
     
     def load_model(self, filename='modelo_accidentes.pkl'):
         model_path = os.path.join(self.output_dir, filename)
         if not os.path.exists(model_path):
             raise FileNotFoundError(f"Modelo no encontrado: {model_path}")
-        return joblib.load(model_path)
+        return as_sklearn_model(load_artifact(model_path))
+    
+    def load_serving_model(self, filename='modelo_accidentes.pkl'):
+        model_path = os.path.join(self.output_dir, filename)
+        if not os.path.exists(model_path):
+            raise FileNotFoundError(f"Modelo no encontrado: {model_path}")
+        # Los arreglos del artefacto compacto se mapean y se comparten entre workers
+        return load_artifact(model_path, mmap=True)
     
     def save_metrics(self, metrics_dict, filename='metricas_modelo.json'):
         metrics_path = os.path.join(self.output_dir, filename)
@@ -297,6 +372,14 @@ class LocalModelStorage:
         metrics_path = os.path.join(self.output_dir, filename)
         return os.path.exists(metrics_path)
     
+    def get_model_version(self, filename='modelo_accidentes.pkl'):
+        model_path = os.path.join(self.output_dir, filename)
+        try:
+            stat = os.stat(model_path)
+        except FileNotFoundError:
+            return None
+        return f"{stat.st_mtime_ns}-{stat.st_size}"
+    
     def get_model_info(self, filename='modelo_accidentes.pkl'):
         model_path = os.path.join(self.output_dir, filename)
         if os.path.exists(model_path):
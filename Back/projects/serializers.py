@@ -6,4 +6,16 @@ class SiniestroSerializer(serializers.ModelSerializer):
         model = Siniestro
         fields = '__all__'  # Serialize all fields of the Siniestro model
         read_only_fields = ['id', 'fecha_ingreso']  # Make 'id' and 'fecha_ingreso' read-only
-        
\ No newline at end of file
+        
+    def validate(self, attrs):
+        """Rechaza un siniestro idéntico a uno existente (misma huella)."""
+        values = {field: getattr(self.instance, field) for field in Siniestro.FINGERPRINT_FIELDS} if self.instance else {}
+        values.update(attrs)
+        if all(field in values for field in Siniestro.FINGERPRINT_FIELDS):
+            fingerprint = Siniestro.compute_fingerprint(values[field] for field in Siniestro.FINGERPRINT_FIELDS)
+            duplicates = Siniestro.objects.filter(FINGERPRINT=fingerprint)
+            if self.instance:
+                duplicates = duplicates.exclude(pk=self.instance.pk)
+            if duplicates.exists():
+                raise serializers.ValidationError('Ya existe un siniestro con los mismos valores')
+        return attrs
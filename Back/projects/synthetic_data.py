@@ -0,0 +1,359 @@
+"""
+Generador de datos sintéticos de siniestros.
+
+El único conjunto real (``Requisitos/df_modelo_normalizado_v2.csv``) tiene
+unas 2.400 filas. Para medir el entrenamiento y la ingesta a 1M o 10M filas
+se ajusta sobre él un modelo de las distribuciones de códigos:
+
+- Se muestrea primero ACCIDENTE y luego cada columna condicionada a
+  ACCIDENTE y a una columna padre (naive Bayes aumentado con un árbol). El
+  árbol es el de máxima información mutua entre pares de columnas dado el
+  objetivo (Chow-Liu condicional), así se conservan tanto la señal que el
+  modelo aprende como las relaciones fuertes entre columnas (HORA_SINIESTRO
+  y PERIODO_DEL_DIA, ZONIFICACION y ZONA, etc.).
+- Cada tabla condicional se suaviza con ``smoothing`` pseudo-conteos
+  repartidos según la distribución de la columna dado el objetivo, para que
+  a gran escala aparezcan también combinaciones no vistas en la muestra.
+- FECHA_SINIESTRO se construye con un año observado, el MES y el
+  DIA_DE_LA_SEMANA muestreados (en los datos reales coinciden siempre).
+
+La generación es por bloques, de modo que se pueden emitir datasets de
+cualquier tamaño con memoria acotada.
+"""
+
+import os
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from .models import Siniestro
+from .bulk_ingestion import ingest_dataframe
+
+DATE_FIELD = 'FECHA_SINIESTRO'
+INGRESO_FIELD = 'FECHA_INGRESO'
+
+# Columnas de códigos que modela el generador (entrada del modelo y objetivo)
+CODE_FIELDS = Siniestro.TRAINING_FIELDS + [Siniestro.TARGET_FIELD]
+
+
+def get_source_csv():
+    return getattr(
+        settings, 'SYNTHETIC_SOURCE_CSV',
+        os.path.join(os.path.dirname(str(settings.BASE_DIR)), 'Requisitos', 'df_modelo_normalizado_v2.csv')
+    )
+
+
+def _mutual_information(a, b, n_a, n_b):
+    """Información mutua (nats) entre dos columnas de índices de categoría."""
+    joint = np.bincount(a * n_b + b, minlength=n_a * n_b).reshape(n_a, n_b).astype(np.float64)
+    joint /= joint.sum()
+    outer = joint.sum(axis=1, keepdims=True) * joint.sum(axis=0, keepdims=True)
+    nonzero = joint > 0
+    return float((joint[nonzero] * np.log(joint[nonzero] / outer[nonzero])).sum())
+
+
+class SyntheticSiniestroGenerator:
+    """Modelo de las distribuciones de códigos de la tabla de siniestros."""
+
+    def __init__(self, smoothing=1.0):
+        """
+        Args:
+            smoothing (float): Pseudo-conteos que se agregan a cada tabla condicional
+        """
+        self.smoothing = float(smoothing)
+        self.fields = list(CODE_FIELDS)
+        self.values = {}
+        self.parents = {}
+        self.order = []
+        self.marginals = {}
+        self.conditionals = {}
+        self.edges = []
+        self.target_information = {}
+        self.years = None
+        self.year_probs = None
+        self.date_null_rate = {}
+        self.source_rows = 0
+
+    @classmethod
+    def from_csv(cls, path=None, smoothing=1.0):
+        """
+        Ajusta el generador sobre un CSV con las columnas de Siniestro.
+
+        Args:
+            path (str, optional): Ruta del CSV (por defecto SYNTHETIC_SOURCE_CSV)
+            smoothing (float): Pseudo-conteos por tabla condicional
+
+        Returns:
+            SyntheticSiniestroGenerator
+        """
+        df = pd.read_csv(path or get_source_csv())
+        df.columns = df.columns.str.strip()
+        return cls(smoothing=smoothing).fit(df)
+
+    def fit(self, df):
+        """
+        Ajusta marginales, árbol de dependencias y tablas condicionales.
+
+        Args:
+            df (pd.DataFrame): Datos reales con CODE_FIELDS y, opcionalmente, FECHA_SINIESTRO
+
+        Returns:
+            self
+        """
+        missing = [field for field in self.fields if field not in df.columns]
+        if missing:
+            raise ValueError(f"Faltan columnas para ajustar el generador: {missing}")
+
+        codes = df[self.fields].dropna().astype(np.int64)
+        if codes.empty:
+            raise ValueError("No hay filas completas para ajustar el generador")
+        self.source_rows = len(codes)
+
+        indices = {}
+        for field in self.fields:
+            values, index = np.unique(codes[field].values, return_inverse=True)
+            self.values[field] = values
+            indices[field] = index
+            self.marginals[field] = np.bincount(index, minlength=len(values)) / len(index)
+
+        self._fit_tree(indices)
+        self._fit_conditionals(indices)
+        self._fit_dates(df, codes.index)
+        return self
+
+    def _fit_tree(self, indices):
+        """Árbol de expansión máxima (Prim) de información mutua condicionada al objetivo."""
+        target = Siniestro.TARGET_FIELD
+        features = [field for field in self.fields if field != target]
+        target_index = indices[target]
+        n_target = len(self.values[target])
+        target_probs = self.marginals[target]
+
+        self.target_information = {
+            field: round(_mutual_information(indices[field], target_index, len(self.values[field]), n_target), 4)
+            for field in features
+        }
+
+        n = len(features)
+        weights = np.zeros((n, n))
+        for i in range(n):
+            for j in range(i + 1, n):
+                a, b = features[i], features[j]
+                # I(A; B | objetivo) = suma sobre cada valor del objetivo
+                weights[i, j] = weights[j, i] = sum(
+                    target_probs[c] * _mutual_information(
+                        indices[a][target_index == c], indices[b][target_index == c],
+                        len(self.values[a]), len(self.values[b])
+                    )
+                    for c in range(n_target)
+                )
+
+        # La raíz es la característica más informativa sobre el objetivo
+        root = max(range(n), key=lambda i: self.target_information[features[i]])
+        in_tree = [root]
+        self.order = [target, features[root]]
+        self.parents = {target: None, features[root]: None}
+        self.edges = []
+        while len(in_tree) < n:
+            best = None
+            for i in in_tree:
+                for j in range(n):
+                    if j not in in_tree and (best is None or weights[i, j] > weights[best[0], best[1]]):
+                        best = (i, j)
+            parent, child = features[best[0]], features[best[1]]
+            in_tree.append(best[1])
+            self.order.append(child)
+            self.parents[child] = parent
+            self.edges.append({'parent': parent, 'child': child,
+                               'conditional_mutual_information': round(weights[best[0], best[1]], 4)})
+
+    def _parent_key(self, field, sampled):
+        """Fila de la tabla condicional: valor del objetivo y, si hay, valor del padre."""
+        key = sampled[Siniestro.TARGET_FIELD]
+        parent = self.parents[field]
+        if parent is not None:
+            key = key * len(self.values[parent]) + sampled[parent]
+        return key
+
+    def _fit_conditionals(self, indices):
+        """CDF de cada columna por objetivo y padre, suavizada hacia la marginal por objetivo."""
+        target = Siniestro.TARGET_FIELD
+        n_target = len(self.values[target])
+        self.conditionals[target] = np.cumsum(self.marginals[target])[None, :]
+        for field in self.order[1:]:
+            n_values = len(self.values[field])
+            parent = self.parents[field]
+            n_keys = n_target * (len(self.values[parent]) if parent is not None else 1)
+            by_target = np.bincount(
+                indices[target] * n_values + indices[field], minlength=n_target * n_values
+            ).reshape(n_target, n_values).astype(np.float64)
+            by_target /= by_target.sum(axis=1, keepdims=True)
+            counts = np.bincount(
+                self._parent_key(field, indices) * n_values + indices[field], minlength=n_keys * n_values
+            ).reshape(n_keys, n_values).astype(np.float64)
+            counts += self.smoothing * np.repeat(by_target, n_keys // n_target, axis=0)
+            probs = counts / counts.sum(axis=1, keepdims=True)
+            self.conditionals[field] = np.cumsum(probs, axis=1)
+
+    def _fit_dates(self, df, rows):
+        """Años observados y proporción de fechas vacías por valor del objetivo."""
+        dates = pd.to_datetime(df[DATE_FIELD], errors='coerce') if DATE_FIELD in df.columns \
+            else pd.Series(pd.NaT, index=df.index)
+        dates = dates.loc[rows]
+        years = dates.dropna().dt.year.astype(int)
+        if years.empty:
+            years = pd.Series([pd.Timestamp.today().year])
+        counts = years.value_counts().sort_index()
+        self.years = counts.index.values
+        self.year_probs = counts.values / counts.values.sum()
+        target = df.loc[rows, Siniestro.TARGET_FIELD].astype(int)
+        self.date_null_rate = {
+            int(value): float(dates[target == value].isna().mean()) for value in self.values[Siniestro.TARGET_FIELD]
+        }
+
+    def _sample_codes(self, n_rows, rng):
+        """Índices de categoría por columna: primero el objetivo, luego el árbol en orden."""
+        sampled = {}
+        for field in self.order:
+            cdf = self.conditionals[field]
+            u = rng.random_sample(n_rows)
+            if field == Siniestro.TARGET_FIELD:
+                index = np.searchsorted(cdf[0], u, side='right')
+            else:
+                index = np.empty(n_rows, dtype=np.int64)
+                key = self._parent_key(field, sampled)
+                for value in np.unique(key):
+                    mask = key == value
+                    index[mask] = np.searchsorted(cdf[value], u[mask], side='right')
+            # Redondeo de la última posición de la CDF
+            sampled[field] = np.minimum(index, cdf.shape[1] - 1)
+        return sampled
+
+    def _sample_dates(self, months, weekdays, rng):
+        """Fechas con el mes y el día de la semana dados (lunes = 0) en un año observado."""
+        years = rng.choice(self.years, size=len(months), p=self.year_probs)
+        month_start = ((years - 1970) * 12 + (months - 1)).astype('datetime64[M]')
+        first_day = month_start.astype('datetime64[D]')
+        days_in_month = ((month_start + 1).astype('datetime64[D]') - first_day).astype(np.int64)
+        # 1970-01-01 fue jueves (3)
+        first_weekday = (first_day.astype(np.int64) + 3) % 7
+        offset = (weekdays - first_weekday) % 7
+        occurrences = (days_in_month - 1 - offset) // 7 + 1
+        offset = offset + 7 * (rng.random_sample(len(months)) * occurrences).astype(np.int64)
+        return first_day + offset
+
+    def generate(self, n_rows, random_state=None, chunk_size=100000, null_dates=False, ingreso_date=None):
+        """
+        Genera filas sintéticas por bloques.
+
+        Args:
+            n_rows (int): Filas totales
+            random_state (int, optional): Semilla
+            chunk_size (int): Filas por bloque
+            null_dates (bool): Dejar FECHA_SINIESTRO vacía con la proporción real
+                (como en el CSV de origen); si no, todas las filas tienen fecha
+            ingreso_date (date, optional): Si se indica, se agrega FECHA_INGRESO
+
+        Yields:
+            pd.DataFrame: Bloques con las columnas de Siniestro
+        """
+        if not self.order:
+            raise ValueError("El generador no está ajustado")
+        rng = np.random.RandomState(random_state)
+        target = Siniestro.TARGET_FIELD
+        remaining = int(n_rows)
+        while remaining > 0:
+            size = min(chunk_size, remaining)
+            sampled = self._sample_codes(size, rng)
+            chunk = pd.DataFrame({
+                field: self.values[field][sampled[field]].astype(np.int32) for field in self.fields
+            })
+            dates = pd.Series(self._sample_dates(
+                chunk['MES'].values.astype(np.int64), chunk['DIA_DE_LA_SEMANA'].values.astype(np.int64), rng
+            ))
+            if null_dates:
+                rates = chunk[target].map(self.date_null_rate).fillna(0).values
+                dates[rng.random_sample(size) < rates] = pd.NaT
+            chunk[DATE_FIELD] = dates.dt.date.where(dates.notna(), None)
+            if ingreso_date is not None:
+                chunk[INGRESO_FIELD] = ingreso_date
+            remaining -= size
+            yield chunk
+
+    def write_csv(self, path, n_rows, random_state=None, chunk_size=100000):
+        """
+        Escribe un CSV sintético con el formato del CSV de carga (fechas vacías incluidas).
+
+        La compresión se deduce de la extensión (por ejemplo ``.csv.gz``).
+
+        Args:
+            path (str): Archivo de salida
+            n_rows (int): Filas
+            random_state (int, optional): Semilla
+            chunk_size (int): Filas por bloque
+
+        Returns:
+            int: Filas escritas
+        """
+        written = 0
+        for i, chunk in enumerate(self.generate(n_rows, random_state, chunk_size, null_dates=True)):
+            chunk.to_csv(path, mode='w' if i == 0 else 'a', header=(i == 0), index=False)
+            written += len(chunk)
+        return written
+
+    def insert(self, n_rows, ingreso_date, random_state=None, chunk_size=100000, batch_size=None,
+               progress_callback=None):
+        """
+        Inserta filas sintéticas en la tabla de siniestros.
+
+        Args:
+            n_rows (int): Filas
+            ingreso_date (date): FECHA_INGRESO de las filas (permite identificarlas)
+            random_state (int, optional): Semilla
+            chunk_size (int): Filas generadas por bloque
+            batch_size (int, optional): Filas por INSERT (por defecto UPLOAD_BULK_BATCH_SIZE)
+            progress_callback (callable, optional): Recibe las filas insertadas hasta el momento
+
+        Returns:
+            int: Filas insertadas
+        """
+        inserted = 0
+        for chunk in self.generate(n_rows, random_state, chunk_size):
+            result = ingest_dataframe(chunk, ingreso_date, ingreso_date=ingreso_date, batch_size=batch_size)
+            inserted += result['records_created']
+            if progress_callback:
+                progress_callback(inserted)
+        return inserted
+
+    def fidelity(self, sample):
+        """
+        Compara una muestra sintética con las distribuciones ajustadas.
+
+        Args:
+            sample (pd.DataFrame): Filas generadas
+
+        Returns:
+            dict: Distancia de variación total por marginal (máxima y por columna)
+            y tasa del objetivo
+        """
+        distances = {}
+        for field in self.fields:
+            index = np.searchsorted(self.values[field], sample[field].values)
+            index = np.minimum(index, len(self.values[field]) - 1)
+            observed = np.bincount(index, minlength=len(self.values[field])) / len(sample)
+            distances[field] = round(0.5 * float(np.abs(observed - self.marginals[field]).sum()), 4)
+        return {
+            'max_marginal_tvd': max(distances.values()),
+            'marginal_tvd': distances,
+            'target_rate': round(float(sample[Siniestro.TARGET_FIELD].mean()), 4)
+        }
+
+    def describe(self):
+        """Resumen del modelo ajustado para los informes."""
+        return {
+            'source_rows': self.source_rows,
+            'smoothing': self.smoothing,
+            'cardinalities': {field: len(values) for field, values in self.values.items()},
+            'target_mutual_information': self.target_information,
+            'dependency_tree': self.edges,
+            'years': [int(year) for year in self.years] if self.years is not None else []
+        }
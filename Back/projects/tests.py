@@ -1,3 +1,900 @@
-from django.test import TestCase
+import gzip
+import io
+import os
+import json
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from unittest import mock, skipIf
+import numpy as np
+import pandas as pd
+from django.contrib.auth.models import User
+from django.db import DatabaseError, connection
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.exceptions import ParseError
+from rest_framework.test import APIClient
+from sklearn.ensemble import HistGradientBoostingClassifier, RandomForestClassifier
+from .batch_streaming import open_csv_chunks, stream_predictions_csv
+from .binary_formats import (
+    ARROW_FILE_MEDIA_TYPE, ARROW_STREAM_MEDIA_TYPE, MATRIX_HEADER, MATRIX_MEDIA_TYPE, PARQUET_MEDIA_TYPE, decode_matrix,
+    decode_table, encode_matrix, encode_results, pa, table_to_matrix
+)
+from .bulk_import import RangeReader, plan_import_tasks
+from .bulk_ingestion import INTEGER_FIELDS, bulk_insert_siniestros, ingest_dataframe, siniestro_rows_from_dataframe
+from .chunked_uploads import (
+    LocalPartStorage, PartsReader, claim_upload, complete_upload, create_upload, part_name, process_upload,
+    receive_part
+)
+from .compiled_forest import CompiledForest
+from .csv_ingestion import CsvUploadError, detect_encoding, ingest_csv_upload, open_csv_reader, zstandard
+from .hyperparameter_search import successive_halving_search
+from .input_schema import FeatureSchema
+from .model_trainer import incremental_retrain_from_db, train_accident_model_from_db
+from .model_artifacts import CompactModelArtifact, artifact_size_bytes, dump_artifact, load_artifact
+from .model_registry import ModelRegistry
+from .models import Siniestro, TrainingJob, UploadSession
+from . import parallel_scoring
+from .native_load import STAGING_FIELDS, _insert_from_staging, load_csv_native, resolve_load_method
+from .prediction_cache import FeatureKeyPacker, PredictionCache
+from .prediction_results import BatchSummary, build_prediction_columns, rows_from_columns, summarize_predictions
+from .training_jobs import claim_next_job, enqueue_training_job, recover_stale_jobs
+from .training_snapshots import load_training_dataframe
 
-# Create your tests here.
+
+def make_siniestros(n_rows, seed=0):
+    """DataFrame de carga con valores enteros aleatorios y fecha fija."""
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({field: rng.integers(0, 1000, n_rows) for field in INTEGER_FIELDS})
+    df['FECHA_SINIESTRO'] = '2024-05-01'
+    return df
+
+
+class CompiledForestTests(TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.X = pd.DataFrame(rng.integers(0, 50, size=(400, 6)), columns=[f'f{i}' for i in range(6)])
+        y = ((self.X['f0'] + self.X['f3'] > 50) ^ (rng.random(400) < 0.1)).astype(int)
+        self.model = RandomForestClassifier(n_estimators=15, max_depth=7, random_state=0).fit(self.X, y)
+        self.forest = CompiledForest.from_sklearn(self.model)
+
+    def test_predict_proba_matches_sklearn(self):
+        expected = self.model.predict_proba(self.X)
+        actual = self.forest.predict_proba(self.X)
+        self.assertEqual(actual.shape, expected.shape)
+        self.assertLessEqual(float(np.max(np.abs(expected - actual))), 1e-9)
+
+    def test_verify_accepts_probe_rows(self):
+        self.assertLessEqual(self.forest.verify(self.model), 1e-9)
+
+    def test_verify_rejects_a_different_model(self):
+        other = RandomForestClassifier(n_estimators=15, max_depth=7, random_state=1).fit(
+            self.X, (self.X['f1'] > 25).astype(int)
+        )
+        with self.assertRaises(ValueError):
+            self.forest.verify(other, self.X)
+
+
+class BulkIngestionTests(TestCase):
+
+    def test_second_ingest_skips_duplicates(self):
+        df = make_siniestros(50)
+        first = ingest_dataframe(df, date(2024, 1, 1), batch_size=16)
+        self.assertEqual(first['records_created'], 50)
+
+        # Un archivo que repite filas propias y de la carga anterior
+        second = ingest_dataframe(pd.concat([df.iloc[:20], make_siniestros(5, seed=1), df.iloc[:2]]),
+                                  date(2024, 1, 1), batch_size=16)
+        self.assertEqual(second['records_created'], 5)
+        self.assertEqual(second['records_duplicates'], 22)
+        self.assertEqual(Siniestro.objects.count(), 55)
+
+    def test_default_date_does_not_change_fingerprint(self):
+        df = make_siniestros(30)
+        df.loc[::3, 'FECHA_SINIESTRO'] = ''
+        first = ingest_dataframe(df, date(2024, 1, 1))
+        self.assertEqual((first['records_created'], first['dates_fixed']), (30, 10))
+
+        # Otra fecha por defecto (p. ej. la carga del día siguiente) no vuelve a insertar las filas
+        second = ingest_dataframe(df, date(2024, 2, 1))
+        self.assertEqual((second['records_created'], second['records_duplicates']), (0, 30))
+        staged = load_csv_native(io.BytesIO(df.to_csv(index=False).encode()), date(2024, 3, 1),
+                                 method='bulk_create')
+        self.assertEqual((staged['records_created'], staged['records_duplicates']), (0, 30))
+        self.assertEqual(Siniestro.objects.count(), 30)
+
+    def test_bisection_isolates_bad_row(self):
+        prepared = siniestro_rows_from_dataframe(make_siniestros(40), date(2024, 1, 1))
+        rows = prepared['rows']
+        # Un NULL en un campo obligatorio hace fallar el lote completo en la base de datos
+        mes = prepared['fields'].index('MES')
+        rows[13] = rows[13][:mes] + (None,) + rows[13][mes + 1:]
+
+        result = bulk_insert_siniestros(prepared['fields'], rows, batch_size=16)
+        self.assertEqual(result['records_created'], 39)
+        self.assertEqual(result['records_errors'], 1)
+        self.assertEqual(result['records_duplicates'], 0)
+        self.assertEqual([detail['row'] for detail in result['error_details']], [14])
+        self.assertEqual(result['bisected_batches'], 1)
+        self.assertEqual(Siniestro.objects.count(), 39)
+
+
+class ChunkedUploadTests(TestCase):
+
+    def setUp(self):
+        self.parts_dir = tempfile.mkdtemp()
+        self.settings_override = override_settings(UPLOAD_PARTS_DIR=self.parts_dir, USE_S3_STORAGE=False)
+        self.settings_override.enable()
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.parts_dir, ignore_errors=True)
+
+    def split(self, data, n_parts):
+        size = len(data) // n_parts + 1
+        return [data[start:start + size] for start in range(0, len(data), size)]
+
+    def test_parts_reader_reassembles_file(self):
+        data = make_siniestros(200).to_csv(index=False).encode()
+        storage = LocalPartStorage()
+        for number, chunk in enumerate(self.split(data, 4), start=1):
+            path = f'{self.parts_dir}/tmp-{number}'
+            with open(path, 'wb') as part:
+                part.write(chunk)
+            storage.save('u1', part_name(number), path)
+
+        reader = PartsReader(storage, 'u1', [1, 2, 3, 4])
+        chunks = []
+        while True:
+            chunk = reader.read(1000)
+            if not chunk:
+                break
+            chunks.append(chunk)
+        self.assertEqual(b''.join(chunks), data)
+        reader.seek(0)
+        self.assertEqual(reader.read(), data)
+        reader.close()
+
+    def test_upload_in_parts_ingests_every_row(self):
+        data = make_siniestros(300).to_csv(index=False).encode()
+        session = create_upload(UploadSession.PURPOSE_INGEST, 'siniestros.csv',
+                                params={'auto_retrain': False}, expected_size=len(data))
+        parts = self.split(data, 3)
+        # Las partes cortan líneas por la mitad y pueden llegar en cualquier orden
+        for number in [2, 1, 3]:
+            receive_part(session, number, io.BytesIO(parts[number - 1]), content_length=len(parts[number - 1]))
+            session.refresh_from_db()
+
+        session = complete_upload(session)
+        self.assertTrue(claim_upload(session.id, 'test'))
+        session.refresh_from_db()
+        session = process_upload(session)
+
+        self.assertEqual(session.status, UploadSession.STATUS_COMPLETED)
+        self.assertEqual(session.result['records_created'], 300)
+        self.assertEqual(session.result['records_errors'], 0)
+        self.assertEqual(Siniestro.objects.count(), 300)
+
+
+class PredictInputTests(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user('analista'))
+        self.values = make_siniestros(3)[Siniestro.TRAINING_FIELDS].to_numpy(dtype=np.float32) % 5
+
+    def test_float32_matrix_with_nan_returns_validation_report(self):
+        self.values[1, 2] = np.nan
+        self.values[2, 0] = np.inf
+        response = self.client.post('/api/predict/', encode_matrix(self.values, Siniestro.TRAINING_FIELDS),
+                                    content_type=MATRIX_MEDIA_TYPE)
+        self.assertEqual(response.status_code, 400)
+        report = response.json()['validation']
+        self.assertEqual(report['invalid_rows'], 2)
+        self.assertEqual(report['rows'][0]['values'], {Siniestro.TRAINING_FIELDS[2]: None})
+        self.assertEqual(report['rows'][1]['values'], {Siniestro.TRAINING_FIELDS[0]: 'inf'})
+
+
+def make_training_siniestros(n_rows, seed=0):
+    """Filas de carga con un objetivo que depende de HORA_SINIESTRO."""
+    df = make_siniestros(n_rows, seed)
+    df['ACCIDENTE'] = (df['HORA_SINIESTRO'] > 500).astype(int)
+    return df
+
+
+class IncrementalTrainingTests(TestCase):
+
+    def setUp(self):
+        self.base_dir = tempfile.mkdtemp()
+        self.settings_override = override_settings(
+            BASE_DIR=self.base_dir, TRAINING_SNAPSHOT_DIR=f'{self.base_dir}/training_snapshots', USE_S3_STORAGE=False
+        )
+        self.settings_override.enable()
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.base_dir, ignore_errors=True)
+
+    def test_incremental_retrain_evaluates_only_new_rows(self):
+        ingest_dataframe(make_training_siniestros(300), date(2024, 1, 1))
+        full = train_accident_model_from_db(Siniestro, model_filename='test.pkl', metrics_filename='test.json')
+        self.assertTrue(full['success'], full)
+
+        ingest_dataframe(make_training_siniestros(200, seed=1), date(2024, 1, 1))
+        result = incremental_retrain_from_db(Siniestro, model_filename='test.pkl', metrics_filename='test.json',
+                                             new_trees=5, replay_ratio=1.0)
+        self.assertTrue(result['success'], result)
+        metrics = result['metrics']
+        self.assertEqual(metrics['training_mode'], 'incremental')
+        self.assertEqual(metrics['incremental']['new_rows'], 200)
+        self.assertEqual(metrics['incremental']['trees_added'], 5)
+        # La prueba es el 20 % de los registros nuevos; las filas de repaso solo entrenan
+        self.assertEqual(metrics['dataset_info']['test_samples'], 40)
+        self.assertEqual(metrics['incremental']['test_rows'], 40)
+        self.assertEqual(metrics['dataset_info']['training_samples'],
+                         160 + metrics['incremental']['replay_rows'])
+
+
+class TrainingSnapshotTests(TestCase):
+
+    def setUp(self):
+        self.snapshot_dir = tempfile.mkdtemp()
+        self.settings_override = override_settings(TRAINING_SNAPSHOT_DIR=self.snapshot_dir,
+                                                   TRAINING_SNAPSHOTS_ENABLED=True)
+        self.settings_override.enable()
+        self.fields = INTEGER_FIELDS
+        ingest_dataframe(make_siniestros(50), date(2024, 1, 1))
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.snapshot_dir, ignore_errors=True)
+
+    def load(self):
+        return load_training_dataframe(Siniestro.objects.order_by('pk'), self.fields)
+
+    def test_reuses_and_appends_snapshot(self):
+        self.assertEqual(self.load().attrs['snapshot'], 'database')
+        self.assertEqual(self.load().attrs['snapshot'], 'snapshot')
+
+        ingest_dataframe(make_siniestros(10, seed=1), date(2024, 1, 1))
+        df = self.load()
+        self.assertEqual(df.attrs['snapshot'], 'append')
+        self.assertEqual(len(df), 60)
+        self.assertEqual(df.attrs['max_pk'], Siniestro.objects.order_by('-pk').first().pk)
+
+    def test_edited_row_rebuilds_snapshot(self):
+        self.load()
+        siniestro = Siniestro.objects.order_by('pk')[3]
+        siniestro.MES = 12345
+        siniestro.save()
+
+        df = self.load()
+        self.assertEqual(df.attrs['snapshot'], 'database')
+        self.assertEqual(int(df['MES'].iloc[3]), 12345)
+
+    def test_deleted_row_rebuilds_snapshot(self):
+        self.load()
+        Siniestro.objects.order_by('pk')[0].delete()
+        df = self.load()
+        self.assertEqual(df.attrs['snapshot'], 'database')
+        self.assertEqual(len(df), 49)
+
+
+class FakePredictor:
+    """Predictor con una versión fija que devuelve la misma probabilidad para todas las filas."""
+
+    def __init__(self, cache_key, probability):
+        self.cache_key = cache_key
+        self.probability = probability
+
+    def predict_proba(self, X):
+        return np.tile([1 - self.probability, self.probability], (len(X), 1))
+
+
+class ParallelScoringTests(TestCase):
+
+    def tearDown(self):
+        if parallel_scoring._pool is not None:
+            parallel_scoring._pool.shutdown()
+        parallel_scoring._pool = None
+        parallel_scoring._pool_key = None
+        parallel_scoring._pool_users.clear()
+        parallel_scoring._retired_pools.clear()
+        parallel_scoring._worker_predictor = None
+
+    def test_replaced_pool_closes_after_its_last_user(self):
+        old = parallel_scoring._acquire_pool('m.pkl', ('m.pkl', 1), 2)
+        new = parallel_scoring._acquire_pool('m.pkl', ('m.pkl', 2), 2)
+        self.assertIsNot(old, new)
+        # Otra petición sigue usando el pool anterior: no se cierra todavía
+        self.assertFalse(old._shutdown_thread)
+        parallel_scoring._release_pool(old)
+        self.assertTrue(old._shutdown_thread)
+        parallel_scoring._release_pool(new)
+        self.assertFalse(new._shutdown_thread)
+
+    def score_with_worker_versions(self, reloaded):
+        parallel_scoring._worker_model_filename = 'm.pkl'
+        parallel_scoring._worker_predictor = FakePredictor(('m.pkl', 1), 0.1)
+        registry = mock.Mock()
+        registry.get_predictor.return_value = reloaded
+        parent = parallel_scoring.ParallelPredictor(FakePredictor(('m.pkl', 2), 0.5), 'm.pkl', workers=2, min_rows=1)
+        with ThreadPoolExecutor(2) as pool, \
+                mock.patch.object(parallel_scoring, '_acquire_pool', return_value=pool), \
+                mock.patch.object(parallel_scoring, '_release_pool'), \
+                mock.patch('projects.model_registry.get_model_registry', return_value=registry):
+            return parent.predict_proba(np.zeros((10, 3)))[:, 1]
+
+    def test_worker_reloads_to_the_parent_version(self):
+        probabilities = self.score_with_worker_versions(FakePredictor(('m.pkl', 2), 0.7))
+        np.testing.assert_array_equal(probabilities, 0.7)
+
+    def test_newer_worker_version_is_scored_in_the_parent(self):
+        probabilities = self.score_with_worker_versions(FakePredictor(('m.pkl', 3), 0.9))
+        np.testing.assert_array_equal(probabilities, 0.5)
+
+
+class NativeLoadTests(TestCase):
+
+    def test_insert_from_staging_skips_existing_and_repeated_rows(self):
+        rows = siniestro_rows_from_dataframe(make_siniestros(3), date(2024, 1, 1))['rows']
+        bulk_insert_siniestros(STAGING_FIELDS, rows[2:])
+        quote = connection.ops.quote_name
+        columns = ', '.join(quote(field) for field in STAGING_FIELDS)
+        with connection.cursor() as cursor:
+            cursor.execute(f'CREATE TEMP TABLE staging AS SELECT {columns} FROM projects_siniestro WHERE 1 = 0')
+            cursor.executemany(f'INSERT INTO staging ({columns}) VALUES ({", ".join(["%s"] * len(STAGING_FIELDS))})',
+                               [rows[0], rows[1], rows[1], rows[2]])
+            inserted = _insert_from_staging(cursor, 'staging')
+            cursor.execute('DROP TABLE staging')
+        self.assertEqual(inserted, 2)
+        self.assertEqual(Siniestro.objects.count(), 3)
+
+    def csv_upload(self, df):
+        return io.BytesIO(df.to_csv(index=False).encode('utf-8'))
+
+    def test_auto_uses_bulk_create_outside_mysql(self):
+        self.assertEqual(resolve_load_method('auto'), 'bulk_create')
+        with self.assertRaises(ValueError):
+            resolve_load_method('load_data')
+
+        staging_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, staging_dir, ignore_errors=True)
+        df = make_siniestros(30)
+        with override_settings(NATIVE_LOAD_STAGING_DIR=staging_dir):
+            first = load_csv_native(self.csv_upload(df), date(2024, 1, 1), chunk_size=8)
+            second = load_csv_native(self.csv_upload(df.iloc[:10]), date(2024, 1, 1))
+        self.assertEqual(first['method'], 'bulk_create')
+        self.assertEqual(first['records_created'], 30)
+        self.assertEqual(second['records_duplicates'], 10)
+        self.assertEqual(Siniestro.objects.count(), 30)
+        # El archivo de staging se elimina al terminar
+        self.assertEqual(os.listdir(staging_dir), [])
+
+    def test_auto_falls_back_when_load_data_fails(self):
+        with mock.patch('projects.native_load.resolve_load_method', return_value='load_data'), \
+                mock.patch('projects.native_load._load_data_infile', side_effect=DatabaseError('local_infile')):
+            result = load_csv_native(self.csv_upload(make_siniestros(12)), date(2024, 1, 1))
+        self.assertEqual(result['method'], 'bulk_create')
+        self.assertEqual(result['fallback_reason'], 'local_infile')
+        self.assertEqual(Siniestro.objects.count(), 12)
+
+    def test_explicit_load_data_failure_is_raised(self):
+        with mock.patch('projects.native_load.resolve_load_method', return_value='load_data'), \
+                mock.patch('projects.native_load._load_data_infile', side_effect=DatabaseError('local_infile')):
+            with self.assertRaises(DatabaseError):
+                load_csv_native(self.csv_upload(make_siniestros(12)), date(2024, 1, 1), method='load_data')
+        self.assertFalse(Siniestro.objects.exists())
+
+
+class HyperparameterSearchTests(TestCase):
+
+    def test_best_score_comes_from_full_folds(self):
+        rng = np.random.default_rng(0)
+        X = rng.integers(0, 20, size=(600, 4))
+        y = (X[:, 0] + rng.integers(0, 10, 600) > 18).astype(int)
+        search = successive_halving_search(
+            X, y, param_grid={'n_estimators': [5, 10], 'max_depth': [3, None]},
+            cv=2, factor=2, min_resources=60, n_jobs=1
+        )
+        # La ronda de 120 filas ya deja un solo candidato; la ronda final usa el fold completo
+        self.assertEqual([r['resources'] for r in search['rounds']], [60, 120, 300])
+        self.assertEqual(search['rounds'][-1]['n_candidates'], 1)
+        self.assertEqual(search['best_score_resources'], 300)
+        self.assertEqual(search['best_score'], search['rounds'][-1]['top_candidates'][0]['mean_roc_auc'])
+
+
+class FakeModelStorage:
+    """Storage en memoria: cada archivo tiene una versión y cuenta sus cargas."""
+
+    def __init__(self):
+        self.versions = {'modelo.pkl': 'v1'}
+        self.loads = 0
+
+    def get_model_version(self, filename):
+        return self.versions.get(filename)
+
+    def load_serving_model(self, filename):
+        self.loads += 1
+        return {'filename': filename, 'version': self.versions[filename]}
+
+    def metrics_exist(self, filename):
+        return False
+
+
+@override_settings(USE_COMPILED_FOREST=False)
+class ModelRegistryTests(TestCase):
+
+    def make_registry(self, ttl_seconds):
+        registry = ModelRegistry(ttl_seconds=ttl_seconds)
+        registry._storage = FakeModelStorage()
+        return registry
+
+    def test_serves_from_memory_within_ttl(self):
+        registry = self.make_registry(3600)
+        first = registry.get_model('modelo.pkl')
+        registry._storage.versions['modelo.pkl'] = 'v2'
+        # Dentro del TTL no se consulta el storage aunque la versión haya cambiado
+        self.assertIs(registry.get_model('modelo.pkl'), first)
+        self.assertEqual(registry._storage.loads, 1)
+        self.assertEqual(registry.stats['hits'], 1)
+
+        registry.invalidate('modelo.pkl')
+        self.assertEqual(registry.get_model('modelo.pkl')['version'], 'v2')
+        self.assertEqual(registry._storage.loads, 2)
+
+    def test_reloads_only_when_version_changes(self):
+        registry = self.make_registry(0)
+        first = registry.get_predictor('modelo.pkl')
+        self.assertIs(registry.get_predictor('modelo.pkl'), first)
+        self.assertEqual(registry.stats['revalidations'], 1)
+        self.assertEqual(registry._storage.loads, 1)
+
+        registry._storage.versions['modelo.pkl'] = 'v2'
+        second = registry.get_predictor('modelo.pkl')
+        self.assertIsNot(second, first)
+        self.assertEqual(second.cache_key, ('modelo.pkl', 'v2'))
+        self.assertEqual(registry._storage.loads, 2)
+
+    def test_missing_model_is_dropped(self):
+        registry = self.make_registry(0)
+        registry.get_model('modelo.pkl')
+        del registry._storage.versions['modelo.pkl']
+        self.assertFalse(registry.model_exists('modelo.pkl'))
+        self.assertFalse(registry.is_loaded('modelo.pkl'))
+
+
+class RowSumPredictor:
+    """Predictor cuya probabilidad depende de la fila; registra cuántas filas evalúa."""
+
+    def __init__(self, cache_key):
+        self.cache_key = cache_key
+        self.scored_rows = 0
+
+    def predict_proba(self, X):
+        X = np.asarray(X, dtype=np.float64)
+        self.scored_rows += len(X)
+        positive = X.sum(axis=1) / 1000
+        return np.column_stack([1 - positive, positive])
+
+
+class PredictionCacheTests(TestCase):
+
+    def setUp(self):
+        self.packer = FeatureKeyPacker(fields=['a', 'b', 'c'], bits={'a': 5, 'b': 4, 'c': 8})
+
+    def test_pack_gives_distinct_keys_per_combination(self):
+        rng = np.random.default_rng(0)
+        X = np.column_stack([rng.integers(0, 32, 500), rng.integers(0, 16, 500), rng.integers(0, 256, 500)])
+        keys, packable = self.packer.pack(X)
+        self.assertTrue(packable.all())
+        self.assertEqual(len(np.unique(keys)), len(np.unique(X, axis=0)))
+        self.assertEqual(int(self.packer.pack(np.array([[1, 2, 3]]))[0][0]), 1 | 2 << 5 | 3 << 9)
+
+    def test_rows_outside_their_bits_are_not_packable(self):
+        X = np.array([[1, 2, 3], [32, 0, 0], [0, -1, 0], [1.5, 0, 0], [np.nan, 0, 0], [31.0, 15.0, 255.0]])
+        _, packable = self.packer.pack(X)
+        self.assertEqual(packable.tolist(), [True, False, False, False, False, True])
+
+    def test_packer_rejects_more_than_64_bits(self):
+        with self.assertRaises(ValueError):
+            FeatureKeyPacker(fields=['a', 'b'], bits={'a': 40, 'b': 30})
+
+    def test_repeated_rows_are_scored_once(self):
+        cache = PredictionCache(maxsize=100, packer=self.packer)
+        predictor = RowSumPredictor(('modelo.pkl', 'v1'))
+        X = np.array([[1, 2, 3], [1, 2, 3], [4, 5, 6], [40, 0, 0]])
+        expected = predictor.predict_proba(X)[:, 1]
+        predictor.scored_rows = 0
+
+        np.testing.assert_allclose(cache.predict_proba(predictor, X), expected)
+        # Las dos filas repetidas se evalúan una vez; la fila fuera de rango va sin caché
+        self.assertEqual(predictor.scored_rows, 3)
+        np.testing.assert_allclose(cache.predict_proba(predictor, X), expected)
+        self.assertEqual(predictor.scored_rows, 4)
+        self.assertEqual(cache.get_stats()['bypassed'], 2)
+
+    def test_new_model_version_clears_cache(self):
+        cache = PredictionCache(maxsize=100, packer=self.packer)
+        X = np.array([[1, 2, 3]])
+        self.assertEqual(cache.predict_proba(FakePredictor(('modelo.pkl', 'v1'), 0.2), X).tolist(), [0.2])
+        self.assertEqual(cache.predict_proba(FakePredictor(('modelo.pkl', 'v2'), 0.7), X).tolist(), [0.7])
+        self.assertEqual(cache.get_stats()['size'], 1)
+
+
+class StreamingPredictionTests(TestCase):
+
+    def make_csv(self, n_rows):
+        rng = np.random.default_rng(0)
+        df = pd.DataFrame({field: rng.integers(0, 50, n_rows) for field in Siniestro.TRAINING_FIELDS})
+        df.insert(0, 'ID', range(n_rows))
+        return df
+
+    def stream(self, df, chunk_size=7):
+        first_chunk, reader = open_csv_chunks(io.BytesIO(df.to_csv(index=False).encode('utf-8')), chunk_size)
+        predictor = RowSumPredictor(('stream.pkl', 'v1'))
+        return ''.join(stream_predictions_csv(first_chunk, reader, predictor, 0.5)), predictor
+
+    def test_streams_every_row_and_summary_trailer(self):
+        df = self.make_csv(30)
+        output, _ = self.stream(df)
+        lines = output.splitlines()
+        self.assertTrue(lines[-1].startswith('# summary: '))
+        summary = json.loads(lines[-1][len('# summary: '):])
+
+        result = pd.read_csv(io.StringIO(output), comment='#')
+        self.assertEqual(result['ID'].tolist(), list(range(30)))
+        expected = df[Siniestro.TRAINING_FIELDS].sum(axis=1).to_numpy() / 1000
+        np.testing.assert_allclose(result['PROBABILITY'], expected)
+        self.assertEqual(result['PREDICTION'].tolist(), (expected >= 0.5).astype(int).tolist())
+        self.assertEqual(summary['total_predictions'], 30)
+        self.assertEqual(summary['accidents_predicted'], int((expected >= 0.5).sum()))
+        self.assertEqual(summary['invalid_rows'], 0)
+        self.assertAlmostEqual(summary['average_probability'], float(expected.mean()))
+
+    def test_invalid_rows_keep_empty_predictions(self):
+        df = self.make_csv(20).astype(object)
+        df.loc[3, 'DISTRITO'] = None
+        df.loc[15, 'MES'] = 'x'
+        output, predictor = self.stream(df)
+        result = pd.read_csv(io.StringIO(output), comment='#')
+        summary = json.loads(output.splitlines()[-1][len('# summary: '):])
+
+        self.assertEqual(len(result), 20)
+        self.assertTrue(result.loc[[3, 15], 'PREDICTION'].isna().all())
+        self.assertFalse(result.drop(index=[3, 15])['PREDICTION'].isna().any())
+        self.assertEqual(summary['invalid_rows'], 2)
+        self.assertEqual(summary['total_predictions'], 18)
+        self.assertLessEqual(predictor.scored_rows, 18)
+
+    def test_missing_columns_are_rejected(self):
+        df = self.make_csv(5).drop(columns=['DISTRITO'])
+        with self.assertRaises(ValueError):
+            open_csv_chunks(io.BytesIO(df.to_csv(index=False).encode('utf-8')), 2)
+
+
+class PredictionResultsTests(TestCase):
+
+    def test_rows_from_columns_matches_columns(self):
+        input_df = pd.DataFrame({'HORA_SINIESTRO': [1, 2, 3], 'MES': [4, 5, 6]}, index=[10, 11, 12])
+        columns, predictions = build_prediction_columns(input_df, np.array([0.1, 0.5, 0.9]), 0.5)
+        self.assertEqual(predictions.tolist(), [0, 1, 1])
+        self.assertEqual(columns['risk_level'], ['Bajo', 'Medio', 'Alto'])
+
+        rows = rows_from_columns(columns)
+        self.assertEqual(rows[1], {
+            'index': 11,
+            'input_data': {'HORA_SINIESTRO': 2, 'MES': 5},
+            'prediction': 1,
+            'probability': 0.5,
+            'risk_level': 'Medio',
+            'accident_likely': True
+        })
+        self.assertEqual([row['index'] for row in rows], [10, 11, 12])
+
+    def test_summary_by_blocks_matches_whole_batch(self):
+        probabilities = np.random.default_rng(0).random(1000)
+        predictions = (probabilities >= 0.5).astype(int)
+        summary = BatchSummary()
+        for start in range(0, 1000, 128):
+            summary.update(probabilities[start:start + 128], predictions[start:start + 128])
+        summary.update(np.array([]), np.array([]))
+
+        by_blocks = summary.to_dict()
+        whole = summarize_predictions(probabilities, predictions)
+        self.assertAlmostEqual(by_blocks.pop('average_probability'), whole.pop('average_probability'))
+        self.assertEqual(by_blocks, whole)
+        self.assertEqual(whole['high_risk'] + whole['medium_risk'] + whole['low_risk'], 1000)
+
+
+class BinaryFormatTests(TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.fields = list(Siniestro.TRAINING_FIELDS)
+        self.values = rng.integers(0, 100, size=(25, len(self.fields))).astype(np.int8)
+
+    def test_matrix_in_training_order_is_not_copied(self):
+        body = encode_matrix(self.values, self.fields)
+        decoded = decode_matrix(body)
+        np.testing.assert_array_equal(decoded, self.values)
+        self.assertFalse(decoded.flags.owndata)
+        self.assertFalse(decoded.flags.writeable)
+
+    def test_matrix_columns_are_reordered(self):
+        reversed_fields = self.fields[::-1]
+        decoded = decode_matrix(encode_matrix(self.values[:, ::-1], reversed_fields))
+        np.testing.assert_array_equal(decoded, self.values)
+
+    def test_malformed_matrix_is_rejected(self):
+        body = encode_matrix(self.values, self.fields)
+        names_bytes = ','.join(self.fields).encode('utf-8')
+        bad_names = MATRIX_HEADER.pack(b'SINM', 1, 1, len(self.fields), 0, len(names_bytes)) + b'\xff' * len(names_bytes)
+        for data in [
+            body[:10],                                                 # cabecera incompleta
+            b'XXXX' + body[4:],                                        # magic desconocido
+            body[:4] + bytes([1, 9]) + body[6:],                       # dtype no soportado
+            body[:-1],                                                 # tamaño de cuerpo
+            encode_matrix(self.values[:, 1:], self.fields[1:]),        # falta una columna
+            bad_names,                                                 # nombres no UTF-8
+        ]:
+            with self.assertRaises(ParseError):
+                decode_matrix(data)
+
+    def encode_table(self, table, media_type):
+        import pyarrow.ipc
+        import pyarrow.parquet
+        sink = pa.BufferOutputStream()
+        if media_type == PARQUET_MEDIA_TYPE:
+            pyarrow.parquet.write_table(table, sink)
+        else:
+            open_writer = pyarrow.ipc.new_file if media_type == ARROW_FILE_MEDIA_TYPE else pyarrow.ipc.new_stream
+            with open_writer(sink, table.schema) as writer:
+                writer.write_table(table)
+        return sink.getvalue().to_pybytes()
+
+    @skipIf(pa is None, 'pyarrow no está instalado')
+    def test_arrow_and_parquet_bodies(self):
+        df = pd.DataFrame(self.values[:, ::-1].astype(np.int64), columns=self.fields[::-1])
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        for media_type in [ARROW_STREAM_MEDIA_TYPE, ARROW_FILE_MEDIA_TYPE, PARQUET_MEDIA_TYPE]:
+            decoded = table_to_matrix(decode_table(self.encode_table(table, media_type), media_type))
+            self.assertEqual(decoded.dtype, np.int8)
+            np.testing.assert_array_equal(decoded, self.values)
+
+            body = encode_results(media_type, np.array([0.2, 0.9]), np.array([0, 1]), np.array(['Bajo', 'Alto']))
+            self.assertEqual(decode_table(body, media_type).column('RISK_LEVEL').to_pylist(), ['Bajo', 'Alto'])
+
+    @skipIf(pa is None, 'pyarrow no está instalado')
+    def test_arrow_nulls_and_garbage_are_rejected(self):
+        df = pd.DataFrame(self.values.astype(np.float64), columns=self.fields)
+        df.loc[0, 'MES'] = np.nan
+        with self.assertRaises(ParseError):
+            table_to_matrix(pa.Table.from_pandas(df, preserve_index=False))
+        with self.assertRaises(ParseError):
+            decode_table(b'no es arrow', ARROW_STREAM_MEDIA_TYPE)
+
+
+class FeatureSchemaTests(TestCase):
+
+    def setUp(self):
+        # a: rango contiguo 0-5; b: códigos dispersos {1, 4, 9}
+        training = pd.DataFrame({'a': [0, 1, 2, 3, 4, 5], 'b': [1, 4, 9, 1, 4, 9]})
+        with mock.patch.object(Siniestro, 'TRAINING_FIELDS', ['a', 'b']):
+            self.schema = FeatureSchema.from_training_data(training)
+
+    def test_from_training_data_keeps_only_sparse_codes(self):
+        self.assertEqual(self.schema.mins, [0, 1])
+        self.assertEqual(self.schema.maxs, [5, 9])
+        self.assertEqual(self.schema.allowed, [None, [1, 4, 9]])
+        self.assertEqual(self.schema.dtype, np.int8)
+        self.assertEqual(FeatureSchema.from_dict(self.schema.to_dict()).to_dict(), self.schema.to_dict())
+
+    def test_rejects_range_codes_and_non_integers(self):
+        X = pd.DataFrame({'a': [0, 6, -1, 2.5, None, 'x', 3], 'b': [4, 4, 4, 4, 4, 4, 5]})
+        validation = self.schema.validate(X)
+        self.assertEqual(validation.valid_rows.tolist(), [True] + [False] * 6)
+        self.assertEqual(validation.errors[:, 1].tolist(), [False] * 6 + [True])
+        self.assertEqual(validation.values.dtype, np.int8)
+        self.assertEqual(validation.values[0].tolist(), [0, 4])
+
+        report = validation.report()
+        self.assertEqual(report['invalid_rows'], 6)
+        self.assertEqual(report['invalid_by_column'], {'a': 5, 'b': 1})
+        self.assertEqual(report['rows'][3], {'row': 4, 'values': {'a': None}})
+        self.assertEqual(report['rows'][5], {'row': 6, 'values': {'b': 5}})
+
+    def test_integer_matrix_is_checked_against_codes(self):
+        validation = self.schema.validate(np.array([[5, 9], [5, 8], [7, 1]], dtype=np.int16))
+        self.assertEqual(validation.valid_rows.tolist(), [True, False, False])
+
+    def test_union_accepts_codes_of_both_schemas(self):
+        other = FeatureSchema(['a', 'b'], [0, 2], [8, 3], [None, None])
+        union = self.schema.union(other)
+        self.assertEqual(union.maxs, [8, 9])
+        self.assertEqual(union.allowed, [None, [1, 2, 3, 4, 9]])
+        self.assertTrue(union.validate(np.array([[8, 2], [0, 9]])).is_valid)
+
+
+class TrainingJobQueueTests(TestCase):
+
+    def test_jobs_are_claimed_once_in_arrival_order(self):
+        first = enqueue_training_job({'mode': 'full'})
+        second = enqueue_training_job({'mode': 'incremental'})
+
+        claimed = claim_next_job('worker-a')
+        self.assertEqual(claimed.id, first.id)
+        self.assertEqual(claimed.status, TrainingJob.STATUS_RUNNING)
+        self.assertEqual(claimed.worker, 'worker-a')
+        self.assertIsNotNone(claimed.heartbeat_at)
+        self.assertEqual(claim_next_job('worker-b').id, second.id)
+        self.assertIsNone(claim_next_job('worker-c'))
+
+    def test_unknown_mode_is_rejected(self):
+        with self.assertRaises(ValueError):
+            enqueue_training_job({'mode': 'otro'})
+        self.assertFalse(TrainingJob.objects.exists())
+
+    def test_only_jobs_without_recent_heartbeat_are_recovered(self):
+        now = timezone.now()
+        old = now - timedelta(seconds=120)
+        stale = TrainingJob.objects.create(status=TrainingJob.STATUS_RUNNING, started_at=old, heartbeat_at=old)
+        never_beat = TrainingJob.objects.create(status=TrainingJob.STATUS_RUNNING, started_at=old)
+        alive = TrainingJob.objects.create(status=TrainingJob.STATUS_RUNNING, started_at=old, heartbeat_at=now)
+        pending = TrainingJob.objects.create()
+
+        self.assertEqual(recover_stale_jobs(stale_seconds=60), 2)
+        for job in (stale, never_beat, alive, pending):
+            job.refresh_from_db()
+        self.assertEqual(stale.status, TrainingJob.STATUS_FAILED)
+        self.assertEqual(never_beat.status, TrainingJob.STATUS_FAILED)
+        self.assertFalse(stale.result['success'])
+        self.assertEqual(alive.status, TrainingJob.STATUS_RUNNING)
+        self.assertEqual(pending.status, TrainingJob.STATUS_PENDING)
+        self.assertEqual(recover_stale_jobs(stale_seconds=60), 0)
+
+
+class ModelArtifactTests(TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.X = pd.DataFrame(rng.integers(0, 30, size=(300, 5)), columns=[f'f{i}' for i in range(5)])
+        self.y = ((self.X['f0'] > 15) ^ (rng.random(300) < 0.1)).astype(int)
+        self.model = RandomForestClassifier(n_estimators=10, max_depth=6, random_state=0).fit(self.X, self.y)
+        self.tmp = tempfile.mkdtemp()
+        self.path = f'{self.tmp}/modelo.pkl'
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_compact_round_trip_is_mapped_and_exact(self):
+        self.assertEqual(dump_artifact(self.model, self.path, 'compact'), 'compact')
+        loaded = load_artifact(self.path, mmap=True)
+        self.assertIsInstance(loaded, CompactModelArtifact)
+        self.assertTrue(loaded.is_mapped)
+        expected = self.model.predict_proba(self.X)
+        np.testing.assert_allclose(loaded.predict_proba(self.X), expected, atol=1e-9)
+
+        # El bosque de sklearn reconstruido predice igual y conserva la importancia
+        rebuilt = loaded.model
+        self.assertIsInstance(rebuilt, RandomForestClassifier)
+        np.testing.assert_allclose(rebuilt.predict_proba(self.X), expected, atol=1e-9)
+        np.testing.assert_allclose(rebuilt.feature_importances_, self.model.feature_importances_, atol=1e-6)
+
+    def test_compact_is_smaller_than_pickle(self):
+        self.assertLess(artifact_size_bytes(self.model, 'compact'), artifact_size_bytes(self.model, 'pickle'))
+
+    def test_other_estimators_are_saved_as_pickle(self):
+        model = HistGradientBoostingClassifier(max_iter=5).fit(self.X, self.y)
+        self.assertEqual(dump_artifact(model, self.path, 'compact'), 'pickle')
+        self.assertIsInstance(load_artifact(self.path, mmap=True), HistGradientBoostingClassifier)
+
+
+class CsvIngestionTests(TestCase):
+
+    def make_csv_bytes(self, df, encoding='utf-8'):
+        # Columna de texto con acentos para distinguir la codificación y un encabezado con espacios
+        df = df.assign(OBSERVACIÓN='Señal dañada').rename(columns={'MES': ' MES '})
+        return df.to_csv(index=False).encode(encoding)
+
+    def test_detect_encoding(self):
+        self.assertEqual(detect_encoding('\ufeffHORA'.encode('utf-8')), 'utf-8-sig')
+        self.assertEqual(detect_encoding('HORA'.encode('utf-16')), 'utf-16')
+        self.assertEqual(detect_encoding('AÑO'.encode('utf-8')), 'utf-8')
+        # Una muestra cortada en medio de un carácter multibyte sigue siendo UTF-8
+        self.assertEqual(detect_encoding('AÑO'.encode('utf-8')[:2]), 'utf-8')
+        self.assertEqual(detect_encoding('AÑO'.encode('latin-1')), 'latin-1')
+
+    def test_gzip_latin1_upload_is_ingested_by_chunks(self):
+        df = make_siniestros(40)
+        upload = io.BytesIO(gzip.compress(self.make_csv_bytes(df, 'latin-1')))
+        result = ingest_csv_upload(upload, date(2024, 1, 1), chunk_size=16)
+        self.assertEqual(result['compression'], 'gzip')
+        self.assertEqual(result['encoding'], 'latin-1')
+        self.assertEqual(result['chunks'], 3)
+        self.assertEqual(result['records_created'], 40)
+        self.assertEqual(sorted(Siniestro.objects.values_list('MES', flat=True)), sorted(df['MES'].tolist()))
+
+    @skipIf(zstandard is None, 'zstandard no está instalado')
+    def test_zstd_upload(self):
+        upload = io.BytesIO(zstandard.ZstdCompressor().compress(self.make_csv_bytes(make_siniestros(10))))
+        result = ingest_csv_upload(upload, date(2024, 1, 1))
+        self.assertEqual(result['compression'], 'zstd')
+        self.assertEqual(result['records_created'], 10)
+
+    @skipIf(zstandard is not None, 'zstandard está instalado')
+    def test_zstd_without_package_is_rejected(self):
+        with self.assertRaises(CsvUploadError):
+            open_csv_reader(io.BytesIO(b'\x28\xb5\x2f\xfd' + self.make_csv_bytes(make_siniestros(10))))
+
+    def test_null_in_later_chunk_rolls_back_the_upload(self):
+        df = make_siniestros(40).astype(object)
+        df.loc[35, 'DISTRITO'] = None
+        with self.assertRaises(CsvUploadError) as raised:
+            ingest_csv_upload(io.BytesIO(self.make_csv_bytes(df)), date(2024, 1, 1), chunk_size=16)
+        self.assertEqual(raised.exception.details['null_fields'], {'DISTRITO': 1})
+        self.assertFalse(Siniestro.objects.exists())
+
+
+class ImportPlanTests(TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.df = make_siniestros(200)
+        self.path = os.path.join(self.tmp, 'siniestros.csv')
+        self.df.to_csv(self.path, index=False)
+        with open(self.path, 'rb') as f:
+            self.content = f.read()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def read_range(self, task):
+        reader = RangeReader(task['path'], task['start'], task['end'])
+        chunks = []
+        while True:
+            data = reader.read(1000)
+            if not data:
+                break
+            chunks.append(data)
+        reader.close()
+        return b''.join(chunks)
+
+    def test_ranges_cover_the_file_on_line_boundaries(self):
+        tasks = plan_import_tasks([self.path], split_bytes=len(self.content) // 4)
+        self.assertEqual(len(tasks), 4)
+        self.assertEqual(tasks[0]['start'], 0)
+        self.assertEqual(tasks[-1]['end'], len(self.content))
+        for previous, task in zip(tasks, tasks[1:]):
+            self.assertEqual(previous['end'], task['start'])
+            self.assertEqual(self.content[task['start'] - 1:task['start']], b'\n')
+
+        header = self.content.split(b'\n', 1)[0] + b'\n'
+        frames = []
+        for task in tasks:
+            data = self.read_range(task)
+            self.assertTrue(data.startswith(header))
+            frames.append(pd.read_csv(io.BytesIO(data)))
+        pd.testing.assert_frame_equal(pd.concat(frames, ignore_index=True), pd.read_csv(self.path))
+
+    def test_small_and_compressed_files_are_not_split(self):
+        gz_path = self.path + '.gz'
+        with open(gz_path, 'wb') as f:
+            f.write(gzip.compress(self.content))
+        tasks = plan_import_tasks([self.path, gz_path], split_bytes=len(self.content) // 2 + 1)
+        self.assertEqual([(task['start'], task['end']) for task in tasks], [(0, None), (0, None)])
+        self.assertEqual(len(plan_import_tasks([gz_path], split_bytes=10)), 1)
+        self.assertEqual(len(plan_import_tasks([self.path], split_bytes=0)), 1)
+
+    def test_range_reader_only_rewinds_to_start(self):
+        task = plan_import_tasks([self.path], split_bytes=len(self.content) // 2)[1]
+        reader = RangeReader(task['path'], task['start'], task['end'])
+        self.addCleanup(reader.close)
+        first = reader.read(50)
+        reader.read(50)
+        reader.seek(0)
+        self.assertEqual(reader.read(50), first)
+        with self.assertRaises(io.UnsupportedOperation):
+            reader.seek(10)
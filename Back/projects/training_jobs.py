@@ -0,0 +1,379 @@
+"""
+Cola de trabajos de entrenamiento respaldada por la base de datos.
+
+Las vistas solo crean un ``TrainingJob`` pendiente y responden con su id;
+el comando ``run_training_worker`` toma los trabajos en orden de llegada,
+ejecuta el entrenamiento fuera del ciclo HTTP y va registrando la etapa,
+el progreso y la duración de cada etapa. No se necesita un broker externo:
+la toma de un trabajo es un UPDATE condicional sobre su estado, así que
+varios workers pueden compartir la misma tabla. Mientras un trabajo corre,
+un hilo registra latidos (``heartbeat_at``); los que quedan en ejecución sin
+latidos porque su worker murió se marcan como fallidos
+(``recover_stale_jobs``).
+"""
+
+import os
+import socket
+import threading
+import time
+import traceback
+from datetime import timedelta
+from django.conf import settings
+from django.db import DatabaseError, connection
+from django.db.models import Q
+from django.utils import timezone
+from .models import Siniestro, TrainingJob
+from .model_engines import get_engine
+from .model_trainer import (
+    train_accident_model_from_db, incremental_retrain_from_db, tune_hyperparameters_from_db
+)
+
+# Modos que producen un modelo nuevo; 'tune' solo busca hiperparámetros
+RETRAIN_MODES = ('full', 'incremental')
+TRAINING_MODES = RETRAIN_MODES + ('tune',)
+
+DEFAULT_TRAINING_PARAMS = {
+    'mode': 'full',
+    'target_col': 'ACCIDENTE',
+    'model_filename': 'modelo_accidentes.pkl',
+    'metrics_filename': 'metricas_modelo.json',
+    'filter_kwargs': None,
+    # Motor de modelo del entrenamiento completo (None = MODEL_ENGINE)
+    'engine': None,
+    # Solo para mode='tune': cv, factor, max_rows, save
+    'tuning': None
+}
+
+
+def default_worker_name():
+    """Identificador del worker: host y pid."""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def enqueue_training_job(params=None, source='api', user=None):
+    """
+    Encola un entrenamiento.
+
+    Args:
+        params (dict, optional): Parámetros de train_accident_model_from_db
+        source (str): Origen del pedido ('api', 'upload', ...)
+        user (User, optional): Usuario que lo solicitó
+
+    Returns:
+        TrainingJob
+    """
+    job_params = dict(DEFAULT_TRAINING_PARAMS)
+    job_params.update({key: value for key, value in (params or {}).items() if value is not None})
+    if job_params['mode'] not in TRAINING_MODES:
+        raise ValueError(f"Modo de entrenamiento no válido: {job_params['mode']}. Opciones: {list(TRAINING_MODES)}")
+    if job_params['engine'] is not None:
+        get_engine(job_params['engine'])
+    if user is not None and not user.is_authenticated:
+        user = None
+    job = TrainingJob.objects.create(params=job_params, source=source, created_by=user)
+    print(f"Trabajo de entrenamiento {job.id} encolado ({source})")
+    return job
+
+
+class Heartbeat:
+    """Marca periódicamente un registro como vivo mientras se ejecuta (en un hilo aparte).
+
+    Uso: ``with Heartbeat(TrainingJob.objects.filter(id=job.id), 'heartbeat_at'): ...``
+    """
+
+    def __init__(self, queryset, field, interval=None):
+        if interval is None:
+            interval = getattr(settings, 'JOB_HEARTBEAT_SECONDS', 30)
+        self.queryset = queryset
+        self.field = field
+        self.interval = max(0.1, float(interval))
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _run(self):
+        try:
+            while not self._stop.wait(self.interval):
+                try:
+                    self.queryset.update(**{self.field: timezone.now()})
+                except DatabaseError as e:
+                    # Un latido perdido no interrumpe el trabajo; se reintenta en el siguiente
+                    print(f"No se pudo registrar el latido: {e}")
+        finally:
+            # El hilo usa su propia conexión
+            connection.close()
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self._run, name='job-heartbeat', daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+        return False
+
+
+def recover_stale_jobs(stale_seconds=None):
+    """
+    Marca como fallidos los trabajos en ejecución cuyo worker dejó de dar latidos.
+
+    Un worker que muere (OOM, despliegue) deja el trabajo en 'running' para
+    siempre y bloquea el entrenamiento completo programado. Se marcan como
+    fallidos en lugar de reencolarlos para no repetir en bucle un trabajo
+    que tumba al worker; el programado se vuelve a encolar en su ciclo.
+
+    Args:
+        stale_seconds (float, optional): Segundos sin latido (por defecto JOB_STALE_SECONDS)
+
+    Returns:
+        int: Cantidad de trabajos recuperados
+    """
+    if stale_seconds is None:
+        stale_seconds = getattr(settings, 'JOB_STALE_SECONDS', 600)
+    now = timezone.now()
+    cutoff = now - timedelta(seconds=stale_seconds)
+    stale = TrainingJob.objects.filter(status=TrainingJob.STATUS_RUNNING).filter(
+        Q(heartbeat_at__lt=cutoff) | Q(heartbeat_at__isnull=True, started_at__lt=cutoff)
+    )
+    recovered = 0
+    for job in stale:
+        message = f'El worker {job.worker} dejó de responder durante la etapa {job.stage or "inicial"}'
+        # Condicional sobre el latido leído: si el worker revivió, no se toca
+        recovered += TrainingJob.objects.filter(
+            id=job.id, status=TrainingJob.STATUS_RUNNING, heartbeat_at=job.heartbeat_at
+        ).update(
+            status=TrainingJob.STATUS_FAILED,
+            result={'success': False, 'message': 'Trabajo abandonado por el worker', 'error': message},
+            error=message,
+            finished_at=now
+        )
+        print(f"Trabajo de entrenamiento {job.id} abandonado: {message}")
+    return recovered
+
+
+def claim_next_job(worker_name=None):
+    """
+    Toma el trabajo pendiente más antiguo.
+
+    Args:
+        worker_name (str, optional): Identificador del worker
+
+    Returns:
+        TrainingJob: Trabajo tomado, o None si no hay pendientes
+    """
+    worker_name = worker_name or default_worker_name()
+    pending = TrainingJob.objects.filter(status=TrainingJob.STATUS_PENDING).order_by('created_at', 'id')
+    for job_id in pending.values_list('id', flat=True)[:10]:
+        # Solo un worker logra pasar el trabajo de pendiente a en ejecución
+        now = timezone.now()
+        claimed = TrainingJob.objects.filter(id=job_id, status=TrainingJob.STATUS_PENDING).update(
+            status=TrainingJob.STATUS_RUNNING,
+            worker=worker_name,
+            started_at=now,
+            heartbeat_at=now
+        )
+        if claimed:
+            return TrainingJob.objects.get(id=job_id)
+    return None
+
+
+class JobProgress:
+    """Registra en el trabajo la etapa actual y la duración de las anteriores."""
+
+    def __init__(self, job):
+        self.job = job
+        self.stage = None
+        self.progress = 0.0
+        self.stage_started = None
+        self.timings = {}
+
+    def _close_stage(self):
+        if self.stage is not None:
+            self.timings[self.stage] = round(time.perf_counter() - self.stage_started, 3)
+
+    def __call__(self, stage, progress):
+        self._close_stage()
+        self.stage = stage
+        self.progress = progress
+        self.stage_started = time.perf_counter()
+        TrainingJob.objects.filter(id=self.job.id).update(
+            stage=stage, progress=progress, stage_timings=self.timings
+        )
+
+    def finish(self):
+        """Cierra la última etapa y retorna las duraciones por etapa."""
+        self._close_stage()
+        self.stage = None
+        return self.timings
+
+
+def run_job(job):
+    """
+    Ejecuta un trabajo ya tomado y guarda su resultado.
+
+    Args:
+        job (TrainingJob): Trabajo en estado 'running'
+
+    Returns:
+        TrainingJob: Trabajo actualizado
+    """
+    params = dict(DEFAULT_TRAINING_PARAMS, **job.params)
+    progress = JobProgress(job)
+    print(f"Ejecutando trabajo de entrenamiento {job.id}")
+
+    # El latido mantiene el trabajo como vivo aunque una etapa tarde mucho
+    with Heartbeat(TrainingJob.objects.filter(id=job.id), 'heartbeat_at'):
+        try:
+            if params['mode'] == 'tune':
+                result = tune_hyperparameters_from_db(
+                    model_class=Siniestro,
+                    target_col=params['target_col'],
+                    filter_kwargs=params['filter_kwargs'],
+                    progress_callback=progress,
+                    **(params['tuning'] or {})
+                )
+            elif params['mode'] == 'incremental':
+                result = incremental_retrain_from_db(
+                    model_class=Siniestro,
+                    target_col=params['target_col'],
+                    filter_kwargs=params['filter_kwargs'],
+                    model_filename=params['model_filename'],
+                    metrics_filename=params['metrics_filename'],
+                    progress_callback=progress,
+                    engine=params['engine']
+                )
+            else:
+                result = train_accident_model_from_db(
+                    model_class=Siniestro,
+                    target_col=params['target_col'],
+                    filter_kwargs=params['filter_kwargs'],
+                    model_filename=params['model_filename'],
+                    metrics_filename=params['metrics_filename'],
+                    progress_callback=progress,
+                    engine=params['engine']
+                )
+            error = '' if result['success'] else result.get('error', '')
+        except Exception as e:
+            result = {
+                'success': False,
+                'message': 'Error durante el entrenamiento del modelo',
+                'error': str(e)
+            }
+            error = traceback.format_exc()
+
+    # En caso de error se conserva la etapa en la que falló
+    last_stage, last_progress = progress.stage or '', progress.progress
+    timings = progress.finish()
+    succeeded = result['success']
+    TrainingJob.objects.filter(id=job.id).update(
+        status=TrainingJob.STATUS_SUCCEEDED if succeeded else TrainingJob.STATUS_FAILED,
+        stage='done' if succeeded else last_stage,
+        progress=1.0 if succeeded else last_progress,
+        stage_timings=timings,
+        result=result,
+        error=error,
+        finished_at=timezone.now()
+    )
+    job.refresh_from_db()
+    print(f"Trabajo de entrenamiento {job.id} terminado: {job.status}")
+    return job
+
+
+def run_job_now(job, worker_name=None):
+    """
+    Ejecuta un trabajo pendiente en el proceso actual (p. ej. con wait=true).
+
+    Args:
+        job (TrainingJob): Trabajo pendiente
+        worker_name (str, optional): Identificador del worker
+
+    Returns:
+        TrainingJob: Trabajo actualizado (sin cambios si otro worker ya lo tomó)
+    """
+    now = timezone.now()
+    claimed = TrainingJob.objects.filter(id=job.id, status=TrainingJob.STATUS_PENDING).update(
+        status=TrainingJob.STATUS_RUNNING,
+        worker=worker_name or default_worker_name(),
+        started_at=now,
+        heartbeat_at=now
+    )
+    job.refresh_from_db()
+    if not claimed:
+        return job
+    return run_job(job)
+
+
+def run_pending_jobs(worker_name=None, max_jobs=None):
+    """
+    Ejecuta trabajos pendientes hasta vaciar la cola.
+
+    Args:
+        worker_name (str, optional): Identificador del worker
+        max_jobs (int, optional): Máximo de trabajos a ejecutar
+
+    Returns:
+        int: Cantidad de trabajos ejecutados
+    """
+    executed = 0
+    while max_jobs is None or executed < max_jobs:
+        job = claim_next_job(worker_name)
+        if job is None:
+            break
+        run_job(job)
+        executed += 1
+    return executed
+
+
+def schedule_full_retrain(interval_hours, model_filename='modelo_accidentes.pkl'):
+    """
+    Encola un entrenamiento completo si el último tiene más de interval_hours.
+
+    Los reentrenamientos incrementales van acumulando árboles ajustados a
+    ventanas pequeñas; el entrenamiento completo periódico reconstruye el
+    bosque sobre toda la tabla.
+
+    Args:
+        interval_hours (float): Horas entre entrenamientos completos (0 lo desactiva)
+        model_filename (str): Nombre del archivo del modelo
+
+    Returns:
+        TrainingJob: Trabajo encolado, o None si no corresponde
+    """
+    if not interval_hours:
+        return None
+    jobs = TrainingJob.objects.filter(params__mode='full', params__model_filename=model_filename)
+    if jobs.filter(status__in=[TrainingJob.STATUS_PENDING, TrainingJob.STATUS_RUNNING]).exists():
+        return None
+    last = jobs.filter(status=TrainingJob.STATUS_SUCCEEDED).order_by('-finished_at').first()
+    if last is not None and timezone.now() - last.finished_at < timedelta(hours=interval_hours):
+        return None
+    if last is None and not Siniestro.objects.exists():
+        return None
+    return enqueue_training_job({'mode': 'full', 'model_filename': model_filename}, source='schedule')
+
+
+def serialize_job(job):
+    """Representación JSON de un trabajo para la API."""
+    result = dict(job.result or {})
+    metrics = result.pop('metrics', None)
+    elapsed = None
+    if job.started_at:
+        elapsed = ((job.finished_at or timezone.now()) - job.started_at).total_seconds()
+    return {
+        'job_id': job.id,
+        'status': job.status,
+        'source': job.source,
+        'stage': job.stage,
+        'progress': job.progress,
+        'stage_timings': job.stage_timings,
+        'params': job.params,
+        'worker': job.worker,
+        'created_at': job.created_at.isoformat(),
+        'started_at': job.started_at.isoformat() if job.started_at else None,
+        'heartbeat_at': job.heartbeat_at.isoformat() if job.heartbeat_at else None,
+        'finished_at': job.finished_at.isoformat() if job.finished_at else None,
+        'elapsed_seconds': round(elapsed, 3) if elapsed is not None else None,
+        'metrics': metrics,
+        'result': result or None,
+        'error': job.error or None
+    }
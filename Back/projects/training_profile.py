@@ -0,0 +1,124 @@
+"""
+Presupuesto de CPU y perfil por etapa del entrenamiento.
+
+Cada etapa (carga, preparación, SMOTE, entrenamiento, evaluación, guardado)
+registra su tiempo de pared y la memoria residente máxima del proceso,
+medida con un hilo que muestrea el RSS mientras la etapa corre. El
+resultado se guarda en las métricas (``training_profile``) para ver cómo
+escala el entrenamiento a medida que crece la tabla.
+"""
+
+import functools
+import os
+import resource
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from django.conf import settings
+from joblib import cpu_count
+from threadpoolctl import threadpool_limits
+
+# Intervalo de muestreo del RSS durante cada etapa
+RSS_SAMPLE_INTERVAL = 0.05
+
+
+def get_training_cpu_budget(n_jobs=None):
+    """
+    Retorna la cantidad de núcleos que puede usar el entrenamiento.
+
+    Sigue la convención de joblib: -1 usa todos los núcleos disponibles
+    (respetando los límites del contenedor), -2 todos menos uno, etc.
+
+    Args:
+        n_jobs (int, optional): Presupuesto solicitado (por defecto TRAINING_N_JOBS)
+
+    Returns:
+        int: Núcleos a usar (al menos 1)
+    """
+    if n_jobs is None:
+        n_jobs = getattr(settings, 'TRAINING_N_JOBS', -1)
+    n_jobs = int(n_jobs)
+    available = cpu_count()
+    if n_jobs < 0:
+        n_jobs = available + 1 + n_jobs
+    return max(1, min(n_jobs, available))
+
+
+def _current_rss_bytes():
+    """RSS actual del proceso (en Linux); en otros sistemas, el máximo histórico."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == 'darwin' else peak * 1024
+
+
+class StageProfiler:
+    """Acumula tiempo de pared y memoria máxima de cada etapa del entrenamiento."""
+
+    def __init__(self, cpu_budget=None):
+        self.cpu_budget = cpu_budget or get_training_cpu_budget()
+        self.stages = {}
+
+    @contextmanager
+    def stage(self, name):
+        """
+        Mide una etapa y limita los hilos de BLAS/OpenMP al presupuesto de CPU.
+
+        Args:
+            name (str): Nombre de la etapa
+        """
+        start_rss = _current_rss_bytes()
+        peak = [start_rss]
+        done = threading.Event()
+
+        def sample():
+            while not done.wait(RSS_SAMPLE_INTERVAL):
+                peak[0] = max(peak[0], _current_rss_bytes())
+
+        sampler = threading.Thread(target=sample, daemon=True)
+        sampler.start()
+        start = time.perf_counter()
+        try:
+            with threadpool_limits(limits=self.cpu_budget):
+                yield
+        finally:
+            elapsed = time.perf_counter() - start
+            done.set()
+            sampler.join()
+            end_rss = _current_rss_bytes()
+            peak[0] = max(peak[0], end_rss)
+            previous = self.stages.get(name, {})
+            self.stages[name] = {
+                'wall_seconds': round(previous.get('wall_seconds', 0.0) + elapsed, 3),
+                'peak_rss_mb': round(max(previous.get('peak_rss_mb', 0.0), peak[0] / (1024 * 1024)), 1),
+                'rss_delta_mb': round((end_rss - start_rss) / (1024 * 1024), 1)
+            }
+
+    def to_dict(self):
+        """Perfil completo para las métricas."""
+        return {
+            'cpu_budget': self.cpu_budget,
+            'cpu_count': cpu_count(),
+            'total_wall_seconds': round(sum(stage['wall_seconds'] for stage in self.stages.values()), 3),
+            'peak_rss_mb': max((stage['peak_rss_mb'] for stage in self.stages.values()), default=None),
+            'stages': dict(self.stages)
+        }
+
+
+def profiled_stage(name):
+    """
+    Decorador para métodos de AccidentPredictorAPI que constituyen una etapa.
+
+    Args:
+        name (str): Nombre de la etapa en el perfil
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            with self.profiler.stage(name):
+                return method(self, *args, **kwargs)
+        return wrapper
+    return decorator
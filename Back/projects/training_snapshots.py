@@ -0,0 +1,272 @@
+"""
+Snapshots en disco de la matriz de entrenamiento.
+
+La primera carga guarda cada columna como un ``.npy`` y anota la versión de
+los datos: cantidad de filas, llave máxima, último ``FECHA_INGRESO`` y
+última ``FECHA_MODIFICACION``. En los siguientes entrenamientos una sola
+consulta de agregación decide qué hacer. Si la versión coincide, las
+columnas se abren con ``np.load(..., mmap_mode='c')`` sin leer la tabla
+(copy-on-write: las páginas se comparten con la caché del sistema y una
+escritura nunca llega al archivo). Si solo se agregaron filas (las
+anteriores conservan su versión), se leen únicamente las filas nuevas y se
+anexan. En cualquier otro caso (eliminaciones, ediciones de filas
+existentes) el snapshot se reconstruye.
+
+``FECHA_MODIFICACION`` la asignan ``save()`` y ``bulk_create`` (auto_now),
+así que las ediciones por la API se detectan. Un ``QuerySet.update()`` o un
+UPDATE por SQL directo no la cambia: quien modifique filas así debe
+asignarla también, o deshabilitar los snapshots (TRAINING_SNAPSHOTS_ENABLED).
+
+Cada combinación de modelo, campos y filtros tiene su propio snapshot.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import time
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.db.models import Count, Max
+from .columnar_loader import load_columns, load_dataframe
+
+SNAPSHOT_FORMAT_VERSION = 1
+
+# Campos con la fecha de ingreso y la de última modificación que forman parte
+# de la versión de los datos
+INGRESO_FIELD = 'FECHA_INGRESO'
+MODIFIED_FIELD = 'FECHA_MODIFICACION'
+
+
+def get_snapshot_dir():
+    return getattr(settings, 'TRAINING_SNAPSHOT_DIR', os.path.join(settings.BASE_DIR, 'training_snapshots'))
+
+
+def snapshot_key(queryset, fields):
+    """
+    Identifica el snapshot de un queryset: modelo, campos y filtros.
+
+    Args:
+        queryset: QuerySet de Django con los filtros a aplicar
+        fields (list): Campos cargados
+
+    Returns:
+        str: Llave hexadecimal corta
+    """
+    query = str(queryset.order_by().values('pk').query)
+    source = json.dumps([queryset.model._meta.label, list(fields), query])
+    return hashlib.sha1(source.encode('utf-8')).hexdigest()[:16]
+
+
+def data_version(queryset):
+    """
+    Retorna la versión actual de los datos del queryset.
+
+    Args:
+        queryset: QuerySet de Django
+
+    Returns:
+        dict: rows, max_pk, last_ingreso y last_modified (ISO, o None si el
+        modelo no tiene FECHA_INGRESO o FECHA_MODIFICACION)
+    """
+    aggregates = {'rows': Count('pk'), 'max_pk': Max('pk')}
+    if _has_field(queryset, INGRESO_FIELD):
+        aggregates['last_ingreso'] = Max(INGRESO_FIELD)
+    if _has_field(queryset, MODIFIED_FIELD):
+        aggregates['last_modified'] = Max(MODIFIED_FIELD)
+    version = queryset.aggregate(**aggregates)
+    return _normalize_version(version)
+
+
+def _has_field(queryset, name):
+    return any(field.name == name for field in queryset.model._meta.concrete_fields)
+
+
+def _normalize_version(version):
+    last_ingreso = version.get('last_ingreso')
+    last_modified = version.get('last_modified')
+    return {
+        'rows': int(version['rows'] or 0),
+        'max_pk': version['max_pk'],
+        'last_ingreso': last_ingreso.isoformat() if last_ingreso is not None else None,
+        'last_modified': last_modified.isoformat() if last_modified is not None else None
+    }
+
+
+class TrainingSnapshot:
+    """Columnas de entrenamiento de un queryset guardadas como ``.npy``."""
+
+    def __init__(self, key, fields, base_dir=None):
+        self.key = key
+        self.fields = list(fields)
+        self.path = os.path.join(base_dir or get_snapshot_dir(), key)
+        self.meta_path = os.path.join(self.path, 'meta.json')
+
+    def _column_path(self, field, suffix=''):
+        return os.path.join(self.path, f'{field}.npy{suffix}')
+
+    def read_meta(self):
+        """Retorna los metadatos, o None si el snapshot no existe o es de otro formato."""
+        try:
+            with open(self.meta_path) as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if meta.get('format') != SNAPSHOT_FORMAT_VERSION or meta.get('fields') != self.fields:
+            return None
+        return meta
+
+    def _write_meta(self, version):
+        meta = {
+            'format': SNAPSHOT_FORMAT_VERSION,
+            'fields': self.fields,
+            'version': version,
+            'updated_at': time.time()
+        }
+        tmp_path = self.meta_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, self.meta_path)
+
+    def load(self, rows):
+        """
+        Abre las columnas con mmap.
+
+        Args:
+            rows (int): Filas esperadas según los metadatos
+
+        Returns:
+            dict: {campo: np.memmap}, o None si algún archivo falta o no coincide
+        """
+        columns = {}
+        for field in self.fields:
+            try:
+                values = np.load(self._column_path(field), mmap_mode='c')
+            except (OSError, ValueError):
+                return None
+            if values.shape != (rows,):
+                return None
+            columns[field] = values
+        return columns
+
+    def write(self, columns, version):
+        """
+        Reemplaza el snapshot con columnas completas.
+
+        Args:
+            columns (dict): {campo: np.ndarray}
+            version (dict): Versión de los datos que contienen
+        """
+        os.makedirs(self.path, exist_ok=True)
+        # Los metadatos se invalidan primero: un snapshot a medio escribir nunca se usa
+        if os.path.exists(self.meta_path):
+            os.remove(self.meta_path)
+        for field in self.fields:
+            tmp_path = self._column_path(field, '.tmp')
+            with open(tmp_path, 'wb') as f:
+                np.save(f, np.ascontiguousarray(columns[field]))
+            os.replace(tmp_path, self._column_path(field))
+        self._write_meta(version)
+
+    def append(self, current, new_columns, version):
+        """
+        Anexa filas nuevas a cada columna (con el dtype ampliado si hace falta).
+
+        Args:
+            current (dict): Columnas actuales (mmap)
+            new_columns (dict): Filas nuevas por campo
+            version (dict): Versión de los datos resultante
+        """
+        if os.path.exists(self.meta_path):
+            os.remove(self.meta_path)
+        for field in self.fields:
+            old, new = current[field], new_columns[field]
+            dtype = np.result_type(old.dtype, new.dtype)
+            tmp_path = self._column_path(field, '.tmp')
+            out = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=dtype, shape=(len(old) + len(new),))
+            out[:len(old)] = old
+            out[len(old):] = new
+            out.flush()
+            del out
+            os.replace(tmp_path, self._column_path(field))
+        self._write_meta(version)
+
+
+def _prune_snapshots(keep_key, base_dir=None):
+    """Conserva solo los TRAINING_SNAPSHOT_KEEP snapshots usados más recientemente."""
+    keep = getattr(settings, 'TRAINING_SNAPSHOT_KEEP', 4)
+    base_dir = base_dir or get_snapshot_dir()
+    entries = []
+    for name in os.listdir(base_dir):
+        meta_path = os.path.join(base_dir, name, 'meta.json')
+        mtime = os.path.getmtime(meta_path) if os.path.exists(meta_path) else 0
+        entries.append((mtime, name))
+    entries.sort(reverse=True)
+    for _, name in entries[keep:]:
+        if name != keep_key:
+            shutil.rmtree(os.path.join(base_dir, name), ignore_errors=True)
+
+
+def load_training_dataframe(queryset, fields, chunk_size=None):
+    """
+    Carga las columnas de entrenamiento usando el snapshot en disco cuando es posible.
+
+    Args:
+        queryset: QuerySet de Django con los filtros a aplicar
+        fields (list): Campos enteros a cargar
+        chunk_size (int, optional): Filas por consulta al leer de la base de datos
+
+    Returns:
+        pd.DataFrame: Con la llave máxima en ``df.attrs['max_pk']`` y el origen
+        ('snapshot', 'append' o 'database') en ``df.attrs['snapshot']``
+    """
+    if not getattr(settings, 'TRAINING_SNAPSHOTS_ENABLED', True):
+        return load_dataframe(queryset, fields, chunk_size)
+
+    start = time.perf_counter()
+    fields = list(fields)
+    version = data_version(queryset)
+    if version['max_pk'] is None:
+        return load_dataframe(queryset, fields, chunk_size)
+
+    snapshot = TrainingSnapshot(snapshot_key(queryset, fields), fields)
+    meta = snapshot.read_meta()
+    columns = snapshot.load(meta['version']['rows']) if meta else None
+    source = 'database'
+
+    if columns is not None:
+        previous = meta['version']
+        if previous == version:
+            source = 'snapshot'
+        elif previous['max_pk'] is not None and version['max_pk'] > previous['max_pk']:
+            # Solo se anexan filas si las anteriores no cambiaron
+            old_version = data_version(queryset.filter(pk__lte=previous['max_pk']))
+            if old_version == previous:
+                new_columns = load_columns(
+                    queryset.filter(pk__gt=previous['max_pk']), fields, chunk_size, max_pk=version['max_pk']
+                )
+                new_rows = len(new_columns[fields[0]]) if fields else 0
+                if previous['rows'] + new_rows == version['rows']:
+                    snapshot.append(columns, new_columns, version)
+                    columns = snapshot.load(version['rows'])
+                    source = 'append'
+                    print(f"Snapshot de entrenamiento: {new_rows} filas nuevas anexadas")
+
+    if source == 'database':
+        columns = load_columns(queryset, fields, chunk_size, max_pk=version['max_pk'])
+        rows = len(columns[fields[0]]) if fields else 0
+        if rows == version['rows']:
+            snapshot.write(columns, version)
+            columns = snapshot.load(version['rows'])
+            _prune_snapshots(snapshot.key)
+        else:
+            # La tabla cambió durante la carga: se usa sin guardar el snapshot
+            print("La tabla cambió durante la carga; no se guarda el snapshot de entrenamiento")
+
+    df = pd.DataFrame(columns, copy=False)
+    df.attrs['max_pk'] = version['max_pk']
+    df.attrs['snapshot'] = source
+    elapsed = time.perf_counter() - start
+    print(f"Carga de entrenamiento ({source}): {len(df)} filas en {elapsed:.2f}s")
+    return df
@@ -0,0 +1,227 @@
+from django.http import StreamingHttpResponse
+from rest_framework import status
+from rest_framework.decorators import api_view
+from rest_framework.response import Response
+from .chunked_uploads import (
+    COPY_BUFFER_BYTES, RESULT_NAME, ChunkedUploadError, abort_upload, claim_upload, complete_upload, create_upload,
+    get_part_storage, process_upload, receive_part, serialize_upload
+)
+from .model_registry import get_model_registry
+from .models import UploadSession
+from .training_jobs import default_worker_name
+
+
+def _error_response(e):
+    return Response(dict({
+        'success': False,
+        'message': str(e)
+    }, **e.details), status=e.status_code)
+
+
+def _get_session(request, upload_id):
+    """Sesión del usuario (o de cualquiera para staff); (sesión, None) o (None, respuesta de error)."""
+    try:
+        session = UploadSession.objects.get(id=upload_id)
+    except UploadSession.DoesNotExist:
+        session = None
+    if session is None or (session.created_by_id not in (None, request.user.id) and not request.user.is_staff):
+        return None, Response({
+            'success': False,
+            'message': f'Carga {upload_id} no encontrada'
+        }, status=status.HTTP_404_NOT_FOUND)
+    return session, None
+
+
+def _flag(value):
+    return None if value is None else str(value).lower() == 'true'
+
+
+def _int_or_none(value, name):
+    if value in (None, ''):
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ChunkedUploadError(f'{name} debe ser un entero')
+
+
+@api_view(['POST'])
+def create_upload_session(request):
+    """
+    Inicia una carga por partes.
+
+    Parámetros: purpose ('ingest' o 'predict'), filename y opcionalmente
+    total_size y total_parts (se verifican al completar). Para 'ingest':
+    validate_data, default_date, load_mode, auto_retrain y retrain_mode, como
+    en /api/upload-and-train/. Para 'predict': model_filename, threshold y
+    chunk_size, como en /api/batch-predict/.
+
+    Las partes se suben con PUT /api/uploads/<id>/parts/<n>/ (cuerpo binario,
+    opcionalmente con el encabezado X-Content-SHA256) y la carga se cierra con
+    POST /api/uploads/<id>/complete/.
+    """
+    try:
+        data = request.data
+        purpose = data.get('purpose')
+        params = {
+            'validate_data': _flag(data.get('validate_data')),
+            'default_date': data.get('default_date'),
+            'load_mode': data.get('load_mode'),
+            'auto_retrain': _flag(data.get('auto_retrain')),
+            'retrain_mode': data.get('retrain_mode'),
+            'model_filename': data.get('model_filename'),
+            'threshold': float(data['threshold']) if data.get('threshold') is not None else None,
+            'chunk_size': _int_or_none(data.get('chunk_size'), 'chunk_size')
+        }
+        if purpose == UploadSession.PURPOSE_PREDICT:
+            model_filename = params['model_filename'] or 'modelo_accidentes.pkl'
+            if not get_model_registry().model_exists(model_filename):
+                return Response({
+                    'success': False,
+                    'message': 'Modelo no encontrado. Primero entrene el modelo usando /api/train-model/'
+                }, status=status.HTTP_404_NOT_FOUND)
+
+        session = create_upload(
+            purpose,
+            data.get('filename'),
+            params=params,
+            expected_size=_int_or_none(data.get('total_size'), 'total_size'),
+            expected_parts=_int_or_none(data.get('total_parts'), 'total_parts'),
+            user=request.user
+        )
+        return Response({
+            'success': True,
+            'message': 'Carga iniciada. Suba las partes y luego complétela.',
+            'upload': serialize_upload(session),
+            'part_url': f'/api/uploads/{session.id}/parts/<n>/',
+            'complete_url': f'/api/uploads/{session.id}/complete/',
+            'status_url': f'/api/uploads/{session.id}/'
+        }, status=status.HTTP_201_CREATED)
+
+    except ChunkedUploadError as e:
+        return _error_response(e)
+    except ValueError as e:
+        return Response({
+            'success': False,
+            'message': f'Parámetro no válido: {str(e)}'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+
+@api_view(['PUT'])
+def upload_part(request, upload_id, part_number):
+    """
+    Recibe una parte (cuerpo binario). Volver a subir una parte la reemplaza,
+    así que ante un corte basta con reintentar esa parte.
+    """
+    session, error_response = _get_session(request, upload_id)
+    if error_response:
+        return error_response
+
+    stream = request.stream
+    if stream is None:
+        return Response({
+            'success': False,
+            'message': 'La parte está vacía'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        content_length = int(request.META.get('CONTENT_LENGTH') or 0) or None
+        part = receive_part(
+            session, part_number, stream,
+            content_length=content_length,
+            sha256=request.headers.get('X-Content-SHA256') or request.query_params.get('sha256')
+        )
+    except ChunkedUploadError as e:
+        return _error_response(e)
+
+    return Response({
+        'success': True,
+        'part': {'number': part.number, 'size': part.size, 'sha256': part.sha256},
+        'file_info': session.file_info or None
+    }, status=status.HTTP_200_OK)
+
+
+@api_view(['GET', 'DELETE'])
+def upload_session(request, upload_id):
+    """
+    GET: estado de la carga, partes recibidas y, al terminar, el resultado.
+    DELETE: cancela la carga y borra sus partes.
+    """
+    session, error_response = _get_session(request, upload_id)
+    if error_response:
+        return error_response
+
+    if request.method == 'DELETE':
+        try:
+            session = abort_upload(session)
+        except ChunkedUploadError as e:
+            return _error_response(e)
+
+    return Response({
+        'success': True,
+        'upload': serialize_upload(session)
+    }, status=status.HTTP_200_OK)
+
+
+@api_view(['POST'])
+def complete_upload_session(request, upload_id):
+    """
+    Cierra la carga y la encola; la procesa el comando run_training_worker.
+
+    Con wait=true se procesa dentro de la petición (útil en desarrollo).
+    """
+    session, error_response = _get_session(request, upload_id)
+    if error_response:
+        return error_response
+
+    try:
+        session = complete_upload(session)
+    except ChunkedUploadError as e:
+        return _error_response(e)
+
+    wait = str(request.data.get('wait', 'false')).lower() == 'true'
+    if wait and claim_upload(session.id, default_worker_name()):
+        session = process_upload(UploadSession.objects.get(id=session.id))
+        return Response({
+            'success': session.status == UploadSession.STATUS_COMPLETED,
+            'upload': serialize_upload(session)
+        }, status=status.HTTP_200_OK)
+
+    return Response({
+        'success': True,
+        'message': 'Carga completa; el procesamiento quedó en cola',
+        'upload': serialize_upload(session),
+        'status_url': f'/api/uploads/{session.id}/'
+    }, status=status.HTTP_202_ACCEPTED)
+
+
+@api_view(['GET'])
+def upload_result(request, upload_id):
+    """Descarga el CSV de predicciones de una carga 'predict' terminada."""
+    session, error_response = _get_session(request, upload_id)
+    if error_response:
+        return error_response
+
+    storage = get_part_storage(session.storage)
+    if session.purpose != UploadSession.PURPOSE_PREDICT or session.status != UploadSession.STATUS_COMPLETED \
+            or not storage.exists(session.id, RESULT_NAME):
+        return Response({
+            'success': False,
+            'message': 'La carga no tiene un resultado de predicción disponible',
+            'status': session.status
+        }, status=status.HTTP_404_NOT_FOUND)
+
+    def chunks():
+        result = storage.open(session.id, RESULT_NAME)
+        try:
+            while True:
+                data = result.read(COPY_BUFFER_BYTES)
+                if not data:
+                    break
+                yield data
+        finally:
+            result.close()
+
+    response = StreamingHttpResponse(chunks(), content_type='text/csv; charset=utf-8')
+    response['Content-Disposition'] = f'attachment; filename="predicciones_{session.id}.csv"'
+    return response
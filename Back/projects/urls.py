@@ -4,6 +4,8 @@ from rest_framework_simplejwt.views import TokenRefreshView
 from .api import SiniestroViewSet
 from . import views
 from . import auth_views
+from . import async_views
+from . import upload_views
 
 router = routers.DefaultRouter()
 
@@ -19,11 +21,22 @@ urlpatterns = [
     
     # Endpoints existentes de ML
     path('api/train-model/', views.train_model, name='train_model'),
+    path('api/tune-model/', views.tune_model, name='tune_model'),
+    path('api/train-jobs/<int:job_id>/', views.train_job_status, name='train_job_status'),
     path('api/predict/', views.predict, name='predict'),
+    path('api/predict-async/', async_views.predict_async, name='predict_async'),
     path('api/model-info/', views.model_info, name='model_info'),
+    path('api/ready/', views.readiness, name='readiness'),
     path('api/batch-predict/', views.batch_predict, name='batch_predict'),
     path('api/download-csv/', views.download_csv, name='download_csv'),
     path('api/download-template/', views.download_template_csv, name='download_template_csv'),
     path('api/upload-and-train/', views.upload_and_retrain, name='upload_and_retrain'), 
     path('api/download-data-template/', views.download_data_template, name='download_data_template'),
+    
+    # Carga reanudable por partes (ingesta o predicción por lotes)
+    path('api/uploads/', upload_views.create_upload_session, name='create_upload_session'),
+    path('api/uploads/<uuid:upload_id>/', upload_views.upload_session, name='upload_session'),
+    path('api/uploads/<uuid:upload_id>/parts/<int:part_number>/', upload_views.upload_part, name='upload_part'),
+    path('api/uploads/<uuid:upload_id>/complete/', upload_views.complete_upload_session, name='complete_upload_session'),
+    path('api/uploads/<uuid:upload_id>/result/', upload_views.upload_result, name='upload_result'),
 ] + router.urls
@@ -1,61 +1,114 @@
 from django.shortcuts import render
-from rest_framework.decorators import api_view, parser_classes
+from rest_framework.decorators import api_view, parser_classes, permission_classes, authentication_classes
+from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
 from rest_framework import status
-from rest_framework.parsers import MultiPartParser, FormParser
+from rest_framework.exceptions import ParseError, UnsupportedMediaType
+from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
 from django.conf import settings
-import os
-import joblib
-import json
 import pandas as pd
-from .model_trainer import train_accident_model_from_db, AccidentPredictorAPI
-from .models import Siniestro
-from django.http import HttpResponse
+from .models import Siniestro, TrainingJob
+from django.http import HttpResponse, StreamingHttpResponse
 import io
-from django.db import transaction
 from datetime import datetime, date
 import traceback
 from .s3_utils import get_storage_handler
+from .model_registry import get_model_registry
+from .prediction_cache import get_prediction_cache
+from .parallel_scoring import get_parallel_predictor
+from .batch_streaming import open_csv_chunks, stream_predictions_csv
+from .warmup import get_readiness
+from .csv_ingestion import CsvUploadError, ingest_csv_upload, is_supported_upload
+from .native_load import load_csv_native
+from .training_jobs import RETRAIN_MODES, enqueue_training_job, run_job_now, serialize_job
+from .model_engines import ENGINES
+from .binary_formats import BINARY_PARSERS, FeatureMatrix, encode_results
+from .prediction_results import (
+    build_prediction_columns, rows_from_columns, summarize_predictions, risk_levels
+)
 
 @api_view(['POST'])
 def train_model(request):
     """
-    Entrena el modelo y guarda los resultados usando el storage configurado (local o S3).
+    Encola el entrenamiento del modelo y responde de inmediato con el id del trabajo.
+    
+    El entrenamiento lo ejecuta el comando run_training_worker; el estado se
+    consulta en /api/train-jobs/<id>/. Con wait=true se ejecuta dentro de la
+    petición (comportamiento anterior) y la respuesta incluye las métricas.
+    
+    mode=incremental agrega árboles entrenados con los registros nuevos en
+    lugar de reentrenar sobre toda la tabla. engine elige el motor de modelo
+    (random_forest o hist_gradient_boosting; por defecto MODEL_ENGINE).
     """
     try:
         # Parámetros opcionales del request
         target_col = request.data.get('target_col', 'ACCIDENTE')
         model_filename = request.data.get('model_filename', 'modelo_accidentes.pkl')
         metrics_filename = request.data.get('metrics_filename', 'metricas_modelo.json')
+        mode = request.data.get('mode', 'full')
+        engine = request.data.get('engine') or None
+        wait = str(request.data.get('wait', 'false')).lower() == 'true'
+        
+        if mode not in RETRAIN_MODES:
+            return Response({
+                'success': False,
+                'message': f'Modo de entrenamiento no válido: {mode}. Opciones: {list(RETRAIN_MODES)}'
+            }, status=status.HTTP_400_BAD_REQUEST)
         
-        # Entrenar el modelo usando el modelo Siniestro
-        result = train_accident_model_from_db(
-            model_class=Siniestro,
-            target_col=target_col,
-            model_filename=model_filename,
-            metrics_filename=metrics_filename
-        )
+        if engine is not None and engine not in ENGINES:
+            return Response({
+                'success': False,
+                'message': f'Motor de modelo no válido: {engine}. Opciones: {list(ENGINES)}'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        job = enqueue_training_job({
+            'mode': mode,
+            'target_col': target_col,
+            'model_filename': model_filename,
+            'metrics_filename': metrics_filename,
+            'engine': engine
+        }, source='api', user=request.user)
+        
+        training_info = {
+            'model_engine': engine or getattr(settings, 'MODEL_ENGINE', 'random_forest'),
+            'features_used': Siniestro.TRAINING_FIELDS,
+            'target_variable': target_col,
+            'excluded_columns': ['FECHA_SINIESTRO', 'FECHA_INGRESO', 'FINGERPRINT', 'FECHA_MODIFICACION', 'id']
+        }
         
-        if result['success']:
+        if not wait:
+            return Response({
+                'success': True,
+                'message': 'Entrenamiento encolado',
+                'job_id': job.id,
+                'status': job.status,
+                'status_url': f'/api/train-jobs/{job.id}/',
+                'storage_type': 'S3' if getattr(settings, 'USE_S3_STORAGE', False) else 'Local',
+                'training_info': training_info
+            }, status=status.HTTP_202_ACCEPTED)
+        
+        # Ejecutar el trabajo en esta petición
+        job = run_job_now(job)
+        result = job.result or {}
+        
+        if job.status == TrainingJob.STATUS_SUCCEEDED:
             return Response({
                 'success': True,
                 'message': 'Modelo entrenado exitosamente',
+                'job_id': job.id,
                 'model_path': result.get('model_path'),
                 'metrics_path': result.get('metrics_path'),
                 'metrics': result['metrics'],
+                'stage_timings': job.stage_timings,
                 'storage_type': 'S3' if getattr(settings, 'USE_S3_STORAGE', False) else 'Local',
-                'training_info': {
-                    'total_records': result['metrics'].get('total_samples', 'N/A'),
-                    'features_used': Siniestro.TRAINING_FIELDS,
-                    'target_variable': target_col,
-                    'excluded_columns': ['FECHA_SINIESTRO', 'FECHA_INGRESO', 'id']
-                }
+                'training_info': dict(training_info, total_records=result['metrics'].get('total_samples', 'N/A'))
             }, status=status.HTTP_200_OK)
         else:
             return Response({
                 'success': False,
-                'message': result['message'],
-                'error': result['error']
+                'job_id': job.id,
+                'message': result.get('message', 'Error durante el entrenamiento del modelo'),
+                'error': result.get('error', job.error)
             }, status=status.HTTP_400_BAD_REQUEST)
             
     except Exception as e:
@@ -65,25 +118,161 @@ def train_model(request):
             'error': str(e)
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+@api_view(['GET'])
+def train_job_status(request, job_id):
+    """
+    Retorna el estado, progreso, duración por etapa y métricas de un trabajo de entrenamiento.
+    """
+    try:
+        job = TrainingJob.objects.get(id=job_id)
+    except TrainingJob.DoesNotExist:
+        return Response({
+            'success': False,
+            'message': f'Trabajo de entrenamiento {job_id} no encontrado'
+        }, status=status.HTTP_404_NOT_FOUND)
+    
+    return Response({
+        'success': True,
+        'job': serialize_job(job)
+    }, status=status.HTTP_200_OK)
+
+@api_view(['POST'])
+def tune_model(request):
+    """
+    Encola una búsqueda de hiperparámetros (successive halving) y responde con el id del trabajo.
+    
+    Los mejores parámetros se guardan y los usa el siguiente entrenamiento.
+    Parámetros opcionales: cv, factor, max_rows, save (por defecto true) y
+    wait=true para ejecutar la búsqueda dentro de la petición.
+    """
+    try:
+        tuning = {}
+        for key in ('cv', 'factor', 'max_rows'):
+            value = request.data.get(key)
+            if value not in (None, ''):
+                tuning[key] = int(value)
+        tuning['save'] = str(request.data.get('save', 'true')).lower() == 'true'
+        wait = str(request.data.get('wait', 'false')).lower() == 'true'
+        
+        job = enqueue_training_job({
+            'mode': 'tune',
+            'target_col': request.data.get('target_col', 'ACCIDENTE'),
+            'tuning': tuning
+        }, source='api', user=request.user)
+        
+        if not wait:
+            return Response({
+                'success': True,
+                'message': 'Búsqueda de hiperparámetros encolada',
+                'job_id': job.id,
+                'status': job.status,
+                'status_url': f'/api/train-jobs/{job.id}/'
+            }, status=status.HTTP_202_ACCEPTED)
+        
+        job = run_job_now(job)
+        result = job.result or {}
+        if job.status == TrainingJob.STATUS_SUCCEEDED:
+            return Response({
+                'success': True,
+                'message': result.get('message'),
+                'job_id': job.id,
+                'best_params': result.get('best_params'),
+                'best_score': result.get('best_score'),
+                'search': result.get('search'),
+                'stage_timings': job.stage_timings
+            }, status=status.HTTP_200_OK)
+        return Response({
+            'success': False,
+            'job_id': job.id,
+            'message': result.get('message', 'Error durante la búsqueda de hiperparámetros'),
+            'error': result.get('error', job.error)
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    except ValueError as e:
+        return Response({
+            'success': False,
+            'message': 'Parámetros de búsqueda no válidos',
+            'error': str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
+    except Exception as e:
+        return Response({
+            'success': False,
+            'message': 'Error interno del servidor',
+            'error': str(e)
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+def _invalid_input_response(validation):
+    """Respuesta 400 con las filas y columnas que no cumplen el esquema del modelo."""
+    return Response({
+        'success': False,
+        'message': 'Se encontraron valores nulos, no enteros o fuera de rango en campos requeridos',
+        'validation': validation.report(),
+        'required_fields': Siniestro.TRAINING_FIELDS
+    }, status=status.HTTP_400_BAD_REQUEST)
+
+def _binary_prediction_response(request, matrix, predictor, schema):
+    """
+    Responde una predicción cuyo cuerpo llegó en formato binario o columnar.
+    
+    Los parámetros (threshold, response_format) se leen del query string. Por
+    defecto la respuesta usa el mismo formato de la petición; con
+    response_format=json se devuelve JSON columnar.
+    """
+    threshold = float(request.query_params.get('threshold', 0.5))
+    validation = schema.validate(matrix.values)
+    if not validation.is_valid:
+        return _invalid_input_response(validation)
+    
+    probabilities = get_prediction_cache().predict_proba(predictor, validation.values)
+    predictions = (probabilities >= threshold).astype(int)
+    levels = risk_levels(probabilities)
+    
+    if request.query_params.get('response_format', '').lower() == 'json':
+        df = pd.DataFrame(validation.values, columns=validation.fields)
+        columns, _ = build_prediction_columns(df, probabilities, threshold)
+        return Response({
+            'success': True,
+            'format': 'columnar',
+            'predictions': columns,
+            'summary': summarize_predictions(probabilities, predictions),
+            'threshold_used': threshold
+        }, status=status.HTTP_200_OK)
+    
+    content = encode_results(matrix.media_type, probabilities, predictions, levels)
+    return HttpResponse(content, content_type=matrix.media_type)
+
 @api_view(['POST'])
+@parser_classes([JSONParser, FormParser, MultiPartParser] + BINARY_PARSERS)
 def predict(request):
     """
     Realiza predicciones usando el modelo entrenado desde el storage configurado.
+    
+    Con format=columnar las predicciones se devuelven como una lista por columna
+    en lugar de una lista de objetos.
+    
+    También acepta cuerpos binarios (matriz cruda application/x-siniestro-matrix,
+    Arrow IPC o Parquet) con los parámetros en el query string.
     """
     try:
-        # Inicializar storage handler
-        storage = get_storage_handler()
+        # Registro de modelos residentes en el proceso
+        registry = get_model_registry()
         
         # Verificar que el modelo existe
-        model_filename = request.data.get('model_filename', 'modelo_accidentes.pkl')
+        model_filename = request.data.get('model_filename', request.query_params.get('model_filename', 'modelo_accidentes.pkl'))
         
-        if not storage.model_exists(model_filename):
+        if not registry.model_exists(model_filename):
             return Response({
                 'success': False,
                 'message': 'Modelo no encontrado. Primero entrene el modelo usando /api/train-model/',
                 'storage_type': 'S3' if getattr(settings, 'USE_S3_STORAGE', False) else 'Local'
             }, status=status.HTTP_404_NOT_FOUND)
         
+        # Cuerpo binario o columnar: la matriz ya viene decodificada
+        if isinstance(request.data, FeatureMatrix):
+            return _binary_prediction_response(
+                request, request.data, registry.get_predictor(model_filename), registry.get_schema(model_filename)
+            )
+        
         # Obtener datos del request
         data = request.data.get('data')
         threshold = request.data.get('threshold', 0.5)
@@ -99,62 +288,56 @@ def predict(request):
         if isinstance(data, dict):
             data = [data]  # Convertir a lista si es un solo objeto
         
-        # Verificar campos requeridos
-        missing_fields = []
-        for record in data:
-            missing = [field for field in Siniestro.TRAINING_FIELDS if field not in record]
-            if missing:
-                missing_fields.extend(missing)
+        # Verificar campos requeridos (los que faltan solo en algunos registros
+        # quedan como nulos y los reporta la validación del esquema)
+        df = pd.DataFrame.from_records(data)
+        missing_fields = [field for field in Siniestro.TRAINING_FIELDS if field not in df.columns]
         
         if missing_fields:
             return Response({
                 'success': False,
                 'message': 'Faltan campos requeridos en los datos',
-                'missing_fields': list(set(missing_fields)),
+                'missing_fields': missing_fields,
                 'required_fields': Siniestro.TRAINING_FIELDS
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        # Cargar el modelo desde storage
-        model = storage.load_model(model_filename)
+        # Validar el lote completo contra el esquema del modelo
+        validation = registry.get_schema(model_filename).validate(df)
+        if not validation.is_valid:
+            return _invalid_input_response(validation)
         
-        # Convertir datos a DataFrame con solo los campos de entrenamiento
-        df_data = []
-        for record in data:
-            filtered_record = {field: record[field] for field in Siniestro.TRAINING_FIELDS}
-            df_data.append(filtered_record)
+        # Obtener el predictor residente (se recarga solo si cambió en el storage)
+        predictor = registry.get_predictor(model_filename)
         
-        df = pd.DataFrame(df_data)
+        # Datos validados, con solo los campos de entrenamiento y el entero más estrecho
+        df = pd.DataFrame(validation.values, columns=validation.fields)
         
         # Realizar predicciones
-        probabilities = model.predict_proba(df)[:, 1]
-        predictions = (probabilities >= threshold).astype(int)
+        probabilities = get_prediction_cache().predict_proba(predictor, validation.values)
         
-        # Preparar respuesta
-        results = []
-        for i, (pred, prob) in enumerate(zip(predictions, probabilities)):
-            results.append({
-                'index': i,
-                'input_data': df_data[i],
-                'prediction': int(pred),
-                'probability': float(prob),
-                'risk_level': 'Alto' if prob > 0.7 else 'Medio' if prob > 0.3 else 'Bajo',
-                'accident_likely': bool(pred)
-            })
+        # Preparar respuesta a partir de los resultados columnares
+        columns, predictions = build_prediction_columns(df, probabilities, threshold)
+        full_summary = summarize_predictions(probabilities, predictions)
+        columnar = str(request.data.get('format', '')).lower() == 'columnar'
         
         return Response({
             'success': True,
-            'predictions': results,
+            'format': 'columnar' if columnar else 'rows',
+            'predictions': columns if columnar else rows_from_columns(columns),
             'summary': {
-                'total_predictions': len(results),
-                'accidents_predicted': sum(1 for r in results if r['accident_likely']),
-                'high_risk': sum(1 for r in results if r['risk_level'] == 'Alto'),
-                'medium_risk': sum(1 for r in results if r['risk_level'] == 'Medio'),
-                'low_risk': sum(1 for r in results if r['risk_level'] == 'Bajo')
+                key: full_summary[key]
+                for key in ('total_predictions', 'accidents_predicted', 'high_risk', 'medium_risk', 'low_risk')
             },
             'threshold_used': threshold,
             'storage_type': 'S3' if getattr(settings, 'USE_S3_STORAGE', False) else 'Local'
         }, status=status.HTTP_200_OK)
         
+    except (ParseError, UnsupportedMediaType) as e:
+        return Response({
+            'success': False,
+            'message': 'Cuerpo de la petición inválido',
+            'error': str(e.detail)
+        }, status=e.status_code)
     except Exception as e:
         return Response({
             'success': False,
@@ -184,15 +367,15 @@ def model_info(request):
                     'required_fields_for_training': Siniestro.TRAINING_FIELDS + [Siniestro.TARGET_FIELD],
                     'required_fields_for_prediction': Siniestro.TRAINING_FIELDS,
                     'target_field': Siniestro.TARGET_FIELD,
-                    'excluded_fields': ['FECHA_SINIESTRO', 'FECHA_INGRESO', 'id']
+                    'excluded_fields': ['FECHA_SINIESTRO', 'FECHA_INGRESO', 'FINGERPRINT', 'FECHA_MODIFICACION', 'id']
                 }
             }, status=status.HTTP_404_NOT_FOUND)
         
         # Leer métricas desde storage
         metrics = storage.load_metrics(metrics_filename)
         
-        # Información del modelo
-        model_info = storage.get_model_info(model_filename)
+        # Información del modelo: tamaño en disco y memoria residente en este proceso
+        model_info = get_model_registry().get_model_info(model_filename)
         
         return Response({
             'success': True,
@@ -200,12 +383,19 @@ def model_info(request):
                 'model_exists': model_info['exists'],
                 'model_size_bytes': model_info['size_bytes'],
                 'model_size_mb': model_info['size_mb'],
+                'artifact_format': model_info['artifact_format'],
+                'resident_size_bytes': model_info['resident_bytes'],
+                'mapped_size_bytes': model_info['mapped_bytes'],
                 'last_modified': model_info.get('last_modified'),
                 'storage_path': model_info.get('s3_path') or model_info.get('local_path'),
                 'storage_type': 'S3' if getattr(settings, 'USE_S3_STORAGE', False) else 'Local',
                 'training_fields': Siniestro.TRAINING_FIELDS,
                 'target_field': Siniestro.TARGET_FIELD,
-                'excluded_fields': ['FECHA_SINIESTRO', 'FECHA_INGRESO', 'id']
+                'excluded_fields': ['FECHA_SINIESTRO', 'FECHA_INGRESO', 'FINGERPRINT', 'FECHA_MODIFICACION', 'id']
+            },
+            'inference': {
+                'model_registry': get_model_registry().get_info(),
+                'prediction_cache': get_prediction_cache().get_stats()
             },
             'metrics': metrics
         }, status=status.HTTP_200_OK)
@@ -217,25 +407,58 @@ def model_info(request):
             'error': str(e)
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+@api_view(['GET'])
+@authentication_classes([])
+@permission_classes([AllowAny])
+def readiness(request):
+    """
+    Readiness del worker para el balanceador de carga.
+    
+    Responde 200 solo cuando el modelo de MODEL_PRELOAD_FILENAME está
+    residente en memoria; mientras tanto responde 503 y lanza la carga en
+    segundo plano.
+    """
+    readiness_info = get_readiness()
+    return Response(
+        readiness_info,
+        status=status.HTTP_200_OK if readiness_info['ready'] else status.HTTP_503_SERVICE_UNAVAILABLE
+    )
+
 @api_view(['POST'])
+@parser_classes([MultiPartParser, FormParser, JSONParser] + BINARY_PARSERS)
 def batch_predict(request):
     """
     Realiza predicciones por lotes subiendo un archivo CSV.
+    
+    En la respuesta JSON, format=columnar devuelve las predicciones como una
+    lista por columna en lugar de una lista de objetos.
+    
+    Con stream=true el archivo se procesa por bloques y el CSV de resultados se
+    envía a medida que se genera; el resumen va al final como una línea
+    '# summary: {...}'.
+    
+    En lugar del CSV también acepta el lote como cuerpo binario (matriz cruda,
+    Arrow IPC o Parquet) y responde en el mismo formato.
     """
     try:
-        # Inicializar storage handler
-        storage = get_storage_handler()
+        # Registro de modelos residentes en el proceso
+        registry = get_model_registry()
         
         # Verificar que el modelo existe
-        model_filename = request.data.get('model_filename', 'modelo_accidentes.pkl')
+        model_filename = request.data.get('model_filename', request.query_params.get('model_filename', 'modelo_accidentes.pkl'))
         
-        if not storage.model_exists(model_filename):
+        if not registry.model_exists(model_filename):
             return Response({
                 'success': False,
                 'message': 'Modelo no encontrado. Primero entrene el modelo usando /api/train-model/',
                 'storage_type': 'S3' if getattr(settings, 'USE_S3_STORAGE', False) else 'Local'
             }, status=status.HTTP_404_NOT_FOUND)
         
+        # Cuerpo binario o columnar: la matriz ya viene decodificada
+        if isinstance(request.data, FeatureMatrix):
+            predictor = get_parallel_predictor(registry.get_predictor(model_filename), model_filename)
+            return _binary_prediction_response(request, request.data, predictor, registry.get_schema(model_filename))
+        
         # Verificar que se subió un archivo
         file_obj = None
         if 'file' in request.FILES:
@@ -252,6 +475,7 @@ def batch_predict(request):
         # Obtener parámetros
         threshold = float(request.data.get('threshold', 0.5))
         output_format = request.data.get('output_format', 'json').lower()  # 'json' o 'csv'
+        stream = str(request.data.get('stream', 'false')).lower() == 'true'
         
         print(f"Archivo detectado: {file_obj.name}")
         print(f"Threshold: {threshold}")
@@ -264,6 +488,28 @@ def batch_predict(request):
                 'message': f'El archivo debe ser un CSV (.csv). Archivo recibido: {file_obj.name}'
             }, status=status.HTTP_400_BAD_REQUEST)
         
+        # Modo streaming: memoria constante sin importar el tamaño del archivo
+        if stream:
+            chunk_size = int(request.data.get('chunk_size', getattr(settings, 'BATCH_PREDICT_CHUNK_ROWS', 50000)))
+            try:
+                first_chunk, reader = open_csv_chunks(file_obj, chunk_size)
+            except Exception as e:
+                return Response({
+                    'success': False,
+                    'message': f'Error al leer el archivo CSV: {str(e)}',
+                    'required_fields': Siniestro.TRAINING_FIELDS
+                }, status=status.HTTP_400_BAD_REQUEST)
+            
+            predictor = get_parallel_predictor(registry.get_predictor(model_filename), model_filename)
+            response = StreamingHttpResponse(
+                stream_predictions_csv(first_chunk, reader, predictor, threshold,
+                                       schema=registry.get_schema(model_filename)),
+                content_type='text/csv; charset=utf-8'
+            )
+            timestamp = pd.Timestamp.now().strftime('%Y%m%d_%H%M%S')
+            response['Content-Disposition'] = f'attachment; filename="predicciones_batch_{timestamp}.csv"'
+            return response
+        
         # Leer el archivo CSV
         try:
             file_obj.seek(0)
@@ -296,38 +542,32 @@ def batch_predict(request):
                 'found_columns': list(df.columns)
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        # Verificar valores nulos
-        null_counts = df[Siniestro.TRAINING_FIELDS].isnull().sum()
-        if null_counts.sum() > 0:
-            null_fields = null_counts[null_counts > 0].to_dict()
-            return Response({
-                'success': False,
-                'message': 'Se encontraron valores nulos en campos requeridos',
-                'null_fields': null_fields
-            }, status=status.HTTP_400_BAD_REQUEST)
+        # Validar nulos, tipos, rangos y códigos permitidos en una sola pasada
+        validation = registry.get_schema(model_filename).validate(df)
+        if not validation.is_valid:
+            return _invalid_input_response(validation)
         
-        # Cargar el modelo desde storage
-        model = storage.load_model(model_filename)
+        # Obtener el predictor residente (se recarga solo si cambió en el storage);
+        # los lotes grandes se reparten entre procesos si PREDICTION_WORKERS > 1
+        predictor = get_parallel_predictor(registry.get_predictor(model_filename), model_filename)
         
         # Seleccionar columnas para predicción
         df_filtered = df[Siniestro.TRAINING_FIELDS]
         
-        # Realizar predicciones
-        probabilities = model.predict_proba(df_filtered)[:, 1]
+        # Realizar predicciones sobre la matriz validada
+        probabilities = get_prediction_cache().predict_proba(predictor, validation.values)
         predictions = (probabilities >= threshold).astype(int)
         
-        # Crear DataFrame con resultados
-        # Copiar datos originales
-        df_results = df.copy()
-        
-        # Agregar columnas de predicción
-        df_results['PREDICTION'] = predictions
-        df_results['PROBABILITY'] = probabilities
-        df_results['RISK_LEVEL'] = ['Alto' if p > 0.7 else 'Medio' if p > 0.3 else 'Bajo' for p in probabilities]
-        df_results['ACCIDENT_LIKELY'] = predictions.astype(bool)
-        
         # Si se solicita CSV, devolver archivo
         if output_format == 'csv':
+            # Agregar columnas de predicción a los datos originales
+            df_results = df.assign(
+                PREDICTION=predictions,
+                PROBABILITY=probabilities,
+                RISK_LEVEL=risk_levels(probabilities),
+                ACCIDENT_LIKELY=predictions.astype(bool)
+            )
+            
             response = HttpResponse(content_type='text/csv; charset=utf-8')
             
             # Nombre del archivo con timestamp
@@ -342,39 +582,18 @@ def batch_predict(request):
         
         # Si se solicita JSON (por defecto), devolver respuesta JSON
         else:
-            # Preparar resultados para JSON
-            results = []
-            for i, row in df_results.iterrows():
-                # Datos de entrada (solo campos de entrenamiento)
-                input_data = {field: row[field] for field in Siniestro.TRAINING_FIELDS}
-                
-                results.append({
-                    'row_index': i,
-                    'input_data': input_data,
-                    'prediction': int(row['PREDICTION']),
-                    'probability': float(row['PROBABILITY']),
-                    'risk_level': row['RISK_LEVEL'],
-                    'accident_likely': bool(row['ACCIDENT_LIKELY'])
-                })
+            # Resultados columnares; la lista de objetos se arma desde ellos
+            columns, _ = build_prediction_columns(df_filtered, probabilities, threshold, index_key='row_index')
+            columnar = str(request.data.get('format', '')).lower() == 'columnar'
             
             # Estadísticas del lote
-            import numpy as np
-            summary = {
-                'total_predictions': len(results),
-                'accidents_predicted': sum(1 for r in results if r['accident_likely']),
-                'no_accidents_predicted': sum(1 for r in results if not r['accident_likely']),
-                'high_risk': sum(1 for r in results if r['risk_level'] == 'Alto'),
-                'medium_risk': sum(1 for r in results if r['risk_level'] == 'Medio'),
-                'low_risk': sum(1 for r in results if r['risk_level'] == 'Bajo'),
-                'average_probability': float(np.mean(probabilities)),
-                'max_probability': float(np.max(probabilities)),
-                'min_probability': float(np.min(probabilities))
-            }
+            summary = summarize_predictions(probabilities, predictions)
             
             return Response({
                 'success': True,
-                'message': f'Predicciones realizadas para {len(results)} registros',
-                'predictions': results,
+                'message': f'Predicciones realizadas para {len(df)} registros',
+                'format': 'columnar' if columnar else 'rows',
+                'predictions': columns if columnar else rows_from_columns(columns, index_key='row_index'),
                 'summary': summary,
                 'threshold_used': threshold,
                 'file_info': {
@@ -385,6 +604,12 @@ def batch_predict(request):
                 'note': 'Para obtener CSV, use output_format=csv'
             }, status=status.HTTP_200_OK)
         
+    except (ParseError, UnsupportedMediaType) as e:
+        return Response({
+            'success': False,
+            'message': 'Cuerpo de la petición inválido',
+            'error': str(e.detail)
+        }, status=e.status_code)
     except Exception as e:
         import traceback
         return Response({
@@ -432,24 +657,24 @@ def download_csv(request):
         
         # Si se solicitan predicciones, agregarlas
         if include_predictions:
-            model_path = os.path.join(settings.BASE_DIR, 'projects', 'ml_model', 'modelo_accidentes.pkl')
+            registry = get_model_registry()
             
-            if os.path.exists(model_path):
+            if registry.model_exists('modelo_accidentes.pkl'):
                 try:
-                    # Cargar modelo
-                    model = joblib.load(model_path)
+                    # Predictor residente (bosque compilado con respaldo en sklearn)
+                    predictor = get_parallel_predictor(registry.get_predictor('modelo_accidentes.pkl'))
                     
                     # Preparar datos para predicción (solo campos de entrenamiento)
                     df_pred = df[Siniestro.TRAINING_FIELDS]
                     
                     # Realizar predicciones
-                    probabilities = model.predict_proba(df_pred)[:, 1]
+                    probabilities = predictor.predict_proba(df_pred)[:, 1]
                     predictions = (probabilities >= 0.5).astype(int)
                     
                     # Agregar columnas de predicción
                     df['PREDICCION_ACCIDENTE'] = predictions
                     df['PROBABILIDAD_ACCIDENTE'] = probabilities
-                    df['NIVEL_RIESGO'] = ['Alto' if p > 0.7 else 'Medio' if p > 0.3 else 'Bajo' for p in probabilities]
+                    df['NIVEL_RIESGO'] = risk_levels(probabilities)
                     
                 except Exception as e:
                     # Si hay error en las predicciones, continuar sin ellas
@@ -557,6 +782,12 @@ def upload_and_retrain(request):
     SENALIZACION, DIA_DE_LA_SEMANA, MES, PERIODO_DEL_DIA, FERIADO, ACCIDENTE, FECHA_SINIESTRO
     
     Nota: FECHA_SINIESTRO puede estar vacía, en cuyo caso se usará la fecha actual.
+    
+    El archivo puede venir comprimido con gzip o zstd; se lee en streaming por
+    bloques de UPLOAD_CHUNK_ROWS filas, sin cargarlo completo en memoria.
+    
+    Con load_mode=native el archivo validado se escribe en un staging y se carga
+    con LOAD DATA LOCAL INFILE en MySQL (bulk_create en otros motores).
     """
     try:
         print("=== DEBUG UPLOAD AND RETRAIN ===")
@@ -582,257 +813,127 @@ def upload_and_retrain(request):
         auto_retrain = request.data.get('auto_retrain', 'true').lower() == 'true'
         validate_data = request.data.get('validate_data', 'true').lower() == 'true'
         default_date_for_nulls = request.data.get('default_date', date.today().strftime('%Y-%m-%d'))
+        load_mode = request.data.get('load_mode', getattr(settings, 'UPLOAD_LOAD_MODE', 'orm')).lower()
+        retrain_mode = request.data.get('retrain_mode', getattr(settings, 'UPLOAD_RETRAIN_MODE', 'incremental'))
         
         print(f"Archivo: {file_obj.name}")
         print(f"Auto retrain: {auto_retrain}")
         print(f"Validate data: {validate_data}")
         print(f"Default date for nulls: {default_date_for_nulls}")
+        print(f"Load mode: {load_mode}")
         
-        # Validar extensión del archivo
-        if not file_obj.name.lower().endswith('.csv'):
+        if load_mode not in ('orm', 'native'):
             return Response({
                 'success': False,
-                'message': f'El archivo debe ser un CSV (.csv). Archivo recibido: {file_obj.name}'
+                'message': f"load_mode no válido: {load_mode}. Opciones: ['orm', 'native']"
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        # Leer el archivo CSV
-        try:
-            file_obj.seek(0)
-            csv_data = file_obj.read().decode('utf-8')
-            df = pd.read_csv(io.StringIO(csv_data))
-            
-            if df.empty:
-                return Response({
-                    'success': False,
-                    'message': 'El archivo CSV está vacío'
-                }, status=status.HTTP_400_BAD_REQUEST)
-            
-        except UnicodeDecodeError:
-            try:
-                file_obj.seek(0)
-                csv_data = file_obj.read().decode('latin-1')
-                df = pd.read_csv(io.StringIO(csv_data))
-            except Exception as e:
-                return Response({
-                    'success': False,
-                    'message': f'Error de codificación al leer el archivo CSV: {str(e)}'
-                }, status=status.HTTP_400_BAD_REQUEST)
-        except Exception as e:
+        if retrain_mode not in RETRAIN_MODES:
             return Response({
                 'success': False,
-                'message': f'Error al leer el archivo CSV: {str(e)}'
+                'message': f'retrain_mode no válido: {retrain_mode}. Opciones: {list(RETRAIN_MODES)}'
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        # Limpiar nombres de columnas
-        df.columns = df.columns.str.strip()
-        
-        print(f"Columnas encontradas: {list(df.columns)}")
-        print(f"Forma del DataFrame: {df.shape}")
-        
-        # Campos requeridos para la inserción
-        required_fields = Siniestro.TRAINING_FIELDS + [Siniestro.TARGET_FIELD, 'FECHA_SINIESTRO']
-        
-        # Verificar que todas las columnas requeridas estén presentes
-        missing_fields = [field for field in required_fields if field not in df.columns]
-        if missing_fields:
+        # Validar extensión del archivo
+        if not is_supported_upload(file_obj.name):
             return Response({
                 'success': False,
-                'message': 'Faltan columnas requeridas en el archivo CSV',
-                'missing_fields': missing_fields,
-                'required_fields': required_fields,
-                'found_columns': list(df.columns)
+                'message': f'El archivo debe ser un CSV (.csv, .csv.gz o .csv.zst). Archivo recibido: {file_obj.name}'
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        # Validar datos si se solicita
-        if validate_data:
-            # Verificar valores nulos en campos críticos (EXCLUYENDO FECHA_SINIESTRO)
-            critical_fields = Siniestro.TRAINING_FIELDS + [Siniestro.TARGET_FIELD]
-            null_counts = df[critical_fields].isnull().sum()
-            if null_counts.sum() > 0:
-                null_fields = null_counts[null_counts > 0].to_dict()
-                return Response({
-                    'success': False,
-                    'message': 'Se encontraron valores nulos en campos críticos',
-                    'null_fields': null_fields,
-                    'note': 'FECHA_SINIESTRO puede estar vacía y se manejará automáticamente'
-                }, status=status.HTTP_400_BAD_REQUEST)
-            
-            # Validar tipos de datos numéricos
-            numeric_fields = Siniestro.TRAINING_FIELDS + [Siniestro.TARGET_FIELD]
-            for field in numeric_fields:
-                if not pd.api.types.is_numeric_dtype(df[field]):
-                    try:
-                        df[field] = pd.to_numeric(df[field], errors='coerce')
-                        if df[field].isnull().any():
-                            return Response({
-                                'success': False,
-                                'message': f'El campo {field} contiene valores no numéricos'
-                            }, status=status.HTTP_400_BAD_REQUEST)
-                    except:
-                        return Response({
-                            'success': False,
-                            'message': f'No se pudo convertir el campo {field} a numérico'
-                        }, status=status.HTTP_400_BAD_REQUEST)
-        
-        # MANEJO ESPECIAL PARA FECHAS VACÍAS
-        print("Procesando fechas...")
-        
-        # Contar fechas vacías antes del procesamiento
-        null_dates_count = 0
-        if 'FECHA_SINIESTRO' in df.columns:
-            null_dates_count = df['FECHA_SINIESTRO'].isnull().sum()
-            empty_dates_count = len(df[df['FECHA_SINIESTRO'].astype(str).str.strip().isin(['', 'NaN', 'nan', 'null', 'NULL'])])
-            print(f"Fechas nulas detectadas: {null_dates_count}")
-            print(f"Fechas vacías detectadas: {empty_dates_count}")
-        
-        # Limpiar y convertir fechas
+        # Fecha por defecto para FECHA_SINIESTRO vacía
         try:
-            # Reemplazar valores vacíos, NaN, etc. con None
-            df['FECHA_SINIESTRO'] = df['FECHA_SINIESTRO'].replace(['', 'NaN', 'nan', 'null', 'NULL'], None)
-            
-            # Convertir a datetime, manteniendo NaT para valores nulos
-            df['FECHA_SINIESTRO'] = pd.to_datetime(df['FECHA_SINIESTRO'], errors='coerce')
-            
-            print(f"Fechas después de conversión inicial:")
-            print(f"- Fechas válidas: {df['FECHA_SINIESTRO'].notna().sum()}")
-            print(f"- Fechas NaT: {df['FECHA_SINIESTRO'].isna().sum()}")
-            
-        except Exception as e:
-            return Response({
-                'success': False,
-                'message': f'Error al procesar fechas: {str(e)}'
-            }, status=status.HTTP_400_BAD_REQUEST)
-        
-        # Agregar FECHA_INGRESO (fecha actual)
-        df['FECHA_INGRESO'] = date.today()
-        
-        # Comenzar transacción para insertar datos
-        records_created = 0
-        records_errors = 0
-        dates_fixed = 0
-        error_details = []
-        
+            default_date = datetime.strptime(default_date_for_nulls, '%Y-%m-%d').date()
+        except (TypeError, ValueError):
+            default_date = date.today()
+        
+        # El CSV se parsea desde el stream del upload por bloques y cada bloque se
+        # inserta con bulk_create; con validate_data=true un bloque inválido
+        # revierte toda la carga
+        print("Iniciando inserción por bloques...")
         try:
-            with transaction.atomic():
-                print(f"Iniciando inserción de {len(df)} registros...")
-                
-                for index, row in df.iterrows():
-                    try:
-                        # MANEJO ESPECIAL DE FECHA_SINIESTRO
-                        fecha_siniestro = row['FECHA_SINIESTRO']
-                        
-                        # Si la fecha es NaT (Not a Time) o nula, usar fecha por defecto
-                        if pd.isna(fecha_siniestro):
-                            # Usar fecha por defecto (puede ser fecha actual o una fecha específica)
-                            try:
-                                fecha_siniestro = datetime.strptime(default_date_for_nulls, '%Y-%m-%d').date()
-                            except:
-                                fecha_siniestro = date.today()
-                            dates_fixed += 1
-                        else:
-                            # Convertir datetime a date si es necesario
-                            if hasattr(fecha_siniestro, 'date'):
-                                fecha_siniestro = fecha_siniestro.date()
-                            elif isinstance(fecha_siniestro, str):
-                                try:
-                                    fecha_siniestro = datetime.strptime(fecha_siniestro, '%Y-%m-%d').date()
-                                except:
-                                    fecha_siniestro = date.today()
-                                    dates_fixed += 1
-                        
-                        # Crear objeto Siniestro
-                        siniestro_data = {
-                            'HORA_SINIESTRO': int(row['HORA_SINIESTRO']),
-                            'CLASE_SINIESTRO': int(row['CLASE_SINIESTRO']),
-                            'CANTIDAD_DE_VEHICULOS_DANADOS': int(row['CANTIDAD_DE_VEHICULOS_DANADOS']),
-                            'DISTRITO': int(row['DISTRITO']),
-                            'ZONA': int(row['ZONA']),
-                            'TIPO_DE_VIA': int(row['TIPO_DE_VIA']),
-                            'RED_VIAL': int(row['RED_VIAL']),
-                            'EXISTE_CICLOVIA': int(row['EXISTE_CICLOVIA']),
-                            'CONDICION_CLIMATICA': int(row['CONDICION_CLIMATICA']),
-                            'ZONIFICACION': int(row['ZONIFICACION']),
-                            'CARACTERISTICAS_DE_VIA': int(row['CARACTERISTICAS_DE_VIA']),
-                            'PERFIL_LONGITUDINAL_VIA': int(row['PERFIL_LONGITUDINAL_VIA']),
-                            'SUPERFICIE_DE_CALZADA': int(row['SUPERFICIE_DE_CALZADA']),
-                            'SENALIZACION': int(row['SENALIZACION']),
-                            'DIA_DE_LA_SEMANA': int(row['DIA_DE_LA_SEMANA']),
-                            'MES': int(row['MES']),
-                            'PERIODO_DEL_DIA': int(row['PERIODO_DEL_DIA']),
-                            'FERIADO': int(row['FERIADO']),
-                            'ACCIDENTE': int(row['ACCIDENTE']),
-                            'FECHA_SINIESTRO': fecha_siniestro,  # Fecha ya procesada
-                            'FECHA_INGRESO': row['FECHA_INGRESO']
-                        }
-                        
-                        # Crear y guardar el registro
-                        siniestro = Siniestro(**siniestro_data)
-                        siniestro.save()
-                        records_created += 1
-                        
-                        if records_created % 100 == 0:
-                            print(f"Insertados {records_created} registros...")
-                        
-                    except Exception as e:
-                        records_errors += 1
-                        error_details.append({
-                            'row': index + 1,
-                            'error': str(e),
-                            'data': {k: str(v) for k, v in row.to_dict().items()}  # Convertir todo a string para evitar errores de serialización
-                        })
-                        
-                        # Si hay demasiados errores, abortar
-                        if records_errors > 10:
-                            raise Exception(f"Demasiados errores en la inserción. Abortando después de {records_errors} errores.")
-                
-                print(f"Inserción completada. Registros creados: {records_created}, Errores: {records_errors}, Fechas corregidas: {dates_fixed}")
-        
-        except Exception as e:
+            if load_mode == 'native':
+                ingestion = load_csv_native(file_obj, default_date, ingreso_date=date.today(), validate=validate_data)
+            else:
+                ingestion = ingest_csv_upload(file_obj, default_date, ingreso_date=date.today(), validate=validate_data)
+        except CsvUploadError as e:
+            return Response(dict({
+                'success': False,
+                'message': str(e)
+            }, **e.details), status=status.HTTP_400_BAD_REQUEST)
+        records_created = ingestion['records_created']
+        records_duplicates = ingestion['records_duplicates']
+        records_errors = ingestion['records_errors']
+        dates_fixed = ingestion['dates_fixed']
+        error_details = ingestion['error_details']
+        print(f"Inserción completada. Registros creados: {records_created}, Duplicados: {records_duplicates}, "
+              f"Errores: {records_errors}, Fechas corregidas: {dates_fixed}, {ingestion['rows_per_second']} filas/s "
+              f"({ingestion['chunks']} bloques, {ingestion['encoding']}, compresión: {ingestion['compression']})")
+        
+        if records_created == 0 and records_errors > 0:
             return Response({
                 'success': False,
-                'message': f'Error durante la inserción de datos: {str(e)}',
-                'records_processed': records_created,
+                'message': 'No se insertó ningún registro: todas las filas tienen errores',
                 'errors_found': records_errors,
-                'dates_fixed': dates_fixed,
                 'error_details': error_details[:5]  # Mostrar solo los primeros 5 errores
-            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+            }, status=status.HTTP_400_BAD_REQUEST)
         
         # Preparar respuesta de inserción
         insertion_result = {
             'records_created': records_created,
+            'records_duplicates': records_duplicates,
             'records_errors': records_errors,
             'dates_fixed': dates_fixed,
             'total_records_in_db': Siniestro.objects.count(),
             'file_processed': file_obj.name,
-            'default_date_used': default_date_for_nulls
+            'default_date_used': default_date_for_nulls,
+            'encoding': ingestion['encoding'],
+            'compression': ingestion['compression'],
+            'load_method': ingestion.get('method', 'bulk_create'),
+            'throughput': {
+                'seconds': ingestion['seconds'],
+                'insert_seconds': ingestion['insert_seconds'],
+                'rows_per_second': ingestion['rows_per_second'],
+                'chunk_size': ingestion['chunk_size'],
+                'chunks': ingestion['chunks'],
+                'batch_size': ingestion['batch_size'],
+                'batches': ingestion['batches'],
+                'bisected_batches': ingestion['bisected_batches']
+            }
         }
-        
-        # Reentrenar modelo si se solicita
+        if load_mode == 'native':
+            insertion_result['throughput'].update(
+                staging_seconds=ingestion['staging_seconds'],
+                load_seconds=ingestion['load_seconds']
+            )
+            if ingestion['fallback_reason']:
+                insertion_result['fallback_reason'] = ingestion['fallback_reason']
+        
+        # Encolar el reentrenamiento si se solicita (lo ejecuta run_training_worker)
         retrain_result = None
         if auto_retrain and records_created > 0:
-            print("Iniciando reentrenamiento del modelo...")
             try:
-                # Reentrenar el modelo usando storage configurado
-                retrain_result = train_accident_model_from_db(
-                    model_class=Siniestro,
-                    target_col='ACCIDENTE',
-                    model_filename='modelo_accidentes.pkl',
-                    metrics_filename='metricas_modelo.json'
-                )
-                
-                print("Reentrenamiento completado exitosamente")
+                job = enqueue_training_job({'mode': retrain_mode}, source='upload', user=request.user)
+                retrain_result = {
+                    'success': True,
+                    'message': 'Reentrenamiento encolado',
+                    'mode': retrain_mode,
+                    'job_id': job.id,
+                    'status_url': f'/api/train-jobs/{job.id}/'
+                }
                 
             except Exception as e:
-                print(f"Error durante el reentrenamiento: {str(e)}")
+                print(f"Error al encolar el reentrenamiento: {str(e)}")
                 retrain_result = {
                     'success': False,
-                    'message': f'Error al reentrenar el modelo: {str(e)}'
+                    'message': f'Error al encolar el reentrenamiento del modelo: {str(e)}'
                 }
         
         # Respuesta final
         response_data = {
             'success': True,
-            'message': f'Datos cargados exitosamente. {records_created} registros insertados.',
+            'message': f'Datos cargados exitosamente. {records_created} registros insertados.'
+                       + (f' {records_duplicates} filas duplicadas omitidas.' if records_duplicates else ''),
             'data_insertion': insertion_result,
             'model_retrain': retrain_result if auto_retrain else {
                 'message': 'Reentrenamiento no solicitado. Use auto_retrain=true para reentrenar automáticamente.'
@@ -842,7 +943,7 @@ def upload_and_retrain(request):
         if records_errors > 0:
             response_data['warnings'] = {
                 'message': f'{records_errors} registros tuvieron errores y no fueron insertados',
-                'error_details': error_details[:3]  # Mostrar solo los primeros 3 errores
+                'error_details': error_details[:10]
             }
         
         if dates_fixed > 0:
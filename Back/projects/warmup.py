@@ -0,0 +1,142 @@
+"""
+Precarga y calentamiento del modelo al iniciar cada worker.
+
+La primera petición tras un despliegue pagaba la importación de
+pandas/sklearn, la conexión con S3 (head_bucket), la descarga del modelo y
+la primera pasada por el código de predicción. Con MODEL_PRELOAD activado
+todo eso ocurre en ``ProjectsConfig.ready()``; el endpoint de readiness
+solo responde listo cuando el modelo está residente en el registro.
+"""
+
+import os
+import sys
+import threading
+import time
+import pandas as pd
+from django.conf import settings
+from .models import Siniestro
+from .model_registry import get_model_registry
+from .prediction_results import build_prediction_columns
+
+_state = {
+    'status': 'idle',
+    'model_filename': None,
+    'started_at': None,
+    'finished_at': None,
+    'duration_seconds': None,
+    'error': None
+}
+_lock = threading.Lock()
+_thread = None
+
+
+def get_preload_filename():
+    """Retorna el archivo del modelo que se precarga y vigila la readiness."""
+    return getattr(settings, 'MODEL_PRELOAD_FILENAME', 'modelo_accidentes.pkl')
+
+
+def should_preload():
+    """
+    Indica si este proceso debe precargar el modelo al iniciar.
+
+    Se omite en los comandos de manage.py distintos de runserver (migrate,
+    shell, ...) y en el proceso vigilante del autoreload de runserver.
+    """
+    if not getattr(settings, 'MODEL_PRELOAD', False):
+        return False
+    if os.path.basename(sys.argv[0]) == 'manage.py':
+        if sys.argv[1:2] != ['runserver']:
+            return False
+        if '--noreload' not in sys.argv and os.environ.get('RUN_MAIN') != 'true':
+            return False
+    return True
+
+
+def warm_up(model_filename=None):
+    """
+    Carga el modelo en el registro y ejecuta una predicción de prueba.
+
+    La predicción de prueba recorre tanto el motor compilado como sklearn
+    (lotes grandes) y la construcción de la respuesta, para que la primera
+    petición real no pague la inicialización perezosa de esas rutas.
+
+    Args:
+        model_filename (str, optional): Nombre del archivo del modelo
+
+    Returns:
+        bool: True si el modelo quedó residente
+    """
+    model_filename = model_filename or get_preload_filename()
+    with _lock:
+        _state.update(status='loading', model_filename=model_filename, started_at=time.time(),
+                      finished_at=None, duration_seconds=None, error=None)
+    start = time.perf_counter()
+
+    try:
+        predictor = get_model_registry().get_predictor(model_filename)
+
+        dummy = pd.DataFrame.from_records(
+            [{field: 0 for field in Siniestro.TRAINING_FIELDS}],
+            columns=Siniestro.TRAINING_FIELDS
+        )
+        probabilities = predictor.predict_proba(dummy)[:, 1]
+        predictor.model.predict_proba(dummy)
+        build_prediction_columns(dummy, probabilities, 0.5)
+
+        status, error = 'ready', None
+    except FileNotFoundError as e:
+        status, error = 'missing', str(e)
+    except Exception as e:
+        status, error = 'failed', str(e)
+
+    duration = time.perf_counter() - start
+    with _lock:
+        _state.update(status=status, error=error, finished_at=time.time(),
+                      duration_seconds=round(duration, 3))
+
+    if status == 'ready':
+        print(f"Modelo '{model_filename}' precargado y calentado en {duration:.2f}s")
+    else:
+        print(f"No se pudo precargar el modelo '{model_filename}': {error}")
+    return status == 'ready'
+
+
+def start_background_warmup(model_filename=None):
+    """
+    Lanza el calentamiento en un hilo si no hay uno en curso.
+
+    Args:
+        model_filename (str, optional): Nombre del archivo del modelo
+    """
+    global _thread
+    with _lock:
+        if _thread is not None and _thread.is_alive():
+            return
+        _thread = threading.Thread(target=warm_up, args=(model_filename,), daemon=True)
+        _thread.start()
+
+
+def get_readiness():
+    """
+    Indica si el worker puede recibir tráfico.
+
+    Solo está listo cuando el modelo de MODEL_PRELOAD_FILENAME está residente
+    en el registro. Si no lo está (arranque sin precarga, fallo previo o
+    reentrenamiento reciente) se lanza el calentamiento en segundo plano para
+    que una próxima consulta lo encuentre listo. El endpoint es anónimo, así
+    que el modelo no se puede elegir desde la petición.
+
+    Returns:
+        dict: Estado de readiness y del último calentamiento
+    """
+    model_filename = get_preload_filename()
+    ready = get_model_registry().is_loaded(model_filename)
+    if not ready:
+        start_background_warmup(model_filename)
+    with _lock:
+        warmup = dict(_state)
+    return {
+        'ready': ready,
+        'model_filename': model_filename,
+        'warmup': warmup
+    }
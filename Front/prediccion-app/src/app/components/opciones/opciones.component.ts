@@ -150,18 +150,23 @@ export class OpcionesComponent implements OnInit {
     this.isUploadingFile = true;
     this.apiService.uploadAndTrain(this.selectedFile).subscribe({
       next: (result) => {
-        this.isUploadingFile = false;
-        this.snackBar.open('Archivo subido y modelo entrenado correctamente', 'Cerrar', {
-          duration: 3000,
-          panelClass: ['success-snackbar']
-        });
-        
-        // Recargar información del modelo
-        this.loadModelInfo();
-        
         // Limpiar el archivo seleccionado
         this.selectedFile = null;
         this.fileName = '';
+
+        // El reentrenamiento se encola; se espera a que el trabajo termine
+        const jobId = result.model_retrain?.job_id;
+        if (!jobId) {
+          this.isUploadingFile = false;
+          this.snackBar.open(result.model_retrain?.success === false
+            ? result.model_retrain.message
+            : result.message, 'Cerrar', {
+            duration: 5000,
+            panelClass: [result.model_retrain?.success === false ? 'error-snackbar' : 'success-snackbar']
+          });
+          return;
+        }
+        this.waitForRetrain(jobId);
       },
       error: (err) => {
         console.error('Error al subir archivo y entrenar modelo:', err);
@@ -174,6 +179,32 @@ export class OpcionesComponent implements OnInit {
     });
   }
 
+  private waitForRetrain(jobId: number): void {
+    this.apiService.waitForTrainJob(jobId).subscribe({
+      next: (job) => {
+        this.isUploadingFile = false;
+        const succeeded = job.status === 'succeeded';
+        this.snackBar.open(succeeded
+          ? 'Archivo subido y modelo reentrenado correctamente'
+          : `Archivo subido, pero el reentrenamiento falló: ${job.result?.message || job.error || ''}`, 'Cerrar', {
+          duration: 5000,
+          panelClass: [succeeded ? 'success-snackbar' : 'error-snackbar']
+        });
+
+        // Recargar información del modelo
+        this.loadModelInfo();
+      },
+      error: (err) => {
+        console.error('Error al consultar el reentrenamiento:', err);
+        this.isUploadingFile = false;
+        this.snackBar.open('Archivo subido; no se pudo consultar el estado del reentrenamiento', 'Cerrar', {
+          duration: 5000,
+          panelClass: ['error-snackbar']
+        });
+      }
+    });
+  }
+
   deleteData(): void {
     if (confirm('¿Estás seguro de que deseas eliminar todos los datos? Esta acción no se puede deshacer.')) {
       this.apiService.deleteAllData().subscribe({
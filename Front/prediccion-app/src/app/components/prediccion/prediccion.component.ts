@@ -16,6 +16,7 @@ import { PrediccionService } from '../../services/prediccion.service';
 import { ApiService } from '../../services/api.service';
 import { PredictionData, PredictionRequest, PredictionResponse } from '../../models/prediction-data';
 import { saveAs } from 'file-saver'; // Importar saveAs
+import { switchMap } from 'rxjs/operators';
 
 @Component({
   selector: 'app-prediccion',
@@ -359,18 +360,29 @@ export class PrediccionComponent {
   trainModel(): void {
     this.isLoadingTrain = true;
 
-    this.apiService.trainModel().subscribe({
-      next: (result) => {
+    // El backend encola el entrenamiento; se consulta el trabajo hasta que termine
+    this.apiService.trainModel().pipe(
+      switchMap((queued) => this.apiService.waitForTrainJob(queued.job_id))
+    ).subscribe({
+      next: (job) => {
         this.isLoadingTrain = false;
 
+        if (job.status !== 'succeeded') {
+          this.snackBar.open(`Error al entrenar el modelo: ${job.result?.message || job.error || ''}`, 'Cerrar', {
+            duration: 5000,
+            panelClass: ['error-snackbar']
+          });
+          return;
+        }
+
         // Mostrar los resultados en un snackbar
         const message = `
-          Status: ${result.status}
-          Mensaje: ${result.message}
-          Accuracy: ${result.details?.metrics?.accuracy?.toFixed(4) || 'N/A'}
-          Precision: ${result.details?.metrics?.precision?.toFixed(4) || 'N/A'}
-          Recall: ${result.details?.metrics?.recall?.toFixed(4) || 'N/A'}
-          F1 Score: ${result.details?.metrics?.f1_score?.toFixed(4) || 'N/A'}
+          Status: ${job.status}
+          Mensaje: ${job.result?.message || 'Modelo entrenado exitosamente'}
+          Accuracy: ${job.metrics?.accuracy?.toFixed(4) || 'N/A'}
+          Precision: ${job.metrics?.precision?.toFixed(4) || 'N/A'}
+          Recall: ${job.metrics?.recall?.toFixed(4) || 'N/A'}
+          F1 Score: ${job.metrics?.f1_score?.toFixed(4) || 'N/A'}
         `;
         this.snackBar.open(message, 'Cerrar', {
           duration: 10000, // Mostrar por 10 segundos
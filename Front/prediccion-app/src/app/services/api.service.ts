@@ -1,6 +1,7 @@
 import { Injectable } from '@angular/core';
 import { HttpClient } from '@angular/common/http';
-import { Observable } from 'rxjs';
+import { Observable, timer } from 'rxjs';
+import { exhaustMap, last, map, takeWhile } from 'rxjs/operators';
 import { ModelInfo } from '../models/model-info';
 import { PredictionData } from '../models/prediction-data';
 import { ApiModelResponse } from '../models/prediction-data';
@@ -37,12 +38,27 @@ export class ApiService {
     });
   }
 
-  // Entrenar modelo
+  // Entrenar modelo (el backend encola el trabajo y responde 202 con job_id)
   trainModel(): Observable<any> {
     return this.http.post(`${this.baseEndpoint}/train-model/`, {});
   }
 
-  // Subir CSV y entrenar
+  // Estado de un trabajo de entrenamiento
+  getTrainJob(jobId: number): Observable<any> {
+    return this.http.get(`${this.baseEndpoint}/train-jobs/${jobId}/`);
+  }
+
+  // Consultar el trabajo periódicamente y emitirlo cuando termine (succeeded o failed)
+  waitForTrainJob(jobId: number, intervalMs = 3000): Observable<any> {
+    return timer(0, intervalMs).pipe(
+      exhaustMap(() => this.getTrainJob(jobId)),
+      map((response: any) => response.job),
+      takeWhile((job: any) => job.status === 'pending' || job.status === 'running', true),
+      last()
+    );
+  }
+
+  // Subir CSV y encolar el reentrenamiento (model_retrain.job_id en la respuesta)
   uploadAndTrain(file: File): Observable<any> {
     const formData = new FormData();
     formData.append('file', file);